@@ -0,0 +1,63 @@
+"""Per-worker cache of quiz and exam questions (with their answer keys) for grading.
+
+Every submit grades against all questions of the quiz or exam. The rows are
+cached under (institution, kind, quiz/exam id, question_version) -- ids repeat
+across shards when LMS_SHARD_DIR is set (tenancy.py); the routes that add, edit
+or delete questions call bump_version(), so every worker misses on its next
+submit instead of grading against an old key. A submit therefore costs one
+primary-key lookup for the version instead of reading every question row.
+
+The release scheduler calls warm() a few minutes before a quiz or exam opens,
+so the first wave of submits finds the key in memory.
+"""
+import os
+
+import tenancy
+from fragment_cache import MemoryBackend
+
+ANSWER_KEY_CACHE_SIZE = int(os.environ.get('LMS_ANSWER_KEY_CACHE_SIZE', '512'))
+
+# kind -> (parent table, question table, parent column)
+TABLES = {
+    'quiz': ('quizzes', 'quiz_questions', 'quiz_id'),
+    'exam': ('exams', 'exam_questions', 'exam_id'),
+}
+
+cache = MemoryBackend(ANSWER_KEY_CACHE_SIZE)
+
+
+def version(cursor, kind, parent_id):
+    """Current question_version of the quiz or exam, None if it does not exist."""
+    parent_table = TABLES[kind][0]
+    cursor.execute(f'SELECT COALESCE(question_version, 0) FROM {parent_table} WHERE id = ?', (parent_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def questions(cursor, kind, parent_id, question_version=None):
+    """Every question row of the quiz or exam (ordered by id), from the cache when
+    it holds this version. Pass question_version when the caller already read it."""
+    if question_version is None:
+        question_version = version(cursor, kind, parent_id)
+    key = (tenancy.current_institution() if tenancy.ENABLED else None, kind, parent_id, question_version)
+    rows = cache.get(key)
+    if rows is None:
+        _, question_table, parent_column = TABLES[kind]
+        cursor.execute(f'SELECT * FROM {question_table} WHERE {parent_column} = ? ORDER BY id', (parent_id,))
+        rows = tuple(cursor.fetchall())
+        if question_version is not None:
+            cache.set(key, rows)
+    return rows
+
+
+def bump_version(cursor, kind, parent_id):
+    """Invalidate the cached questions of a quiz or exam in every worker (the caller commits)."""
+    parent_table = TABLES[kind][0]
+    cursor.execute(f'UPDATE {parent_table} SET question_version = COALESCE(question_version, 0) + 1 WHERE id = ?',
+                   (parent_id,))
+
+
+def warm(cursor, kind, parent_ids):
+    """Load the questions of these quizzes or exams into this worker's cache."""
+    for parent_id in parent_ids:
+        questions(cursor, kind, parent_id)
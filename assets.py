@@ -0,0 +1,440 @@
+"""Fingerprinted, precompressed static assets.
+
+`python assets.py build` walks the asset folders of static/ (css, js, img,
+vendor) and writes to static/dist/:
+
+- CSS/JS named by content hash (css/style.3f2a9c1d0b.css); CSS is minified
+  and its relative url(...) references rewritten to the hashed files, JS is
+  copied as written (no tokenizer here to minify it safely; the .gz/.br
+  siblings recover most of the difference)
+- .gz siblings for text assets, and .br siblings when the brotli module is
+  installed
+- WebP/AVIF variants of every image at IMAGE_WIDTHS (and at full size), so
+  a 26px logo no longer downloads a 160 KB PNG
+- manifest.json mapping logical names to the hashed files
+
+The Assets extension serves static/dist/ under /assets/ with
+`Cache-Control: immutable` (a hashed file never changes, so browsers never
+revalidate it), picks the .br/.gz sibling the client accepts, and gives
+templates static_url('css/style.css') and static_image('img/logo.jpg', 28).
+Names missing from the manifest fall back to url_for('static'), so a fresh
+checkout works before the first build; nothing is loaded from a CDN. When a source is newer than the
+manifest, the app rebuilds in the background at startup; in debug mode the
+helpers return the unhashed files so edits show up on reload.
+
+static/vendor/fontawesome/ holds Font Awesome Free 6.4 reduced to the icons
+the templates use. `python assets.py vendor-icons <fontawesome-free-6.x-web
+dir>` regenerates it after templates start using new icons (the fonts are
+subset to those glyphs when fontTools is installed). Inter is not shipped:
+static/vendor/inter/inter.css is empty, so pages use the system font stack
+until `--inter <dir with Inter woff2 files>` vendors it the same way.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+
+from flask import abort, request, send_file, url_for
+from markupsafe import Markup, escape
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings without it
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+
+ASSET_DIRS = ('css', 'js', 'img', 'vendor')
+TEXT_EXTENSIONS = {'.css', '.js', '.svg', '.ttf', '.eot', '.json'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+COPY_EXTENSIONS = {'.woff2', '.woff', '.gif', '.webp', '.avif', '.ico'}
+IMAGE_WIDTHS = (64, 128)  # logos render at 22-64 CSS px; 128 covers 2x screens
+IMAGE_FORMATS = (('avif', 'AVIF', {'quality': 55}), ('webp', 'WEBP', {'quality': 80, 'method': 6}))
+MIN_COMPRESS_BYTES = 512
+CACHE_SECONDS = 365 * 24 * 3600
+
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('font/woff2', '.woff2')
+
+_HASH_LENGTH = 10
+_CSS_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_ICON_CLASS = re.compile(r'\bfa-([a-z0-9]+(?:-[a-z0-9]+)*)')
+
+
+# ---------------------------------------------------------------- minifiers
+
+def minify_css(text):
+    """Drop comments and redundant whitespace; quoted strings are left alone."""
+    parts = _CSS_STRING.split(_CSS_COMMENT.sub('', text))
+    for i in range(0, len(parts), 2):  # even indexes are outside strings
+        chunk = re.sub(r'\s+', ' ', parts[i])
+        chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+        chunk = re.sub(r':\s+', ':', chunk)
+        parts[i] = chunk.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+# ---------------------------------------------------------------- build
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:_HASH_LENGTH]
+
+
+def _hashed_name(logical, data, ext=None):
+    root, original_ext = os.path.splitext(logical)
+    return f'{root}.{_digest(data)}{ext or original_ext}'
+
+
+def _write(relpath, data):
+    """Atomically write dist/<relpath> (plus compressed siblings for text)."""
+    path = os.path.join(DIST_DIR, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    outputs = [(path, data)]
+    if os.path.splitext(relpath)[1] in TEXT_EXTENSIONS and len(data) >= MIN_COMPRESS_BYTES:
+        outputs.append((path + '.gz', gzip.compress(data, compresslevel=9, mtime=0)))
+        if brotli is not None:
+            outputs.append((path + '.br', brotli.compress(data, quality=11)))
+    for target, payload in outputs:
+        if os.path.exists(target):
+            continue  # same name means same content
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600; a front web server may serve dist/ directly
+        os.replace(tmp_path, target)
+
+
+def iter_sources(static_dir=STATIC_DIR):
+    """Logical names (relative to static/, '/'-separated) of every buildable asset."""
+    extensions = TEXT_EXTENSIONS | IMAGE_EXTENSIONS | COPY_EXTENSIONS
+    for top in ASSET_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(static_dir, top)):
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() in extensions:
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, static_dir).replace(os.sep, '/')
+
+
+def _image_variants(logical, data, manifest, images):
+    from io import BytesIO
+    from PIL import Image, features
+
+    with Image.open(BytesIO(data)) as img:
+        img.load()
+        width, height = img.size
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+        root = os.path.splitext(logical)[0]
+        widths = sorted({w for w in IMAGE_WIDTHS if w < width} | {width})
+        available = {}
+        for ext, pil_format, options in IMAGE_FORMATS:
+            if not features.check(ext):
+                continue
+            for target_width in widths:
+                if target_width == width:
+                    resized = img
+                else:
+                    resized = img.resize((target_width, max(1, round(height * target_width / width))),
+                                         Image.LANCZOS)
+                buf = BytesIO()
+                resized.save(buf, pil_format, **options)
+                encoded = buf.getvalue()
+                variant = f'{root}-{target_width}w.{ext}'
+                manifest[variant] = _hashed_name(variant, encoded)
+                _write(manifest[variant], encoded)
+            available[ext] = widths
+    images[logical] = {'width': width, 'height': height, 'formats': available}
+
+
+def build(static_dir=STATIC_DIR):
+    """Build static/dist/ and its manifest; returns the manifest dict."""
+    sources = list(iter_sources(static_dir))
+    manifest, images = {}, {}
+    # Non-CSS first, so url(...) in stylesheets can be rewritten to hashed names
+    for logical in sorted(sources, key=lambda name: name.endswith('.css')):
+        with open(os.path.join(static_dir, logical), 'rb') as f:
+            data = f.read()
+        ext = os.path.splitext(logical)[1].lower()
+        if ext == '.css':
+            data = minify_css(_rewrite_urls(logical, data.decode('utf-8'), manifest)).encode('utf-8')
+        elif ext in IMAGE_EXTENSIONS:
+            _image_variants(logical, data, manifest, images)
+        manifest[logical] = _hashed_name(logical, data)
+        _write(manifest[logical], data)
+
+    document = {'files': manifest, 'images': images}
+    os.makedirs(DIST_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=DIST_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(document, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(DIST_DIR, MANIFEST_NAME))
+    _prune(document)
+    return document
+
+
+def _rewrite_urls(logical, css, manifest):
+    base = os.path.dirname(logical)
+
+    def replace(match):
+        target = match.group(2).strip()
+        if re.match(r'^(data:|[a-z]+://|/|#)', target):
+            return match.group(0)
+        path, _, suffix = target.partition('?')
+        path, _, fragment = path.partition('#')
+        resolved = os.path.normpath(os.path.join(base, path)).replace(os.sep, '/')
+        if resolved not in manifest:
+            return match.group(0)
+        relative = os.path.relpath(manifest[resolved], base).replace(os.sep, '/')
+        return f'url({relative}{"#" + fragment if fragment else ""})'
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _prune(document):
+    """Remove hashed files that no longer appear in the manifest."""
+    keep = set(document['files'].values())
+    for dirpath, _, filenames in os.walk(DIST_DIR):
+        for filename in filenames:
+            relpath = os.path.relpath(os.path.join(dirpath, filename), DIST_DIR).replace(os.sep, '/')
+            base = re.sub(r'\.(gz|br)$', '', relpath)
+            if filename != MANIFEST_NAME and base not in keep:
+                os.remove(os.path.join(dirpath, filename))
+
+
+def is_stale(static_dir=STATIC_DIR):
+    manifest_path = os.path.join(DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return True
+    built = os.path.getmtime(manifest_path)
+    return any(os.path.getmtime(os.path.join(static_dir, name)) > built for name in iter_sources(static_dir))
+
+
+# ---------------------------------------------------------------- vendoring
+
+def used_icons(template_dir=TEMPLATE_DIR, static_dir=STATIC_DIR):
+    """fa-* class names referenced by the templates and scripts."""
+    names = set()
+    for root in (template_dir, os.path.join(static_dir, 'js')):
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(('.html', '.js')):
+                    with open(os.path.join(dirpath, filename), encoding='utf-8', errors='ignore') as f:
+                        names.update(_ICON_CLASS.findall(f.read()))
+    return names
+
+
+def _top_level_blocks(css):
+    """Split a stylesheet into (prelude, body) top-level blocks; nested at-rules stay whole."""
+    blocks, depth, start, prelude_end = [], 0, 0, None
+    for i, ch in enumerate(css):
+        if ch == '{':
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:prelude_end].strip(), css[prelude_end + 1:i]))
+                start = i + 1
+    return blocks
+
+
+def subset_icon_css(css, keep):
+    """Drop the glyph rules (.fa-name:before{content:...} / .fa-name{--fa:...})
+    of icons that are not in `keep`; returns (css, codepoints of kept glyphs)."""
+    out, codepoints = [], set()
+    glyph_selector = re.compile(r'^\.fa-([a-z0-9-]+)(?:::?before)?$')
+    glyph_body = re.compile(r'''(?:content|--fa)\s*:\s*["']\\([0-9a-f]+)["']''')
+    for prelude, body in _top_level_blocks(css):
+        selectors = [s.strip() for s in prelude.split(',')]
+        match = glyph_body.search(body)
+        if not prelude.startswith('@') and match and all(glyph_selector.match(s) for s in selectors):
+            kept = [s for s in selectors if glyph_selector.match(s).group(1) in keep]
+            if not kept:
+                continue
+            codepoints.add(int(match.group(1), 16))
+            prelude = ','.join(kept)
+        out.append(f'{prelude}{{{body}}}')
+    return '\n'.join(out) + '\n', codepoints
+
+
+def _subset_font(src, dest, codepoints):
+    try:
+        from fontTools import subset
+    except ImportError:
+        shutil.copyfile(src, dest)
+        return False
+    options = subset.Options()
+    options.flavor = 'woff2' if dest.endswith('.woff2') else None
+    options.layout_features = ['*']
+    font = subset.load_font(src, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    subset.save_font(font, dest, options)
+    return True
+
+
+def vendor_icons(source_dir, static_dir=STATIC_DIR):
+    """Vendor Font Awesome from an unpacked fontawesome-free-*-web download."""
+    with open(os.path.join(source_dir, 'css', 'all.css'), encoding='utf-8') as f:
+        css, codepoints = subset_icon_css(f.read(), used_icons(static_dir=static_dir))
+    target = os.path.join(static_dir, 'vendor', 'fontawesome')
+    os.makedirs(os.path.join(target, 'css'), exist_ok=True)
+    os.makedirs(os.path.join(target, 'webfonts'), exist_ok=True)
+    with open(os.path.join(target, 'css', 'icons.css'), 'w', encoding='utf-8') as f:
+        f.write(css)
+    if os.path.exists(os.path.join(source_dir, 'LICENSE.txt')):
+        shutil.copyfile(os.path.join(source_dir, 'LICENSE.txt'), os.path.join(target, 'LICENSE.txt'))
+    subset_done = True
+    fonts = os.path.join(source_dir, 'webfonts')
+    for filename in sorted(os.listdir(fonts)):
+        if filename.endswith(('.woff2', '.ttf')):
+            # Subset from the .ttf when there is one: fontTools cannot decode every shipped woff2
+            source = os.path.join(fonts, os.path.splitext(filename)[0] + '.ttf')
+            if not os.path.exists(source):
+                source = os.path.join(fonts, filename)
+            subset_done &= _subset_font(source, os.path.join(target, 'webfonts', filename), codepoints)
+    print(f'[Assets] Vendored {len(codepoints)} icons into {target}'
+          + ('' if subset_done else ' (install fontTools to also subset the font files)'))
+
+
+def vendor_inter(source_dir, static_dir=STATIC_DIR):
+    """Vendor the Inter woff2 files (Inter-Regular.woff2, Inter-SemiBold.woff2, ...)."""
+    weights = {'Light': 300, 'Regular': 400, 'Medium': 500, 'SemiBold': 600, 'Bold': 700,
+               'ExtraBold': 800, 'Black': 900}
+    target = os.path.join(static_dir, 'vendor', 'inter')
+    os.makedirs(target, exist_ok=True)
+    faces = []
+    for name, weight in weights.items():
+        filename = f'Inter-{name}.woff2'
+        if os.path.exists(os.path.join(source_dir, filename)):
+            shutil.copyfile(os.path.join(source_dir, filename), os.path.join(target, filename))
+            faces.append(f"@font-face{{font-family:'Inter';font-style:normal;font-weight:{weight};"
+                         f"font-display:swap;src:url({filename}) format('woff2')}}")
+    with open(os.path.join(target, 'inter.css'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(faces) + '\n')
+    print(f'[Assets] Vendored {len(faces)} Inter weights into {target}')
+
+
+# ---------------------------------------------------------------- Flask extension
+
+class Assets:
+    """Serves static/dist/ and provides static_url() / static_image() to templates."""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.images = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.add_url_rule('/assets/<path:filename>', 'hashed_asset', self.serve)
+        app.jinja_env.globals['static_url'] = self.static_url
+        app.jinja_env.globals['static_image'] = self.static_image
+        self.load()
+        if not app.debug and is_stale():
+            threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def load(self):
+        try:
+            with open(os.path.join(DIST_DIR, MANIFEST_NAME)) as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self.manifest = document.get('files', {})
+            self.images = document.get('images', {})
+
+    def _rebuild(self):
+        try:
+            document = build()
+            print(f'[Assets] Built {len(document["files"])} fingerprinted assets')
+            self.load()
+        except Exception as e:
+            print(f'[Assets] Build failed, serving unhashed files: {e}')
+
+    def static_url(self, filename, width=None, fmt=None):
+        """Hashed /assets/ URL for a static file, or its WebP/AVIF variant at `width`."""
+        if width and fmt:
+            filename = f'{os.path.splitext(filename)[0]}-{width}w.{fmt}'
+        hashed = None if self.app.debug else self.manifest.get(filename)
+        if hashed:
+            return url_for('hashed_asset', filename=hashed)
+        return url_for('static', filename=filename)
+
+    def static_image(self, filename, size, alt='', style='', **attrs):
+        """<picture> with AVIF/WebP sources sized for `size` CSS px at 1x and 2x."""
+        info = None if self.app.debug else self.images.get(filename)
+        attributes = ''.join(f' {name.replace("_", "-")}="{escape(value)}"' for name, value in attrs.items())
+        img = (f'<img src="{escape(self.static_url(filename))}" alt="{escape(alt)}" style="{escape(style)}"'
+               f' width="{size}" height="{size}" decoding="async"{attributes}>')
+        if not info:
+            return Markup(img)
+        sources = []
+        for fmt, widths in info['formats'].items():
+            candidates, chosen = [], set()
+            for density in (1, 2):
+                width = next((w for w in widths if w >= size * density), widths[-1])
+                if width not in chosen:
+                    chosen.add(width)
+                    candidates.append(f'{self.static_url(filename, width, fmt)} {density}x')
+            sources.append(f'<source type="image/{fmt}" srcset="{escape(", ".join(candidates))}">')
+        return Markup(f'<picture>{"".join(sources)}{img}</picture>')
+
+    def serve(self, filename):
+        path = os.path.normpath(os.path.join(DIST_DIR, filename))
+        if not path.startswith(DIST_DIR + os.sep) or not os.path.isfile(path) or filename == MANIFEST_NAME:
+            abort(404)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if candidate in accepted and os.path.isfile(path + suffix):
+                path, encoding = path + suffix, candidate
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=CACHE_SECONDS)
+        response.headers['Cache-Control'] = f'public, max-age={CACHE_SECONDS}, immutable'
+        response.headers['Vary'] = 'Accept-Encoding'
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or vendor static assets.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', help='fingerprint, minify and compress static/ into static/dist/')
+    vendor = commands.add_parser('vendor-icons', help='vendor the Font Awesome icons the templates use')
+    vendor.add_argument('fontawesome_dir', help='unpacked fontawesome-free-6.x-web directory')
+    vendor.add_argument('--inter', help='directory with Inter-*.woff2 files to vendor as well')
+    args = parser.parse_args(argv)
+
+    if args.command == 'vendor-icons':
+        vendor_icons(args.fontawesome_dir)
+        if args.inter:
+            vendor_inter(args.inter)
+    document = build()
+    print(f'[Assets] Built {len(document["files"])} fingerprinted assets in {DIST_DIR}'
+          + ('' if brotli else ' (pip install brotli for .br siblings)'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""Benchmarks for the LMS.
+
+- bench.datagen             deterministic synthetic database (students, enrollments,
+                            submissions, quiz attempts, video heartbeats, messages)
+- bench.run                 times the hot routes through the Flask test client and
+                            records / compares bench/baseline.json
+- bench.payroll_generation  set-based payroll generation vs. the original loop
+- bench.startup             import and create_app() time of a fresh worker, and
+                            whether pandas / PIL / smtplib load at boot
+
+Run from the repository root, e.g. ``python -m bench.run --compare``.
+"""
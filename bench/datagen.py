@@ -0,0 +1,257 @@
+"""Deterministic synthetic data for benchmarks.
+
+generate() builds a fresh database with init_db() and then bulk-loads
+institutions, sections, students, subjects (owned by the default instructor),
+sessions with activities and a 10-question quiz, enrollments, and for every
+enrolled student a seeded-random amount of progress: submissions, quiz
+attempts, video watches, session progress, messages and notifications.
+
+The same parameters and seed always produce the same rows (timestamps are
+offsets from a fixed date), so benchmark numbers stay comparable.
+
+    python -m bench.datagen out.db [--institutions 2 --students 300 --subjects 4 --sessions 8]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+import database
+import item_analysis
+import pg_backend
+
+BASE_DATE = datetime(2026, 1, 5, 8, 0, 0)
+BENCH_PASSWORD = 'bench123'
+ACTIVITIES_PER_SESSION = 2
+QUESTIONS_PER_QUIZ = 10
+SECTIONS_PER_INSTITUTION = 4
+ENROLLMENTS_PER_STUDENT = 4
+MESSAGES_PER_STUDENT = 3
+NOTIFICATIONS_PER_STUDENT = 5
+VIDEO_DURATION = 600
+
+DEFAULTS = {'institutions': 2, 'students': 300, 'subjects': 4, 'sessions': 8, 'seed': 42}
+
+
+def _ts(rng, max_days=90):
+    return (BASE_DATE + timedelta(minutes=rng.randrange(max_days * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def generate(path, institutions=2, students=300, subjects=4, sessions=8, seed=42):
+    """Create the database at path and return a dict describing what was generated.
+
+    students is the total across institutions; subjects is per institution and
+    sessions per subject. With DATABASE_URL set the PostgreSQL database is
+    wiped and filled instead of path.
+    """
+    if pg_backend.ENABLED:
+        pg_backend.reset_schema()
+    elif os.path.exists(path):
+        os.remove(path)
+    database.DATABASE = path
+    database.init_db()
+
+    rng = random.Random(seed)
+    conn = database.get_db()
+    cursor = conn.cursor()
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    cursor.execute("SELECT id FROM users WHERE role = 'instructor' ORDER BY id LIMIT 1")
+    instructor_id = cursor.fetchone()['id']
+
+    # Institutions and their sections
+    cursor.executemany('INSERT INTO institutions (name, short_name) VALUES (?, ?)',
+                       [(f'Bench University {i}', f'BU{i}') for i in range(institutions)])
+    cursor.execute("SELECT id FROM institutions WHERE short_name LIKE 'BU%' ORDER BY id")
+    institution_ids = [r['id'] for r in cursor.fetchall()]
+    sections = {inst_id: [f'BENCH {n}-{k}' for k in range(1, SECTIONS_PER_INSTITUTION + 1)]
+                for n, inst_id in enumerate(institution_ids)}
+
+    # Students, spread evenly over institutions and sections
+    student_rows = []
+    for n in range(students):
+        inst_id = institution_ids[n % institutions]
+        student_rows.append((f'bench_student_{n}', password_hash, f'Bench Student {n:05d}', 'student',
+                             f'2026-{n:05d}', rng.choice(sections[inst_id]), inst_id,
+                             f'bench_student_{n}@example.com', _ts(rng)))
+    cursor.executemany('''
+        INSERT INTO users (username, password_hash, full_name, role, student_id, section, institution_id,
+                           email, created_at, is_approved, profile_completed)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 1)
+    ''', student_rows)
+    cursor.execute("SELECT id, institution_id FROM users WHERE username LIKE 'bench_student_%' ORDER BY id")
+    student_list = cursor.fetchall()
+
+    # Subjects with sessions, activities and one quiz per session
+    subject_rows = []
+    for inst_id in institution_ids:
+        for k in range(subjects):
+            subject_rows.append((f'BEN{inst_id:02d}{k:02d}', f'Benchmark Subject {inst_id}-{k}',
+                                 sections[inst_id][k % SECTIONS_PER_INSTITUTION], instructor_id, inst_id))
+    cursor.executemany('''
+        INSERT INTO subjects (code, name, section, instructor_id, institution_id)
+        VALUES (?, ?, ?, ?, ?)
+    ''', subject_rows)
+    cursor.execute("SELECT id, institution_id FROM subjects WHERE code LIKE 'BEN%' ORDER BY id")
+    subject_list = cursor.fetchall()
+
+    cursor.executemany('''
+        INSERT INTO sessions (subject_id, session_number, title, youtube_url, video_duration)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(s['id'], n, f'Session {n}: Benchmark Topic {n}', f'https://www.youtube.com/watch?v=bench{s["id"]}x{n}',
+           VIDEO_DURATION) for s in subject_list for n in range(1, sessions + 1)])
+    cursor.execute('''
+        SELECT s.id, s.subject_id, s.session_number FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id WHERE sub.code LIKE 'BEN%' ORDER BY s.id
+    ''')
+    session_list = cursor.fetchall()
+
+    activity_rows = []
+    for s in session_list:
+        due = (BASE_DATE + timedelta(days=7 * s['session_number'])).strftime('%Y-%m-%d')
+        for a in range(1, ACTIVITIES_PER_SESSION + 1):
+            activity_rows.append((s['id'], a, f'Activity {s["session_number"]}.{a}',
+                                  '<ol><li>Write the program described in the lesson.</li>'
+                                  '<li>Explain each step of your solution.</li></ol>',
+                                  due, 1 if a == 1 else 0, 2))
+    cursor.executemany('''
+        INSERT INTO activities (session_id, activity_number, title, instructions, due_date,
+                                enable_peer_review, peer_reviewers_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', activity_rows)
+    cursor.execute('''
+        SELECT a.id, a.session_id FROM activities a
+        JOIN sessions s ON a.session_id = s.id JOIN subjects sub ON s.subject_id = sub.id
+        WHERE sub.code LIKE 'BEN%' ORDER BY a.id
+    ''')
+    activities_by_session = {}
+    for a in cursor.fetchall():
+        activities_by_session.setdefault(a['session_id'], []).append(a['id'])
+
+    cursor.executemany('INSERT INTO quizzes (session_id, title, time_limit) VALUES (?, ?, 15)',
+                       [(s['id'], f'Quiz {s["session_number"]}') for s in session_list])
+    cursor.execute('''
+        SELECT q.id, q.session_id FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id JOIN subjects sub ON s.subject_id = sub.id
+        WHERE sub.code LIKE 'BEN%' ORDER BY q.id
+    ''')
+    quiz_by_session = {q['session_id']: q['id'] for q in cursor.fetchall()}
+    options = json.dumps(['A', 'B', 'C', 'D'])
+    cursor.executemany('''
+        INSERT INTO quiz_questions (quiz_id, question_text, question_type, options, correct_answer, points)
+        VALUES (?, ?, 'multiple_choice', ?, ?, 1)
+    ''', [(quiz_id, f'Benchmark question {n}?', options, 'ABCD'[n % 4])
+          for quiz_id in quiz_by_session.values() for n in range(QUESTIONS_PER_QUIZ)])
+    cursor.execute('SELECT id, quiz_id, correct_answer FROM quiz_questions ORDER BY id')
+    questions_by_quiz = {}
+    for q in cursor.fetchall():
+        questions_by_quiz.setdefault(q['quiz_id'], []).append(q)
+
+    # Enrollments within the student's institution
+    subjects_by_institution = {}
+    for s in subject_list:
+        subjects_by_institution.setdefault(s['institution_id'], []).append(s['id'])
+    sessions_by_subject = {}
+    for s in session_list:
+        sessions_by_subject.setdefault(s['subject_id'], []).append(s)
+    enrollments = []
+    for st in student_list:
+        pool = subjects_by_institution[st['institution_id']]
+        for subject_id in rng.sample(pool, min(ENROLLMENTS_PER_STUDENT, len(pool))):
+            enrollments.append((st['id'], subject_id))
+    cursor.executemany('INSERT INTO enrollments (student_id, subject_id) VALUES (?, ?)', enrollments)
+
+    # Per-student progress through each enrolled subject
+    submissions, attempts, watches, progress = [], [], [], []
+    for student_id, subject_id in enrollments:
+        reached = rng.randint(0, sessions)
+        for s in sessions_by_subject[subject_id][:reached]:
+            completed = s['session_number'] < reached
+            watched = VIDEO_DURATION if completed else rng.randrange(VIDEO_DURATION)
+            watches.append((s['id'], student_id, watched, watched, 1 if completed else 0, _ts(rng)))
+            for activity_id in activities_by_session[s['id']]:
+                if rng.random() < 0.85:
+                    score = rng.randint(55, 100)
+                    submissions.append((activity_id, student_id, 'Benchmark submission text. ' * 20, score,
+                                        score, 1, _ts(rng)))
+            quiz_id = quiz_by_session[s['id']]
+            if rng.random() < 0.8:
+                answers = {str(q['id']): q['correct_answer'] if rng.random() < 0.7 else rng.choice('ABCD')
+                           for q in questions_by_quiz[quiz_id]}
+                correct = sum(answers[str(q['id'])] == q['correct_answer'] for q in questions_by_quiz[quiz_id])
+                attempts.append((quiz_id, student_id, json.dumps(answers), correct * 100.0 / QUESTIONS_PER_QUIZ,
+                                 1, rng.randint(60, 900), _ts(rng)))
+            progress.append((s['id'], student_id, 1, 1, 1 if completed else 0, 1 if completed else 0,
+                             1 if completed else 0, _ts(rng) if completed else None))
+    cursor.executemany('''
+        INSERT INTO submissions (activity_id, student_id, content, score, final_score, score_visible, submitted_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', submissions)
+    cursor.executemany('''
+        INSERT INTO quiz_attempts (quiz_id, student_id, answers, score, score_visible, time_spent, submitted_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', attempts)
+    cursor.executemany('''
+        INSERT INTO session_video_watches (session_id, student_id, watched_seconds, last_position, completed,
+                                           last_heartbeat_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', watches)
+    cursor.executemany('''
+        INSERT INTO session_progress (session_id, student_id, step_video, step_slides, step_reading,
+                                      step_activity, step_quiz, completed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', progress)
+
+    # Messages and notifications
+    messages, notifications = [], []
+    for st in student_list:
+        for n in range(MESSAGES_PER_STUDENT):
+            messages.append((instructor_id, st['id'], f'Benchmark message {n}', 'Please review the latest session.',
+                             1 if rng.random() < 0.6 else 0, _ts(rng)))
+        for n in range(NOTIFICATIONS_PER_STUDENT):
+            notifications.append((st['id'], 'info', 'bell', f'Benchmark notification {n}', '/student/dashboard',
+                                  1 if rng.random() < 0.5 else 0, _ts(rng)))
+    cursor.executemany('''
+        INSERT INTO messages (sender_id, recipient_id, subject, content, is_read, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', messages)
+    cursor.executemany('''
+        INSERT INTO notifications (user_id, type, icon, message, link, is_read, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', notifications)
+
+    item_analysis.backfill_question_stats(cursor)
+    conn.commit()
+    conn.close()
+
+    return {
+        'institutions': institutions, 'students': students, 'subjects': len(subject_list),
+        'sessions': len(session_list), 'enrollments': len(enrollments), 'submissions': len(submissions),
+        'quiz_attempts': len(attempts), 'video_watches': len(watches), 'messages': len(messages),
+        'notifications': len(notifications),
+    }
+
+
+def build_parser(description=__doc__):
+    parser = argparse.ArgumentParser(description=description.splitlines()[0])
+    parser.add_argument('--institutions', type=int, default=DEFAULTS['institutions'])
+    parser.add_argument('--students', type=int, default=DEFAULTS['students'])
+    parser.add_argument('--subjects', type=int, default=DEFAULTS['subjects'], help='per institution')
+    parser.add_argument('--sessions', type=int, default=DEFAULTS['sessions'], help='per subject')
+    parser.add_argument('--seed', type=int, default=DEFAULTS['seed'])
+    return parser
+
+
+def main():
+    parser = build_parser()
+    parser.add_argument('path')
+    args = parser.parse_args()
+    counts = generate(args.path, args.institutions, args.students, args.subjects, args.sessions, args.seed)
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""Benchmark payroll generation on a synthetic database.
+
+Builds a throwaway database with institutions x instructors_per_institution
+instructors and ATTENDANCE_DAYS of attendance each (the period is the last
+month), then times the original per-instructor loop against
+payroll.generate_payroll() and checks that both produce the same records.
+
+    python -m bench.payroll_generation [institutions] [instructors_per_institution]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import database
+import payroll
+
+PERIOD_START = '2026-03-01'
+PERIOD_END = '2026-03-31'
+ATTENDANCE_DAYS = 90         # Jan-Mar, so the period filter has history to skip
+
+
+def build_database(path, institutions, per_institution):
+    database.DATABASE = path
+    database.init_db()
+    conn = database.get_db()
+    cursor = conn.cursor()
+    rng = random.Random(42)
+
+    cursor.executemany('INSERT INTO institutions (name, short_name) VALUES (?, ?)',
+                       [(f'Bench Institution {i}', f'BI{i}') for i in range(institutions)])
+    cursor.execute("SELECT id FROM institutions WHERE short_name LIKE 'BI%' ORDER BY id")
+    institution_ids = [r['id'] for r in cursor.fetchall()]
+
+    users = [(f'bench_inst_{i}_{n}', 'x', f'Instructor {i}-{n}', 'instructor', inst_id)
+             for i, inst_id in enumerate(institution_ids) for n in range(per_institution)]
+    cursor.executemany('''
+        INSERT INTO users (username, password_hash, full_name, role, institution_id, is_approved)
+        VALUES (?, ?, ?, ?, ?, 1)
+    ''', users)
+    cursor.execute("SELECT id, institution_id FROM users WHERE username LIKE 'bench_inst_%'")
+    instructors = cursor.fetchall()
+
+    cursor.executemany('''
+        INSERT INTO instructor_profiles (user_id, institution_id, salary_rate, salary_frequency)
+        VALUES (?, ?, ?, ?)
+    ''', [(r['id'], r['institution_id'], rng.choice([350, 500, 25000, 32000]),
+           rng.choice(['hourly', 'monthly'])) for r in instructors])
+
+    days = [date(2026, 4, 1) - timedelta(days=d) for d in range(1, ATTENDANCE_DAYS + 1)]
+    attendance = []
+    for r in instructors:
+        for day in days:
+            if day.weekday() >= 5:
+                continue
+            status = rng.choices(['present', 'late', 'absent'], weights=[85, 10, 5])[0]
+            hours = 0 if status == 'absent' else rng.choice([6, 7, 8])
+            attendance.append((r['id'], day.isoformat(), status, hours))
+    cursor.executemany('''
+        INSERT INTO instructor_attendance (instructor_id, date, status, hours_worked) VALUES (?, ?, ?, ?)
+    ''', attendance)
+    conn.commit()
+    conn.close()
+    return len(instructors), len(attendance)
+
+
+def legacy_generate(conn, period_start, period_end):
+    """The per-instructor loop payroll generation used before payroll.py."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT u.id, u.full_name, ip.institution_id, ip.salary_rate, ip.salary_frequency, ip.contract_type
+        FROM users u
+        JOIN instructor_profiles ip ON u.id = ip.user_id
+        WHERE u.role = 'instructor' AND ip.salary_rate > 0
+    ''')
+    generated = 0
+    for inst in cursor.fetchall():
+        cursor.execute('''
+            SELECT COUNT(*) as total_days,
+                   SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present,
+                   SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END) as absent,
+                   SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) as late,
+                   SUM(hours_worked) as total_hours
+            FROM instructor_attendance
+            WHERE instructor_id = ? AND date BETWEEN ? AND ?
+        ''', (inst['id'], period_start, period_end))
+        att = cursor.fetchone()
+        days_present = (att['present'] or 0) + (att['late'] or 0)
+        days_absent = att['absent'] or 0
+        days_late = att['late'] or 0
+        total_hours = att['total_hours'] or 0
+        base_salary = inst['salary_rate']
+        gross_pay = base_salary * total_hours if inst['salary_frequency'] == 'hourly' else base_salary
+        daily_rate = gross_pay / 22 if gross_pay > 0 else 0
+        absent_deduction = daily_rate * days_absent
+        late_deduction = (daily_rate * 0.1) * days_late
+        total_deductions = absent_deduction + late_deduction
+        deduction_details = json.dumps({
+            'absent_days': days_absent, 'absent_deduction': round(absent_deduction, 2),
+            'late_days': days_late, 'late_deduction': round(late_deduction, 2)
+        })
+        net_pay = max(0, gross_pay - total_deductions)
+        cursor.execute('''
+            SELECT id FROM instructor_payroll WHERE instructor_id = ? AND period_start = ? AND period_end = ?
+        ''', (inst['id'], period_start, period_end))
+        if not cursor.fetchone():
+            cursor.execute('''
+                INSERT INTO instructor_payroll (instructor_id, institution_id, period_start, period_end,
+                    base_salary, days_present, days_absent, days_late, total_hours,
+                    deductions, deduction_details, gross_pay, net_pay, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'draft')
+            ''', (inst['id'], inst['institution_id'], period_start, period_end,
+                  base_salary, days_present, days_absent, days_late, round(total_hours, 1),
+                  round(total_deductions, 2), deduction_details, round(gross_pay, 2), round(net_pay, 2)))
+            generated += 1
+    conn.commit()
+    return generated
+
+
+def snapshot(conn):
+    rows = conn.execute('''
+        SELECT instructor_id, institution_id, base_salary, days_present, days_absent, days_late,
+               total_hours, deductions, deduction_details, gross_pay, net_pay
+        FROM instructor_payroll WHERE period_start = ? AND period_end = ? ORDER BY instructor_id
+    ''', (PERIOD_START, PERIOD_END)).fetchall()
+    return [tuple(r[:8]) + (json.loads(r['deduction_details']),) + tuple(r[9:]) for r in rows]
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f'  {label:<28} {elapsed * 1000:9.1f} ms  ({result} records)')
+    return elapsed
+
+
+def main():
+    institutions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    per_institution = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench_payroll.db')
+        instructors, attendance = build_database(path, institutions, per_institution)
+        print(f'{instructors} instructors across {institutions} institutions, {attendance} attendance rows')
+
+        conn = database.get_db()
+        legacy = timed('per-instructor loop', lambda: legacy_generate(conn, PERIOD_START, PERIOD_END))
+        expected = snapshot(conn)
+        conn.execute('DELETE FROM instructor_payroll')
+        conn.commit()
+
+        timed('preview (dry run)', lambda: len(payroll.preview_payroll(conn.cursor(), PERIOD_START, PERIOD_END)))
+
+        def set_based():
+            generated = payroll.generate_payroll(conn.cursor(), PERIOD_START, PERIOD_END)
+            conn.commit()
+            return generated
+        new = timed('set-based generate', set_based)
+        timed('set-based re-run (no-op)', set_based)
+
+        matches = snapshot(conn) == expected
+        conn.close()
+        print(f'  speedup: {legacy / new:.1f}x, records identical: {matches}')
+        if not matches:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
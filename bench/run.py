@@ -0,0 +1,204 @@
+"""Benchmark the hot routes against a synthetic database.
+
+Generates a database with bench.datagen, then drives the Flask test client
+through each scenario (a warm-up call plus --repeat timed calls) and reports
+median / p95 latency and the SQL query count per call. Query counts come from
+the Server-Timing header of the query profiler, which is switched on for the
+run; they do not depend on the machine, so they are the number to watch.
+
+    python -m bench.run                       # print results
+    python -m bench.run --save                # record bench/baseline.json
+    python -m bench.run --compare [--check]   # diff against the baseline
+
+--check exits non-zero when a scenario issues more queries than the baseline
+or its median is more than --tolerance (and --min-delta-ms) slower.
+"""
+import json
+import os
+import platform
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Query counts come from the profiler, which must be on before database is imported
+os.environ['LMS_QUERY_PROFILE'] = '1'
+os.environ.setdefault('LMS_SLOW_QUERY_MS', '1000000')
+os.environ.setdefault('LMS_SLOW_QUERY_LOG', os.path.join(tempfile.gettempdir(), 'lms_bench_slow_queries.log'))
+
+from bench import datagen  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+INSTRUCTOR_LOGIN = ('instructor', 'instructor123')
+STUDENT_LOGIN = ('bench_student_0', datagen.BENCH_PASSWORD)
+
+_QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+
+def _fixtures(conn):
+    """Ids the scenarios need, picked deterministically from the generated data."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM users WHERE username = ?", (STUDENT_LOGIN[0],))
+    student_id = cursor.fetchone()['id']
+    cursor.execute('''
+        SELECT q.id AS quiz_id, s.id AS session_id FROM enrollments e
+        JOIN sessions s ON s.subject_id = e.subject_id
+        JOIN quizzes q ON q.session_id = s.id
+        WHERE e.student_id = ?
+        ORDER BY s.subject_id, s.session_number LIMIT 1
+    ''', (student_id,))
+    row = cursor.fetchone()
+    cursor.execute('SELECT id FROM quiz_questions WHERE quiz_id = ? ORDER BY id', (row['quiz_id'],))
+    question_ids = [r['id'] for r in cursor.fetchall()]
+    cursor.execute('''
+        SELECT a.id FROM activities a JOIN submissions sub ON sub.activity_id = a.id
+        WHERE a.enable_peer_review = 1
+        GROUP BY a.id ORDER BY COUNT(*) DESC, a.id LIMIT 1
+    ''')
+    return {
+        'quiz_id': row['quiz_id'],
+        'session_id': row['session_id'],
+        'question_ids': question_ids,
+        'peer_review_activity_id': cursor.fetchone()['id'],
+    }
+
+
+def _scenarios(fx):
+    """(name, login, request function taking (client, iteration))."""
+    answers = {f'q_{qid}': 'ABCD'[n % 4] for n, qid in enumerate(fx['question_ids'])}
+    return [
+        ('grades', INSTRUCTOR_LOGIN, lambda c, i: c.get('/grades')),
+        ('grades_download', INSTRUCTOR_LOGIN, lambda c, i: c.get('/grades/download')),
+        ('instructor_monitoring', INSTRUCTOR_LOGIN, lambda c, i: c.get('/instructor/monitoring')),
+        ('assign_peer_reviewers', INSTRUCTOR_LOGIN,
+         lambda c, i: c.post(f'/activity/{fx["peer_review_activity_id"]}/peer-review/assign')),
+        ('student_dashboard', STUDENT_LOGIN, lambda c, i: c.get('/student/dashboard')),
+        ('video_heartbeat', STUDENT_LOGIN,
+         lambda c, i: c.post('/api/session/video-heartbeat',
+                             json={'session_id': fx['session_id'], 'current_time': 5 * (i + 1),
+                                   'duration': datagen.VIDEO_DURATION})),
+        ('unread_count', STUDENT_LOGIN, lambda c, i: c.get('/api/messages/unread-count')),
+        ('submit_quiz', STUDENT_LOGIN, lambda c, i: c.post(f'/quiz/{fx["quiz_id"]}/submit', data=answers)),
+    ]
+
+
+def _login(app, credentials):
+    client = app.test_client()
+    response = client.post('/login', data={'username': credentials[0], 'password': credentials[1]})
+    if response.status_code != 302:
+        raise RuntimeError(f'Login failed for {credentials[0]} ({response.status_code})')
+    return client
+
+
+def run(args):
+    """Generate the database, run every scenario and return the results dict."""
+    workdir = tempfile.mkdtemp(prefix='lms_bench_')
+    db_path = os.path.join(workdir, 'bench.db')
+    params = {'institutions': args.institutions, 'students': args.students, 'subjects': args.subjects,
+              'sessions': args.sessions, 'seed': args.seed}
+    start = time.perf_counter()
+    counts = datagen.generate(db_path, **params)
+    print(f'Generated {counts} in {time.perf_counter() - start:.1f}s')
+
+    from database import get_db
+    from lms import create_app
+    app = create_app({'TESTING': True, 'BACKGROUND_JOBS': False})
+    conn = get_db()
+    fx = _fixtures(conn)
+    conn.close()
+
+    clients = {}
+    results = {}
+    for name, credentials, call in _scenarios(fx):
+        if args.only and name not in args.only:
+            continue
+        if credentials not in clients:
+            clients[credentials] = _login(app, credentials)
+        client = clients[credentials]
+        response = call(client, 0)  # warm-up: template compilation, caches
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: HTTP {response.status_code}')
+        timings, queries = [], []
+        for i in range(1, args.repeat + 1):
+            t0 = time.perf_counter()
+            response = call(client, i)
+            timings.append((time.perf_counter() - t0) * 1000)
+            match = _QUERY_COUNT.search(response.headers.get('Server-Timing', ''))
+            queries.append(int(match.group(1)) if match else None)
+        timings.sort()
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(round(0.95 * len(timings))) - 1)], 2),
+            'min_ms': round(timings[0], 2),
+            'queries': max(q for q in queries if q is not None) if any(q is not None for q in queries) else None,
+            'status': response.status_code,
+        }
+        print(f'  {name:<24} median {results[name]["median_ms"]:9.1f} ms   p95 {results[name]["p95_ms"]:9.1f} ms'
+              f'   queries {results[name]["queries"]}')
+
+    return {
+        'recorded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'repeat': args.repeat,
+        'params': params,
+        'data': counts,
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Print the diff against the baseline; return the names of regressed scenarios."""
+    if current['params'] != baseline['params']:
+        print(f'Note: baseline was recorded with {baseline["params"]}, this run used {current["params"]}')
+    regressions = []
+    print(f'\n  {"scenario":<24} {"median ms":>20} {"queries":>14}')
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            print(f'  {name:<24} {now["median_ms"]:>9.1f} (new)')
+            continue
+        change = (now['median_ms'] - before['median_ms']) / before['median_ms'] if before['median_ms'] else 0
+        slower = change > tolerance and now['median_ms'] - before['median_ms'] > min_delta_ms
+        more_queries = (now['queries'] or 0) > (before['queries'] or 0)
+        flag = '  <-- regression' if slower or more_queries else ''
+        print(f'  {name:<24} {before["median_ms"]:>8.1f} -> {now["median_ms"]:<8.1f} ({change:+.0%})'
+              f' {before["queries"]:>5} -> {now["queries"]:<5}{flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = datagen.build_parser(__doc__)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='run only these scenarios')
+    parser.add_argument('--save', action='store_true', help=f'write the results to {BASELINE_PATH}')
+    parser.add_argument('--compare', action='store_true', help='compare with the recorded baseline')
+    parser.add_argument('--check', action='store_true', help='exit 1 on regressions (implies --compare)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed median slowdown (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='ignore slowdowns smaller than this (timer noise on fast routes)')
+    args = parser.parse_args()
+
+    current = run(args)
+    if args.save:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {BASELINE_PATH}')
+    if args.compare or args.check:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance, args.min_delta_ms)
+        if regressions and args.check:
+            print(f'Regressions: {", ".join(regressions)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Measure worker boot: importing the app package and running create_app().
+
+Starts a fresh interpreter with `python -X importtime`, imports lms, then
+builds the app against a scratch copy of classroom_lms.db (background jobs
+off). Reports the import and create_app() wall time, the slowest imports
+made by lms, and whether any module that should only load on demand (pandas for
+bulk uploads, PIL for images, smtplib for e-mailed backups) was imported.
+
+    python -m bench.startup [--top 15] [--check]
+
+--check exits non-zero when one of those modules is imported at boot.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ('pandas', 'PIL', 'smtplib')
+
+_CHILD = '''
+import json, sys, time
+t0 = time.perf_counter()
+from lms import create_app
+t1 = time.perf_counter()
+import database
+database.DATABASE = sys.argv[1]
+create_app({'BACKGROUND_JOBS': False})
+t2 = time.perf_counter()
+print(json.dumps({'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+                  'modules': sorted(sys.modules)}))
+'''
+
+
+def parse_importtime(stderr, max_depth=1):
+    """(cumulative_us, module) from -X importtime output, for imports at most
+    max_depth levels below a top-level import (lms itself, then what it imports)."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # one space of padding, two per level
+        if depth <= max_depth:
+            imports.append((int(cumulative), name.strip()))
+    return imports
+
+
+def measure():
+    with tempfile.TemporaryDirectory(prefix='lms_startup_') as tmp:
+        db_path = os.path.join(tmp, 'startup.db')
+        if os.path.exists(os.path.join(ROOT, 'classroom_lms.db')):
+            shutil.copy(os.path.join(ROOT, 'classroom_lms.db'), db_path)
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', _CHILD, db_path],
+                              cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'create_app() failed:\n{proc.stderr[-2000:]}')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=15, help='how many of the slowest imports to list')
+    parser.add_argument('--check', action='store_true', help='exit 1 when a lazy module is imported at boot')
+    args = parser.parse_args()
+
+    result = measure()
+    imports = result['imports']
+    print(f'import lms      {result["import_ms"]:8.1f} ms')
+    print(f'create_app()    {result["create_app_ms"]:8.1f} ms')
+    print(f'{len(result["modules"])} modules loaded')
+    print('Slowest imports (cumulative):')
+    for us, name in sorted(imports, reverse=True)[:args.top]:
+        print(f'  {us / 1000:8.1f} ms  {name}')
+
+    loaded = [m for m in LAZY_MODULES if m in result['modules']]
+    if loaded:
+        print(f'Imported at boot but should load on demand: {", ".join(loaded)}')
+        return 1 if args.check else 0
+    print(f'Not imported at boot: {", ".join(LAZY_MODULES)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Response compression and conditional GET for dynamic routes.
+
+init_app() registers one after_request hook that, for every response:
+
+1. gives successful GET/HEAD JSON responses a weak ETag (a hash of the
+   uncompressed body) and answers a matching If-None-Match with 304, so
+   polling endpoints such as /api/notifications cost a header round trip when
+   nothing changed. They also get `Cache-Control: private, no-cache`: the
+   browser keeps the copy but revalidates it every time.
+2. compresses text responses (HTML, JSON, CSV, JS, SVG...) with brotli when
+   the client accepts it and the brotli module is installed, else gzip.
+   Buffered bodies smaller than MIN_BYTES, or that do not shrink, are sent
+   as they are; streamed responses are compressed chunk by chunk, flushing
+   after each one so the client still receives them as they are produced.
+
+Responses that already have a Content-Encoding (the precompressed files from
+assets.py), file downloads (direct_passthrough) and `no-transform` responses
+are left alone. Set LMS_COMPRESS=0 when a front proxy already compresses.
+"""
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+ENABLED = os.environ.get('LMS_COMPRESS', '1').lower() not in ('0', 'false', 'no', 'off')
+MIN_BYTES = int(os.environ.get('LMS_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('LMS_COMPRESS_LEVEL', '6'))
+BROTLI_QUALITY = 5  # quality 11 is for build-time assets; 4-6 keeps per-request CPU close to gzip -6
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml', 'application/xhtml+xml',
+    'image/svg+xml',
+}
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header with a non-zero q-value."""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of body chunks, flushing after each chunk."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def add_validator(request, response):
+    """Weak ETag + 304 for successful GET/HEAD JSON; returns the (possibly 304) response."""
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.mimetype != 'application/json' or response.is_streamed):
+        return response
+    if not response.get_etag()[0]:
+        response.add_etag(weak=True)
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def compress_response(request, response):
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_BYTES:
+            return response
+        compressed = compress(data, encoding)
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """Register the after_request hook; a no-op when LMS_COMPRESS=0."""
+    if not ENABLED:
+        return
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(request, add_validator(request, response))
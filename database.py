@@ -1,15 +1,42 @@
 import sqlite3
 from werkzeug.security import generate_password_hash
-
-DATABASE = 'classroom_lms.db'
-
-def get_db():
-    conn = sqlite3.connect(DATABASE)
+import item_analysis
+import payroll
+import pg_backend
+import query_profiler
+import search_index
+import tenancy
+
+# With LMS_SHARD_DIR set the catalog (users, institutions, ...) stands in for
+# the single file, e.g. for backups; see tenancy.py
+DATABASE = tenancy.catalog_path() if tenancy.ENABLED else 'classroom_lms.db'
+
+def open_db(path):
+    if query_profiler.ENABLED:
+        conn = sqlite3.connect(path, factory=query_profiler.ProfiledConnection)
+    else:
+        conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
     return conn
 
+def get_db():
+    if pg_backend.ENABLED:
+        return pg_backend.connect()
+    if tenancy.ENABLED:
+        return tenancy.connect(open_db, create_schema)
+    return open_db(DATABASE)
+
 def init_db():
+    if tenancy.ENABLED:
+        tenancy.migrate(open_db, create_schema, seed_defaults)
+        return
     conn = get_db()
+    create_schema(conn)
+    seed_defaults(conn)
+    conn.close()
+
+def create_schema(conn):
+    """Create missing tables, columns, indexes and search indexes (safe to re-run)."""
     cursor = conn.cursor()
 
     # Users table
@@ -173,6 +200,41 @@ def init_db():
         )
     ''')
 
+    # Per-question item statistics (see item_analysis.py), updated on every
+    # quiz/exam submit. Derived data: rebuilt from attempts if the layout is outdated.
+    cursor.execute("PRAGMA table_info(quiz_question_stats)")
+    stats_columns = {row[1] for row in cursor.fetchall()}
+    rebuild_item_stats = bool(stats_columns) and 'correct_score_sum' not in stats_columns
+    if rebuild_item_stats:
+        cursor.execute('DROP TABLE quiz_question_stats')
+
+    for table, parent_col, parent_table in (('quiz_question_stats', 'quiz_id', 'quizzes'),
+                                            ('exam_question_stats', 'exam_id', 'exams')):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                question_id INTEGER PRIMARY KEY,
+                {parent_col} INTEGER NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                correct_count INTEGER DEFAULT 0,
+                score_sum REAL DEFAULT 0,
+                score_sq_sum REAL DEFAULT 0,
+                correct_score_sum REAL DEFAULT 0,
+                FOREIGN KEY ({parent_col}) REFERENCES {parent_table} (id)
+            )
+        ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS question_option_counts (
+            kind TEXT NOT NULL,
+            question_id INTEGER NOT NULL,
+            answer TEXT NOT NULL,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (kind, question_id, answer)
+        )
+    ''')
+    if rebuild_item_stats:
+        cursor.execute('DELETE FROM question_option_counts')
+
     # Enrollments table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS enrollments (
@@ -246,6 +308,44 @@ def init_db():
         )
     ''')
 
+    # Daily game score rollup (one row per user per day, maintained on insert;
+    # raw game_scores rows past the retention window are compacted away)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS game_score_daily (
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            games INTEGER DEFAULT 0,
+            max_score INTEGER DEFAULT 0,
+            max_level INTEGER DEFAULT 0,
+            total_codes INTEGER DEFAULT 0,
+            max_streak INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, day),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Back-fill the rollup from raw scores recorded before it existed
+    cursor.execute('SELECT COUNT(*) FROM game_score_daily')
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO game_score_daily (user_id, day, games, max_score, max_level, total_codes, max_streak)
+            SELECT user_id, date(played_at), COUNT(*), MAX(score), MAX(level), SUM(codes_typed), MAX(best_streak)
+            FROM game_scores
+            GROUP BY user_id, date(played_at)
+        ''')
+
+    # Cached dashboard counters, scope 'platform' or 'institution:<id>'
+    # (recomputed by stats_counters.refresh)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            scope TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value REAL DEFAULT 0,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (scope, name)
+        )
+    ''')
+
     # Messages table for instructor-student communication
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS messages (
@@ -529,6 +629,21 @@ def init_db():
         )
     ''')
 
+    # Duplicate payroll records set aside by `python payroll.py archive-duplicates`
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS instructor_payroll_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payroll_id INTEGER NOT NULL,
+            kept_id INTEGER,
+            instructor_id INTEGER,
+            period_start DATE,
+            period_end DATE,
+            status TEXT,
+            record TEXT,
+            archived_at TIMESTAMP
+        )
+    ''')
+
     # Academic periods (semesters/terms)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS academic_periods (
@@ -773,6 +888,112 @@ def init_db():
         )
     ''')
 
+    # Bulk student import jobs (progress polled by the students page)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS student_import_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT,
+            created_by INTEGER,
+            status TEXT DEFAULT 'queued',
+            total_rows INTEGER DEFAULT 0,
+            processed_rows INTEGER DEFAULT 0,
+            added INTEGER DEFAULT 0,
+            enrolled INTEGER DEFAULT 0,
+            error_count INTEGER DEFAULT 0,
+            errors TEXT,
+            message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users (id)
+        )
+    ''')
+
+    # Scheduled show/hide of sessions, activities, quizzes, exams or a whole
+    # subject, applied by the release scheduler (release_scheduler.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_releases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_type TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            make_visible INTEGER NOT NULL,
+            release_at TEXT NOT NULL,
+            created_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            released_at TEXT,
+            FOREIGN KEY (created_by) REFERENCES users (id)
+        )
+    ''')
+
+    # Append-only learning activity log; the writer thread batches inserts and
+    # compaction moves old rows into weekly Parquet files (learning_events.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learning_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            user_id INTEGER,
+            subject_id INTEGER,
+            session_id INTEGER,
+            created_at TEXT NOT NULL,
+            payload TEXT
+        )
+    ''')
+
+    # Precomputed grade reports behind the admin and institution Grades pages,
+    # rebuilt nightly and on demand (report_cubes.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_subject_cube (
+            subject_id INTEGER PRIMARY KEY,
+            institution_id INTEGER,
+            code TEXT,
+            name TEXT,
+            section TEXT,
+            instructor_name TEXT,
+            enrolled INTEGER DEFAULT 0,
+            avg_activity_score REAL,
+            avg_quiz_score REAL,
+            avg_exam_score REAL,
+            avg_grade REAL,
+            grade_90_up INTEGER DEFAULT 0,
+            grade_80_89 INTEGER DEFAULT 0,
+            grade_75_79 INTEGER DEFAULT 0,
+            grade_below_75 INTEGER DEFAULT 0,
+            completion_rate REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_student_grades (
+            subject_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            full_name TEXT,
+            activity_avg REAL,
+            quiz_avg REAL,
+            midterm REAL,
+            final_exam REAL,
+            grade REAL,
+            PRIMARY KEY (subject_id, student_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_student_overall (
+            student_id INTEGER PRIMARY KEY,
+            full_name TEXT,
+            section TEXT,
+            student_code TEXT,
+            activities_done INTEGER DEFAULT 0,
+            graded INTEGER DEFAULT 0,
+            avg_score REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_builds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            built_at TEXT NOT NULL,
+            duration_ms INTEGER,
+            subject_rows INTEGER,
+            student_rows INTEGER
+        )
+    ''')
+
     conn.commit()
 
     # Migration: Add new columns to existing tables if they don't exist
@@ -802,6 +1023,8 @@ def init_db():
         ("sessions", "video_duration", "INTEGER DEFAULT 0"),
         ("sessions", "reading_materials", "TEXT"),
         ("sessions", "reading_audio", "TEXT"),
+        # Bumped by session edits; part of the fragment cache key (fragment_cache.py)
+        ("sessions", "content_version", "INTEGER DEFAULT 0"),
         # Session video watches table migrations
         ("session_video_watches", "watched_seconds", "INTEGER DEFAULT 0"),
         ("session_video_watches", "last_position", "INTEGER DEFAULT 0"),
@@ -838,8 +1061,15 @@ def init_db():
         ("subjects", "color_theme", "TEXT DEFAULT 'blue'"),
         # Quizzes visibility
         ("quizzes", "is_visible", "INTEGER DEFAULT 0"),
+        ("quizzes", "visible_from", "TEXT"),
+        ("quizzes", "visible_until", "TEXT"),
         # Exams visibility
         ("exams", "is_visible", "INTEGER DEFAULT 0"),
+        ("exams", "visible_from", "TEXT"),
+        ("exams", "visible_until", "TEXT"),
+        # Bumped when questions change, so every worker's answer-key cache misses (answer_keys.py)
+        ("quizzes", "question_version", "INTEGER DEFAULT 0"),
+        ("exams", "question_version", "INTEGER DEFAULT 0"),
         # Quiz attempts score visibility
         ("quiz_attempts", "score_visible", "INTEGER DEFAULT 0"),
         # Exam attempts score visibility
@@ -879,6 +1109,78 @@ def init_db():
         except sqlite3.OperationalError:
             pass  # Column already exists
 
+    # Payroll generated before the period was unique may hold duplicates. They are
+    # financial records, so they are never deleted here: the unique period index is
+    # skipped until `python payroll.py archive-duplicates` has archived them.
+    payroll_duplicates = payroll.find_duplicates(cursor)
+    if payroll_duplicates:
+        print(f"[DB] instructor_payroll has {len(payroll_duplicates)} period(s) with more than one record; "
+              "not creating idx_instructor_payroll_period. List them with `python payroll.py duplicates` "
+              "and archive the extras with `python payroll.py archive-duplicates`.")
+
+    # Per-question stats for attempts recorded before the tables existed
+    item_analysis.backfill_question_stats(cursor)
+    conn.commit()
+
+    # Full-text search indexes and their sync triggers (search_index.py)
+    try:
+        search_index.create_schema(cursor)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f"[Search] Could not create search indexes: {e}")
+
+    # Indexes (name, table, columns, unique)
+    indexes = [
+        ("idx_subjects_section_id", "subjects", "section_id", False),
+        ("idx_subjects_section", "subjects", "section", False),
+        ("idx_users_role_section", "users", "role, section", False),
+        ("idx_game_scores_played_at", "game_scores", "played_at", False),
+        ("idx_game_score_daily_day", "game_score_daily", "day", False),
+        ("idx_quiz_question_stats_quiz", "quiz_question_stats", "quiz_id", False),
+        ("idx_exam_question_stats_exam", "exam_question_stats", "exam_id", False),
+        # ON CONFLICT target for set-based payroll generation (payroll.py)
+        ("idx_instructor_payroll_period", "instructor_payroll", "instructor_id, period_start, period_end", True),
+        # Covering index: payroll aggregates every instructor's period in one ordered scan
+        ("idx_instructor_attendance_payroll", "instructor_attendance", "instructor_id, date, status, hours_worked", False),
+        ("idx_quiz_attempts_quiz", "quiz_attempts", "quiz_id", False),
+        # Keyset pagination (pagination.py): each list seeks on its sort key
+        ("idx_users_role_name", "users", "role, full_name", False),
+        ("idx_users_role_approved_name", "users", "role, is_approved, full_name", False),
+        ("idx_users_inst_role_name", "users", "institution_id, role, full_name", False),
+        ("idx_messages_sender_created", "messages", "sender_id, created_at", False),
+        ("idx_file_storage_created", "file_storage", "created_at", False),
+        ("idx_ai_admin_logs_created", "ai_admin_logs", "created_at", False),
+        ("idx_student_payments_inst_due", "student_payments", "institution_id, due_date", False),
+        # The release scheduler's queue: pending rows (released_at NULL) in time order
+        ("idx_scheduled_releases_due", "scheduled_releases", "released_at, release_at", False),
+        ("idx_scheduled_releases_item", "scheduled_releases", "item_type, item_id", False),
+        ("idx_learning_events_created", "learning_events", "created_at", False),
+        # Grade report reads: top N per institution, top/bottom N overall
+        ("idx_report_student_grades_grade", "report_student_grades", "grade", False),
+        ("idx_report_student_overall_avg", "report_student_overall", "avg_score", False),
+        ("idx_report_subject_cube_inst", "report_subject_cube", "institution_id, code, section", False),
+        ("idx_report_builds_built", "report_builds", "built_at", False),
+    ]
+
+    for name, table, columns, unique in indexes:
+        if name == 'idx_instructor_payroll_period' and payroll_duplicates:
+            continue
+        try:
+            cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            print(f"[DB] Could not create index {name}: {e}")
+
+    # Superseded indexes. idx_enrollments_student_subject duplicated the
+    # table's UNIQUE(student_id, subject_id), so every enrollment paid for two.
+    for name in ('idx_enrollments_student_subject',):
+        cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.commit()
+
+def seed_defaults(conn):
+    """Default accounts, demo subjects, the PUP institution, plans, rules and settings."""
+    cursor = conn.cursor()
+
     # Seed default instructor (always approved)
     try:
         cursor.execute('''
@@ -890,7 +1192,7 @@ def init_db():
         pass
 
     # Ensure all instructors are approved
-    cursor.execute('UPDATE users SET is_approved = 1, profile_completed = 1 WHERE role = "instructor"')
+    cursor.execute("UPDATE users SET is_approved = 1, profile_completed = 1 WHERE role = 'instructor'")
     conn.commit()
 
     # Seed default student account
@@ -977,7 +1279,7 @@ def init_db():
         pass
 
     # Ensure admin is approved
-    cursor.execute('UPDATE users SET is_approved = 1, profile_completed = 1 WHERE role = "admin"')
+    cursor.execute("UPDATE users SET is_approved = 1, profile_completed = 1 WHERE role = 'admin'")
     conn.commit()
 
     # Seed default institution (PUP)
@@ -1055,7 +1357,7 @@ def init_db():
         except sqlite3.IntegrityError:
             pass
         # Ensure institution users are approved
-        cursor.execute('UPDATE users SET is_approved = 1, profile_completed = 1 WHERE role = "institution"')
+        cursor.execute("UPDATE users SET is_approved = 1, profile_completed = 1 WHERE role = 'institution'")
         conn.commit()
 
     # Seed programs for PUP institution
@@ -1133,6 +1435,7 @@ def init_db():
         (None, 'default_working_hours', '8', 'integer', 'Default working hours per day'),
         (None, 'late_threshold_minutes', '15', 'integer', 'Minutes after schedule to count as late'),
         (None, 'email_notifications_enabled', 'false', 'boolean', 'Send email notifications'),
+        (None, 'game_score_retention_days', '30', 'integer', 'Days of raw game scores kept before compaction into daily rollups'),
     ]
     for inst_id, key, value, stype, desc in default_settings:
         cursor.execute('SELECT id FROM platform_settings WHERE setting_key = ? AND institution_id IS ?', (key, inst_id))
@@ -1143,8 +1446,6 @@ def init_db():
             ''', (inst_id, key, value, stype, desc))
     conn.commit()
 
-    conn.close()
-
 if __name__ == '__main__':
     init_db()
     print("Database initialized successfully!")
@@ -0,0 +1,211 @@
+"""Rendered-fragment cache for the large, mostly static parts of session pages.
+
+Templates wrap a static block in
+
+    {% cache 'session', session.id, session.content_version, 'lesson-slides' %}
+        ... markup that depends only on the session row ...
+    {% endcache %}
+
+and the rendered HTML is stored under 'session:<id>:<version>:lesson-slides'.
+Everything outside the block (the stepper, watched-time, per-student buttons)
+still renders on every request.
+
+sessions.content_version is bumped by every route that edits a session
+(bump_session_version), so a changed session gets new keys in every worker at
+once; invalidate_session() additionally drops this worker's old entries.
+With LMS_SHARD_DIR set, session ids repeat across shards, so every key (and
+every invalidation prefix) starts with 'institution:<id>:' of the current
+tenant (tenancy.current_institution()).
+
+Storage is an in-process LRU (FRAGMENT_CACHE_SIZE entries). Set
+LMS_FRAGMENT_CACHE_DIR to also keep fragments on disk, shared by every worker
+on the host (or a shared volume): a miss in memory falls back to the file
+before rendering.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+import tenancy
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get('LMS_FRAGMENT_CACHE_SIZE', '256'))
+FRAGMENT_CACHE_DIR = os.environ.get('LMS_FRAGMENT_CACHE_DIR', '')
+
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class MemoryBackend:
+    """Thread-safe LRU of rendered fragments."""
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend:
+    """Fragments as files in a directory, written atomically so concurrent
+    workers never read a partial file."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        # Readable prefix for delete_prefix, hash suffix so distinct keys never collide
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.directory, f'{_UNSAFE_FILENAME.sub("_", key)}.{digest}.html')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f'[Fragment-Cache] Could not write {key}: {e}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def delete_prefix(self, prefix):
+        safe_prefix = _UNSAFE_FILENAME.sub('_', prefix)
+        for name in os.listdir(self.directory):
+            if name.startswith(safe_prefix):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def clear(self):
+        self.delete_prefix('')
+
+
+class FragmentCache:
+    """Memory LRU in front of an optional disk backend."""
+
+    def __init__(self, directory=FRAGMENT_CACHE_DIR):
+        self.memory = MemoryBackend()
+        self.disk = DiskBackend(directory) if directory else None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete_prefix(self, prefix):
+        self.memory.delete_prefix(prefix)
+        if self.disk is not None:
+            self.disk.delete_prefix(prefix)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+cache = FragmentCache()
+
+
+def tenant_prefix():
+    return f'institution:{tenancy.current_institution()}:' if tenancy.ENABLED else ''
+
+
+def make_key(parts):
+    return tenant_prefix() + ':'.join(str(part) for part in parts)
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache part, part, ... %}...{% endcache %}"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache_support', [nodes.List(parts)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, parts, caller):
+        key = make_key(parts)
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, str(value))
+        return Markup(value)
+
+
+def session_prefix(session_id):
+    return f'{tenant_prefix()}session:{session_id}:'
+
+
+def invalidate_session(session_id):
+    cache.delete_prefix(session_prefix(session_id))
+
+
+def bump_session_version(cursor, session_id=None, subject_id=None):
+    """Give the edited session(s) a new content_version, so every worker renders
+    fresh fragments, and drop this worker's stale ones (the caller commits)."""
+    if session_id is not None:
+        cursor.execute('UPDATE sessions SET content_version = COALESCE(content_version, 0) + 1 WHERE id = ?',
+                       (session_id,))
+        invalidate_session(session_id)
+    if subject_id is not None:
+        cursor.execute('SELECT id FROM sessions WHERE subject_id = ?', (subject_id,))
+        session_ids = [row['id'] for row in cursor.fetchall()]
+        cursor.execute('UPDATE sessions SET content_version = COALESCE(content_version, 0) + 1 WHERE subject_id = ?',
+                       (subject_id,))
+        for sid in session_ids:
+            invalidate_session(sid)
@@ -0,0 +1,239 @@
+"""Profile photo and ID/COR image processing off the request thread.
+
+The upload routes only decode the upload, check that PIL can read it, save
+the original under uploads/originals/ and call submit_photo() /
+submit_document() after committing their own UPDATE. The original is deleted
+once it has been processed (kept if processing fails). The resizing runs in a
+process pool (LMS_IMAGE_WORKERS, default 2) so a burst of registrations
+neither holds gunicorn workers nor contends for the GIL; when a job finishes
+the users row is pointed at the new file and the user cache is refreshed.
+Until then the previous photo (or default.png) keeps showing.
+
+A profile photo user_5_20260301120000 produces, in static/uploads/photos/:
+
+    user_5_20260301120000.jpg / .webp        full size, fits 400x400
+    user_5_20260301120000_128.jpg / .webp    square avatar, 128 px
+    user_5_20260301120000_64.jpg / .webp     square avatar, 64 px
+
+users.photo keeps the .jpg name, and templates ask for the small WebP with
+avatar_url(photo, 64). Photos uploaded before the pipeline have no variants;
+avatar_url() falls back to the full file for them, and
+`python image_pipeline.py backfill` generates the missing variants.
+
+PUP ID and COR images become one JPEG that fits 800x800, as before.
+JPEG sources are decoded with Image.draft(), which lets libjpeg downscale by
+1/2, 1/4 or 1/8 while decoding instead of materialising the full camera frame.
+
+LMS_IMAGE_WORKERS=0 processes in the calling thread (development, tests).
+PIL is imported by the functions that use it, so importing this module at
+boot stays cheap.
+"""
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+WORKERS = int(os.environ.get('LMS_IMAGE_WORKERS', '2'))
+ORIGINALS_FOLDER = os.path.join('uploads', 'originals')
+PHOTO_FOLDER = os.path.join('static', 'uploads', 'photos')
+DOCUMENT_FOLDER = os.path.join('static', 'uploads', 'documents')
+
+PHOTO_FULL_SIZE = 400
+AVATAR_SIZES = (128, 64)
+DOCUMENT_SIZE = 800
+JPEG_QUALITY = {'photo': 70, 'document': 75}
+WEBP_QUALITY = 75
+DEFAULT_PHOTO = 'default.png'
+
+_executor = None
+_executor_lock = threading.Lock()
+_latest = {}                 # (user_id, column) -> filename of the newest submitted job
+_latest_lock = threading.Lock()
+_variants = {}               # variant filenames known to exist, for avatar_url()
+on_user_updated = None       # set by the app: callback(list of user ids)
+
+
+# ---------------------------------------------------------------- worker side (runs in the pool)
+
+def _open_scaled(path, size):
+    """Open an image and decode it at the smallest JPEG scale still >= size."""
+    from PIL import Image, ImageOps
+
+    img = Image.open(path)
+    if img.format == 'JPEG':
+        img.draft('RGB', (size, size))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        rgba = img.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[3])
+        img = background
+    return img
+
+
+def _save(img, path, fmt, quality):
+    tmp_path = f'{path}.tmp'
+    if fmt == 'JPEG':
+        img.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(tmp_path, 'WEBP', quality=quality, method=4)
+    os.replace(tmp_path, path)
+
+
+def render_photo(original_path, folder, stem, full=True):
+    """Full-size and avatar variants of a profile photo; returns the written filenames."""
+    from PIL import Image, ImageOps
+
+    img = _open_scaled(original_path, PHOTO_FULL_SIZE)
+    img.thumbnail((PHOTO_FULL_SIZE, PHOTO_FULL_SIZE), Image.Resampling.LANCZOS)
+    outputs = [(img, stem)] if full else []
+    square = img
+    for size in AVATAR_SIZES:  # largest first: each avatar is cut from the previous one
+        square = ImageOps.fit(square, (size, size), Image.Resampling.LANCZOS)
+        outputs.append((square, f'{stem}_{size}'))
+    written = []
+    for image, name in outputs:
+        _save(image, os.path.join(folder, f'{name}.webp'), 'WEBP', WEBP_QUALITY)
+        _save(image, os.path.join(folder, f'{name}.jpg'), 'JPEG', JPEG_QUALITY['photo'])
+        written += [f'{name}.webp', f'{name}.jpg']
+    return written
+
+
+def render_document(original_path, folder, stem):
+    from PIL import Image
+
+    img = _open_scaled(original_path, DOCUMENT_SIZE)
+    img.thumbnail((DOCUMENT_SIZE, DOCUMENT_SIZE), Image.Resampling.LANCZOS)
+    _save(img, os.path.join(folder, f'{stem}.jpg'), 'JPEG', JPEG_QUALITY['document'])
+    return [f'{stem}.jpg']
+
+
+# ---------------------------------------------------------------- app side
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=WORKERS)
+        return _executor
+
+
+def read_upload(raw):
+    """Validate uploaded bytes as an image PIL can decode; returns its extension or None."""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            img.verify()
+            return {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}.get(img.format, 'img')
+    except Exception:
+        return None
+
+
+def save_original(raw, stem, ext):
+    os.makedirs(ORIGINALS_FOLDER, exist_ok=True)
+    path = os.path.join(ORIGINALS_FOLDER, f'{stem}.{ext}')
+    with open(path, 'wb') as f:
+        f.write(raw)
+    return path
+
+
+def new_stem(prefix, user_id):
+    return f"{prefix}_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+
+def _finish(user_id, column, filename, original_path, future):
+    from database import get_db
+
+    try:
+        written = future.result()
+    except Exception as e:
+        print(f'[Images] Processing {filename} for user {user_id} failed: {e}')
+        return
+    try:
+        os.remove(original_path)  # full-resolution ID/COR scans are not kept
+    except OSError:
+        pass
+    for name in written:
+        _variants[name] = True
+    with _latest_lock:
+        if _latest.get((user_id, column)) != filename:
+            return  # a newer upload superseded this one
+        del _latest[(user_id, column)]
+    conn = get_db()
+    conn.execute(f'UPDATE users SET {column} = ? WHERE id = ?', (filename, user_id))
+    conn.commit()
+    conn.close()
+    if on_user_updated is not None:
+        on_user_updated([user_id])
+
+
+def _submit(render, original_path, folder, stem, user_id, column):
+    filename = f'{stem}.jpg'
+    with _latest_lock:
+        _latest[(user_id, column)] = filename
+    if WORKERS <= 0:
+        from concurrent.futures import Future
+        future = Future()
+        try:
+            future.set_result(render(original_path, folder, stem))
+        except Exception as e:
+            future.set_exception(e)
+    else:
+        future = _get_executor().submit(render, original_path, folder, stem)
+    future.add_done_callback(lambda f: _finish(user_id, column, filename, original_path, f))
+    return filename
+
+
+def submit_photo(user_id, raw, ext):
+    """Queue a profile photo; users.photo is updated when it is processed."""
+    stem = new_stem('user', user_id)
+    original = save_original(raw, stem, ext)
+    return _submit(render_photo, original, PHOTO_FOLDER, stem, user_id, 'photo')
+
+
+def submit_document(user_id, column, prefix, raw, ext):
+    """Queue a PUP ID (column 'pup_id_photo') or COR ('cor_photo') image."""
+    stem = new_stem(prefix, user_id)
+    original = save_original(raw, stem, ext)
+    return _submit(render_document, original, DOCUMENT_FOLDER, stem, user_id, column)
+
+
+def avatar_name(photo, size):
+    """Filename of the `size` px WebP avatar for users.photo, or the photo itself
+    when it has no variants (default.png, photos from before the pipeline)."""
+    if not photo or photo == DEFAULT_PHOTO:
+        return DEFAULT_PHOTO
+    variant = f'{os.path.splitext(photo)[0]}_{size}.webp'
+    # Only hits are remembered: another worker may finish the variants later
+    if variant not in _variants and os.path.exists(os.path.join(PHOTO_FOLDER, variant)):
+        _variants[variant] = True
+    return variant if variant in _variants else photo
+
+
+def backfill(folder=PHOTO_FOLDER):
+    """Generate variants for photos uploaded before the pipeline existed."""
+    done = 0
+    for filename in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in ('.jpg', '.jpeg', '.png') or stem.rsplit('_', 1)[-1] in {str(s) for s in AVATAR_SIZES}:
+            continue
+        if os.path.exists(os.path.join(folder, f'{stem}_{AVATAR_SIZES[-1]}.webp')):
+            continue
+        try:
+            # An existing .jpg already is the full-size photo; do not re-encode it
+            render_photo(os.path.join(folder, filename), folder, stem, full=ext.lower() != '.jpg')
+            done += 1
+        except Exception as e:
+            print(f'[Images] Skipping {filename}: {e}')
+    print(f'[Images] Generated variants for {done} photos')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['backfill']:
+        backfill()
+    else:
+        print('usage: python image_pipeline.py backfill')
+        sys.exit(2)
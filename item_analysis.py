@@ -0,0 +1,249 @@
+"""Per-question item analysis for quizzes and exams.
+
+submit_quiz, submit_exam and the quiz-journey submit all grade through
+grade_answers() and fold each attempt into the per-question stats tables with
+record_question_stats(), so item statistics never re-parse the answers JSON of
+every attempt. Each question keeps sufficient statistics:
+
+- attempts, correct_count                          -> difficulty index p
+- score_sum, score_sq_sum, correct_score_sum        -> point-biserial discrimination
+  (attempt score as a 0-1 fraction of the points available)
+- question_option_counts rows                       -> answer distribution
+
+analyze() turns those rows into indices in O(questions).
+"""
+import json
+import math
+
+AUTO_GRADED_TYPES = ('multiple_choice', 'true_false', 'short_answer')
+
+# kind -> (stats table, parent column, questions table, attempts table)
+STATS_TABLES = {
+    'quiz': ('quiz_question_stats', 'quiz_id', 'quiz_questions', 'quiz_attempts'),
+    'exam': ('exam_question_stats', 'exam_id', 'exam_questions', 'exam_attempts'),
+}
+
+MAX_ANSWER_LENGTH = 200      # free-text answers are truncated before being counted
+EASY_THRESHOLD = 0.9         # p above this: nearly everyone gets it right
+HARD_THRESHOLD = 0.2         # p below this: nearly everyone gets it wrong
+LOW_DISCRIMINATION = 0.2     # point-biserial below this barely separates strong from weak students
+
+
+def normalize_answer(answer):
+    return str(answer or '').strip().lower()
+
+
+def grade_answers(questions, answers, auto_types=AUTO_GRADED_TYPES):
+    """Auto-grade one submission.
+
+    answers maps str(question_id) -> answer. Returns (score, max_score, outcomes)
+    where outcomes is {question_id: correct} for each answered, auto-graded
+    question. auto_types=None grades every question by exact match (quiz journey).
+    """
+    score = 0
+    max_score = 0
+    outcomes = {}
+    for q in questions:
+        max_score += q['points']
+        if auto_types is not None and q['question_type'] not in auto_types:
+            continue
+        key = str(q['id'])
+        if key not in answers:
+            continue
+        correct = normalize_answer(answers[key]) == normalize_answer(q['correct_answer'])
+        outcomes[q['id']] = correct
+        if correct:
+            score += q['points']
+    return score, max_score, outcomes
+
+
+def _accumulate(stats, options, parent_id, questions, answers, auto_types, sign=1):
+    """Add (sign=1) or remove (sign=-1) one attempt's contribution in memory."""
+    score, max_score, outcomes = grade_answers(questions, answers, auto_types)
+    fraction = score / max_score if max_score else 0.0
+    for question_id, correct in outcomes.items():
+        entry = stats.setdefault(question_id, [parent_id, 0, 0, 0.0, 0.0, 0.0])
+        entry[1] += sign
+        entry[2] += sign * correct
+        entry[3] += sign * fraction
+        entry[4] += sign * fraction * fraction
+        entry[5] += sign * fraction * correct
+        answer = normalize_answer(answers.get(str(question_id)))[:MAX_ANSWER_LENGTH]
+        options[(question_id, answer)] = options.get((question_id, answer), 0) + sign
+
+
+def _flush(cursor, kind, stats, options):
+    table, parent_col = STATS_TABLES[kind][:2]
+    rows = [(question_id, *entry) for question_id, entry in stats.items() if any(entry[1:])]
+    if rows:
+        cursor.executemany(f'''
+            INSERT INTO {table} (question_id, {parent_col}, attempts, correct_count,
+                                 score_sum, score_sq_sum, correct_score_sum)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(question_id) DO UPDATE SET
+                attempts = {table}.attempts + excluded.attempts,
+                correct_count = {table}.correct_count + excluded.correct_count,
+                score_sum = {table}.score_sum + excluded.score_sum,
+                score_sq_sum = {table}.score_sq_sum + excluded.score_sq_sum,
+                correct_score_sum = {table}.correct_score_sum + excluded.correct_score_sum
+        ''', rows)
+    option_rows = [(kind, question_id, answer, count)
+                   for (question_id, answer), count in options.items() if count]
+    if option_rows:
+        cursor.executemany('''
+            INSERT INTO question_option_counts (kind, question_id, answer, count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(kind, question_id, answer) DO UPDATE SET count = question_option_counts.count + excluded.count
+        ''', option_rows)
+
+    # A replaced attempt can subtract from stats that were cleared since (answer
+    # key edited); clamp at zero and drop answers nobody gives any more
+    shrunk = [question_id for question_id, entry in stats.items() if entry[1] < 0 or entry[2] < 0 or entry[3] < 0]
+    shrunk += [question_id for (question_id, _), count in options.items() if count < 0]
+    if shrunk:
+        shrunk = sorted(set(shrunk))
+        placeholders = ','.join('?' * len(shrunk))
+        cursor.execute(f'''
+            UPDATE {table} SET attempts = MAX(0, attempts), correct_count = MAX(0, correct_count),
+                   score_sum = MAX(0, score_sum), score_sq_sum = MAX(0, score_sq_sum),
+                   correct_score_sum = MAX(0, correct_score_sum)
+            WHERE question_id IN ({placeholders})
+        ''', shrunk)
+        cursor.execute(f'''
+            DELETE FROM question_option_counts
+            WHERE kind = ? AND count <= 0 AND question_id IN ({placeholders})
+        ''', [kind] + shrunk)
+
+
+def record_question_stats(cursor, kind, parent_id, questions, answers, auto_types=AUTO_GRADED_TYPES,
+                          previous_answers=None, previous_auto_types=AUTO_GRADED_TYPES):
+    """Fold one submitted attempt into the stats for kind ('quiz' or 'exam').
+
+    previous_answers is the attempt being replaced (quiz-journey retakes); its
+    contribution is subtracted, graded the way it was recorded, so the stats
+    reflect the current attempts only.
+    """
+    stats, options = {}, {}
+    if previous_answers is not None:
+        _accumulate(stats, options, parent_id, questions, previous_answers, previous_auto_types, sign=-1)
+    _accumulate(stats, options, parent_id, questions, answers, auto_types)
+    _flush(cursor, kind, stats, options)
+
+
+def clear_question_stats(cursor, kind, question_ids):
+    """Forget the stats of questions that were deleted or had their answer key changed."""
+    if not question_ids:
+        return
+    table = STATS_TABLES[kind][0]
+    placeholders = ','.join('?' * len(question_ids))
+    cursor.execute(f'DELETE FROM {table} WHERE question_id IN ({placeholders})', list(question_ids))
+    cursor.execute(f'DELETE FROM question_option_counts WHERE kind = ? AND question_id IN ({placeholders})',
+                   [kind] + list(question_ids))
+
+
+def backfill_question_stats(cursor):
+    """Build the stats from existing attempts, for each kind whose table is still empty."""
+    for kind, (table, parent_col, questions_table, attempts_table) in STATS_TABLES.items():
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        if cursor.fetchone()[0]:
+            continue
+        cursor.execute(f'SELECT * FROM {questions_table} ORDER BY id')
+        questions_by_parent = {}
+        for q in cursor.fetchall():
+            questions_by_parent.setdefault(q[parent_col], []).append(q)
+
+        stats, options = {}, {}
+        # Quiz-journey attempts (the ones with missed_questions) grade every question type
+        cursor.execute(f'PRAGMA table_info({attempts_table})')
+        has_missed = any(col[1] == 'missed_questions' for col in cursor.fetchall())
+        missed_col = 'missed_questions' if has_missed else 'NULL AS missed_questions'
+        cursor.execute(f'SELECT {parent_col}, answers, {missed_col} FROM {attempts_table}')
+        for row in cursor.fetchall():
+            questions = questions_by_parent.get(row[parent_col])
+            if not questions:
+                continue
+            try:
+                answers = json.loads(row['answers'] or '{}')
+            except ValueError:
+                continue
+            auto_types = None if row['missed_questions'] is not None else AUTO_GRADED_TYPES
+            _accumulate(stats, options, row[parent_col], questions, answers, auto_types)
+        _flush(cursor, kind, stats, options)
+
+
+def _point_biserial(n, k, score_sum, score_sq_sum, correct_score_sum):
+    """Correlation between answering the item correctly and the attempt score."""
+    if n < 2 or k == 0 or k == n:
+        return None
+    mean = score_sum / n
+    variance = score_sq_sum / n - mean * mean
+    if variance <= 1e-12:
+        return None
+    mean_correct = correct_score_sum / k
+    mean_wrong = (score_sum - correct_score_sum) / (n - k)
+    p = k / n
+    return (mean_correct - mean_wrong) / math.sqrt(variance) * math.sqrt(p * (1 - p))
+
+
+def analyze(cursor, kind, parent_id):
+    """Difficulty, discrimination and answer distribution for every question of one quiz/exam."""
+    table, parent_col, questions_table = STATS_TABLES[kind][:3]
+    cursor.execute(f'''
+        SELECT q.id, q.question_text, q.question_type, q.options, q.correct_answer,
+               COALESCE(s.attempts, 0) AS attempts, COALESCE(s.correct_count, 0) AS correct_count,
+               COALESCE(s.score_sum, 0) AS score_sum, COALESCE(s.score_sq_sum, 0) AS score_sq_sum,
+               COALESCE(s.correct_score_sum, 0) AS correct_score_sum
+        FROM {questions_table} q
+        LEFT JOIN {table} s ON s.question_id = q.id
+        WHERE q.{parent_col} = ?
+        ORDER BY q.id
+    ''', (parent_id,))
+    questions = cursor.fetchall()
+
+    cursor.execute(f'''
+        SELECT question_id, answer, count FROM question_option_counts
+        WHERE kind = ? AND count > 0
+          AND question_id IN (SELECT id FROM {questions_table} WHERE {parent_col} = ?)
+        ORDER BY question_id, count DESC
+    ''', (kind, parent_id))
+    distribution = {}
+    for row in cursor.fetchall():
+        distribution.setdefault(row['question_id'], []).append((row['answer'], row['count']))
+
+    items = []
+    for q in questions:
+        n, k = q['attempts'], q['correct_count']
+        difficulty = k / n if n else None
+        discrimination = _point_biserial(n, k, q['score_sum'], q['score_sq_sum'], q['correct_score_sum'])
+
+        # Show answers with the question's own option text where one matches
+        try:
+            choices = json.loads(q['options']) if q['options'] else []
+        except ValueError:
+            choices = []
+        labels = {normalize_answer(c): c for c in choices}
+        correct = normalize_answer(q['correct_answer'])
+        options = [{'answer': labels.get(answer, answer) if answer else '(no answer)',
+                    'count': count, 'is_correct': answer == correct}
+                   for answer, count in distribution.get(q['id'], [])]
+
+        flags = []
+        if difficulty is not None and difficulty > EASY_THRESHOLD:
+            flags.append('too_easy')
+        if difficulty is not None and difficulty < HARD_THRESHOLD:
+            flags.append('too_hard')
+        if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+            flags.append('low_discrimination')
+
+        items.append({
+            'question_id': q['id'],
+            'question_text': q['question_text'],
+            'question_type': q['question_type'],
+            'attempts': n,
+            'correct_count': k,
+            'difficulty': round(difficulty, 3) if difficulty is not None else None,
+            'discrimination': round(discrimination, 3) if discrimination is not None else None,
+            'options': options,
+            'flags': flags,
+        })
+    return items
@@ -0,0 +1,341 @@
+"""In-memory leaderboard for the Python Code Blaster typing game.
+
+All-time ranks come from a bucketed sorted list of (-highest_score, user_id)
+keys, so rank, top-N and "players around me" are O(log n) lookups instead of a
+correlated COUNT(*) over game_user_stats. Weekly standings are kept as one
+aggregate bucket per UTC day (max score, max level, summed codes, max streak);
+the last WEEK_DAYS buckets are merged into the weekly view.
+
+The board is rebuilt on startup from game_user_stats and the game_score_daily
+rollup (at most WEEK_DAYS small rows per user). Each gunicorn worker holds
+its own copy, so sync() tails game_scores by id (one MAX(id) lookup when
+nothing changed) to pick up rounds saved through other workers.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+WEEK_DAYS = 7
+
+
+class SortedKeyList:
+    """Minimal sortedcontainers-style list: sorted sublists of at most 2 * LOAD items,
+    with a Fenwick tree over the sublist lengths for global positions. The tree is
+    updated in place when an item is added or removed, and rebuilt on the next
+    lookup after a sublist is split or emptied."""
+    LOAD = 256
+
+    def __init__(self):
+        self._lists = []
+        self._maxes = []
+        self._index = None           # Fenwick tree (1-based) over len(sublist), None when stale
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value):
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._index = None
+        else:
+            pos = bisect_left(self._maxes, value)
+            if pos == len(self._maxes):
+                pos -= 1
+                self._lists[pos].append(value)
+                self._maxes[pos] = value
+            else:
+                insort(self._lists[pos], value)
+            self._update_index(pos, 1)
+            self._split(pos)
+        self._len += 1
+
+    def _split(self, pos):
+        sublist = self._lists[pos]
+        if len(sublist) > 2 * self.LOAD:
+            half = sublist[self.LOAD:]
+            del sublist[self.LOAD:]
+            self._maxes[pos] = sublist[-1]
+            self._lists.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+            self._index = None
+
+    def remove(self, value):
+        pos = bisect_left(self._maxes, value)
+        sublist = self._lists[pos]
+        del sublist[bisect_left(sublist, value)]
+        self._len -= 1
+        if sublist:
+            self._maxes[pos] = sublist[-1]
+            self._update_index(pos, -1)
+        else:
+            del self._lists[pos]
+            del self._maxes[pos]
+            self._index = None
+
+    # ---------- positional index ----------
+
+    def _build_index(self):
+        tree = [0] + [len(sublist) for sublist in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._index = tree
+
+    def _update_index(self, pos, delta):
+        if self._index is None:
+            return
+        i = pos + 1
+        while i < len(self._index):
+            self._index[i] += delta
+            i += i & -i
+
+    def _offset(self, pos):
+        """Number of items in the sublists before sublist pos."""
+        if self._index is None:
+            self._build_index()
+        total, i = 0, pos
+        while i > 0:
+            total += self._index[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """(sublist position, index inside it) of global index 0 <= index < len."""
+        if self._index is None:
+            self._build_index()
+        pos, step = 0, 1 << (len(self._index) - 1).bit_length()
+        while step:
+            if pos + step < len(self._index) and self._index[pos + step] <= index:
+                pos += step
+                index -= self._index[pos]
+            step >>= 1
+        return pos, index
+
+    def bisect_left(self, value):
+        """Global index of the first item >= value."""
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos) + bisect_left(self._lists[pos], value)
+
+    def slice(self, start, stop):
+        """Items in [start, stop) by global index."""
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return []
+        pos, skip = self._locate(start)
+        result = []
+        while pos < len(self._lists) and len(result) < stop - start:
+            result.extend(self._lists[pos][skip:skip + stop - start - len(result)])
+            pos, skip = pos + 1, 0
+        return result
+
+
+class Leaderboard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ranked = SortedKeyList()   # (-highest_score, user_id)
+        self._players = {}               # user_id -> game_user_stats row + full_name/photo/section
+        self._days = {}                  # 'YYYY-MM-DD' -> {user_id: [score, level, codes, streak]}
+        self._weekly = None              # merged view of the current window, rebuilt lazily
+        self._window_start = None
+        self._last_score_id = 0
+        self._built = False
+
+    # ---------- loading ----------
+
+    def rebuild(self, conn):
+        """Load all-time stats and the last WEEK_DAYS of daily aggregates from the database."""
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT gs.*, u.full_name, u.photo, u.section
+            FROM game_user_stats gs
+            JOIN users u ON gs.user_id = u.id
+        ''')
+        stats_rows = cursor.fetchall()
+
+        window_start = self._current_window_start()
+        # Read the rollup and the game_scores high-water mark from one snapshot,
+        # so sync() neither re-applies nor skips rounds saved meanwhile
+        conn.execute('BEGIN')
+        cursor.execute('''
+            SELECT user_id, day, max_score AS score, max_level AS level,
+                   total_codes AS codes, max_streak AS streak
+            FROM game_score_daily
+            WHERE day >= ?
+        ''', (window_start,))
+        day_rows = cursor.fetchall()
+
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM game_scores')
+        last_id = cursor.fetchone()[0]
+        conn.commit()
+
+        with self._lock:
+            self._ranked = SortedKeyList()
+            self._players = {}
+            for row in stats_rows:
+                self._set_player(dict(row))
+            self._days = {}
+            for row in day_rows:
+                self._days.setdefault(row['day'], {})[row['user_id']] = [
+                    row['score'] or 0, row['level'] or 0, row['codes'] or 0, row['streak'] or 0]
+            self._window_start = window_start
+            self._weekly = None
+            self._last_score_id = last_id
+            self._built = True
+
+    def sync(self, conn):
+        """Apply game_scores rows saved since the last sync (by this or another worker)."""
+        if not self._built:
+            self.rebuild(conn)
+            return
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM game_scores')
+        if cursor.fetchone()[0] <= self._last_score_id:
+            return
+
+        cursor.execute('''
+            SELECT id, user_id, score, level, codes_typed, best_streak, date(played_at) AS day
+            FROM game_scores WHERE id > ? ORDER BY id
+        ''', (self._last_score_id,))
+        new_scores = cursor.fetchall()
+        if not new_scores:
+            return
+        user_ids = sorted({r['user_id'] for r in new_scores})
+        placeholders = ','.join('?' * len(user_ids))
+        cursor.execute(f'''
+            SELECT gs.*, u.full_name, u.photo, u.section
+            FROM game_user_stats gs
+            JOIN users u ON gs.user_id = u.id
+            WHERE gs.user_id IN ({placeholders})
+        ''', user_ids)
+        stats_rows = cursor.fetchall()
+
+        with self._lock:
+            for row in new_scores:
+                if row['id'] <= self._last_score_id:
+                    continue  # applied concurrently by another request
+                self._add_round(row['user_id'], row['day'], row['score'], row['level'],
+                                row['codes_typed'], row['best_streak'])
+                self._last_score_id = row['id']
+            for row in stats_rows:
+                self._set_player(dict(row))
+
+    def _set_player(self, player):
+        old = self._players.get(player['user_id'])
+        if old is not None:
+            self._ranked.remove((-(old['highest_score'] or 0), old['user_id']))
+        self._players[player['user_id']] = player
+        self._ranked.add((-(player['highest_score'] or 0), player['user_id']))
+
+    def _add_round(self, user_id, day, score, level, codes, streak):
+        if day < self._window_start:
+            return
+        agg = self._days.setdefault(day, {}).get(user_id)
+        if agg is None:
+            self._days[day][user_id] = [score, level, codes, streak]
+        else:
+            agg[0] = max(agg[0], score)
+            agg[1] = max(agg[1], level)
+            agg[2] += codes
+            agg[3] = max(agg[3], streak)
+        if self._weekly is not None:
+            self._merge_into(self._weekly, user_id, [score, level, codes, streak])
+
+    # ---------- weekly window ----------
+
+    @staticmethod
+    def _current_window_start():
+        return (datetime.utcnow().date() - timedelta(days=WEEK_DAYS - 1)).isoformat()
+
+    @staticmethod
+    def _merge_into(weekly, user_id, agg):
+        current = weekly.get(user_id)
+        if current is None:
+            weekly[user_id] = list(agg)
+        else:
+            current[0] = max(current[0], agg[0])
+            current[1] = max(current[1], agg[1])
+            current[2] += agg[2]
+            current[3] = max(current[3], agg[3])
+
+    def _weekly_view(self):
+        """Merged per-user aggregates for the current window (caller holds the lock)."""
+        window_start = self._current_window_start()
+        if window_start != self._window_start:
+            # Day rolled over: drop expired buckets and re-merge
+            self._days = {day: users for day, users in self._days.items() if day >= window_start}
+            self._window_start = window_start
+            self._weekly = None
+        if self._weekly is None:
+            weekly = {}
+            for users in self._days.values():
+                for user_id, agg in users.items():
+                    self._merge_into(weekly, user_id, agg)
+            self._weekly = weekly
+        return self._weekly
+
+    # ---------- queries ----------
+
+    def _entry(self, user_id):
+        p = self._players[user_id]
+        return {
+            'id': user_id, 'full_name': p['full_name'], 'photo': p['photo'], 'section': p['section'],
+            'highest_score': p['highest_score'], 'highest_level': p['highest_level'],
+            'total_codes_typed': p['total_codes_typed'], 'best_streak': p['best_streak'],
+            'xp_points': p['xp_points'], 'current_rank': p['current_rank'], 'total_games': p['total_games'],
+        }
+
+    def top(self, n=10):
+        with self._lock:
+            return [self._entry(user_id) for _, user_id in self._ranked.slice(0, n)]
+
+    def rank(self, user_id):
+        """1-based rank by highest score; ties share the best rank. None if never played."""
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return None
+            return self._ranked.bisect_left((-(player['highest_score'] or 0), float('-inf'))) + 1
+
+    def around(self, user_id, radius=2):
+        """Players ranked just above and below user_id, with their positions."""
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return []
+            index = self._ranked.bisect_left((-(player['highest_score'] or 0), user_id))
+            start = max(0, index - radius)
+            keys = self._ranked.slice(start, index + radius + 1)
+            return [dict(self._entry(uid), position=start + i + 1) for i, (_, uid) in enumerate(keys)]
+
+    def user_stats(self, user_id):
+        """game_user_stats row for user_id plus global_rank, or None."""
+        with self._lock:
+            player = self._players.get(user_id)
+            if player is None:
+                return None
+            stats = {k: v for k, v in player.items() if k not in ('full_name', 'photo', 'section')}
+        stats['global_rank'] = self.rank(user_id)
+        return stats
+
+    def weekly_top(self, n=10):
+        with self._lock:
+            weekly = self._weekly_view()
+            best = heapq.nsmallest(n, weekly.items(), key=lambda item: (-item[1][0], item[0]))
+            result = []
+            for user_id, (score, level, codes, streak) in best:
+                p = self._players.get(user_id)
+                if p is None:
+                    continue
+                result.append({'id': user_id, 'full_name': p['full_name'], 'photo': p['photo'],
+                               'section': p['section'], 'highest_score': score, 'highest_level': level,
+                               'total_codes_typed': codes, 'best_streak': streak})
+            return result
+
+
+board = Leaderboard()
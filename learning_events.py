@@ -0,0 +1,264 @@
+"""Append-only learning activity log, compacted into weekly Parquet files for analytics.
+
+Student activity lives in session_video_watches, session_progress,
+submissions, quiz_attempts, game_scores and instructor_attendance, shaped for
+the pages that write it. The hot paths also call
+
+    learning_events.record('quiz_submitted', current_user.id, session_id=..., quiz_id=..., score=...)
+
+which only appends to an in-memory buffer. The writer thread flushes it every
+FLUSH_INTERVAL seconds with one executemany per tenant into learning_events
+(event_type, user_id, subject_id, session_id, created_at, payload JSON), so a
+request never waits on the log; a crash loses at most one interval of events.
+
+Every COMPACT_INTERVAL seconds compact() moves the logged rows into Parquet
+files, one directory per tenant and ISO week, filling subject_id from the
+session on the way, and deletes them from the live table:
+
+    <LMS_EVENT_STORE>/main/week=2026-W42/events-1201-1750.parquet
+
+load() and engagement() read the weeks they need from those files plus the
+rows not yet compacted, so the analytics scans stay off the OLTP tables.
+Readers drop duplicate ids, which two workers compacting at once can leave.
+Parquet needs pyarrow (optional); without it the events stay in
+learning_events and the analytics read them from there. pandas is imported
+by the functions that use it.
+
+    python learning_events.py compact     # flush and compact every tenant now
+"""
+import atexit
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from database import get_db
+import tenancy
+
+FLUSH_INTERVAL = 5           # seconds between writes of the buffered events
+COMPACT_INTERVAL = int(os.environ.get('LMS_EVENT_COMPACT_INTERVAL', '3600'))
+EVENT_STORE_DIR = os.environ.get('LMS_EVENT_STORE', os.path.join('data', 'events'))
+MAX_BUFFERED = 100000        # oldest events are dropped past this (e.g. no writer thread)
+
+PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+COLUMNS = ('event_type', 'user_id', 'subject_id', 'session_id', 'created_at', 'payload')
+
+_buffer = deque(maxlen=MAX_BUFFERED)     # (institution id, row); append/popleft are thread-safe
+_flush_lock = threading.Lock()
+
+
+def _tenant():
+    return tenancy.current_institution() if tenancy.ENABLED else None
+
+
+def tenant_dir(institution_id=None):
+    return os.path.join(EVENT_STORE_DIR, 'main' if institution_id is None else f'institution_{institution_id}')
+
+
+def week_key(moment):
+    year, week, _ = moment.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def record(event_type, user_id, subject_id=None, session_id=None, **payload):
+    """Queue one event for the writer thread; never touches the database."""
+    _buffer.append((_tenant(), (event_type, user_id, subject_id, session_id,
+                                datetime.now().strftime(TIME_FORMAT),
+                                json.dumps(payload) if payload else None)))
+
+
+def flush():
+    """Write the buffered events, one executemany per tenant; returns how many.
+    A tenant whose write fails keeps its events in the buffer (retried on the
+    next flush) and the first error is raised once every tenant was tried."""
+    with _flush_lock:
+        batches = {}
+        while _buffer:
+            institution_id, row = _buffer.popleft()
+            batches.setdefault(institution_id, []).append(row)
+        written, error = 0, None
+        for institution_id, rows in batches.items():
+            conn = None
+            try:
+                with tenancy.use_institution(institution_id):
+                    conn = get_db()
+                conn.executemany(f'''
+                    INSERT INTO learning_events ({', '.join(COLUMNS)})
+                    VALUES ({', '.join('?' * len(COLUMNS))})
+                ''', rows)
+                conn.commit()
+                written += len(rows)
+            except Exception as e:
+                _buffer.extend((institution_id, row) for row in rows)
+                error = error or e
+            finally:
+                if conn is not None:
+                    conn.close()
+        if error is not None:
+            raise error
+        return written
+
+
+_EVENT_SELECT = '''
+    SELECT e.id, e.event_type, e.user_id, COALESCE(e.subject_id, s.subject_id) AS subject_id,
+           e.session_id, e.created_at, e.payload
+    FROM learning_events e
+    LEFT JOIN sessions s ON s.id = e.session_id
+'''
+
+
+def _frame(rows):
+    import pandas as pd
+
+    frame = pd.DataFrame([tuple(row) for row in rows],
+                         columns=['id', 'event_type', 'user_id', 'subject_id', 'session_id', 'created_at', 'payload'])
+    for column in ('user_id', 'subject_id', 'session_id'):
+        frame[column] = frame[column].astype('Int64')
+    frame['created_at'] = pd.to_datetime(frame['created_at'])
+    return frame
+
+
+def compact(conn, institution_id=None):
+    """Move every logged event of this tenant into its weekly Parquet files; returns how many."""
+    if not PARQUET:
+        return 0
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX(id) FROM learning_events')
+    last_id = cursor.fetchone()[0]
+    if last_id is None:
+        return 0
+    cursor.execute(f'{_EVENT_SELECT} WHERE e.id <= ? ORDER BY e.id', (last_id,))
+    frame = _frame(cursor.fetchall())
+
+    weeks = frame['created_at'].map(week_key)
+    for week, part in frame.groupby(weeks):
+        directory = os.path.join(tenant_dir(institution_id), f'week={week}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"events-{part['id'].iloc[0]}-{part['id'].iloc[-1]}.parquet")
+        part.to_parquet(path + '.tmp', engine='pyarrow', index=False)
+        os.replace(path + '.tmp', path)
+
+    cursor.execute('DELETE FROM learning_events WHERE id <= ?', (last_id,))
+    conn.commit()
+    return len(frame)
+
+
+def load(since=None, subject_id=None, institution_id=None):
+    """Events of the current tenant (a pandas DataFrame), optionally since a datetime
+    and for one subject, from the Parquet files and the live table."""
+    import pandas as pd
+
+    if institution_id is None:
+        institution_id = _tenant()
+    # Live rows first: a compaction running meanwhile then shows up twice, not never
+    where, params = ['1 = 1'], []
+    if since is not None:
+        where.append('e.created_at >= ?')
+        params.append(since.strftime(TIME_FORMAT))
+    if subject_id is not None:
+        where.append('COALESCE(e.subject_id, s.subject_id) = ?')
+        params.append(subject_id)
+    with tenancy.use_institution(institution_id):
+        conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"{_EVENT_SELECT} WHERE {' AND '.join(where)}", params)
+        frames = [_frame(cursor.fetchall())]
+    finally:
+        conn.close()
+
+    root = tenant_dir(institution_id)
+    if PARQUET and os.path.isdir(root):
+        first_week = f'week={week_key(since)}' if since is not None else ''
+        filters = [('subject_id', '==', subject_id)] if subject_id is not None else None
+        for week_dir in sorted(os.listdir(root)):
+            if not week_dir.startswith('week=') or week_dir < first_week:
+                continue
+            for name in sorted(os.listdir(os.path.join(root, week_dir))):
+                if name.endswith('.parquet'):
+                    frames.append(pd.read_parquet(os.path.join(root, week_dir, name),
+                                                  engine='pyarrow', filters=filters))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return _frame([])
+    events = pd.concat(frames, ignore_index=True).drop_duplicates('id')
+    if since is not None:
+        events = events[events['created_at'] >= pd.Timestamp(since)]
+    return events.sort_values('id', ignore_index=True)
+
+
+def engagement(subject_id=None, weeks=8, now=None):
+    """Weekly event counts per event type and distinct active users over the last
+    `weeks` ISO weeks (oldest first), for the monitoring page's chart."""
+    now = now or datetime.now()
+    start = (now - timedelta(days=now.weekday(), weeks=weeks - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    week_keys = [week_key(start + timedelta(weeks=i)) for i in range(weeks)]
+    events = load(since=start, subject_id=subject_id)
+
+    result = {'weeks': week_keys, 'events': {}, 'active_users': [0] * weeks, 'total': int(len(events))}
+    if events.empty:
+        return result
+    event_weeks = events['created_at'].map(week_key)
+    counts = events.groupby(['event_type', event_weeks]).size().unstack(fill_value=0)
+    counts = counts.reindex(columns=week_keys, fill_value=0)
+    result['events'] = {event_type: [int(n) for n in row] for event_type, row in counts.iterrows()}
+    active = events.groupby(event_weeks)['user_id'].nunique().reindex(week_keys, fill_value=0)
+    result['active_users'] = [int(n) for n in active]
+    return result
+
+
+def compact_all():
+    """Flush, then compact every tenant; returns the number of events compacted."""
+    flush()
+    compacted = 0
+    for institution_id in tenancy.tenants():
+        with tenancy.use_institution(institution_id):
+            conn = get_db()
+        try:
+            compacted += compact(conn, institution_id)
+        finally:
+            conn.close()
+    return compacted
+
+
+def writer():
+    """Background thread body: flush every FLUSH_INTERVAL, compact every COMPACT_INTERVAL."""
+    last_compact = time.monotonic()
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception as e:
+            print(f'[Events] Flush failed: {e}')
+        if PARQUET and time.monotonic() - last_compact >= COMPACT_INTERVAL:
+            last_compact = time.monotonic()
+            try:
+                compacted = compact_all()
+                if compacted:
+                    print(f'[Events] Compacted {compacted} events into {EVENT_STORE_DIR}')
+            except Exception as e:
+                print(f'[Events] Compaction failed: {e}')
+
+
+def start_writer():
+    if not PARQUET:
+        print('[Events] pyarrow not installed: events stay in learning_events (no Parquet compaction)')
+    atexit.register(flush)
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['compact']:
+        sys.exit('usage: python learning_events.py compact')
+    if not PARQUET:
+        sys.exit('pyarrow is not installed: pip install pyarrow')
+    print(f'Compacted {compact_all()} events into {EVENT_STORE_DIR}')
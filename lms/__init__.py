@@ -0,0 +1,124 @@
+"""Application factory.
+
+create_app() builds the Flask app: configuration, Jinja extensions, the
+blueprints (one module per area of the site), database initialisation and,
+unless BACKGROUND_JOBS is False, the background threads (AI admin agent,
+backup scheduler, dashboard counter refresher, visibility release runner,
+learning event writer, nightly grade report builder). Importing lms or any of its modules has no side
+effects, and heavy libraries (pandas for bulk uploads and analytics, PIL for
+images, smtplib for e-mailed backups) are imported by the code that uses
+them, so a worker boots without loading them.
+
+    from lms import create_app
+    app = create_app({'TESTING': True, 'BACKGROUND_JOBS': False})
+
+app.py calls create_app() for `python app.py` and `gunicorn app:app`.
+"""
+import os
+import threading
+from functools import partial
+
+from flask import Flask, flash, redirect, request, url_for
+
+import assets
+import compression
+import fragment_cache
+import image_pipeline
+import leaderboard
+import learning_events
+import query_profiler
+import release_scheduler
+import report_cubes
+import stats_counters
+from database import get_db, init_db
+
+from lms import (admin, auth, backup, games, grading, institution, instructor, lessons,
+                 messaging, peer_review, search, student, templating)
+from lms.common import login_manager, invalidate_user_cache
+
+# Templates and static/ live next to app.py, not inside the package
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLUEPRINTS = (auth, lessons, grading, peer_review, student, games, messaging,
+              instructor, admin, institution, backup, search)
+
+_background_started = False
+_background_lock = threading.Lock()
+
+
+def start_background_jobs():
+    """Start the process-wide daemon threads once, however many apps are created."""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    threading.Thread(target=admin.ai_admin_agent, daemon=True).start()
+    threading.Thread(target=backup.backup_scheduler, daemon=True).start()
+    # Keep the dashboard counters fresh in the background (stats_counters.py)
+    stats_counters.start_refresher()
+    # Scheduled visibility releases and their cache prewarming (release_scheduler.py)
+    release_scheduler.start_runner()
+    # Batched writes of the learning event log and its Parquet compaction (learning_events.py)
+    learning_events.start_writer()
+    # Nightly rebuild of the precomputed grade reports (report_cubes.py)
+    report_cubes.start_scheduler()
+
+
+def request_entity_too_large(error):
+    flash('File too large! Please upload a smaller file (max 16MB).', 'error')
+    return redirect(request.referrer or url_for('auth.profile'))
+
+
+def create_app(config=None):
+    app = Flask(__name__, root_path=BASE_DIR)
+    app.secret_key = 'your-secret-key-change-this'
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['PHOTO_FOLDER'] = 'static/uploads/photos'
+    app.config['DOCUMENT_FOLDER'] = 'static/uploads/documents'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+    app.config['BACKGROUND_JOBS'] = True
+    if config:
+        app.config.update(config)
+
+    # {% cache %} blocks for the static parts of session pages (see fragment_cache.py)
+    app.jinja_env.add_extension(fragment_cache.FragmentCacheExtension)
+    # static_url() / static_image() and the fingerprinted /assets/ route (see assets.py)
+    assets.Assets(app)
+
+    # Ensure upload and backup folders exist
+    for folder in (app.config['PHOTO_FOLDER'], app.config['DOCUMENT_FOLDER'],
+                   app.config['UPLOAD_FOLDER'], backup.BACKUP_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+
+    # Initialize database (creates tables, runs migrations, seeds defaults)
+    init_db()
+
+    # Build the in-memory game leaderboard
+    conn = get_db()
+    leaderboard.board.rebuild(conn)
+    conn.close()
+
+    login_manager.init_app(app)
+    image_pipeline.on_user_updated = invalidate_user_cache
+    release_scheduler.warm_sessions = partial(lessons.warm_session_pages, app)
+    release_scheduler.on_released = lessons.forget_released
+
+    # Per-request SQL profiling (LMS_QUERY_PROFILE=1, see query_profiler.py)
+    query_profiler.init_app(app)
+    # gzip/brotli for text responses, weak ETags + 304 for GET JSON (see compression.py)
+    compression.init_app(app)
+    templating.init_app(app)
+    app.register_error_handler(413, request_entity_too_large)
+
+    for module in BLUEPRINTS:
+        app.register_blueprint(module.bp)
+
+    # Compile templates at worker boot, after every filter and global is registered
+    with app.app_context():
+        overrides = lessons.load_lesson_templates()
+        print(f'[Templates] Precompiled {lessons.precompile_templates()} templates, {len(overrides)} lesson overrides')
+
+    if app.config['BACKGROUND_JOBS']:
+        start_background_jobs()
+    return app
@@ -0,0 +1,1315 @@
+"""Platform admin pages and APIs, payroll, AI rules/logs and the AI admin agent."""
+import json
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app
+from flask_login import login_required, current_user
+from werkzeug.security import generate_password_hash
+from werkzeug.utils import secure_filename
+
+from database import get_db
+import pagination
+import payroll
+import query_profiler
+import report_cubes
+import stats_counters
+import tenancy
+
+from lms.common import admin_required, compute_weighted_grade, invalidate_user_cache, student_filters
+
+bp = Blueprint('admin', __name__)
+
+
+# ============== V2: PLATFORM ADMIN ROUTES ==============
+
+@bp.route('/admin/dashboard')
+@login_required
+@admin_required
+def admin_dashboard():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Platform-wide stats (cached counters, see stats_counters.py)
+    if request.args.get('refresh'):
+        stats_counters.refresh(conn)
+    stats, stats_as_of = stats_counters.get_counters(conn, stats_counters.PLATFORM)
+
+    # Recent AI actions
+    cursor.execute('''
+        SELECT * FROM ai_admin_logs ORDER BY created_at DESC LIMIT 10
+    ''')
+    recent_ai_logs = cursor.fetchall()
+
+    # Institutions list
+    cursor.execute('SELECT * FROM institutions ORDER BY name')
+    institutions = cursor.fetchall()
+
+    conn.close()
+
+    return render_template('admin_dashboard.html',
+        total_institutions=int(stats.get('total_institutions', 0)),
+        total_instructors=int(stats.get('total_instructors', 0)),
+        total_students=int(stats.get('total_students', 0)),
+        total_subjects=int(stats.get('total_subjects', 0)),
+        total_submissions=int(stats.get('total_submissions', 0)),
+        total_ai_actions=int(stats.get('total_ai_actions', 0)),
+        recent_ai_logs=recent_ai_logs,
+        active_rules=int(stats.get('active_rules', 0)),
+        institutions=institutions,
+        pending_payroll=int(stats.get('pending_payroll', 0)),
+        total_paid=stats.get('total_paid', 0),
+        stats_as_of=stats_as_of
+    )
+
+
+@bp.route('/admin/query-profile')
+@login_required
+@admin_required
+def admin_query_profile():
+    if request.args.get('reset'):
+        query_profiler.reset()
+        return redirect(url_for('admin.admin_query_profile'))
+    sort = request.args.get('sort', 'p95')
+    return render_template('admin_query_profile.html',
+        enabled=query_profiler.ENABLED,
+        routes=query_profiler.route_report(sort),
+        statements=query_profiler.statement_report(),
+        sort=sort,
+        slow_query_ms=query_profiler.SLOW_QUERY_MS,
+        slow_query_log=query_profiler.SLOW_QUERY_LOG
+    )
+
+
+@bp.route('/admin/institutions')
+@login_required
+@admin_required
+def admin_institutions():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT i.*,
+               (SELECT COUNT(*) FROM users WHERE institution_id = i.id AND role = 'instructor') as instructor_count,
+               (SELECT COUNT(*) FROM users WHERE institution_id = i.id AND role = 'student') as student_count,
+               (SELECT COUNT(*) FROM subjects WHERE institution_id = i.id) as subject_count
+        FROM institutions i ORDER BY i.name
+    ''')
+    institutions = cursor.fetchall()
+    cursor.execute('SELECT * FROM subscription_plans WHERE is_active = 1 ORDER BY price_monthly')
+    plans = cursor.fetchall()
+    conn.close()
+    return render_template('admin_institutions.html', institutions=institutions, plans=plans)
+
+
+@bp.route('/api/admin/institutions', methods=['POST'])
+@login_required
+@admin_required
+def create_institution():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO institutions (name, short_name, domain, address, contact_email, contact_phone, plan, max_students, max_instructors)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (data.get('name'), data.get('short_name'), data.get('domain'), data.get('address'),
+              data.get('contact_email'), data.get('contact_phone'), data.get('plan', 'free'),
+              data.get('max_students', 100), data.get('max_instructors', 5)))
+        stats_counters.mark_stale()
+        conn.commit()
+
+        # Log AI action
+        cursor.execute('''
+            INSERT INTO ai_admin_logs (action_type, target_type, target_name, decision, reasoning, severity)
+            VALUES ('institution_created', 'institution', ?, 'New institution registered', 'Admin created new institution', 'info')
+        ''', (data.get('name'),))
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True, 'message': 'Institution created'})
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@bp.route('/api/admin/institutions/<int:inst_id>', methods=['PUT'])
+@login_required
+@admin_required
+def update_institution(inst_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE institutions SET name=?, short_name=?, domain=?, address=?, contact_email=?, contact_phone=?,
+               plan=?, max_students=?, max_instructors=?, is_active=?
+        WHERE id=?
+    ''', (data.get('name'), data.get('short_name'), data.get('domain'), data.get('address'),
+          data.get('contact_email'), data.get('contact_phone'), data.get('plan'),
+          data.get('max_students'), data.get('max_instructors'), data.get('is_active', 1), inst_id))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/admin/instructors')
+@login_required
+@admin_required
+def admin_instructors():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT u.*, i.name as institution_name, ip.employee_id, ip.hire_date, ip.contract_type,
+               ip.salary_rate, ip.salary_frequency
+        FROM users u
+        LEFT JOIN institutions i ON u.institution_id = i.id
+        LEFT JOIN instructor_profiles ip ON u.id = ip.user_id
+        WHERE u.role = 'instructor'
+        ORDER BY u.full_name
+    ''')
+    instructors = cursor.fetchall()
+    cursor.execute('SELECT id, name, short_name FROM institutions WHERE is_active = 1 ORDER BY name')
+    institutions = cursor.fetchall()
+    conn.close()
+    return render_template('admin_instructors.html', instructors=instructors, institutions=institutions)
+
+
+@bp.route('/api/admin/instructor-profile/<int:user_id>', methods=['POST'])
+@login_required
+@admin_required
+def update_instructor_profile(user_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Update institution assignment
+    cursor.execute('UPDATE users SET institution_id = ? WHERE id = ?', (data.get('institution_id'), user_id))
+
+    # Upsert instructor profile
+    cursor.execute('SELECT id FROM instructor_profiles WHERE user_id = ?', (user_id,))
+    if cursor.fetchone():
+        cursor.execute('''
+            UPDATE instructor_profiles SET institution_id=?, employee_id=?, hire_date=?, contract_type=?,
+                   salary_rate=?, salary_frequency=?
+            WHERE user_id=?
+        ''', (data.get('institution_id'), data.get('employee_id'), data.get('hire_date'),
+              data.get('contract_type', 'full-time'), data.get('salary_rate', 0),
+              data.get('salary_frequency', 'monthly'), user_id))
+    else:
+        cursor.execute('''
+            INSERT INTO instructor_profiles (user_id, institution_id, employee_id, hire_date, contract_type, salary_rate, salary_frequency)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, data.get('institution_id'), data.get('employee_id'), data.get('hire_date'),
+              data.get('contract_type', 'full-time'), data.get('salary_rate', 0),
+              data.get('salary_frequency', 'monthly')))
+    conn.commit()
+    invalidate_user_cache([user_id])
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN PAYROLL ==============
+
+@bp.route('/admin/payroll')
+@login_required
+@admin_required
+def admin_payroll():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT p.*, u.full_name, i.short_name as institution_name
+        FROM instructor_payroll p
+        JOIN users u ON p.instructor_id = u.id
+        LEFT JOIN institutions i ON p.institution_id = i.id
+        ORDER BY p.created_at DESC
+    ''')
+    payrolls = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT u.id, u.full_name, ip.salary_rate, ip.salary_frequency, ip.contract_type, i.short_name as institution_name
+        FROM users u
+        JOIN instructor_profiles ip ON u.id = ip.user_id
+        LEFT JOIN institutions i ON ip.institution_id = i.id
+        WHERE u.role = 'instructor'
+        ORDER BY u.full_name
+    ''')
+    instructors = cursor.fetchall()
+
+    conn.close()
+    return render_template('admin_payroll.html', payrolls=payrolls, instructors=instructors)
+
+
+@bp.route('/api/admin/payroll/preview', methods=['POST'])
+@login_required
+@admin_required
+def preview_payroll():
+    """Dry run of payroll generation for the confirmation step in the admin UI"""
+    data = request.get_json() or {}
+    try:
+        period_start, period_end = payroll.parse_period(data.get('period_start'), data.get('period_end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+    conn = get_db()
+    rows = payroll.preview_payroll(conn.cursor(), period_start, period_end)
+    conn.close()
+    return jsonify({'success': True, 'rows': rows, 'summary': payroll.summarize(rows)})
+
+
+@bp.route('/api/admin/payroll/generate', methods=['POST'])
+@login_required
+@admin_required
+def generate_payroll():
+    data = request.get_json() or {}
+    try:
+        period_start, period_end = payroll.parse_period(data.get('period_start'), data.get('period_end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # One INSERT ... SELECT for all instructors, logged in the same transaction
+    generated = payroll.generate_payroll(cursor, period_start, period_end)
+
+    # AI log
+    cursor.execute('''
+        INSERT INTO ai_admin_logs (action_type, target_type, decision, reasoning, severity)
+        VALUES ('payroll_generated', 'payroll', ?, ?, 'info')
+    ''', (f'Generated {generated} payroll records for {period_start} to {period_end}',
+          'Auto-calculated based on attendance records and salary rates'))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+
+    return jsonify({'success': True, 'generated': generated})
+
+
+@bp.route('/api/admin/payroll/<int:payroll_id>/approve', methods=['POST'])
+@login_required
+@admin_required
+def approve_payroll(payroll_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE instructor_payroll SET status = 'approved', approved_by = ?, approved_at = datetime('now')
+        WHERE id = ?
+    ''', (current_user.id, payroll_id))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/admin/payroll/<int:payroll_id>/pay', methods=['POST'])
+@login_required
+@admin_required
+def mark_payroll_paid(payroll_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE instructor_payroll SET status = 'paid', paid_at = datetime('now')
+        WHERE id = ? AND status = 'approved'
+    ''', (payroll_id,))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN AI LOGS & RULES ==============
+
+AI_LOG_ORDER = pagination.Keyset(('created_at', 'created_at'), ('id', 'id'), descending=True)
+
+
+@bp.route('/admin/ai-logs')
+@login_required
+@admin_required
+def admin_ai_logs():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    filter_type = request.args.get('type', '')
+    filter_severity = request.args.get('severity', '')
+
+    query = 'SELECT * FROM ai_admin_logs WHERE 1=1'
+    params = []
+    if filter_type:
+        query += ' AND action_type = ?'
+        params.append(filter_type)
+    if filter_severity:
+        query += ' AND severity = ?'
+        params.append(filter_severity)
+    logs = AI_LOG_ORDER.fetch(cursor, query + ' AND {keyset}', params, request.args)
+
+    cursor.execute('SELECT COUNT(*) FROM ai_admin_logs')
+    total = cursor.fetchone()[0]
+
+    # Get distinct types for filter
+    cursor.execute('SELECT DISTINCT action_type FROM ai_admin_logs ORDER BY action_type')
+    action_types = [r['action_type'] for r in cursor.fetchall()]
+
+    conn.close()
+    return render_template('admin_ai_logs.html', logs=logs, action_types=action_types,
+                          filter_type=filter_type, filter_severity=filter_severity, total=total)
+
+
+@bp.route('/admin/ai-rules')
+@login_required
+@admin_required
+def admin_ai_rules():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM ai_admin_rules ORDER BY priority DESC, rule_name')
+    rules = cursor.fetchall()
+    conn.close()
+    return render_template('admin_ai_rules.html', rules=rules)
+
+
+@bp.route('/api/admin/ai-rules/<int:rule_id>/toggle', methods=['POST'])
+@login_required
+@admin_required
+def toggle_ai_rule(rule_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT is_active FROM ai_admin_rules WHERE id = ?', (rule_id,))
+    rule = cursor.fetchone()
+    if rule:
+        new_state = 0 if rule['is_active'] else 1
+        cursor.execute('UPDATE ai_admin_rules SET is_active = ? WHERE id = ?', (new_state, rule_id))
+        stats_counters.mark_stale()
+        conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'is_active': new_state})
+
+
+@bp.route('/api/admin/ai-rules', methods=['POST'])
+@login_required
+@admin_required
+def create_ai_rule():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO ai_admin_rules (rule_name, rule_type, condition_field, condition_operator, condition_value, action_type, action_params, priority)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (data.get('rule_name'), data.get('rule_type'), data.get('condition_field'),
+          data.get('condition_operator'), data.get('condition_value'),
+          data.get('action_type'), data.get('action_params', '{}'), data.get('priority', 0)))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== AI ADMIN AGENT ==============
+
+def ai_admin_agent():
+    """Background AI admin agent that monitors and triggers actions based on rules."""
+    import time
+
+    time.sleep(120)  # Wait 2 minutes on startup
+
+    while True:
+        try:
+            conn = get_db()
+            cursor = conn.cursor()
+
+            # Check if AI admin is enabled
+            cursor.execute("SELECT setting_value FROM platform_settings WHERE setting_key = 'ai_admin_enabled'")
+            setting = cursor.fetchone()
+            if not setting or setting['setting_value'] != 'true':
+                conn.close()
+                time.sleep(1800)
+                continue
+
+            # Get active rules
+            cursor.execute('SELECT * FROM ai_admin_rules WHERE is_active = 1 ORDER BY priority DESC')
+            rules = cursor.fetchall()
+            conn.close()
+
+            # Every institution's shard in turn (just the one database when not sharded)
+            for institution_id in tenancy.tenants():
+                with tenancy.use_institution(institution_id):
+                    conn = get_db()
+                cursor = conn.cursor()
+                for rule in rules:
+                    try:
+                        if rule['rule_type'] == 'grade_monitor':
+                            _ai_check_grades(cursor, conn, rule)
+                        elif rule['rule_type'] == 'deadline_monitor':
+                            _ai_check_deadlines(cursor, conn, rule)
+                        elif rule['rule_type'] == 'progress_monitor':
+                            _ai_check_progress(cursor, conn, rule)
+                        elif rule['rule_type'] == 'attendance_monitor':
+                            _ai_check_attendance(cursor, conn, rule)
+                    except Exception as e:
+                        print(f'[AI-Admin] Rule "{rule["rule_name"]}" error: {e}')
+                conn.close()
+        except Exception as e:
+            print(f'[AI-Admin] Agent error: {e}')
+
+        # Get interval from settings or default 30 min
+        time.sleep(1800)
+
+
+def _ai_check_grades(cursor, conn, rule):
+    """Check student grades against threshold and send alerts."""
+    threshold = float(rule['condition_value'])
+    params = json.loads(rule['action_params']) if rule['action_params'] else {}
+
+    cursor.execute('''
+        SELECT DISTINCT e.subject_id, e.student_id FROM enrollments e
+        JOIN users u ON e.student_id = u.id AND u.is_approved = 1
+    ''')
+    enrollments = cursor.fetchall()
+
+    for enr in enrollments:
+        try:
+            grade = compute_weighted_grade(cursor, enr['subject_id'], enr['student_id'])
+            if grade and grade > 0 and grade < threshold:
+                # Check if we already alerted recently
+                cursor.execute('''
+                    SELECT id FROM ai_admin_logs
+                    WHERE action_type = 'grade_alert' AND target_id = ? AND target_type = ?
+                    AND created_at > datetime('now', '-7 days')
+                ''', (enr['student_id'], f"subject_{enr['subject_id']}"))
+                if not cursor.fetchone():
+                    cursor.execute('SELECT full_name FROM users WHERE id = ?', (enr['student_id'],))
+                    student = cursor.fetchone()
+                    cursor.execute('SELECT code FROM subjects WHERE id = ?', (enr['subject_id'],))
+                    subject = cursor.fetchone()
+
+                    if student and subject:
+                        msg = params.get('message_template', 'Your grade needs improvement in {subject}.')
+                        msg = msg.replace('{grade}', f'{grade:.1f}').replace('{subject}', subject['code'])
+
+                        cursor.execute('''
+                            INSERT INTO notifications (user_id, type, icon, message, link)
+                            VALUES (?, 'warning', 'exclamation-triangle', ?, '/my-grades')
+                        ''', (enr['student_id'], msg))
+
+                        cursor.execute('''
+                            INSERT INTO ai_admin_logs (action_type, target_type, target_id, target_name, decision, reasoning, severity)
+                            VALUES ('grade_alert', ?, ?, ?, ?, ?, ?)
+                        ''', (f"subject_{enr['subject_id']}", enr['student_id'], student['full_name'],
+                              f'Sent grade alert: {grade:.1f}% in {subject["code"]}',
+                              f'Grade below {threshold}% threshold', params.get('severity', 'warning')))
+                        conn.commit()
+        except Exception:
+            pass
+
+
+def _ai_check_deadlines(cursor, conn, rule):
+    """Check for missed activity deadlines."""
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    cursor.execute('''
+        SELECT a.id, a.title, a.due_date, s.code as subject_code, s.id as subject_id,
+               e.student_id
+        FROM activities a
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects s ON ses.subject_id = s.id
+        JOIN enrollments e ON e.subject_id = s.id
+        JOIN users u ON e.student_id = u.id AND u.is_approved = 1
+        LEFT JOIN submissions sub ON sub.activity_id = a.id AND sub.student_id = e.student_id
+        WHERE a.due_date IS NOT NULL AND a.due_date < ? AND sub.id IS NULL
+    ''', (today,))
+    missed = cursor.fetchall()
+
+    for m in missed:
+        cursor.execute('''
+            SELECT id FROM ai_admin_logs
+            WHERE action_type = 'deadline_alert' AND target_id = ?
+            AND data LIKE ? AND created_at > datetime('now', '-3 days')
+        ''', (m['student_id'], f'%activity_{m["id"]}%'))
+        if not cursor.fetchone():
+            cursor.execute('''
+                INSERT INTO notifications (user_id, type, icon, message, link)
+                VALUES (?, 'warning', 'clock', ?, ?)
+            ''', (m['student_id'],
+                  f'Missed deadline: "{m["title"]}" in {m["subject_code"]} was due {m["due_date"]}.',
+                  f'/student/subject/{m["subject_id"]}'))
+
+            cursor.execute('''
+                INSERT INTO ai_admin_logs (action_type, target_type, target_id, decision, data, severity)
+                VALUES ('deadline_alert', 'student', ?, ?, ?, 'warning')
+            ''', (m['student_id'], f'Missed deadline alert for {m["title"]}',
+                  json.dumps({'activity_id': m['id'], 'key': f'activity_{m["id"]}'})))
+            conn.commit()
+
+
+def _ai_check_progress(cursor, conn, rule):
+    """Check for students behind on sessions."""
+    threshold = int(rule['condition_value'])
+
+    cursor.execute('''
+        SELECT e.student_id, e.subject_id, s.code as subject_code,
+               (SELECT COUNT(*) FROM sessions WHERE subject_id = e.subject_id AND is_visible = 1) as total_sessions,
+               (SELECT COUNT(*) FROM session_progress sp
+                JOIN sessions ses ON sp.session_id = ses.id
+                WHERE ses.subject_id = e.subject_id AND sp.student_id = e.student_id AND sp.completed_at IS NOT NULL) as completed_sessions
+        FROM enrollments e
+        JOIN subjects s ON e.subject_id = s.id
+        JOIN users u ON e.student_id = u.id AND u.is_approved = 1
+    ''')
+    for enr in cursor.fetchall():
+        behind = enr['total_sessions'] - enr['completed_sessions']
+        if behind > threshold:
+            cursor.execute('''
+                SELECT id FROM ai_admin_logs
+                WHERE action_type = 'progress_alert' AND target_id = ?
+                AND data LIKE ? AND created_at > datetime('now', '-7 days')
+            ''', (enr['student_id'], f'%subject_{enr["subject_id"]}%'))
+            if not cursor.fetchone():
+                cursor.execute('''
+                    INSERT INTO notifications (user_id, type, icon, message, link)
+                    VALUES (?, 'warning', 'tasks', ?, ?)
+                ''', (enr['student_id'],
+                      f'You are {behind} sessions behind in {enr["subject_code"]}. Catch up!',
+                      f'/student/subject/{enr["subject_id"]}'))
+                cursor.execute('''
+                    INSERT INTO ai_admin_logs (action_type, target_type, target_id, decision, data, severity)
+                    VALUES ('progress_alert', 'student', ?, ?, ?, 'warning')
+                ''', (enr['student_id'], f'{behind} sessions behind in {enr["subject_code"]}',
+                      json.dumps({'subject_id': enr['subject_id'], 'key': f'subject_{enr["subject_id"]}'})))
+                conn.commit()
+
+
+def _ai_check_attendance(cursor, conn, rule):
+    """Check if instructors have clocked in today."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    day_of_week = datetime.now().strftime('%A')
+
+    # Only check on weekdays
+    if day_of_week in ('Saturday', 'Sunday'):
+        return
+
+    cursor.execute('''
+        SELECT u.id, u.full_name FROM users u
+        WHERE u.role = 'instructor'
+        AND u.id NOT IN (SELECT instructor_id FROM instructor_attendance WHERE date = ?)
+    ''', (today,))
+    missing = cursor.fetchall()
+
+    for inst in missing:
+        cursor.execute('''
+            SELECT id FROM ai_admin_logs
+            WHERE action_type = 'attendance_reminder' AND target_id = ? AND created_at > datetime('now', '-12 hours')
+        ''', (inst['id'],))
+        if not cursor.fetchone():
+            cursor.execute('''
+                INSERT INTO notifications (user_id, type, icon, message, link)
+                VALUES (?, 'info', 'clock', 'Reminder: Please clock in for today.', '/instructor/attendance')
+            ''', (inst['id'],))
+            cursor.execute('''
+                INSERT INTO ai_admin_logs (action_type, target_type, target_id, target_name, decision, severity)
+                VALUES ('attendance_reminder', 'instructor', ?, ?, 'Sent clock-in reminder', 'info')
+            ''', (inst['id'], inst['full_name']))
+            conn.commit()
+
+
+# ============== ADMIN STUDENTS MANAGEMENT ==============
+
+STUDENT_ORDER = pagination.Keyset(('u.full_name', 'full_name'), ('u.id', 'id'))
+
+
+@bp.route('/admin/students')
+@login_required
+@admin_required
+def admin_students():
+    conn = get_db()
+    cursor = conn.cursor()
+    where, params = student_filters(request.args)
+    students = STUDENT_ORDER.fetch(cursor, f'''
+        SELECT u.*, i.short_name as institution_name,
+               (SELECT COUNT(*) FROM enrollments WHERE student_id = u.id) as enrolled_subjects,
+               (SELECT COUNT(*) FROM submissions WHERE student_id = u.id) as total_submissions,
+               (SELECT COUNT(*) FROM quiz_attempts WHERE student_id = u.id) as quiz_attempts
+        FROM users u
+        LEFT JOIN institutions i ON u.institution_id = i.id
+        WHERE u.role = 'student'{where} AND {{keyset}}
+    ''', params, request.args)
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(CASE WHEN is_approved = 1 THEN 1 ELSE 0 END), 0) FROM users WHERE role = 'student'")
+    total_students, approved_students = cursor.fetchone()
+    cursor.execute('SELECT id, name, short_name FROM institutions WHERE is_active = 1 ORDER BY name')
+    institutions = cursor.fetchall()
+    cursor.execute("SELECT DISTINCT section FROM users WHERE section IS NOT NULL AND section != '' ORDER BY section")
+    sections = [r['section'] for r in cursor.fetchall()]
+    conn.close()
+    return render_template('admin_students.html', students=students, institutions=institutions, sections=sections,
+                           total_students=total_students, approved_students=approved_students,
+                           filters={'section': request.args.get('section', ''), 'q': request.args.get('q', '')})
+
+
+@bp.route('/api/admin/students', methods=['POST'])
+@login_required
+@admin_required
+def admin_create_student():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO users (username, password_hash, full_name, role, student_id, section,
+                             institution_id, email, contact_number, is_approved, profile_completed)
+            VALUES (?, ?, ?, 'student', ?, ?, ?, ?, ?, 1, 1)
+        ''', (data.get('username'), generate_password_hash(data.get('password', 'student123')),
+              data.get('full_name'), data.get('student_id'), data.get('section'),
+              data.get('institution_id'), data.get('email'), data.get('contact_number')))
+        stats_counters.mark_stale()
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@bp.route('/api/admin/students/<int:user_id>', methods=['PUT'])
+@login_required
+@admin_required
+def admin_update_student(user_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE users SET full_name=?, email=?, student_id=?, section=?, contact_number=?,
+               institution_id=?, is_approved=?, status=?
+        WHERE id=? AND role='student'
+    ''', (data.get('full_name'), data.get('email'), data.get('student_id'), data.get('section'),
+          data.get('contact_number'), data.get('institution_id'),
+          data.get('is_approved', 1), data.get('status', 'active'), user_id))
+    conn.commit()
+    invalidate_user_cache([user_id])
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/admin/students/<int:user_id>', methods=['DELETE'])
+@login_required
+@admin_required
+def admin_delete_student(user_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET status = 'inactive' WHERE id = ? AND role = 'student'", (user_id,))
+    conn.commit()
+    invalidate_user_cache([user_id])
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN SUBJECTS MANAGEMENT ==============
+
+@bp.route('/admin/subjects')
+@login_required
+@admin_required
+def admin_subjects():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, i.short_name as institution_name, u.full_name as instructor_name,
+               (SELECT COUNT(*) FROM enrollments WHERE subject_id = s.id) as student_count,
+               (SELECT COUNT(*) FROM sessions WHERE subject_id = s.id) as session_count,
+               (SELECT COUNT(*) FROM activities a JOIN sessions se ON a.session_id = se.id WHERE se.subject_id = s.id) as activity_count
+        FROM subjects s
+        LEFT JOIN institutions i ON s.institution_id = i.id
+        LEFT JOIN users u ON s.instructor_id = u.id
+        ORDER BY s.code, s.section
+    ''')
+    subjects = [dict(row) for row in cursor.fetchall()]
+    cursor.execute('SELECT id, name, short_name FROM institutions WHERE is_active = 1 ORDER BY name')
+    institutions = cursor.fetchall()
+    cursor.execute("SELECT id, full_name FROM users WHERE role = 'instructor' ORDER BY full_name")
+    instructors = cursor.fetchall()
+    conn.close()
+    return render_template('admin_subjects.html', subjects=subjects, institutions=institutions, instructors=instructors)
+
+
+@bp.route('/api/admin/subjects', methods=['POST'])
+@login_required
+@admin_required
+def admin_create_subject():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO subjects (code, name, description, section, day, time_schedule,
+                                institution_id, instructor_id, room, credits, max_students, color_theme)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (data.get('code'), data.get('name'), data.get('description'), data.get('section'),
+              data.get('day'), data.get('time_schedule'), data.get('institution_id'),
+              data.get('instructor_id'), data.get('room'), data.get('credits', 3),
+              data.get('max_students', 50), data.get('color_theme', 'blue')))
+        subject_id = cursor.lastrowid
+        # Create 16 sessions
+        for i in range(1, 17):
+            title = f"Session {i}: {'Lesson' if i <= 12 else 'Project'}"
+            cursor.execute('INSERT INTO sessions (subject_id, session_number, title) VALUES (?, ?, ?)',
+                         (subject_id, i, title))
+        stats_counters.mark_stale()
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@bp.route('/api/admin/subjects/<int:subject_id>', methods=['PUT'])
+@login_required
+@admin_required
+def admin_update_subject(subject_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE subjects SET code=?, name=?, description=?, section=?, day=?, time_schedule=?,
+               institution_id=?, instructor_id=?, room=?, credits=?, max_students=?, color_theme=?
+        WHERE id=?
+    ''', (data.get('code'), data.get('name'), data.get('description'), data.get('section'),
+          data.get('day'), data.get('time_schedule'), data.get('institution_id'),
+          data.get('instructor_id'), data.get('room'), data.get('credits', 3),
+          data.get('max_students', 50), data.get('color_theme', 'blue'), subject_id))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN MATERIALS & VIDEOS ==============
+
+@bp.route('/admin/materials')
+@login_required
+@admin_required
+def admin_materials():
+    conn = get_db()
+    cursor = conn.cursor()
+    # Get all sessions with their materials info
+    cursor.execute('''
+        SELECT se.*, s.code as subject_code, s.name as subject_name, s.section,
+               (SELECT COUNT(*) FROM activities WHERE session_id = se.id) as activity_count,
+               (SELECT COUNT(*) FROM quizzes WHERE session_id = se.id) as quiz_count
+        FROM sessions se
+        JOIN subjects s ON se.subject_id = s.id
+        ORDER BY s.code, s.section, se.session_number
+    ''')
+    sessions = cursor.fetchall()
+    # Get file storage entries
+    cursor.execute('''
+        SELECT f.*, u.full_name as uploader_name, s.code as subject_code, s.name as subject_name
+        FROM file_storage f
+        LEFT JOIN users u ON f.uploaded_by = u.id
+        LEFT JOIN subjects s ON f.subject_id = s.id
+        ORDER BY f.created_at DESC
+        LIMIT 100
+    ''')
+    files = cursor.fetchall()
+    cursor.execute('SELECT id, code, name, section FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+    conn.close()
+    return render_template('admin_materials.html', sessions=sessions, files=files, subjects=subjects)
+
+
+@bp.route('/api/admin/materials/upload', methods=['POST'])
+@login_required
+@admin_required
+def admin_upload_material():
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'error': 'No file provided'})
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'success': False, 'error': 'No file selected'})
+
+    safe_name = secure_filename(file.filename)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_name = f"{timestamp}_{safe_name}"
+    file_path = os.path.join(current_app.config['DOCUMENT_FOLDER'], file_name)
+    file.save(file_path)
+    file_size = os.path.getsize(file_path)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO file_storage (uploaded_by, file_name, original_name, file_path, file_size,
+                                 file_type, category, subject_id, description, is_public)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (current_user.id, file_name, safe_name, file_path, file_size,
+          safe_name.rsplit('.', 1)[-1] if '.' in safe_name else 'unknown',
+          request.form.get('category', 'general'),
+          request.form.get('subject_id') or None,
+          request.form.get('description', ''),
+          1 if request.form.get('is_public') else 0))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/admin/materials/<int:file_id>', methods=['DELETE'])
+@login_required
+@admin_required
+def admin_delete_material(file_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_path FROM file_storage WHERE id = ?', (file_id,))
+    f = cursor.fetchone()
+    if f and os.path.exists(f['file_path']):
+        os.remove(f['file_path'])
+    cursor.execute('DELETE FROM file_storage WHERE id = ?', (file_id,))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN QUIZZES MANAGEMENT ==============
+
+@bp.route('/admin/quizzes')
+@login_required
+@admin_required
+def admin_quizzes():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT q.*, se.session_number, s.code as subject_code, s.name as subject_name, s.section,
+               (SELECT COUNT(*) FROM quiz_questions WHERE quiz_id = q.id) as question_count,
+               (SELECT COUNT(*) FROM quiz_attempts WHERE quiz_id = q.id) as attempt_count,
+               (SELECT AVG(score) FROM quiz_attempts WHERE quiz_id = q.id) as avg_score
+        FROM quizzes q
+        JOIN sessions se ON q.session_id = se.id
+        JOIN subjects s ON se.subject_id = s.id
+        ORDER BY s.code, se.session_number
+    ''')
+    quizzes = cursor.fetchall()
+    # Exams too
+    cursor.execute('''
+        SELECT e.*, s.code as subject_code, s.name as subject_name, s.section,
+               (SELECT COUNT(*) FROM exam_questions WHERE exam_id = e.id) as question_count,
+               (SELECT COUNT(*) FROM exam_attempts WHERE exam_id = e.id) as attempt_count,
+               (SELECT AVG(score) FROM exam_attempts WHERE exam_id = e.id) as avg_score
+        FROM exams e
+        JOIN subjects s ON e.subject_id = s.id
+        ORDER BY s.code, e.exam_type
+    ''')
+    exams = cursor.fetchall()
+    conn.close()
+    return render_template('admin_quizzes.html', quizzes=quizzes, exams=exams)
+
+
+# ============== ADMIN GRADES OVERVIEW ==============
+
+@bp.route('/admin/grades')
+@login_required
+@admin_required
+def admin_grades():
+    conn = get_db()
+    cursor = conn.cursor()
+    # Precomputed nightly (report_cubes.py); ?refresh=1 rebuilds now
+    reports_as_of = report_cubes.ensure_built(conn, rebuild=bool(request.args.get('refresh')))
+    cursor.execute('SELECT *, subject_id AS id FROM report_subject_cube ORDER BY code, section')
+    grade_summary = cursor.fetchall()
+    # Top and bottom performers
+    cursor.execute('''
+        SELECT student_id AS id, full_name, section, student_code AS student_id, activities_done, graded, avg_score
+        FROM report_student_overall
+        ORDER BY avg_score DESC, student_id
+        LIMIT 20
+    ''')
+    top_students = cursor.fetchall()
+    cursor.execute('''
+        SELECT student_id AS id, full_name, section, student_code AS student_id, activities_done, graded, avg_score
+        FROM report_student_overall
+        ORDER BY avg_score ASC, student_id
+        LIMIT 20
+    ''')
+    at_risk_students = cursor.fetchall()
+    conn.close()
+    return render_template('admin_grades.html', grade_summary=grade_summary,
+                          top_students=top_students, at_risk_students=at_risk_students,
+                          reports_as_of=reports_as_of)
+
+
+# ============== ADMIN ATTENDANCE OVERVIEW ==============
+
+@bp.route('/admin/attendance')
+@login_required
+@admin_required
+def admin_attendance():
+    conn = get_db()
+    cursor = conn.cursor()
+    today = datetime.now().strftime('%Y-%m-%d')
+    month_start = datetime.now().strftime('%Y-%m-01')
+
+    # Instructor attendance summary
+    cursor.execute('''
+        SELECT u.id, u.full_name, ip.employee_id,
+               (SELECT COUNT(*) FROM instructor_attendance WHERE instructor_id = u.id AND date BETWEEN ? AND ? AND status='present') as present,
+               (SELECT COUNT(*) FROM instructor_attendance WHERE instructor_id = u.id AND date BETWEEN ? AND ? AND status='late') as late,
+               (SELECT COUNT(*) FROM instructor_attendance WHERE instructor_id = u.id AND date BETWEEN ? AND ? AND status='absent') as absent,
+               (SELECT SUM(hours_worked) FROM instructor_attendance WHERE instructor_id = u.id AND date BETWEEN ? AND ?) as total_hours,
+               (SELECT time_in FROM instructor_attendance WHERE instructor_id = u.id AND date = ?) as today_in,
+               (SELECT time_out FROM instructor_attendance WHERE instructor_id = u.id AND date = ?) as today_out
+        FROM users u
+        LEFT JOIN instructor_profiles ip ON u.id = ip.user_id
+        WHERE u.role = 'instructor'
+        ORDER BY u.full_name
+    ''', (month_start, today, month_start, today, month_start, today, month_start, today, today, today))
+    instructor_attendance = cursor.fetchall()
+
+    # Student attendance
+    cursor.execute('''
+        SELECT sa.date, s.code as subject_code, s.section,
+               SUM(CASE WHEN sa.status = 'present' THEN 1 ELSE 0 END) as present,
+               SUM(CASE WHEN sa.status = 'absent' THEN 1 ELSE 0 END) as absent,
+               SUM(CASE WHEN sa.status = 'late' THEN 1 ELSE 0 END) as late,
+               COUNT(*) as total
+        FROM student_attendance sa
+        JOIN subjects s ON sa.subject_id = s.id
+        WHERE sa.date BETWEEN ? AND ?
+        GROUP BY sa.date, s.id
+        ORDER BY sa.date DESC
+        LIMIT 50
+    ''', (month_start, today))
+    student_attendance = cursor.fetchall()
+
+    conn.close()
+    return render_template('admin_attendance.html',
+        instructor_attendance=instructor_attendance,
+        student_attendance=student_attendance,
+        today=today, month_start=month_start)
+
+
+@bp.route('/api/admin/student-attendance', methods=['POST'])
+@login_required
+@admin_required
+def admin_record_student_attendance():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    subject_id = data.get('subject_id')
+    date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
+    records = data.get('records', [])
+
+    for rec in records:
+        try:
+            cursor.execute('''
+                INSERT INTO student_attendance (student_id, subject_id, date, status, recorded_by)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (rec['student_id'], subject_id, date, rec.get('status', 'present'), current_user.id))
+        except Exception:
+            cursor.execute('''
+                UPDATE student_attendance SET status = ?, recorded_by = ?
+                WHERE student_id = ? AND subject_id = ? AND date = ?
+            ''', (rec.get('status', 'present'), current_user.id, rec['student_id'], subject_id, date))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN PAYMENTS & TUITION ==============
+
+@bp.route('/admin/payments')
+@login_required
+@admin_required
+def admin_payments():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT sp.*, u.full_name, u.student_id as sid, u.section, i.short_name as institution_name
+        FROM student_payments sp
+        JOIN users u ON sp.student_id = u.id
+        LEFT JOIN institutions i ON sp.institution_id = i.id
+        ORDER BY sp.created_at DESC
+        LIMIT 200
+    ''')
+    payments = cursor.fetchall()
+    # Summary stats
+    cursor.execute('SELECT SUM(amount) FROM student_payments')
+    total_billed = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT SUM(amount_paid) FROM student_payments WHERE status IN ('paid','partial')")
+    total_collected = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT SUM(balance) FROM student_payments WHERE status IN ('pending','partial','overdue')")
+    total_outstanding = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COUNT(*) FROM student_payments WHERE status = 'overdue'")
+    overdue_count = cursor.fetchone()[0]
+    # Tuition plans
+    cursor.execute('''
+        SELECT tp.*, i.short_name as institution_name
+        FROM tuition_plans tp
+        LEFT JOIN institutions i ON tp.institution_id = i.id
+        WHERE tp.is_active = 1
+        ORDER BY tp.name
+    ''')
+    tuition_plans = cursor.fetchall()
+    cursor.execute('SELECT id, name, short_name FROM institutions WHERE is_active = 1 ORDER BY name')
+    institutions = cursor.fetchall()
+    cursor.execute('''SELECT id, full_name, student_id, section FROM users WHERE role = 'student' AND status != 'inactive' ORDER BY full_name''')
+    students = cursor.fetchall()
+    conn.close()
+    return render_template('admin_payments.html', payments=payments,
+        total_billed=total_billed, total_collected=total_collected,
+        total_outstanding=total_outstanding, overdue_count=overdue_count,
+        tuition_plans=tuition_plans, institutions=institutions, students=students)
+
+
+@bp.route('/api/admin/payments', methods=['POST'])
+@login_required
+@admin_required
+def admin_create_payment():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    amount = float(data.get('amount', 0))
+    cursor.execute('''
+        INSERT INTO student_payments (student_id, institution_id, payment_type, description,
+                                     amount, balance, due_date, status, created_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?)
+    ''', (data.get('student_id'), data.get('institution_id'), data.get('payment_type', 'tuition'),
+          data.get('description'), amount, amount, data.get('due_date'), current_user.id))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/admin/payments/<int:payment_id>/pay', methods=['POST'])
+@login_required
+@admin_required
+def admin_record_payment(payment_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    amount_paid = float(data.get('amount_paid', 0))
+    cursor.execute('SELECT * FROM student_payments WHERE id = ?', (payment_id,))
+    payment = cursor.fetchone()
+    if not payment:
+        conn.close()
+        return jsonify({'success': False, 'error': 'Payment not found'})
+    new_paid = (payment['amount_paid'] or 0) + amount_paid
+    new_balance = payment['amount'] - new_paid
+    status = 'paid' if new_balance <= 0 else 'partial'
+    cursor.execute('''
+        UPDATE student_payments SET amount_paid = ?, balance = ?, status = ?,
+               payment_method = ?, reference_number = ?, paid_at = ?
+        WHERE id = ?
+    ''', (new_paid, max(0, new_balance), status,
+          data.get('payment_method'), data.get('reference_number'),
+          datetime.now().strftime('%Y-%m-%d %H:%M:%S'), payment_id))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/admin/tuition-plans', methods=['POST'])
+@login_required
+@admin_required
+def admin_create_tuition_plan():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO tuition_plans (institution_id, name, amount, frequency, description)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (data.get('institution_id'), data.get('name'), data.get('amount', 0),
+          data.get('frequency', 'semester'), data.get('description')))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN FILES MANAGEMENT ==============
+
+FILE_ORDER = pagination.Keyset(('f.created_at', 'created_at'), ('f.id', 'id'), descending=True)
+
+
+def like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+@bp.route('/admin/files')
+@login_required
+@admin_required
+def admin_files():
+    conn = get_db()
+    cursor = conn.cursor()
+    search = request.args.get('q', '').strip()
+    where, params = '', []
+    if search:
+        where, params = " AND f.original_name LIKE ? ESCAPE '\\'", [f'%{like_escape(search)}%']
+    files = FILE_ORDER.fetch(cursor, f'''
+        SELECT f.*, u.full_name as uploader_name, s.code as subject_code, s.name as subject_name
+        FROM file_storage f
+        LEFT JOIN users u ON f.uploaded_by = u.id
+        LEFT JOIN subjects s ON f.subject_id = s.id
+        WHERE 1=1{where} AND {{keyset}}
+    ''', params, request.args)
+    # Storage summary
+    cursor.execute('SELECT SUM(file_size) FROM file_storage')
+    total_size = cursor.fetchone()[0] or 0
+    cursor.execute('SELECT COUNT(*) FROM file_storage')
+    total_files = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(DISTINCT category) FROM file_storage')
+    total_categories = cursor.fetchone()[0]
+    cursor.execute('SELECT id, code, name, section FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+    conn.close()
+    return render_template('admin_files.html', files=files, total_size=total_size, search=search,
+                          total_files=total_files, total_categories=total_categories, subjects=subjects)
+
+
+@bp.route('/admin/files/download/<int:file_id>')
+@login_required
+def admin_download_file(file_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM file_storage WHERE id = ?', (file_id,))
+    f = cursor.fetchone()
+    if not f:
+        flash('File not found.', 'error')
+        return redirect(url_for('admin.admin_files'))
+    cursor.execute('UPDATE file_storage SET download_count = download_count + 1 WHERE id = ?', (file_id,))
+    conn.commit()
+    conn.close()
+    return send_file(f['file_path'], as_attachment=True, download_name=f['original_name'])
+
+
+# ============== ADMIN SUBSCRIPTIONS ==============
+
+@bp.route('/admin/subscriptions')
+@login_required
+@admin_required
+def admin_subscriptions():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subscription_plans ORDER BY price_monthly')
+    plans = [dict(row) for row in cursor.fetchall()]
+    cursor.execute('''
+        SELECT i.*, sp.name as plan_name, sp.price_monthly,
+               (SELECT COUNT(*) FROM users WHERE institution_id = i.id AND role = 'student') as student_count,
+               (SELECT COUNT(*) FROM users WHERE institution_id = i.id AND role = 'instructor') as instructor_count
+        FROM institutions i
+        LEFT JOIN subscription_plans sp ON i.plan = sp.name
+        WHERE i.is_active = 1
+        ORDER BY i.name
+    ''')
+    institutions = cursor.fetchall()
+    # Revenue
+    cursor.execute('SELECT SUM(price_monthly) FROM subscription_plans sp JOIN institutions i ON i.plan = sp.name WHERE i.is_active = 1')
+    monthly_revenue = cursor.fetchone()[0] or 0
+    conn.close()
+    return render_template('admin_subscriptions.html', plans=plans, institutions=institutions, monthly_revenue=monthly_revenue)
+
+
+@bp.route('/api/admin/subscriptions', methods=['POST'])
+@login_required
+@admin_required
+def admin_create_plan():
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO subscription_plans (name, price_monthly, price_yearly, max_students, max_instructors, max_subjects, features)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (data.get('name'), data.get('price_monthly', 0), data.get('price_yearly', 0),
+              data.get('max_students', 100), data.get('max_instructors', 5),
+              data.get('max_subjects', 20), data.get('features', '')))
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True})
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'error': str(e)})
+
+
+@bp.route('/api/admin/subscriptions/<int:plan_id>', methods=['PUT'])
+@login_required
+@admin_required
+def admin_update_plan(plan_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE subscription_plans SET name=?, price_monthly=?, price_yearly=?, max_students=?,
+               max_instructors=?, max_subjects=?, features=?, is_active=?
+        WHERE id=?
+    ''', (data.get('name'), data.get('price_monthly', 0), data.get('price_yearly', 0),
+          data.get('max_students'), data.get('max_instructors'), data.get('max_subjects'),
+          data.get('features'), data.get('is_active', 1), plan_id))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ============== ADMIN TEACHER PROFILES ==============
+
+@bp.route('/admin/teacher-profiles')
+@login_required
+@admin_required
+def admin_teacher_profiles():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT u.*, ip.*, i.name as institution_name, i.short_name as inst_short,
+               d.name as department_name,
+               (SELECT COUNT(*) FROM subjects WHERE instructor_id = u.id) as subject_count,
+               (SELECT COUNT(*) FROM instructor_attendance WHERE instructor_id = u.id AND status = 'present') as total_present,
+               (SELECT SUM(hours_worked) FROM instructor_attendance WHERE instructor_id = u.id) as total_hours,
+               (SELECT SUM(net_pay) FROM instructor_payroll WHERE instructor_id = u.id AND status = 'paid') as total_earned
+        FROM users u
+        LEFT JOIN instructor_profiles ip ON u.id = ip.user_id
+        LEFT JOIN institutions i ON ip.institution_id = i.id
+        LEFT JOIN departments d ON ip.department_id = d.id
+        WHERE u.role = 'instructor'
+        ORDER BY u.full_name
+    ''')
+    teachers = [dict(row) for row in cursor.fetchall()]
+    cursor.execute('SELECT id, name, short_name FROM institutions WHERE is_active = 1 ORDER BY name')
+    institutions = cursor.fetchall()
+    cursor.execute('SELECT id, name, institution_id FROM departments ORDER BY name')
+    departments = cursor.fetchall()
+    conn.close()
+    return render_template('admin_teacher_profiles.html', teachers=teachers,
+                          institutions=institutions, departments=departments)
+
+
+@bp.route('/api/admin/teacher-profile/<int:user_id>', methods=['POST'])
+@login_required
+@admin_required
+def admin_update_teacher_profile(user_id):
+    data = request.get_json()
+    conn = get_db()
+    cursor = conn.cursor()
+    # Update user basic info
+    cursor.execute('''
+        UPDATE users SET full_name=?, email=?, contact_number=?, institution_id=?
+        WHERE id=? AND role='instructor'
+    ''', (data.get('full_name'), data.get('email'), data.get('contact_number'),
+          data.get('institution_id'), user_id))
+    # Upsert profile
+    cursor.execute('SELECT id FROM instructor_profiles WHERE user_id = ?', (user_id,))
+    if cursor.fetchone():
+        cursor.execute('''
+            UPDATE instructor_profiles SET institution_id=?, department_id=?, employee_id=?,
+                   hire_date=?, contract_type=?, salary_rate=?, salary_frequency=?,
+                   tax_id=?, bank_account=?, emergency_contact=?, emergency_phone=?
+            WHERE user_id=?
+        ''', (data.get('institution_id'), data.get('department_id'), data.get('employee_id'),
+              data.get('hire_date'), data.get('contract_type', 'full-time'),
+              data.get('salary_rate', 0), data.get('salary_frequency', 'monthly'),
+              data.get('tax_id'), data.get('bank_account'),
+              data.get('emergency_contact'), data.get('emergency_phone'), user_id))
+    else:
+        cursor.execute('''
+            INSERT INTO instructor_profiles (user_id, institution_id, department_id, employee_id,
+                   hire_date, contract_type, salary_rate, salary_frequency, tax_id, bank_account,
+                   emergency_contact, emergency_phone)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, data.get('institution_id'), data.get('department_id'), data.get('employee_id'),
+              data.get('hire_date'), data.get('contract_type', 'full-time'),
+              data.get('salary_rate', 0), data.get('salary_frequency', 'monthly'),
+              data.get('tax_id'), data.get('bank_account'),
+              data.get('emergency_contact'), data.get('emergency_phone')))
+    conn.commit()
+    invalidate_user_cache([user_id])
+    conn.close()
+    return jsonify({'success': True})
@@ -0,0 +1,546 @@
+"""Login, registration, the public registration API and profile pages."""
+import base64
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask_login import login_user, logout_user, login_required, current_user
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from database import get_db
+import image_pipeline
+import stats_counters
+import tenancy
+
+from lms.common import User, invalidate_user_cache
+
+bp = Blueprint('auth', __name__)
+
+
+def queue_profile_images(user_id, queued):
+    """Hand validated (column, bytes, ext) uploads to the background image pipeline;
+    call after committing, the pipeline updates the users row when each one is done."""
+    prefixes = {'pup_id_photo': 'pupid', 'cor_photo': 'cor'}
+    for column, raw_image, ext in queued:
+        if column == 'photo':
+            image_pipeline.submit_photo(user_id, raw_image, ext)
+        else:
+            image_pipeline.submit_document(user_id, column, prefixes[column], raw_image, ext)
+
+
+# ==================== AUTH ROUTES ====================
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        if current_user.role == 'admin':
+            return redirect(url_for('admin.admin_dashboard'))
+        elif current_user.role == 'institution':
+            return redirect(url_for('institution.inst_dashboard'))
+        elif current_user.role == 'instructor':
+            return redirect(url_for('instructor.dashboard'))
+        return redirect(url_for('student.student_dashboard'))
+    return render_template('landing.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
+        user = cursor.fetchone()
+        conn.close()
+
+        if user and check_password_hash(user['password_hash'], password):
+            keys = user.keys()
+            is_approved = user['is_approved'] if 'is_approved' in keys else 1
+
+            # Check if student is approved (instructors are always approved)
+            if user['role'] == 'student' and not is_approved:
+                flash('Your enrollment is pending approval. Please wait for instructor approval.', 'warning')
+                return render_template('login.html')
+
+            user_obj = User.from_row(user)
+            invalidate_user_cache([user_obj.id])
+            login_user(user_obj)
+            flash('Logged in successfully!', 'success')
+            if user['role'] == 'admin':
+                return redirect(url_for('admin.admin_dashboard'))
+            elif user['role'] == 'institution':
+                return redirect(url_for('institution.inst_dashboard'))
+            elif user['role'] == 'instructor':
+                return redirect(url_for('instructor.dashboard'))
+            return redirect(url_for('student.student_dashboard'))
+        flash('Invalid username or password', 'error')
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('student.student_dashboard'))
+
+    if request.method == 'POST':
+        role = request.form.get('role', 'student').strip()
+        email = request.form.get('email', '').strip().lower()
+        password = request.form.get('password', '')
+        confirm_password = request.form.get('confirm_password', '')
+        full_name = request.form.get('full_name', '').strip()
+        institution_id = request.form.get('institution_id', type=int)
+
+        # Student-specific
+        student_id_val = request.form.get('student_id', '').strip()
+        program_id = request.form.get('program_id', type=int)
+        year_level = request.form.get('year_level', '').strip()
+        section_id = request.form.get('section_id', type=int)
+
+        # Teacher-specific
+        department_id = request.form.get('department_id', type=int)
+
+        # Validation
+        errors = []
+        if role not in ('student', 'instructor'):
+            errors.append('Invalid role selected.')
+        if not email or '@' not in email or '.' not in email:
+            errors.append('Please enter a valid email address.')
+        if not password or len(password) < 6:
+            errors.append('Password must be at least 6 characters.')
+        if password != confirm_password:
+            errors.append('Passwords do not match.')
+        if not full_name:
+            errors.append('Full name is required.')
+        if not institution_id:
+            errors.append('Please select an institution.')
+        if role == 'student':
+            if not student_id_val:
+                errors.append('Student ID is required.')
+            if not section_id:
+                errors.append('Please select your section.')
+
+        if errors:
+            for error in errors:
+                flash(error, 'error')
+            return render_template('register.html')
+
+        # Nobody is signed in yet: open the chosen institution's shard (see tenancy.py)
+        with tenancy.use_institution(institution_id):
+            conn = get_db()
+        cursor = conn.cursor()
+
+        # Check if email already exists
+        cursor.execute('SELECT id FROM users WHERE username = ?', (email,))
+        if cursor.fetchone():
+            flash('Email address already registered. Please use another or log in.', 'error')
+            conn.close()
+            return render_template('register.html')
+
+        if role == 'student':
+            cursor.execute('SELECT id FROM users WHERE student_id = ?', (student_id_val,))
+            if cursor.fetchone():
+                flash('Student ID already registered. Please contact your instructor.', 'error')
+                conn.close()
+                return render_template('register.html')
+
+        # Look up section label for backward compat
+        section_text = ''
+        if section_id:
+            cursor.execute('SELECT label FROM sections WHERE id = ?', (section_id,))
+            sec_row = cursor.fetchone()
+            if sec_row:
+                section_text = sec_row['label']
+
+        try:
+            cursor.execute('''
+                INSERT INTO users (username, password_hash, full_name, role, student_id,
+                    section, section_id, program_id, institution_id, department_id,
+                    year_level, email, profile_completed, is_approved)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)
+            ''', (email, generate_password_hash(password), full_name, role,
+                  student_id_val if role == 'student' else None,
+                  section_text, section_id, program_id, institution_id,
+                  department_id, year_level, email))
+            stats_counters.mark_stale()
+            conn.commit()
+            if role == 'student':
+                flash('Registration successful! Please wait for approval before logging in.', 'success')
+            else:
+                flash('Teacher registration submitted! Please wait for institution approval.', 'success')
+            conn.close()
+            return redirect(url_for('auth.login'))
+        except Exception as e:
+            flash('Registration failed. Please try again.', 'error')
+            conn.close()
+            return render_template('register.html')
+
+    return render_template('register.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('Logged out successfully!', 'success')
+    return redirect(url_for('auth.login'))
+
+
+# ==================== PUBLIC API (registration dropdowns) ====================
+
+@bp.route('/api/public/institutions')
+def api_public_institutions():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, name, short_name, logo FROM institutions WHERE is_active = 1 ORDER BY name')
+    institutions = [dict(r) for r in cursor.fetchall()]
+    conn.close()
+    return jsonify(institutions)
+
+@bp.route('/api/public/institutions/<int:inst_id>/programs')
+def api_public_programs(inst_id):
+    with tenancy.use_institution(inst_id):
+        conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, code, name, short_name, year_count FROM programs WHERE institution_id = ? AND is_active = 1 ORDER BY code', (inst_id,))
+    programs = [dict(r) for r in cursor.fetchall()]
+    conn.close()
+    return jsonify(programs)
+
+@bp.route('/api/public/programs/<int:program_id>/sections')
+def api_public_sections(program_id):
+    year_level = request.args.get('year_level', type=int)
+    with tenancy.use_institution(request.args.get('institution_id', type=int)):
+        conn = get_db()
+    cursor = conn.cursor()
+    if year_level:
+        cursor.execute('SELECT id, year_level, section_number, label FROM sections WHERE program_id = ? AND year_level = ? AND is_active = 1 ORDER BY section_number', (program_id, year_level))
+    else:
+        cursor.execute('SELECT id, year_level, section_number, label FROM sections WHERE program_id = ? AND is_active = 1 ORDER BY year_level, section_number', (program_id,))
+    sections = [dict(r) for r in cursor.fetchall()]
+    conn.close()
+    return jsonify(sections)
+
+@bp.route('/api/public/institutions/<int:inst_id>/departments')
+def api_public_departments(inst_id):
+    with tenancy.use_institution(inst_id):
+        conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, name, code FROM departments WHERE institution_id = ? ORDER BY name', (inst_id,))
+    departments = [dict(r) for r in cursor.fetchall()]
+    conn.close()
+    return jsonify(departments)
+
+
+# ==================== PROFILE ====================
+
+@bp.route('/complete-profile', methods=['GET', 'POST'])
+@login_required
+def complete_profile():
+    if current_user.profile_completed:
+        if current_user.role == 'instructor':
+            return redirect(url_for('instructor.dashboard'))
+        return redirect(url_for('student.student_dashboard'))
+
+    if request.method == 'POST':
+        photo_data = request.form.get('photo_data', '')
+        student_id = request.form.get('student_id', '')
+        email = request.form.get('email', '')
+        contact_number = request.form.get('contact_number', '')
+        github_account = request.form.get('github_account', '')
+        railway_account = request.form.get('railway_account', '')
+        messenger = request.form.get('messenger', '')
+
+        # KYS (Know Your Student) fields
+        prog_langs = request.form.getlist('programming_languages')
+        prog_langs_other = request.form.get('programming_languages_other', '')
+        if prog_langs_other:
+            prog_langs.extend([x.strip() for x in prog_langs_other.split(',') if x.strip()])
+        programming_languages = ', '.join(prog_langs)
+
+        dbs = request.form.getlist('databases_known')
+        dbs_other = request.form.get('databases_known_other', '')
+        if dbs_other:
+            dbs.extend([x.strip() for x in dbs_other.split(',') if x.strip()])
+        databases_known = ', '.join(dbs)
+
+        hosts = request.form.getlist('hosting_platforms')
+        hosts_other = request.form.get('hosting_platforms_other', '')
+        if hosts_other:
+            hosts.extend([x.strip() for x in hosts_other.split(',') if x.strip()])
+        hosting_platforms = ', '.join(hosts)
+
+        tools = request.form.getlist('other_tools')
+        tools_other = request.form.get('other_tools_other', '')
+        if tools_other:
+            tools.extend([x.strip() for x in tools_other.split(',') if x.strip()])
+        other_tools = ', '.join(tools)
+
+        conn = get_db()
+        cursor = conn.cursor()
+
+        photo_filename = 'default.png'
+        pup_id_filename = None
+        cor_filename = None
+        queued_images = []  # resized in the background once the row below is committed
+
+        # Handle base64 camera capture for selfie
+        if photo_data and photo_data.startswith('data:image'):
+            try:
+                header, encoded = photo_data.split(',', 1)
+                raw_image = base64.b64decode(encoded)
+                ext = image_pipeline.read_upload(raw_image)
+                if not ext:
+                    raise ValueError('not an image')
+                photo_filename = current_user.photo or 'default.png'  # until the new one is processed
+                queued_images.append(('photo', raw_image, ext))
+            except Exception as e:
+                flash('Error saving photo. Please try again.', 'error')
+                return render_template('complete_profile.html')
+
+        # Handle PUP ID upload
+        if 'pup_id' in request.files:
+            file = request.files['pup_id']
+            if file and file.filename:
+                ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
+                if ext in ['png', 'jpg', 'jpeg', 'gif', 'pdf']:
+                    if ext == 'pdf':
+                        pup_id_filename = f"pupid_{current_user.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+                        file.save(os.path.join(current_app.config['DOCUMENT_FOLDER'], pup_id_filename))
+                    else:
+                        raw_image = file.read()
+                        image_ext = image_pipeline.read_upload(raw_image)
+                        if not image_ext:
+                            conn.close()
+                            flash('Could not read the PUP ID image. Please upload a PNG, JPG, GIF or PDF file.', 'error')
+                            return render_template('complete_profile.html')
+                        queued_images.append(('pup_id_photo', raw_image, image_ext))
+
+        # Handle COR upload
+        if 'cor' in request.files:
+            file = request.files['cor']
+            if file and file.filename:
+                ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
+                if ext in ['png', 'jpg', 'jpeg', 'gif', 'pdf']:
+                    if ext == 'pdf':
+                        cor_filename = f"cor_{current_user.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+                        file.save(os.path.join(current_app.config['DOCUMENT_FOLDER'], cor_filename))
+                    else:
+                        raw_image = file.read()
+                        image_ext = image_pipeline.read_upload(raw_image)
+                        if not image_ext:
+                            conn.close()
+                            flash('Could not read the COR image. Please upload a PNG, JPG, GIF or PDF file.', 'error')
+                            return render_template('complete_profile.html')
+                        queued_images.append(('cor_photo', raw_image, image_ext))
+
+        # Update user profile with all fields including KYS
+        cursor.execute('''
+            UPDATE users SET
+                photo = ?,
+                student_id = ?,
+                email = ?,
+                contact_number = ?,
+                github_account = ?,
+                railway_account = ?,
+                messenger = ?,
+                pup_id_photo = ?,
+                cor_photo = ?,
+                programming_languages = ?,
+                databases_known = ?,
+                hosting_platforms = ?,
+                other_tools = ?,
+                profile_completed = 1
+            WHERE id = ?
+        ''', (photo_filename, student_id, email, contact_number, github_account,
+              railway_account, messenger, pup_id_filename, cor_filename,
+              programming_languages, databases_known, hosting_platforms, other_tools, current_user.id))
+        conn.commit()
+        invalidate_user_cache([current_user.id])
+        conn.close()
+        queue_profile_images(current_user.id, queued_images)
+
+        flash('Profile completed successfully!', 'success')
+        if current_user.role == 'instructor':
+            return redirect(url_for('instructor.dashboard'))
+        return redirect(url_for('student.student_dashboard'))
+
+    return render_template('complete_profile.html')
+
+@bp.route('/profile', methods=['GET', 'POST'])
+@login_required
+def profile():
+    if request.method == 'POST':
+        photo_data = request.form.get('photo_data', '')
+
+        conn = get_db()
+        cursor = conn.cursor()
+
+        queued_images = []  # users.photo is updated when the background resize finishes
+
+        # Handle base64 camera capture
+        if photo_data and photo_data.startswith('data:image'):
+            try:
+                header, encoded = photo_data.split(',', 1)
+                raw_image = base64.b64decode(encoded)
+                ext = image_pipeline.read_upload(raw_image)
+                if not ext:
+                    raise ValueError('not an image')
+                queued_images.append(('photo', raw_image, ext))
+            except Exception as e:
+                flash('Error saving photo.', 'error')
+
+        # Handle file upload
+        elif 'photo' in request.files:
+            file = request.files['photo']
+            if file and file.filename:
+                ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
+                if ext in ['png', 'jpg', 'jpeg', 'gif']:
+                    raw_image = file.read()
+                    image_ext = image_pipeline.read_upload(raw_image)
+                    if image_ext:
+                        queued_images.append(('photo', raw_image, image_ext))
+                    else:
+                        flash('Error saving photo.', 'error')
+
+        conn.commit()
+        invalidate_user_cache([current_user.id])
+        conn.close()
+        queue_profile_images(current_user.id, queued_images)
+        flash('Profile updated successfully!', 'success')
+        return redirect(url_for('auth.profile'))
+
+    return render_template('profile.html')
+
+@bp.route('/update-profile', methods=['POST'])
+@login_required
+def update_profile():
+    if current_user.role != 'student':
+        flash('Only students can update their profile.', 'error')
+        return redirect(url_for('auth.profile'))
+
+    student_id = request.form.get('student_id', '')
+    email = request.form.get('email', '')
+    contact_number = request.form.get('contact_number', '')
+    github_account = request.form.get('github_account', '')
+    railway_account = request.form.get('railway_account', '')
+    messenger = request.form.get('messenger', '')
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Start building the update query
+    update_fields = []
+    params = []
+    queued_images = []  # ID/COR images are resized in the background after the commit
+
+    if student_id:
+        update_fields.append('student_id = ?')
+        params.append(student_id)
+    if email:
+        update_fields.append('email = ?')
+        params.append(email)
+    if contact_number:
+        update_fields.append('contact_number = ?')
+        params.append(contact_number)
+    if github_account:
+        update_fields.append('github_account = ?')
+        params.append(github_account)
+    if railway_account:
+        update_fields.append('railway_account = ?')
+        params.append(railway_account)
+
+    # Messenger can be empty (optional)
+    update_fields.append('messenger = ?')
+    params.append(messenger if messenger else None)
+
+    # Handle PUP ID upload
+    if 'pup_id' in request.files:
+        file = request.files['pup_id']
+        if file and file.filename:
+            ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
+            if ext in ['png', 'jpg', 'jpeg', 'gif', 'pdf']:
+                if ext == 'pdf':
+                    pup_id_filename = f"pupid_{current_user.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+                    file.save(os.path.join(current_app.config['DOCUMENT_FOLDER'], pup_id_filename))
+                    update_fields.append('pup_id_photo = ?')
+                    params.append(pup_id_filename)
+                else:
+                    raw_image = file.read()
+                    image_ext = image_pipeline.read_upload(raw_image)
+                    if not image_ext:
+                        conn.close()
+                        flash('Could not read the PUP ID image. Please upload a PNG, JPG, GIF or PDF file.', 'error')
+                        return redirect(url_for('auth.profile'))
+                    queued_images.append(('pup_id_photo', raw_image, image_ext))
+
+    # Handle COR upload
+    if 'cor' in request.files:
+        file = request.files['cor']
+        if file and file.filename:
+            ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'png'
+            if ext in ['png', 'jpg', 'jpeg', 'gif', 'pdf']:
+                if ext == 'pdf':
+                    cor_filename = f"cor_{current_user.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
+                    file.save(os.path.join(current_app.config['DOCUMENT_FOLDER'], cor_filename))
+                    update_fields.append('cor_photo = ?')
+                    params.append(cor_filename)
+                else:
+                    raw_image = file.read()
+                    image_ext = image_pipeline.read_upload(raw_image)
+                    if not image_ext:
+                        conn.close()
+                        flash('Could not read the COR image. Please upload a PNG, JPG, GIF or PDF file.', 'error')
+                        return redirect(url_for('auth.profile'))
+                    queued_images.append(('cor_photo', raw_image, image_ext))
+
+    if update_fields:
+        params.append(current_user.id)
+        query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
+        cursor.execute(query, params)
+        conn.commit()
+        invalidate_user_cache([current_user.id])
+
+    conn.close()
+    queue_profile_images(current_user.id, queued_images)
+    flash('Profile updated successfully!', 'success')
+    return redirect(url_for('auth.profile'))
+
+@bp.route('/change-password', methods=['POST'])
+@login_required
+def change_password():
+    current_password = request.form.get('current_password', '')
+    new_password = request.form.get('new_password', '')
+    confirm_password = request.form.get('confirm_password', '')
+
+    if not current_password or not new_password or not confirm_password:
+        flash('All fields are required.', 'error')
+        return redirect(url_for('auth.profile'))
+
+    if new_password != confirm_password:
+        flash('New passwords do not match.', 'error')
+        return redirect(url_for('auth.profile'))
+
+    if len(new_password) < 6:
+        flash('Password must be at least 6 characters.', 'error')
+        return redirect(url_for('auth.profile'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Verify current password
+    cursor.execute('SELECT password_hash FROM users WHERE id = ?', (current_user.id,))
+    user = cursor.fetchone()
+
+    if not user or not check_password_hash(user['password_hash'], current_password):
+        flash('Current password is incorrect.', 'error')
+        conn.close()
+        return redirect(url_for('auth.profile'))
+
+    # Update password
+    new_hash = generate_password_hash(new_password)
+    cursor.execute('UPDATE users SET password_hash = ? WHERE id = ?', (new_hash, current_user.id))
+    conn.commit()
+    invalidate_user_cache([current_user.id])
+    conn.close()
+
+    flash('Password changed successfully!', 'success')
+    return redirect(url_for('auth.profile'))
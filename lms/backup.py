@@ -0,0 +1,458 @@
+"""Database backup and restore pages, e-mailed backups and the backup scheduler."""
+import os
+import shutil
+import glob as glob_module
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+
+from database import get_db, DATABASE
+import pg_backend
+
+from lms.common import compact_game_scores
+
+bp = Blueprint('backup', __name__)
+
+
+# ============== DATABASE BACKUP & RESTORE ==============
+
+BACKUP_FOLDER = 'backups'
+
+AUTO_BACKUP_INTERVAL = 24  # hours
+REMINDER_BEFORE_HOURS = 5  # remind 5 hours before auto-backup deadline
+
+# Email backup config
+BACKUP_EMAIL_TO = 'sangrenesflorante@gmail.com'
+BACKUP_EMAIL_FROM = os.environ.get('SMTP_EMAIL', '')
+BACKUP_EMAIL_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+SMTP_SERVER = 'smtp.gmail.com'
+SMTP_PORT = 587
+
+
+def email_backup(filepath):
+    """Email the database backup file to the configured address."""
+    if not BACKUP_EMAIL_FROM or not BACKUP_EMAIL_PASSWORD:
+        print('[Email-Backup] SMTP_EMAIL or SMTP_PASSWORD not configured. Skipping email.')
+        return False
+
+    # Imported here: only this function sends mail, and workers should not pay for it at boot
+    import smtplib
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    try:
+        import sqlite3 as _sqlite3
+        conn = _sqlite3.connect(DATABASE)
+        conn.row_factory = _sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'student'")
+        student_count = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM subjects')
+        subject_count = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM submissions')
+        submission_count = cursor.fetchone()[0]
+        conn.close()
+
+        db_size = round(os.path.getsize(filepath) / (1024 * 1024), 2)
+        timestamp = datetime.now().strftime('%B %d, %Y at %I:%M %p')
+        filename = os.path.basename(filepath)
+
+        msg = MIMEMultipart()
+        msg['From'] = BACKUP_EMAIL_FROM
+        msg['To'] = BACKUP_EMAIL_TO
+        msg['Subject'] = f'LMS Database Backup - {datetime.now().strftime("%b %d, %Y %I:%M %p")}'
+
+        body = f"""eMathrix LMS - Automatic Database Backup
+
+Backup File: {filename}
+Database Size: {db_size} MB
+Timestamp: {timestamp}
+
+Records Summary:
+- Students: {student_count}
+- Subjects: {subject_count}
+- Submissions: {submission_count}
+
+This backup was sent automatically by the LMS backup system.
+To restore, upload this .db file via the Backup & Restore page.
+"""
+        msg.attach(MIMEText(body, 'plain'))
+
+        with open(filepath, 'rb') as f:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(f.read())
+            encoders.encode_base64(part)
+            part.add_header('Content-Disposition', f'attachment; filename="{filename}"')
+            msg.attach(part)
+
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+        server.starttls()
+        server.login(BACKUP_EMAIL_FROM, BACKUP_EMAIL_PASSWORD)
+        server.send_message(msg)
+        server.quit()
+
+        print(f'[Email-Backup] Sent backup to {BACKUP_EMAIL_TO}: {filename}')
+        return True
+    except Exception as e:
+        print(f'[Email-Backup] Failed to send: {e}')
+        return False
+
+
+def get_last_backup_time():
+    """Get the timestamp of the most recent backup file."""
+    backups = glob_module.glob(os.path.join(BACKUP_FOLDER, '*.db'))
+    if not backups:
+        return None
+    latest = max(backups, key=os.path.getmtime)
+    return datetime.fromtimestamp(os.path.getmtime(latest))
+
+
+def get_hours_since_last_backup():
+    """Get hours elapsed since the last backup."""
+    last = get_last_backup_time()
+    if last is None:
+        return float('inf')
+    delta = datetime.now() - last
+    return delta.total_seconds() / 3600
+
+
+def create_auto_backup():
+    """Create an automatic backup of the database and email it."""
+    import sqlite3 as _sqlite3
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    backup_name = f'auto_{timestamp}.db'
+    backup_path = os.path.join(BACKUP_FOLDER, backup_name)
+    try:
+        source = _sqlite3.connect(DATABASE)
+        dest = _sqlite3.connect(backup_path)
+        source.backup(dest)
+        dest.close()
+        source.close()
+        print(f'[Auto-Backup] Created: {backup_name}')
+        # Email the backup
+        email_backup(backup_path)
+        return True
+    except Exception as e:
+        print(f'[Auto-Backup] Failed: {e}')
+        return False
+
+
+def send_backup_reminder():
+    """Send a notification to all instructors reminding them to back up."""
+    import sqlite3 as _sqlite3
+    try:
+        conn = _sqlite3.connect(DATABASE)
+        conn.row_factory = _sqlite3.Row
+        cursor = conn.cursor()
+
+        # Check if we already sent a reminder in the last 20 hours (avoid spam)
+        cursor.execute('''
+            SELECT COUNT(*) FROM notifications
+            WHERE message LIKE '%backup reminder%'
+            AND created_at > datetime('now', '-20 hours')
+        ''')
+        if cursor.fetchone()[0] > 0:
+            conn.close()
+            return
+
+        cursor.execute("SELECT id FROM users WHERE role = 'instructor'")
+        instructors = cursor.fetchall()
+        for inst in instructors:
+            cursor.execute('''
+                INSERT INTO notifications (user_id, type, icon, message, link)
+                VALUES (?, 'warning', 'exclamation-triangle',
+                        'Backup reminder: No database backup in the last 19 hours. Please create a backup soon or one will be created automatically.',
+                        '/admin/backup')
+            ''', (inst['id'],))
+        conn.commit()
+        conn.close()
+        print('[Auto-Backup] Reminder notifications sent to instructors.')
+    except Exception as e:
+        print(f'[Auto-Backup] Reminder failed: {e}')
+
+
+def backup_scheduler():
+    """Background thread that checks backup status every 30 minutes."""
+    import time
+    # Wait 60 seconds on startup before first check
+    time.sleep(60)
+    last_compaction = None
+    while True:
+        # Daily maintenance: compact raw game scores into the rollup window
+        if last_compaction != datetime.now().date():
+            try:
+                compact_game_scores()
+                last_compaction = datetime.now().date()
+            except Exception as e:
+                print(f'[Game-Scores] Compaction failed: {e}')
+
+        if pg_backend.ENABLED:
+            time.sleep(1800)
+            continue
+        try:
+            hours = get_hours_since_last_backup()
+            reminder_threshold = AUTO_BACKUP_INTERVAL - REMINDER_BEFORE_HOURS  # 19 hours
+
+            if hours >= AUTO_BACKUP_INTERVAL:
+                # 24+ hours with no backup -> auto-backup
+                create_auto_backup()
+            elif hours >= reminder_threshold:
+                # 19+ hours with no backup -> send reminder
+                send_backup_reminder()
+        except Exception as e:
+            print(f'[Auto-Backup] Scheduler error: {e}')
+
+        time.sleep(1800)  # Check every 30 minutes
+
+
+@bp.before_request
+def sqlite_file_only():
+    """Backups here are copies of the SQLite file; a PostgreSQL database is backed up with pg_dump."""
+    if pg_backend.ENABLED and request.endpoint != 'backup.backup_page':
+        flash('This deployment stores its data in PostgreSQL; back it up with pg_dump.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+
+@bp.route('/admin/backup')
+@login_required
+def backup_page():
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    # List existing backups
+    backup_files = []
+    for f in sorted(glob_module.glob(os.path.join(BACKUP_FOLDER, '*.db')), key=os.path.getmtime, reverse=True):
+        stat = os.stat(f)
+        backup_files.append({
+            'filename': os.path.basename(f),
+            'size': round(stat.st_size / (1024 * 1024), 2),  # MB
+            'created': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %I:%M %p')
+        })
+
+    # Current DB size
+    db_size = round(os.path.getsize(DATABASE) / (1024 * 1024), 2) if os.path.exists(DATABASE) else 0
+
+    # Count records
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'student'")
+    student_count = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM subjects')
+    subject_count = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM submissions')
+    submission_count = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM quiz_attempts')
+    quiz_attempt_count = cursor.fetchone()[0]
+    conn.close()
+
+    # Auto-backup timing info
+    last_backup = get_last_backup_time()
+    hours_since_raw = get_hours_since_last_backup()
+    hours_since = round(hours_since_raw, 1) if hours_since_raw != float('inf') else 0
+    if last_backup:
+        from datetime import timedelta
+        next_auto = last_backup + timedelta(hours=AUTO_BACKUP_INTERVAL)
+        hours_remaining = max(0, round(AUTO_BACKUP_INTERVAL - hours_since_raw, 1))
+    else:
+        next_auto = None
+        hours_remaining = 0
+
+    email_configured = bool(BACKUP_EMAIL_FROM and BACKUP_EMAIL_PASSWORD)
+
+    return render_template('backup.html',
+        backups=backup_files,
+        db_size=db_size,
+        student_count=student_count,
+        subject_count=subject_count,
+        submission_count=submission_count,
+        quiz_attempt_count=quiz_attempt_count,
+        last_backup=last_backup,
+        hours_since=hours_since,
+        hours_remaining=round(hours_remaining, 1),
+        next_auto=next_auto,
+        auto_interval=AUTO_BACKUP_INTERVAL,
+        reminder_hours=REMINDER_BEFORE_HOURS,
+        email_configured=email_configured,
+        backup_email=BACKUP_EMAIL_TO
+    )
+
+
+@bp.route('/admin/backup/create', methods=['POST'])
+@login_required
+def create_backup():
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    backup_name = f'backup_{timestamp}.db'
+    backup_path = os.path.join(BACKUP_FOLDER, backup_name)
+
+    try:
+        # Use SQLite backup API for safe copy
+        import sqlite3
+        source = sqlite3.connect(DATABASE)
+        dest = sqlite3.connect(backup_path)
+        source.backup(dest)
+        dest.close()
+        source.close()
+        flash(f'Backup created successfully: {backup_name}', 'success')
+    except Exception as e:
+        flash(f'Backup failed: {str(e)}', 'error')
+
+    return redirect(url_for('backup.backup_page'))
+
+
+@bp.route('/admin/backup/email-now', methods=['POST'])
+@login_required
+def email_backup_now():
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    if not BACKUP_EMAIL_FROM or not BACKUP_EMAIL_PASSWORD:
+        flash('Email not configured. Set SMTP_EMAIL and SMTP_PASSWORD environment variables.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    if not os.path.exists(DATABASE):
+        flash('Database not found.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    success = email_backup(DATABASE)
+    if success:
+        flash(f'Database backup emailed to {BACKUP_EMAIL_TO} successfully!', 'success')
+    else:
+        flash('Failed to send email. Check SMTP settings.', 'error')
+
+    return redirect(url_for('backup.backup_page'))
+
+
+@bp.route('/admin/backup/download/<filename>')
+@login_required
+def download_backup(filename):
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    safe_name = secure_filename(filename)
+    backup_path = os.path.join(BACKUP_FOLDER, safe_name)
+
+    if not os.path.exists(backup_path):
+        flash('Backup file not found.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    return send_file(backup_path, as_attachment=True, download_name=safe_name)
+
+
+@bp.route('/admin/backup/download-current')
+@login_required
+def download_current_db():
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    if not os.path.exists(DATABASE):
+        flash('Database file not found.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return send_file(DATABASE, as_attachment=True, download_name=f'classroom_lms_{timestamp}.db')
+
+
+@bp.route('/admin/backup/restore/<filename>', methods=['POST'])
+@login_required
+def restore_backup(filename):
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    safe_name = secure_filename(filename)
+    backup_path = os.path.join(BACKUP_FOLDER, safe_name)
+
+    if not os.path.exists(backup_path):
+        flash('Backup file not found.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    try:
+        # Auto-backup current DB before restoring
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        auto_backup = os.path.join(BACKUP_FOLDER, f'pre_restore_{timestamp}.db')
+        import sqlite3
+        source = sqlite3.connect(DATABASE)
+        dest = sqlite3.connect(auto_backup)
+        source.backup(dest)
+        dest.close()
+        source.close()
+
+        # Restore: copy backup over current DB
+        shutil.copy2(backup_path, DATABASE)
+        flash(f'Database restored from {safe_name}. A pre-restore backup was saved automatically.', 'success')
+    except Exception as e:
+        flash(f'Restore failed: {str(e)}', 'error')
+
+    return redirect(url_for('backup.backup_page'))
+
+
+@bp.route('/admin/backup/upload', methods=['POST'])
+@login_required
+def upload_backup():
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    if 'backup_file' not in request.files:
+        flash('No file selected.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    file = request.files['backup_file']
+    if file.filename == '':
+        flash('No file selected.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    if not file.filename.endswith('.db'):
+        flash('Invalid file type. Only .db files are accepted.', 'error')
+        return redirect(url_for('backup.backup_page'))
+
+    try:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        safe_name = f'uploaded_{timestamp}.db'
+        upload_path = os.path.join(BACKUP_FOLDER, safe_name)
+        file.save(upload_path)
+
+        # Validate it's a real SQLite database
+        import sqlite3
+        test_conn = sqlite3.connect(upload_path)
+        test_conn.execute('SELECT count(*) FROM sqlite_master')
+        test_conn.close()
+
+        flash(f'Backup file uploaded: {safe_name}', 'success')
+    except Exception as e:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+        flash(f'Invalid database file: {str(e)}', 'error')
+
+    return redirect(url_for('backup.backup_page'))
+
+
+@bp.route('/admin/backup/delete/<filename>', methods=['POST'])
+@login_required
+def delete_backup(filename):
+    if current_user.role != 'instructor':
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    safe_name = secure_filename(filename)
+    backup_path = os.path.join(BACKUP_FOLDER, safe_name)
+
+    if os.path.exists(backup_path):
+        os.remove(backup_path)
+        flash(f'Backup deleted: {safe_name}', 'success')
+    else:
+        flash('Backup file not found.', 'error')
+
+    return redirect(url_for('backup.backup_page'))
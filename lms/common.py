@@ -0,0 +1,490 @@
+"""Helpers shared by the blueprints: the User model and loader, role decorators,
+session progress, grade computation and the quiz journey cache."""
+import threading
+import time
+from functools import wraps
+from collections import OrderedDict
+
+from flask import redirect, url_for, flash
+from flask_login import LoginManager, current_user
+
+from database import get_db
+import leaderboard
+import search_index
+import tenancy
+
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+
+# ==================== SESSION PROGRESS HELPERS ====================
+
+def get_session_progress(cursor, session_id, student_id):
+    """Get 5-step progress for a student in a session. Auto-completes steps that don't apply."""
+    cursor.execute('SELECT * FROM session_progress WHERE session_id = ? AND student_id = ?',
+                   (session_id, student_id))
+    row = cursor.fetchone()
+    progress = {
+        'step_video': row['step_video'] if row else 0,
+        'step_slides': row['step_slides'] if row else 0,
+        'step_reading': row['step_reading'] if row else 0,
+        'step_activity': row['step_activity'] if row else 0,
+        'step_quiz': row['step_quiz'] if row else 0,
+        'completed_at': row['completed_at'] if row else None,
+    }
+    # Auto-complete steps that don't apply for this session
+    cursor.execute('SELECT youtube_url, reading_materials FROM sessions WHERE id = ?', (session_id,))
+    sess = cursor.fetchone()
+    if sess:
+        if not sess['youtube_url']:
+            progress['step_video'] = 1
+        if not sess['reading_materials']:
+            progress['step_reading'] = 1
+    # Check if activities exist for this session
+    cursor.execute('SELECT COUNT(*) as cnt FROM activities WHERE session_id = ? AND is_visible = 1', (session_id,))
+    act_count = cursor.fetchone()['cnt']
+    if act_count == 0:
+        progress['step_activity'] = 1
+    # Check if quizzes exist for this session
+    cursor.execute('SELECT COUNT(*) as cnt FROM quizzes WHERE session_id = ? AND is_visible = 1', (session_id,))
+    quiz_count = cursor.fetchone()['cnt']
+    if quiz_count == 0:
+        progress['step_quiz'] = 1
+    progress['completed'] = all([
+        progress['step_video'], progress['step_slides'], progress['step_reading'],
+        progress['step_activity'], progress['step_quiz']
+    ])
+    return progress
+
+def check_previous_session_complete(cursor, session_id, student_id):
+    """Check if the previous session (by session_number) is fully completed."""
+    cursor.execute('SELECT session_number, subject_id FROM sessions WHERE id = ?', (session_id,))
+    current = cursor.fetchone()
+    if not current or current['session_number'] <= 1:
+        return True
+    # Find previous visible session in same subject
+    cursor.execute('''
+        SELECT id FROM sessions
+        WHERE subject_id = ? AND session_number = ? AND is_visible = 1
+    ''', (current['subject_id'], current['session_number'] - 1))
+    prev = cursor.fetchone()
+    if not prev:
+        return True  # No previous visible session, allow access
+    cursor.execute('''
+        SELECT completed_at FROM session_progress
+        WHERE session_id = ? AND student_id = ?
+    ''', (prev['id'], student_id))
+    prog = cursor.fetchone()
+    if prog and prog['completed_at']:
+        return True
+    # Also check via get_session_progress in case all steps auto-complete
+    prev_progress = get_session_progress(cursor, prev['id'], student_id)
+    return prev_progress['completed']
+
+def check_and_mark_session_complete(cursor, session_id, student_id):
+    """If all applicable steps are done, mark session as completed."""
+    progress = get_session_progress(cursor, session_id, student_id)
+    if progress['completed'] and not progress['completed_at']:
+        cursor.execute('''
+            INSERT INTO session_progress (session_id, student_id, step_video, step_slides, step_reading, step_activity, step_quiz, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(session_id, student_id) DO UPDATE SET completed_at = CURRENT_TIMESTAMP
+        ''', (session_id, student_id, progress['step_video'], progress['step_slides'],
+              progress['step_reading'], progress['step_activity'], progress['step_quiz']))
+
+_COMPLETE_PROGRESS_UPSERT = '''
+    INSERT INTO session_progress (session_id, student_id, step_video, step_slides, step_reading, step_activity, step_quiz, completed_at)
+    {source}
+    ON CONFLICT(session_id, student_id) DO UPDATE SET
+        step_video = 1, step_slides = 1, step_reading = 1,
+        step_activity = 1, step_quiz = 1, completed_at = CURRENT_TIMESTAMP
+'''
+
+def mark_session_complete(cursor, session_id, subject_id=None, student_ids=None):
+    """Mark every step of a session done for the given students, or for everyone
+    enrolled in subject_id when student_ids is None. One statement either way;
+    returns the number of progress rows written."""
+    if student_ids is None:
+        cursor.execute(_COMPLETE_PROGRESS_UPSERT.format(source='''
+            SELECT DISTINCT CAST(? AS INTEGER), student_id, 1, 1, 1, 1, 1, CURRENT_TIMESTAMP
+            FROM enrollments WHERE subject_id = ?
+        '''), (session_id, subject_id))
+        return cursor.rowcount
+    cursor.executemany(_COMPLETE_PROGRESS_UPSERT.format(source='VALUES (?, ?, 1, 1, 1, 1, 1, CURRENT_TIMESTAMP)'),
+                       [(session_id, student_id) for student_id in student_ids])
+    return len(student_ids)
+
+class User:
+    """Logged-in user identity, cached by load_user().
+
+    Only the columns used on most requests are loaded; profile/KYS fields
+    (PROFILE_FIELDS) are fetched on first access and kept on the object.
+    """
+    IDENTITY_FIELDS = ('id', 'username', 'full_name', 'role', 'student_id', 'section', 'photo',
+                       'profile_completed', 'is_approved', 'institution_id', 'department_id',
+                       'section_id', 'program_id')
+    PROFILE_FIELDS = ('email', 'github_account', 'railway_account', 'messenger', 'pup_id_photo',
+                      'cor_photo', 'contact_number', 'programming_languages', 'databases_known',
+                      'hosting_platforms', 'other_tools')
+    __slots__ = IDENTITY_FIELDS + ('_profile',)
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, full_name, role, student_id=None, section=None, photo='default.png',
+                 profile_completed=1, is_approved=1, institution_id=None, department_id=None,
+                 section_id=None, program_id=None):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.role = role
+        self.student_id = student_id
+        self.section = section
+        self.photo = photo or 'default.png'
+        self.profile_completed = profile_completed
+        self.is_approved = is_approved
+        self.institution_id = institution_id
+        self.department_id = department_id
+        self.section_id = section_id
+        self.program_id = program_id
+        self._profile = None
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(**{field: row[field] for field in cls.IDENTITY_FIELDS})
+
+    def __getattr__(self, name):
+        # Only reached for attributes that aren't slots, i.e. the lazy profile fields
+        if name not in User.PROFILE_FIELDS:
+            raise AttributeError(name)
+        if self._profile is None:
+            conn = get_db()
+            row = conn.execute(f"SELECT {', '.join(User.PROFILE_FIELDS)} FROM users WHERE id = ?",
+                               (self.id,)).fetchone()
+            conn.close()
+            self._profile = dict(row) if row else dict.fromkeys(User.PROFILE_FIELDS)
+        return self._profile[name]
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, User) and self.id == other.id
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+# User identity cache for load_user(). Entries expire after USER_CACHE_TTL seconds,
+# which also bounds staleness in other gunicorn workers; routes that change a user's
+# identity or profile call invalidate_user_cache() for the current worker.
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 2048
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def invalidate_user_cache(user_ids=None):
+    """Drop cached users (all of them when user_ids is None)."""
+    with _user_cache_lock:
+        if user_ids is None:
+            _user_cache.clear()
+        else:
+            for uid in user_ids:
+                _user_cache.pop(int(uid), None)
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+        if cached and cached[0] > now:
+            _user_cache.move_to_end(user_id)
+            return cached[1]
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(User.IDENTITY_FIELDS)} FROM users WHERE id = ?", (user_id,))
+    user = cursor.fetchone()
+    conn.close()
+    if not user:
+        return None
+
+    user_obj = User.from_row(user)
+    with _user_cache_lock:
+        _user_cache[user_id] = (now + USER_CACHE_TTL, user_obj)
+        _user_cache.move_to_end(user_id)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return user_obj
+
+def student_filters(args):
+    """SQL conditions on users u (and their params) for the section / subject / name
+    filters of the student lists; the name search uses the users full-text index."""
+    where, params = '', []
+    if args.get('section'):
+        where += ' AND u.section = ?'
+        params.append(args['section'])
+    if args.get('subject', type=int):
+        where += ' AND EXISTS (SELECT 1 FROM enrollments e WHERE e.student_id = u.id AND e.subject_id = ?)'
+        params.append(args.get('subject', type=int))
+    match = search_index.match_expression(args.get('q'))
+    if match:
+        where += f' AND u.id IN ({search_index.users_matching()})'
+        params.append(match)
+    return where, params
+
+# Profile completion required decorator
+def profile_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_user.is_authenticated and not current_user.profile_completed:
+            flash('Please complete your profile first.', 'warning')
+            return redirect(url_for('auth.complete_profile'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Admin role required decorator
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or current_user.role != 'admin':
+            flash('Access denied. Admin privileges required.', 'error')
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+# PUP Transmutation Table
+def get_pup_grade(percentage):
+    """Convert percentage to PUP grade scale (1.00 - 5.00)"""
+    if percentage >= 97:
+        return 1.00
+    elif percentage >= 94:
+        return 1.25
+    elif percentage >= 91:
+        return 1.50
+    elif percentage >= 88:
+        return 1.75
+    elif percentage >= 85:
+        return 2.00
+    elif percentage >= 82:
+        return 2.25
+    elif percentage >= 79:
+        return 2.50
+    elif percentage >= 76:
+        return 2.75
+    elif percentage >= 75:
+        return 3.00
+    else:
+        return 5.00
+
+# Grade weights per subject
+def get_grade_weights(subject_code):
+    """Get grade component weights based on subject code
+    Standard PUP Grade Distribution:
+    - Activities: 50%
+    - Quizzes: 10%
+    - Midterm: 20%
+    - Final: 20%
+    """
+    # All subjects use the same standard PUP grade distribution
+    return {
+        'quizzes': 0.10,      # 10%
+        'activities': 0.50,   # 50%
+        'midterm': 0.20,      # 20%
+        'final': 0.20,        # 20%
+        'final_project': 0.00 # Included in activities if applicable
+    }
+
+
+# ==================== GRADE & PERFORMANCE HELPERS ====================
+
+def compute_weighted_grade(cursor, subject_id, student_id):
+    """Compute weighted grade percentage for a student in a subject."""
+    weights = get_grade_weights('')
+    # Activity average (using final_score if available, else score)
+    cursor.execute('''
+        SELECT AVG(COALESCE(sub.final_score, sub.score)) as avg_score
+        FROM submissions sub
+        JOIN activities a ON sub.activity_id = a.id
+        JOIN sessions ses ON a.session_id = ses.id
+        WHERE ses.subject_id = ? AND sub.student_id = ?
+        AND COALESCE(sub.final_score, sub.score) IS NOT NULL
+    ''', (subject_id, student_id))
+    activity_avg = cursor.fetchone()['avg_score'] or 0
+
+    # Quiz average
+    cursor.execute('''
+        SELECT AVG(qa.score) as avg_score
+        FROM quiz_attempts qa
+        JOIN quizzes q ON qa.quiz_id = q.id
+        JOIN sessions ses ON q.session_id = ses.id
+        WHERE ses.subject_id = ? AND qa.student_id = ? AND qa.score IS NOT NULL
+    ''', (subject_id, student_id))
+    quiz_avg = cursor.fetchone()['avg_score'] or 0
+
+    # Exams
+    midterm = 0
+    final_exam = 0
+    cursor.execute('''
+        SELECT ea.score, e.exam_type
+        FROM exam_attempts ea
+        JOIN exams e ON ea.exam_id = e.id
+        WHERE e.subject_id = ? AND ea.student_id = ?
+        ORDER BY ea.id
+    ''', (subject_id, student_id))
+    for exam in cursor.fetchall():
+        if exam['exam_type'] == 'midterm':
+            midterm = exam['score'] or 0
+        elif exam['exam_type'] == 'final':
+            final_exam = exam['score'] or 0
+
+    # If no final exam but project groups exist, use project grade
+    if final_exam == 0:
+        proj = compute_project_grade(cursor, subject_id, student_id)
+        if proj is not None and proj > 0:
+            final_exam = proj
+
+    return (activity_avg * weights['activities'] +
+            quiz_avg * weights['quizzes'] +
+            midterm * weights['midterm'] +
+            final_exam * weights['final'])
+
+
+def compute_project_grade(cursor, subject_id, student_id):
+    """Compute project grade (0-100) based on group project progress for sessions 13-16."""
+    cursor.execute('''
+        SELECT pg.id FROM project_groups pg
+        JOIN project_group_members pgm ON pg.id = pgm.group_id
+        WHERE pg.subject_id = ? AND pgm.student_id = ?
+    ''', (subject_id, student_id))
+    group = cursor.fetchone()
+    if not group:
+        return None
+    cursor.execute('''
+        SELECT session_number, percentage FROM project_progress
+        WHERE group_id = ?
+    ''', (group['id'],))
+    progress = {r['session_number']: r['percentage'] for r in cursor.fetchall()}
+    if not progress:
+        return 0
+    total = sum(progress.get(sn, 0) for sn in [13, 14, 15, 16])
+    return total / 4
+
+
+def build_guidance_message(activity_avg, quiz_avg, sessions_behind, subject_code):
+    """Generate smart guidance text based on student performance patterns."""
+    parts = []
+    if activity_avg >= 85 and quiz_avg < 75 and quiz_avg > 0:
+        parts.append(f"Your activity work in {subject_code} is strong, but quiz scores need improvement. Review the lesson materials before taking quizzes.")
+    elif quiz_avg >= 85 and activity_avg < 75 and activity_avg > 0:
+        parts.append(f"You're doing well on quizzes in {subject_code}, showing solid understanding. Focus on submitting activities on time to boost your grade.")
+    elif activity_avg < 75 and activity_avg > 0 and quiz_avg < 75 and quiz_avg > 0:
+        parts.append(f"Both activity and quiz scores in {subject_code} need improvement. Consider reviewing lesson materials and attending office hours.")
+    elif activity_avg >= 85 and quiz_avg >= 85:
+        parts.append(f"Excellent work in {subject_code}! Keep up the outstanding performance.")
+    if sessions_behind >= 3:
+        parts.append(f"You're {sessions_behind} lessons behind. Complete the video and reading materials before moving to activities.")
+    elif sessions_behind >= 2:
+        parts.append(f"You're {sessions_behind} lessons behind. Try to catch up this week.")
+    if not parts:
+        parts.append(f"Keep up the work in {subject_code} and submit all requirements on time.")
+    return ' '.join(parts)
+
+
+# ==================== ACTIVITIES ====================
+
+def calculate_participation_score(cursor, student_id, activity_id, max_points):
+    """
+    Calculate participation score for a student as a PERCENTAGE (0-100) based on
+    instructor approval of their peer reviews.
+
+    - approved reviews / total assignments * 100
+    - If no assignments exist -> 100% (not required to review)
+    - Completed but not yet approved -> counts as 0 until instructor approves
+
+    Returns: percentage score (0-100)
+    """
+    # Get all peer review assignments for this student for this activity
+    cursor.execute('''
+        SELECT pra.*, s.activity_id
+        FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        WHERE pra.reviewer_id = ? AND s.activity_id = ?
+    ''', (student_id, activity_id))
+    assignments = cursor.fetchall()
+
+    if not assignments:
+        # No assignments = full participation score (they weren't required to review)
+        return 100  # Return 100%
+
+    total_assignments = len(assignments)
+    approved_count = sum(1 for a in assignments
+                         if 'approval_status' in a.keys() and a['approval_status'] == 'approved')
+
+    # Participation = percentage of approved reviews
+    return (approved_count / total_assignments) * 100 if total_assignments > 0 else 0
+
+
+# ==================== STUDENT DASHBOARD ====================
+
+QUIZ_ANALYTICS_PER_PAGE = 8
+
+def compact_game_scores():
+    """Delete raw game_scores rows older than the retention window.
+
+    Every round is already folded into game_score_daily when it is saved, so
+    compaction only has to drop the raw rows. Run by the background scheduler.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT setting_value FROM platform_settings WHERE setting_key = 'game_score_retention_days' AND institution_id IS NULL")
+    setting = cursor.fetchone()
+    try:
+        retention_days = max(leaderboard.WEEK_DAYS, int(setting['setting_value'])) if setting else 30
+    except ValueError:
+        retention_days = 30
+    cursor.execute("DELETE FROM game_scores WHERE played_at < datetime('now', ?)",
+                   (f'-{retention_days} days',))
+    deleted = cursor.rowcount
+    conn.commit()
+    conn.close()
+    if deleted:
+        print(f'[Game-Scores] Compacted {deleted} raw score(s) older than {retention_days} days')
+    return deleted
+
+
+# ============== QUIZ JOURNEY GAME ==============
+
+# (institution id, subject_id) -> (expires, tree); subject ids repeat across shards
+_journey_tree_cache = {}
+_journey_tree_lock = threading.Lock()
+
+def journey_tree_tenant():
+    return tenancy.current_institution() if tenancy.ENABLED else None
+
+def invalidate_journey_tree(subject_ids=None):
+    """Drop the current institution's cached journey trees (all of them when
+    subject_ids is None)."""
+    tenant = journey_tree_tenant()
+    with _journey_tree_lock:
+        if subject_ids is None:
+            for key in [key for key in _journey_tree_cache if key[0] == tenant]:
+                del _journey_tree_cache[key]
+        else:
+            for subject_id in subject_ids:
+                _journey_tree_cache.pop((tenant, int(subject_id)), None)
+
+def invalidate_journey_tree_for(cursor, session_id=None, quiz_id=None):
+    """Invalidate the tree of the subject owning a session or quiz."""
+    if quiz_id is not None:
+        cursor.execute('''
+            SELECT s.subject_id FROM quizzes q JOIN sessions s ON q.session_id = s.id WHERE q.id = ?
+        ''', (quiz_id,))
+    else:
+        cursor.execute('SELECT subject_id FROM sessions WHERE id = ?', (session_id,))
+    row = cursor.fetchone()
+    invalidate_journey_tree([row['subject_id']] if row else None)
@@ -0,0 +1,631 @@
+"""Games hub, typing game, quiz journey and the game leaderboards."""
+import time
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+
+from database import get_db
+import answer_keys
+import item_analysis
+import leaderboard
+import learning_events
+
+from lms.common import (
+    QUIZ_ANALYTICS_PER_PAGE,
+    _journey_tree_cache,
+    _journey_tree_lock,
+    invalidate_journey_tree,
+    journey_tree_tenant,
+)
+
+bp = Blueprint('games', __name__)
+
+
+# ==================== STUDENT DASHBOARD ====================
+
+@bp.route('/games')
+@login_required
+def games_hub():
+    """Combined games & quizzes hub - students play, instructors see performance"""
+    if current_user.role == 'instructor':
+        return redirect(url_for('games.student_performance'))
+    return render_template('games_hub.html')
+
+@bp.route('/games/performance')
+@login_required
+def student_performance():
+    """Instructor view - student performance across games and quizzes"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('games.games_hub'))
+
+    import json as json_mod
+
+    subject_filter = request.args.get('subject', '').strip()
+    section_filter = request.args.get('section', '').strip()
+    search = request.args.get('q', '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # ---- QUIZ ANALYTICS: per-quiz breakdown (filtered server-side) ----
+    where, params = [], []
+    if subject_filter:
+        where.append('sub.name = ?')
+        params.append(subject_filter)
+    if section_filter:
+        where.append('sub.section = ?')
+        params.append(section_filter)
+    if search:
+        where.append('(LOWER(q.title) LIKE ? OR LOWER(sub.name) LIKE ? OR LOWER(s.title) LIKE ?)')
+        params.extend([f'%{search.lower()}%'] * 3)
+    where_sql = ('WHERE ' + ' AND '.join(where)) if where else ''
+
+    cursor.execute(f'''
+        WITH qc AS (SELECT quiz_id, COUNT(*) AS cnt FROM quiz_questions GROUP BY quiz_id)
+        SELECT q.id, q.title as quiz_title, s.title as session_title,
+               sub.name as subject_name, sub.section,
+               COALESCE(qc.cnt, 0) as total_questions,
+               COUNT(qa.id) as attempt_count,
+               AVG(qa.score) as avg_score,
+               MAX(qa.score) as best_score,
+               MIN(qa.score) as worst_score,
+               AVG(qa.time_spent) as avg_time,
+               SUM(CASE WHEN qa.id IS NOT NULL AND qa.score = COALESCE(qc.cnt, 0) THEN 1 ELSE 0 END) as perfect_count,
+               SUM(CASE WHEN qa.id IS NOT NULL AND (COALESCE(qc.cnt, 0) = 0
+                        OR ROUND(qa.score * 100.0 / qc.cnt) < 50) THEN 1 ELSE 0 END) as fail_count
+        FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id
+        JOIN subjects sub ON s.subject_id = sub.id
+        LEFT JOIN qc ON qc.quiz_id = q.id
+        LEFT JOIN quiz_attempts qa ON q.id = qa.quiz_id
+        {where_sql}
+        GROUP BY q.id, s.id, sub.id, qc.cnt
+        ORDER BY sub.name, s.session_number
+    ''', params)
+    filtered_quizzes = [dict(row) for row in cursor.fetchall()]
+
+    total_pages = max(1, (len(filtered_quizzes) + QUIZ_ANALYTICS_PER_PAGE - 1) // QUIZ_ANALYTICS_PER_PAGE)
+    page = min(page, total_pages)
+    quizzes = filtered_quizzes[(page - 1) * QUIZ_ANALYTICS_PER_PAGE:page * QUIZ_ANALYTICS_PER_PAGE]
+    quiz_map = {q['id']: q for q in quizzes}
+    for quiz in quizzes:
+        quiz['attempt_list'] = []
+        quiz['most_missed'] = []
+
+    if quiz_map:
+        placeholders = ','.join('?' * len(quiz_map))
+
+        # All attempts for the quizzes on this page in one ordered query
+        cursor.execute(f'''
+            SELECT qa.id, qa.quiz_id, qa.score, qa.time_spent, qa.missed_questions,
+                   u.full_name, u.student_id as sid, u.section, u.photo
+            FROM quiz_attempts qa
+            JOIN users u ON qa.student_id = u.id
+            WHERE qa.quiz_id IN ({placeholders})
+            ORDER BY qa.quiz_id, qa.score DESC, qa.time_spent ASC
+        ''', list(quiz_map))
+        for row in cursor.fetchall():
+            quiz = quiz_map[row['quiz_id']]
+            a = dict(row)
+            try:
+                a['missed_list'] = json_mod.loads(a.get('missed_questions') or '[]')
+            except:
+                a['missed_list'] = []
+            a['is_perfect'] = (a['score'] == quiz['total_questions'])
+            a['pct'] = round((a['score'] / quiz['total_questions'] * 100) if quiz['total_questions'] else 0)
+            time_mins = (a.get('time_spent') or 0) // 60
+            time_secs = (a.get('time_spent') or 0) % 60
+            a['time_display'] = f'{time_mins}m {time_secs}s' if time_mins else f'{time_secs}s'
+            quiz['attempt_list'].append(a)
+
+        # Most-missed questions from the per-question stats kept at submit time
+        cursor.execute(f'''
+            SELECT qs.quiz_id, qs.question_id, qs.attempts, qs.attempts - qs.correct_count as missed,
+                   qq.question_text
+            FROM quiz_question_stats qs
+            JOIN quiz_questions qq ON qq.id = qs.question_id
+            WHERE qs.quiz_id IN ({placeholders}) AND qs.attempts > qs.correct_count
+            ORDER BY qs.quiz_id, missed DESC
+        ''', list(quiz_map))
+        for row in cursor.fetchall():
+            missed_list = quiz_map[row['quiz_id']]['most_missed']
+            if len(missed_list) < 3:
+                missed_list.append(dict(row))
+
+    # ---- GAME ANALYTICS ----
+    cursor.execute('''
+        SELECT u.id, u.full_name, u.student_id, u.section, u.photo,
+               gs.total_games, gs.highest_score as game_high_score, gs.highest_level,
+               gs.total_codes_typed, gs.xp_points, gs.current_rank, gs.best_streak
+        FROM users u
+        LEFT JOIN game_user_stats gs ON u.id = gs.user_id
+        WHERE u.role = 'student' AND u.is_approved = 1 AND gs.total_games > 0
+        ORDER BY gs.highest_score DESC
+    ''')
+    game_players = [dict(row) for row in cursor.fetchall()]
+
+    # Get sections
+    cursor.execute('''
+        SELECT DISTINCT section FROM users WHERE role = 'student' AND section IS NOT NULL ORDER BY section
+    ''')
+    sections = [r['section'] for r in cursor.fetchall()]
+
+    # Get subjects for filter
+    cursor.execute('SELECT DISTINCT name FROM subjects ORDER BY name')
+    subjects = [r['name'] for r in cursor.fetchall()]
+
+    # Summary stats (across all quizzes, independent of filters)
+    cursor.execute('''
+        WITH qc AS (SELECT quiz_id, COUNT(*) AS cnt FROM quiz_questions GROUP BY quiz_id),
+             per_quiz AS (
+                SELECT qa.quiz_id, COUNT(*) AS attempts, AVG(qa.score) AS avg_score,
+                       SUM(CASE WHEN qa.score = COALESCE(qc.cnt, 0) THEN 1 ELSE 0 END) AS perfect
+                FROM quiz_attempts qa
+                LEFT JOIN qc ON qc.quiz_id = qa.quiz_id
+                GROUP BY qa.quiz_id
+             )
+        SELECT (SELECT COUNT(*) FROM quizzes) AS quiz_count,
+               COALESCE(SUM(attempts), 0) AS total_attempts,
+               COALESCE(AVG(avg_score), 0) AS overall_avg,
+               COALESCE(SUM(perfect), 0) AS total_perfect
+        FROM per_quiz
+    ''')
+    summary = cursor.fetchone()
+
+    conn.close()
+    return render_template('student_performance.html',
+                           quizzes=quizzes,
+                           quiz_count=summary['quiz_count'],
+                           filtered_count=len(filtered_quizzes),
+                           page=page,
+                           total_pages=total_pages,
+                           filters={'subject': subject_filter, 'section': section_filter, 'q': search},
+                           game_players=game_players,
+                           sections=sections,
+                           subjects=subjects,
+                           total_attempts=summary['total_attempts'],
+                           overall_avg=round(summary['overall_avg'], 1),
+                           total_perfect=summary['total_perfect'])
+
+
+@bp.route('/typing-game')
+@login_required
+def typing_game():
+    return render_template('typing_game.html')
+
+@bp.route('/api/game/save-score', methods=['POST'])
+@login_required
+def save_game_score():
+    data = request.get_json()
+    score = data.get('score', 0)
+    level = data.get('level', 1)
+    codes_typed = data.get('codesTyped', 0)
+    best_streak = data.get('bestStreak', 0)
+    difficulty = data.get('difficulty', 'medium')
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Save individual game score
+    cursor.execute('''
+        INSERT INTO game_scores (user_id, score, level, codes_typed, best_streak, difficulty)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (current_user.id, score, level, codes_typed, best_streak, difficulty))
+
+    # Maintain the daily rollup that leaderboards read instead of raw rounds
+    cursor.execute('''
+        INSERT INTO game_score_daily (user_id, day, games, max_score, max_level, total_codes, max_streak)
+        VALUES (?, date('now'), 1, ?, ?, ?, ?)
+        ON CONFLICT(user_id, day) DO UPDATE SET
+            games = game_score_daily.games + 1,
+            max_score = MAX(game_score_daily.max_score, excluded.max_score),
+            max_level = MAX(game_score_daily.max_level, excluded.max_level),
+            total_codes = game_score_daily.total_codes + excluded.total_codes,
+            max_streak = MAX(game_score_daily.max_streak, excluded.max_streak)
+    ''', (current_user.id, score, level, codes_typed, best_streak))
+
+    # Update or create user stats
+    cursor.execute('SELECT * FROM game_user_stats WHERE user_id = ?', (current_user.id,))
+    stats = cursor.fetchone()
+
+    # Calculate XP (1 XP per 10 points scored)
+    xp_earned = score // 10
+
+    # Determine rank based on total XP
+    def get_rank(xp):
+        if xp >= 10000: return 'Python Master'
+        if xp >= 5000: return 'Code Ninja'
+        if xp >= 2500: return 'Senior Dev'
+        if xp >= 1000: return 'Developer'
+        if xp >= 500: return 'Junior Dev'
+        if xp >= 200: return 'Apprentice'
+        if xp >= 50: return 'Novice'
+        return 'Beginner'
+
+    if stats:
+        new_total_xp = stats['xp_points'] + xp_earned
+        new_rank = get_rank(new_total_xp)
+        cursor.execute('''
+            UPDATE game_user_stats SET
+                total_games = total_games + 1,
+                total_score = total_score + ?,
+                highest_score = MAX(highest_score, ?),
+                highest_level = MAX(highest_level, ?),
+                total_codes_typed = total_codes_typed + ?,
+                best_streak = MAX(best_streak, ?),
+                xp_points = ?,
+                current_rank = ?,
+                last_played = CURRENT_TIMESTAMP
+            WHERE user_id = ?
+        ''', (score, score, level, codes_typed, best_streak, new_total_xp, new_rank, current_user.id))
+    else:
+        new_rank = get_rank(xp_earned)
+        cursor.execute('''
+            INSERT INTO game_user_stats
+            (user_id, total_games, total_score, highest_score, highest_level, total_codes_typed, best_streak, xp_points, current_rank, last_played)
+            VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (current_user.id, score, score, level, codes_typed, best_streak, xp_earned, new_rank))
+
+    conn.commit()
+    leaderboard.board.sync(conn)
+    conn.close()
+    learning_events.record('game_played', current_user.id, game='typing', score=score, level=level,
+                           difficulty=difficulty)
+
+    return jsonify({'success': True, 'xp_earned': xp_earned, 'rank': new_rank if not stats else get_rank(stats['xp_points'] + xp_earned)})
+
+@bp.route('/api/game/leaderboard')
+@login_required
+def get_leaderboard():
+    # Pick up rounds saved by other workers, then serve everything from memory
+    conn = get_db()
+    leaderboard.board.sync(conn)
+    conn.close()
+
+    return jsonify({
+        'allTime': leaderboard.board.top(10),
+        'weekly': leaderboard.board.weekly_top(10),
+        'userStats': leaderboard.board.user_stats(current_user.id),
+        'around': leaderboard.board.around(current_user.id),
+        'currentUser': {
+            'id': current_user.id,
+            'name': current_user.full_name,
+            'photo': current_user.photo
+        }
+    })
+
+
+# ============== QUIZ JOURNEY GAME ==============
+
+# Static subject -> session -> quiz tree (titles, quiz and question counts), cached
+# per subject. Entries expire after JOURNEY_TREE_TTL seconds, which bounds staleness
+# in other gunicorn workers; quiz and session edits call invalidate_journey_tree().
+JOURNEY_TREE_TTL = 300
+
+def load_journey_trees(cursor, subject_ids):
+    """{subject_id: [session dict with quiz_count and quizzes]} from the cache,
+    loading every missing subject with two queries."""
+    now = time.monotonic()
+    tenant = journey_tree_tenant()
+    trees, missing = {}, []
+    with _journey_tree_lock:
+        for subject_id in subject_ids:
+            cached = _journey_tree_cache.get((tenant, subject_id))
+            if cached and cached[0] > now:
+                trees[subject_id] = cached[1]
+            else:
+                missing.append(subject_id)
+    if not missing:
+        return trees
+
+    placeholders = ','.join('?' * len(missing))
+    cursor.execute(f'''
+        SELECT * FROM sessions WHERE subject_id IN ({placeholders}) ORDER BY subject_id, session_number
+    ''', missing)
+    loaded = {subject_id: [] for subject_id in missing}
+    sessions_by_id = {}
+    for row in cursor.fetchall():
+        session_data = dict(row, quiz_count=0, quizzes=[])
+        loaded[row['subject_id']].append(session_data)
+        sessions_by_id[row['id']] = session_data
+
+    cursor.execute(f'''
+        SELECT q.*, COALESCE(qc.cnt, 0) as question_count
+        FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id
+        LEFT JOIN (SELECT quiz_id, COUNT(*) AS cnt FROM quiz_questions GROUP BY quiz_id) qc ON qc.quiz_id = q.id
+        WHERE s.subject_id IN ({placeholders})
+        ORDER BY q.id
+    ''', missing)
+    for row in cursor.fetchall():
+        session_data = sessions_by_id[row['session_id']]
+        session_data['quizzes'].append(dict(row))
+        session_data['quiz_count'] += 1
+
+    with _journey_tree_lock:
+        for subject_id, tree in loaded.items():
+            _journey_tree_cache[(tenant, subject_id)] = (now + JOURNEY_TREE_TTL, tree)
+    trees.update(loaded)
+    return trees
+
+def load_journey_progress(cursor, student_id):
+    """{quiz_id: {attempts, best_score, last_score}} for one student, in one grouped query."""
+    cursor.execute('''
+        SELECT quiz_id, COUNT(*) as attempts, MAX(score) as best_score,
+               MAX(CASE WHEN rn = 1 THEN score END) as last_score
+        FROM (
+            SELECT quiz_id, score,
+                   ROW_NUMBER() OVER (PARTITION BY quiz_id ORDER BY submitted_at DESC, id DESC) as rn
+            FROM quiz_attempts
+            WHERE student_id = ?
+        )
+        GROUP BY quiz_id
+    ''', (student_id,))
+    return {row['quiz_id']: dict(row) for row in cursor.fetchall()}
+
+def build_journey_sessions(tree, progress):
+    """Per-request copy of a cached tree with the student's progress merged in."""
+    sessions = []
+    for session_data in tree:
+        quizzes = []
+        for quiz in session_data['quizzes']:
+            quiz_progress = progress.get(quiz['id'])
+            quizzes.append(dict(quiz,
+                                best_score=quiz_progress['best_score'] if quiz_progress else None,
+                                last_score=quiz_progress['last_score'] if quiz_progress else None))
+        sessions.append(dict(session_data, quizzes=quizzes,
+                             completed_quizzes=sum(1 for q in quizzes if q['id'] in progress)))
+    return sessions
+
+@bp.route('/quiz-journey')
+@login_required
+def quiz_journey():
+    """Quiz journey - level-based quiz game"""
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # For students, get enrolled subjects
+    if current_user.role == 'student':
+        cursor.execute('''
+            SELECT DISTINCT sub.* FROM subjects sub
+            JOIN enrollments e ON sub.id = e.subject_id
+            WHERE e.student_id = ?
+            ORDER BY sub.name
+        ''', (current_user.id,))
+    else:
+        # Instructors see all subjects
+        cursor.execute('SELECT * FROM subjects ORDER BY name')
+
+    subjects = cursor.fetchall()
+
+    # Session/quiz tree for every subject plus this student's progress
+    trees = load_journey_trees(cursor, [subject['id'] for subject in subjects])
+    progress = load_journey_progress(cursor, current_user.id)
+    conn.close()
+
+    subjects_data = []
+    for subject in subjects:
+        sessions = build_journey_sessions(trees[subject['id']], progress)
+        subjects_data.append({
+            'subject': subject,
+            'sessions': sessions,
+            'completed_quiz_ids': [q['id'] for s in sessions for q in s['quizzes'] if q['id'] in progress]
+        })
+
+    return render_template('quiz_journey.html', subjects_data=subjects_data)
+
+
+@bp.route('/quiz-journey/subject/<int:subject_id>')
+@login_required
+def quiz_journey_subject(subject_id):
+    """Show sessions/levels for a subject"""
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+    subject = cursor.fetchone()
+
+    if not subject:
+        flash('Subject not found', 'error')
+        conn.close()
+        return redirect(url_for('games.quiz_journey'))
+
+    # Get sessions with quizzes
+    tree = load_journey_trees(cursor, [subject_id])[subject_id]
+    sessions = build_journey_sessions(tree, load_journey_progress(cursor, current_user.id))
+
+    conn.close()
+    return render_template('quiz_journey_subject.html', subject=subject, sessions=sessions)
+
+
+@bp.route('/quiz-journey/session/<int:session_id>')
+@login_required
+def quiz_journey_session(session_id):
+    """Show quizzes available in a session"""
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT s.*, sub.name as subject_name, sub.id as subject_id
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id,))
+    session = cursor.fetchone()
+
+    if not session:
+        flash('Session not found', 'error')
+        conn.close()
+        return redirect(url_for('games.quiz_journey'))
+
+    # Get quizzes for this session
+    tree = load_journey_trees(cursor, [session['subject_id']])[session['subject_id']]
+    if not any(s['id'] == session_id for s in tree):
+        # Session added since the tree was cached (possibly by another worker)
+        invalidate_journey_tree([session['subject_id']])
+        tree = load_journey_trees(cursor, [session['subject_id']])[session['subject_id']]
+    sessions = build_journey_sessions([s for s in tree if s['id'] == session_id],
+                                      load_journey_progress(cursor, current_user.id))
+    quizzes = sessions[0]['quizzes'] if sessions else []
+
+    conn.close()
+    return render_template('quiz_journey_session.html', session=session, quizzes=quizzes)
+
+
+@bp.route('/quiz-journey/start/<int:quiz_id>')
+@login_required
+def start_quiz_journey_game(quiz_id):
+    """Start a timed quiz with randomized questions"""
+    import random
+    import hashlib
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get quiz info
+    cursor.execute('''
+        SELECT q.*, s.title as session_title, sub.name as subject_name
+        FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE q.id = ?
+    ''', (quiz_id,))
+    quiz = cursor.fetchone()
+
+    if not quiz:
+        flash('Quiz not found', 'error')
+        conn.close()
+        return redirect(url_for('games.quiz_journey'))
+
+    # Get questions
+    questions = [dict(q) for q in answer_keys.questions(cursor, 'quiz', quiz_id, quiz['question_version'] or 0)]
+
+    # Randomize questions based on user ID + quiz ID (consistent for same user)
+    seed = int(hashlib.md5(f"{current_user.id}-{quiz_id}".encode()).hexdigest(), 16)
+    random.seed(seed)
+    random.shuffle(questions)
+
+    # Randomize options for each multiple choice question
+    for q in questions:
+        if q['options']:
+            import json
+            try:
+                options = json.loads(q['options'])
+                random.shuffle(options)
+                q['options'] = json.dumps(options)
+            except:
+                pass
+
+    conn.close()
+    return render_template('quiz_journey_game.html', quiz=quiz, questions=questions)
+
+
+@bp.route('/quiz-journey/submit/<int:quiz_id>', methods=['POST'])
+@login_required
+def submit_quiz_journey_game(quiz_id):
+    """Submit quiz answers and calculate score"""
+    import json
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get quiz questions
+    questions = answer_keys.questions(cursor, 'quiz', quiz_id)
+
+    # Get time spent from form
+    time_spent = int(request.form.get('time_spent', 0))
+
+    # Calculate score and track missed questions
+    answers = {str(q['id']): request.form.get(f'question_{q["id"]}', '').strip() for q in questions}
+    score, total_points, outcomes = item_analysis.grade_answers(questions, answers, auto_types=None)
+    missed = [{
+        'question_id': q['id'],
+        'question': q['question_text'][:100],
+        'your_answer': answers[str(q['id'])] or '(no answer)',
+        'correct_answer': q['correct_answer']
+    } for q in questions if not outcomes[q['id']]]
+
+    total_questions = len(questions)
+
+    # Check if already attempted (update or create)
+    cursor.execute('''
+        SELECT id, answers, missed_questions FROM quiz_attempts WHERE quiz_id = ? AND student_id = ?
+    ''', (quiz_id, current_user.id))
+    existing = cursor.fetchone()
+
+    # Keep per-question stats in step, replacing the previous attempt's contribution
+    # (which may be a regular quiz submit, graded on auto-graded types only)
+    previous_answers = None
+    if existing:
+        try:
+            previous_answers = json.loads(existing['answers'] or '{}')
+        except ValueError:
+            previous_answers = None
+    item_analysis.record_question_stats(
+        cursor, 'quiz', quiz_id, questions, answers, auto_types=None,
+        previous_answers=previous_answers,
+        previous_auto_types=None if existing and existing['missed_questions'] is not None
+        else item_analysis.AUTO_GRADED_TYPES)
+
+    if existing:
+        cursor.execute('''
+            UPDATE quiz_attempts SET answers = ?, score = ?, time_spent = ?,
+                   missed_questions = ?, total_questions = ?, submitted_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (json.dumps(answers), score, time_spent, json.dumps(missed), total_questions, existing['id']))
+    else:
+        cursor.execute('''
+            INSERT INTO quiz_attempts (quiz_id, student_id, answers, score, time_spent, missed_questions, total_questions)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (quiz_id, current_user.id, json.dumps(answers), score, time_spent, json.dumps(missed), total_questions))
+
+    conn.commit()
+
+    # Get quiz info for result page
+    cursor.execute('''
+        SELECT q.*, s.title as session_title, sub.name as subject_name, s.subject_id
+        FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE q.id = ?
+    ''', (quiz_id,))
+    quiz = cursor.fetchone()
+
+    conn.close()
+
+    percentage = (score / total_points * 100) if total_points > 0 else 0
+    learning_events.record('quiz_journey_submitted', current_user.id,
+                           subject_id=quiz['subject_id'] if quiz else None,
+                           session_id=quiz['session_id'] if quiz else None,
+                           quiz_id=quiz_id, score=round(percentage, 1))
+
+    return render_template('quiz_journey_result.html',
+                           quiz=quiz,
+                           score=score,
+                           total_points=total_points,
+                           percentage=percentage,
+                           answers=answers,
+                           missed=missed,
+                           time_spent=time_spent)
+
+
+@bp.route('/api/quiz-journey/leaderboard/<int:quiz_id>')
+@login_required
+def quiz_journey_leaderboard(quiz_id):
+    """Get leaderboard for a specific quiz"""
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT u.id, u.full_name, u.photo, u.section, qa.score, qa.submitted_at
+        FROM quiz_attempts qa
+        JOIN users u ON qa.student_id = u.id
+        WHERE qa.quiz_id = ?
+        ORDER BY qa.score DESC, qa.submitted_at ASC
+        LIMIT 10
+    ''', (quiz_id,))
+    leaderboard = [dict(row) for row in cursor.fetchall()]
+
+    conn.close()
+    return jsonify(leaderboard)
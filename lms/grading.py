@@ -0,0 +1,1333 @@
+"""Activities and submissions, quizzes, exams, item analysis and the grade book."""
+import json
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+
+from database import get_db
+import answer_keys
+import item_analysis
+import learning_events
+
+from lms.common import (
+    calculate_participation_score,
+    check_and_mark_session_complete,
+    check_previous_session_complete,
+    compute_project_grade,
+    get_grade_weights,
+    get_pup_grade,
+    get_session_progress,
+    invalidate_journey_tree_for,
+)
+
+bp = Blueprint('grading', __name__)
+
+
+# ==================== ACTIVITIES ====================
+
+@bp.route('/subject/<int:subject_id>/all-activities')
+@login_required
+def all_activities(subject_id):
+    """Show ALL 16 sessions' activities on ONE page"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+    subject = cursor.fetchone()
+
+    # Get enrolled count
+    cursor.execute('SELECT COUNT(*) FROM enrollments WHERE subject_id = ?', (subject_id,))
+    total_enrolled = cursor.fetchone()[0]
+
+    # Get all sessions with their activities
+    cursor.execute('SELECT * FROM sessions WHERE subject_id = ? ORDER BY session_number', (subject_id,))
+    sessions = cursor.fetchall()
+
+    # Get submission stats per activity in one batch
+    session_ids = [s['id'] for s in sessions]
+    activity_stats = {}
+    if session_ids:
+        placeholders = ','.join(['?'] * len(session_ids))
+        cursor.execute(f'''
+            SELECT a.id as activity_id,
+                   COUNT(DISTINCT sub.student_id) as submitted_count,
+                   AVG(CASE WHEN sub.score IS NOT NULL THEN sub.score
+                        WHEN sub.final_score IS NOT NULL THEN sub.final_score END) as avg_score,
+                   SUM(CASE WHEN sub.score IS NOT NULL OR sub.final_score IS NOT NULL THEN 1 ELSE 0 END) as graded_count
+            FROM activities a
+            LEFT JOIN submissions sub ON a.id = sub.activity_id
+            WHERE a.session_id IN ({placeholders})
+            GROUP BY a.id
+        ''', session_ids)
+        for row in cursor.fetchall():
+            activity_stats[row['activity_id']] = dict(row)
+
+    sessions_with_activities = []
+    for session in sessions:
+        cursor.execute('SELECT * FROM activities WHERE session_id = ? ORDER BY activity_number', (session['id'],))
+        activities = cursor.fetchall()
+        sessions_with_activities.append({
+            'session': session,
+            'activities': activities
+        })
+
+    conn.close()
+    return render_template('all_activities.html', subject=subject, sessions_data=sessions_with_activities,
+                           total_enrolled=total_enrolled, activity_stats=activity_stats)
+
+@bp.route('/session/<int:session_id>/activities')
+@login_required
+def session_activities(session_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, sub.code as subject_code, sub.name as subject_name
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id,))
+    session_data = cursor.fetchone()
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (session_data['subject_id'],))
+    subject = cursor.fetchone()
+    cursor.execute('SELECT * FROM activities WHERE session_id = ? ORDER BY activity_number', (session_id,))
+    activities = cursor.fetchall()
+    conn.close()
+    return render_template('activities.html', session=session_data, subject=subject, activities=activities)
+
+@bp.route('/activity/create/<int:session_id>', methods=['POST'])
+@login_required
+def create_activity(session_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    title = request.form['title']
+    instructions = request.form['instructions']
+    points = request.form['points']
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) as count FROM activities WHERE session_id = ?', (session_id,))
+    count = cursor.fetchone()['count']
+    cursor.execute('''
+        INSERT INTO activities (session_id, activity_number, title, instructions, points)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (session_id, count + 1, title, instructions, points))
+    conn.commit()
+    conn.close()
+    flash('Activity created successfully!', 'success')
+    return redirect(url_for('grading.session_activities', session_id=session_id))
+
+@bp.route('/activity/<int:activity_id>/upload', methods=['POST'])
+@login_required
+def upload_activity_file(activity_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    if 'file' not in request.files:
+        flash('No file uploaded', 'error')
+        return redirect(request.referrer)
+
+    file = request.files['file']
+    if file.filename == '':
+        flash('No file selected', 'error')
+        return redirect(request.referrer)
+
+    allowed_extensions = ('.pdf', '.docx', '.doc', '.pptx', '.ppt')
+    if file and file.filename.lower().endswith(allowed_extensions):
+        filename = secure_filename(f"activity_{activity_id}_{file.filename}")
+        filepath = os.path.join('static', 'activity_files', filename)
+        file.save(filepath)
+
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('UPDATE activities SET file_path = ? WHERE id = ?', (filename, activity_id))
+        conn.commit()
+
+        # Get session_id to redirect back
+        cursor.execute('SELECT session_id FROM activities WHERE id = ?', (activity_id,))
+        session_id = cursor.fetchone()['session_id']
+        conn.close()
+
+        flash('File uploaded successfully!', 'success')
+        return redirect(url_for('grading.session_activities', session_id=session_id))
+    else:
+        flash('Only PDF, DOCX, DOC, PPTX, PPT files are allowed', 'error')
+        return redirect(request.referrer)
+
+@bp.route('/activity/<int:activity_id>/view-pdf')
+@login_required
+def view_activity_pdf(activity_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_path FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+    conn.close()
+
+    if activity and activity['file_path']:
+        return redirect(url_for('static', filename=f"activity_files/{activity['file_path']}"))
+    flash('No file found for this activity', 'error')
+    return redirect(request.referrer)
+
+@bp.route('/activity/<int:activity_id>/submit', methods=['POST'])
+@login_required
+def submit_activity(activity_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Check if activity exists and is active
+    cursor.execute('''
+        SELECT a.*, s.subject_id FROM activities a
+        JOIN sessions s ON a.session_id = s.id
+        WHERE a.id = ?
+    ''', (activity_id,))
+    activity = cursor.fetchone()
+
+    if not activity:
+        flash('Activity not found.', 'error')
+        conn.close()
+        return redirect(url_for('student.student_dashboard'))
+
+    # Check if activity is active (not deactivated)
+    keys = activity.keys()
+    is_active = activity['is_active'] if 'is_active' in keys else 1
+    if not is_active:
+        flash('This activity is no longer accepting submissions.', 'error')
+        conn.close()
+        return redirect(url_for('student.student_dashboard'))
+
+    content = request.form.get('content', '')
+
+    # Calculate late submission penalty
+    is_late = 0
+    late_days = 0
+    late_penalty = 0
+
+    due_date = activity['due_date'] if 'due_date' in keys else None
+    due_time = activity['due_time'] if 'due_time' in keys else '23:59'
+    late_penalty_per_day = activity['late_penalty_per_day'] if 'late_penalty_per_day' in keys else 1
+
+    if due_date:
+        # Combine due date and time
+        due_datetime_str = f"{due_date} {due_time or '23:59'}"
+        try:
+            due_datetime = datetime.strptime(due_datetime_str, '%Y-%m-%d %H:%M')
+            now = datetime.now()
+
+            if now > due_datetime:
+                is_late = 1
+                # Calculate days late (every 24 hours = 1 day)
+                time_diff = now - due_datetime
+                late_days = time_diff.days + (1 if time_diff.seconds > 0 else 0)
+                late_penalty = late_days * late_penalty_per_day
+        except ValueError:
+            pass  # If date parsing fails, don't apply penalty
+
+    # Handle multiple file uploads
+    uploaded_files = []
+    files = request.files.getlist('submission_files')
+
+    # Also check for single file upload (backwards compatibility)
+    if not files or (len(files) == 1 and not files[0].filename):
+        if 'submission_file' in request.files:
+            single_file = request.files['submission_file']
+            if single_file and single_file.filename:
+                files = [single_file]
+
+    # Create activity-specific folder
+    activity_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'activity_submissions', f"activity_{activity_id}")
+    os.makedirs(activity_folder, exist_ok=True)
+
+    first_file_path = None
+    for file in files:
+        if file and file.filename:
+            safe_filename = secure_filename(file.filename)
+            timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            filename = f"student_{current_user.id}_{timestamp}_{safe_filename}"
+            file.save(os.path.join(activity_folder, filename))
+            file_path = f"activity_{activity_id}/{filename}"
+
+            if first_file_path is None:
+                first_file_path = file_path
+
+            uploaded_files.append({
+                'file_path': file_path,
+                'file_name': file.filename
+            })
+
+    # Check if already submitted
+    cursor.execute('SELECT id FROM submissions WHERE activity_id = ? AND student_id = ?',
+                   (activity_id, current_user.id))
+    existing = cursor.fetchone()
+
+    if existing:
+        submission_id = existing['id']
+        # Update existing submission with late info
+        cursor.execute('''
+            UPDATE submissions SET content = ?, file_path = ?, submitted_at = CURRENT_TIMESTAMP,
+            is_late = ?, late_days = ?, late_penalty = ?
+            WHERE activity_id = ? AND student_id = ?
+        ''', (content, first_file_path, is_late, late_days, late_penalty, activity_id, current_user.id))
+
+        # Delete old files from submission_files table
+        cursor.execute('DELETE FROM submission_files WHERE submission_id = ?', (submission_id,))
+    else:
+        cursor.execute('''
+            INSERT INTO submissions (activity_id, student_id, content, file_path, is_late, late_days, late_penalty)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (activity_id, current_user.id, content, first_file_path, is_late, late_days, late_penalty))
+        submission_id = cursor.lastrowid
+
+    # Insert all uploaded files into submission_files table
+    for file_info in uploaded_files:
+        cursor.execute('''
+            INSERT INTO submission_files (submission_id, file_path, file_name)
+            VALUES (?, ?, ?)
+        ''', (submission_id, file_info['file_path'], file_info['file_name']))
+
+    # Note: step_activity is NOT marked here on submission.
+    # It will be marked when the instructor grades the submission (grade_activity route).
+
+    conn.commit()
+    conn.close()
+    learning_events.record('activity_submitted', current_user.id, subject_id=activity['subject_id'],
+                           session_id=activity['session_id'], activity_id=activity_id, late=bool(is_late))
+
+    if is_late:
+        flash(f'Activity submitted successfully! Note: Your submission is {late_days} day(s) late with a penalty of {late_penalty} point(s).', 'warning')
+    else:
+        flash('Activity submitted successfully!', 'success')
+    return redirect(url_for('student.student_dashboard'))
+
+@bp.route('/activity/<int:activity_id>/grade', methods=['POST'])
+@login_required
+def grade_activity(activity_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    submission_id = request.form['submission_id']
+    instructor_score = float(request.form['score'])
+    feedback = request.form['feedback']
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get the submission and activity info
+    cursor.execute('''
+        SELECT s.*, a.points, a.enable_peer_review, a.session_id as activity_session_id
+        FROM submissions s
+        JOIN activities a ON s.activity_id = a.id
+        WHERE s.id = ?
+    ''', (submission_id,))
+    submission = cursor.fetchone()
+
+    if not submission:
+        flash('Submission not found', 'error')
+        conn.close()
+        return redirect(url_for('grading.view_submissions', activity_id=activity_id))
+
+    student_id = submission['student_id']
+    max_points = submission['points']
+    enable_peer_review = submission['enable_peer_review'] if 'enable_peer_review' in submission.keys() else 0
+
+    # Calculate final score based on peer review enabled or not
+    if enable_peer_review:
+        # Get peer review score (25% weight) - now stored as percentage (60-100)
+        peer_review_score = submission['peer_review_score'] if submission['peer_review_score'] else 60
+
+        # Calculate participation score (25% weight) - returns percentage (0-100)
+        # Based on: completed reviews + quality of reviews
+        participation_score = calculate_participation_score(cursor, student_id, activity_id, max_points)
+
+        # Calculate weighted final score
+        # 25% peer review + 25% participation + 50% instructor
+        # peer_review_score is already 60-100 (percentage)
+        # participation_score is already 0-100 (percentage)
+        # instructor_score needs to be converted to percentage
+        peer_component = (peer_review_score / 100) * 25
+        participation_component = (participation_score / 100) * 25
+        instructor_component = (instructor_score / max_points) * 50 if max_points > 0 else 0
+
+        # Final score as percentage, then converted to points
+        final_percentage = peer_component + participation_component + instructor_component
+        final_score = (final_percentage / 100) * max_points
+
+        # Apply late penalty if any
+        late_penalty = submission['late_penalty'] if submission['late_penalty'] else 0
+        final_score = max(0, final_score - late_penalty)
+
+        cursor.execute('''
+            UPDATE submissions
+            SET score = ?, instructor_score = ?, participation_score = ?, final_score = ?, feedback = ?
+            WHERE id = ?
+        ''', (instructor_score, instructor_score, participation_score, final_score, feedback, submission_id))
+    else:
+        # No peer review - instructor score is the final score
+        late_penalty = submission['late_penalty'] if submission['late_penalty'] else 0
+        final_score = max(0, instructor_score - late_penalty)
+
+        cursor.execute('''
+            UPDATE submissions
+            SET score = ?, instructor_score = ?, final_score = ?, feedback = ?
+            WHERE id = ?
+        ''', (instructor_score, instructor_score, final_score, feedback, submission_id))
+
+    # Check if ALL visible activities for this session are graded for this student
+    act_session_id = submission['activity_session_id']
+    cursor.execute('''
+        SELECT COUNT(*) as total FROM activities WHERE session_id = ? AND is_visible = 1
+    ''', (act_session_id,))
+    total_activities = cursor.fetchone()['total']
+
+    cursor.execute('''
+        SELECT COUNT(DISTINCT a.id) as graded
+        FROM activities a
+        JOIN submissions s ON s.activity_id = a.id
+        WHERE a.session_id = ? AND s.student_id = ? AND s.final_score IS NOT NULL AND a.is_visible = 1
+    ''', (act_session_id, student_id))
+    graded_activities = cursor.fetchone()['graded']
+
+    if graded_activities >= total_activities:
+        cursor.execute('''
+            INSERT INTO session_progress (session_id, student_id, step_activity)
+            VALUES (?, ?, 1)
+            ON CONFLICT(session_id, student_id) DO UPDATE SET step_activity = 1
+        ''', (act_session_id, student_id))
+        check_and_mark_session_complete(cursor, act_session_id, student_id)
+
+    conn.commit()
+    conn.close()
+    flash('Grade saved successfully!', 'success')
+
+    # Support redirecting back to peer review status page
+    redirect_to = request.form.get('redirect_to', '')
+    if redirect_to == 'peer_review_status':
+        return redirect(url_for('peer_review.peer_review_status', activity_id=activity_id))
+    return redirect(url_for('grading.view_submissions', activity_id=activity_id))
+
+@bp.route('/activity/<int:activity_id>/submissions')
+@login_required
+def view_submissions(activity_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+    cursor.execute('''
+        SELECT s.*, u.full_name, u.student_id as sid
+        FROM submissions s
+        JOIN users u ON s.student_id = u.id
+        WHERE s.activity_id = ?
+        ORDER BY s.submitted_at
+    ''', (activity_id,))
+    submissions_raw = cursor.fetchall()
+
+    # Fetch all files for each submission
+    submissions = []
+    for sub in submissions_raw:
+        sub_dict = dict(sub)
+        cursor.execute('''
+            SELECT * FROM submission_files WHERE submission_id = ?
+        ''', (sub['id'],))
+        sub_dict['files'] = cursor.fetchall()
+        submissions.append(sub_dict)
+
+    conn.close()
+    return render_template('submissions.html', activity=activity, submissions=submissions)
+
+
+# ==================== QUIZZES ====================
+
+@bp.route('/session/<int:session_id>/quiz')
+@login_required
+def session_quiz(session_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, sub.code as subject_code
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id,))
+    session_data = cursor.fetchone()
+    cursor.execute('SELECT * FROM quizzes WHERE session_id = ?', (session_id,))
+    quiz = cursor.fetchone()
+
+    questions = []
+    if quiz:
+        cursor.execute('SELECT * FROM quiz_questions WHERE quiz_id = ? ORDER BY id', (quiz['id'],))
+        questions = cursor.fetchall()
+
+    conn.close()
+    return render_template('quiz.html', session=session_data, quiz=quiz, questions=questions)
+
+@bp.route('/quiz/create/<int:session_id>', methods=['POST'])
+@login_required
+def create_quiz(session_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    title = request.form['title']
+    time_limit = request.form.get('time_limit', 0)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO quizzes (session_id, title, time_limit)
+        VALUES (?, ?, ?)
+    ''', (session_id, title, time_limit))
+    invalidate_journey_tree_for(cursor, session_id=session_id)
+    conn.commit()
+    conn.close()
+    flash('Quiz created successfully! Now add questions.', 'success')
+    return redirect(url_for('grading.session_quiz', session_id=session_id))
+
+@bp.route('/quiz/<int:quiz_id>/add-question', methods=['POST'])
+@login_required
+def add_quiz_question(quiz_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    question_text = request.form['question_text']
+    question_type = request.form['question_type']
+    options_raw = request.form.get('options', '')
+    correct_answer = request.form['correct_answer']
+    points = request.form.get('points', 1)
+
+    # Convert options from newline-separated to JSON array
+    if question_type == 'multiple_choice' and options_raw:
+        opts_list = [o.strip() for o in options_raw.strip().split('\n') if o.strip()]
+        options = json.dumps(opts_list)
+    elif question_type == 'true_false':
+        options = json.dumps(['True', 'False'])
+    else:
+        options = ''
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO quiz_questions (quiz_id, question_text, question_type, options, correct_answer, points)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (quiz_id, question_text, question_type, options, correct_answer, points))
+    answer_keys.bump_version(cursor, 'quiz', quiz_id)
+    invalidate_journey_tree_for(cursor, quiz_id=quiz_id)
+
+    conn.commit()
+    conn.close()
+    flash('Question added successfully!', 'success')
+
+    # Redirect back to manage page if that's where we came from
+    if request.form.get('from_manage'):
+        return redirect(url_for('grading.manage_quiz', quiz_id=quiz_id))
+
+    cursor2 = get_db()
+    c2 = cursor2.cursor()
+    c2.execute('SELECT session_id FROM quizzes WHERE id = ?', (quiz_id,))
+    session_id = c2.fetchone()['session_id']
+    cursor2.close()
+    return redirect(url_for('grading.session_quiz', session_id=session_id))
+
+
+@bp.route('/quiz/<int:quiz_id>/manage')
+@login_required
+def manage_quiz(quiz_id):
+    """Instructor quiz management - edit/add/remove questions"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT q.*, s.title as session_title, s.session_number, s.subject_id,
+               sub.name as subject_name, sub.section
+        FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE q.id = ?
+    ''', (quiz_id,))
+    quiz = cursor.fetchone()
+    if not quiz:
+        conn.close()
+        flash('Quiz not found.', 'error')
+        return redirect(url_for('games.student_performance'))
+
+    cursor.execute('SELECT * FROM quiz_questions WHERE quiz_id = ? ORDER BY id', (quiz_id,))
+    questions = cursor.fetchall()
+
+    conn.close()
+    return render_template('manage_quiz.html', quiz=quiz, questions=questions)
+
+
+@bp.route('/quiz/<int:quiz_id>/edit-question/<int:question_id>', methods=['POST'])
+@login_required
+def edit_quiz_question(quiz_id, question_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    question_text = request.form['question_text']
+    question_type = request.form['question_type']
+    correct_answer = request.form['correct_answer']
+    options = request.form.get('options', '')
+
+    # Convert options from newline-separated to JSON array
+    if question_type == 'multiple_choice' and options:
+        opts_list = [o.strip() for o in options.strip().split('\n') if o.strip()]
+        options = json.dumps(opts_list)
+    elif question_type == 'true_false':
+        options = json.dumps(['True', 'False'])
+    else:
+        options = ''
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT correct_answer FROM quiz_questions WHERE id = ? AND quiz_id = ?', (question_id, quiz_id))
+    old_question = cursor.fetchone()
+    if old_question and item_analysis.normalize_answer(old_question['correct_answer']) != item_analysis.normalize_answer(correct_answer):
+        # Outcomes graded against the old key no longer mean anything
+        item_analysis.clear_question_stats(cursor, 'quiz', [question_id])
+    cursor.execute('''
+        UPDATE quiz_questions SET question_text = ?, question_type = ?, options = ?, correct_answer = ?
+        WHERE id = ? AND quiz_id = ?
+    ''', (question_text, question_type, options, correct_answer, question_id, quiz_id))
+    answer_keys.bump_version(cursor, 'quiz', quiz_id)
+    conn.commit()
+    conn.close()
+    flash('Question updated successfully!', 'success')
+    return redirect(url_for('grading.manage_quiz', quiz_id=quiz_id))
+
+
+@bp.route('/quiz/<int:quiz_id>/delete-question/<int:question_id>', methods=['POST'])
+@login_required
+def delete_quiz_question(quiz_id, question_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM quiz_questions WHERE id = ? AND quiz_id = ?', (question_id, quiz_id))
+    if cursor.rowcount:
+        item_analysis.clear_question_stats(cursor, 'quiz', [question_id])
+        answer_keys.bump_version(cursor, 'quiz', quiz_id)
+        invalidate_journey_tree_for(cursor, quiz_id=quiz_id)
+    conn.commit()
+    conn.close()
+    flash('Question deleted.', 'success')
+    return redirect(url_for('grading.manage_quiz', quiz_id=quiz_id))
+
+
+@bp.route('/quiz/<int:quiz_id>/edit', methods=['POST'])
+@login_required
+def edit_quiz(quiz_id):
+    """Edit quiz title and time limit"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    title = request.form['title']
+    time_limit = request.form.get('time_limit', 0)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE quizzes SET title = ?, time_limit = ? WHERE id = ?',
+                   (title, time_limit, quiz_id))
+    invalidate_journey_tree_for(cursor, quiz_id=quiz_id)
+    conn.commit()
+    conn.close()
+    flash('Quiz updated successfully!', 'success')
+    return redirect(url_for('grading.manage_quiz', quiz_id=quiz_id))
+
+
+@bp.route('/quiz/<int:quiz_id>/delete', methods=['POST'])
+@login_required
+def delete_quiz(quiz_id):
+    """Delete entire quiz and its questions"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM quiz_questions WHERE quiz_id = ?', (quiz_id,))
+    item_analysis.clear_question_stats(cursor, 'quiz', [r['id'] for r in cursor.fetchall()])
+    invalidate_journey_tree_for(cursor, quiz_id=quiz_id)
+    cursor.execute('DELETE FROM quiz_questions WHERE quiz_id = ?', (quiz_id,))
+    cursor.execute('DELETE FROM quiz_attempts WHERE quiz_id = ?', (quiz_id,))
+    cursor.execute('DELETE FROM quizzes WHERE id = ?', (quiz_id,))
+    conn.commit()
+    conn.close()
+    flash('Quiz deleted successfully.', 'success')
+    return redirect(url_for('games.student_performance'))
+
+
+@bp.route('/quiz/<int:quiz_id>/take')
+@login_required
+def take_quiz(quiz_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get quiz and check visibility
+    cursor.execute('SELECT * FROM quizzes WHERE id = ?', (quiz_id,))
+    quiz = cursor.fetchone()
+
+    if not quiz:
+        conn.close()
+        flash('Quiz not found.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    # Check if quiz is visible to students
+    if not quiz['is_visible']:
+        conn.close()
+        flash('This quiz is not yet available.', 'warning')
+        return redirect(url_for('student.student_dashboard'))
+
+    # Check session progress — must complete activity step before quiz
+    session_id_for_quiz = quiz['session_id']
+    if not check_previous_session_complete(cursor, session_id_for_quiz, current_user.id):
+        conn.close()
+        flash('You must complete the previous session first.', 'warning')
+        return redirect(url_for('student.student_dashboard'))
+
+    progress = get_session_progress(cursor, session_id_for_quiz, current_user.id)
+    if not progress['step_activity']:
+        conn.close()
+        flash('You must complete the activity before taking the quiz.', 'warning')
+        return redirect(url_for('student.student_session_activities', session_id=session_id_for_quiz))
+
+    # Check if already taken
+    cursor.execute('SELECT * FROM quiz_attempts WHERE quiz_id = ? AND student_id = ?',
+                   (quiz_id, current_user.id))
+    attempt = cursor.fetchone()
+
+    if attempt:
+        conn.close()
+        flash('You have already taken this quiz.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    cursor.execute('SELECT id, question_text, question_type, options, points FROM quiz_questions WHERE quiz_id = ? ORDER BY id', (quiz_id,))
+    questions = cursor.fetchall()
+
+    # Get session data for stepper
+    cursor.execute('''
+        SELECT s.*, sub.code as subject_code, sub.name as subject_name, sub.id as subject_id
+        FROM sessions s JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id_for_quiz,))
+    session_data = cursor.fetchone()
+
+    conn.close()
+
+    return render_template('quiz_take.html', quiz=quiz, questions=questions,
+                           session=session_data, progress=progress)
+
+@bp.route('/quiz/<int:quiz_id>/submit', methods=['POST'])
+@login_required
+def submit_quiz(quiz_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT session_id, COALESCE(question_version, 0) AS question_version FROM quizzes WHERE id = ?',
+                   (quiz_id,))
+    quiz_row = cursor.fetchone()
+    questions = answer_keys.questions(cursor, 'quiz', quiz_id, quiz_row['question_version'] if quiz_row else None)
+
+    answers = {str(q['id']): request.form.get(f'q_{q["id"]}', '') for q in questions}
+    total_score, max_score, _ = item_analysis.grade_answers(questions, answers)
+
+    percentage = (total_score / max_score * 100) if max_score > 0 else 0
+
+    cursor.execute('''
+        INSERT INTO quiz_attempts (quiz_id, student_id, answers, score)
+        VALUES (?, ?, ?, ?)
+    ''', (quiz_id, current_user.id, json.dumps(answers), percentage))
+    item_analysis.record_question_stats(cursor, 'quiz', quiz_id, questions, answers)
+
+    # Mark quiz step complete in session progress
+    if quiz_row:
+        cursor.execute('''
+            INSERT INTO session_progress (session_id, student_id, step_quiz)
+            VALUES (?, ?, 1)
+            ON CONFLICT(session_id, student_id) DO UPDATE SET step_quiz = 1
+        ''', (quiz_row['session_id'], current_user.id))
+        check_and_mark_session_complete(cursor, quiz_row['session_id'], current_user.id)
+
+    conn.commit()
+    conn.close()
+    learning_events.record('quiz_submitted', current_user.id, session_id=quiz_row['session_id'] if quiz_row else None,
+                           quiz_id=quiz_id, score=round(percentage, 1))
+
+    flash(f'Quiz submitted! Your score: {total_score}/{max_score} ({percentage:.1f}%)', 'success')
+    return redirect(url_for('student.student_dashboard'))
+
+
+# ==================== EXAMS ====================
+
+@bp.route('/subject/<int:subject_id>/exams')
+@login_required
+def subject_exams(subject_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+    subject = cursor.fetchone()
+    cursor.execute('SELECT * FROM exams WHERE subject_id = ? ORDER BY exam_type', (subject_id,))
+    exams = cursor.fetchall()
+    conn.close()
+    return render_template('exams.html', subject=subject, exams=exams)
+
+@bp.route('/exam/create/<int:subject_id>', methods=['POST'])
+@login_required
+def create_exam(subject_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    title = request.form['title']
+    exam_type = request.form['exam_type']
+    time_limit = request.form.get('time_limit', 0)
+    total_points = request.form.get('total_points', 100)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO exams (subject_id, exam_type, title, time_limit, total_points)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (subject_id, exam_type, title, time_limit, total_points))
+    conn.commit()
+    conn.close()
+    flash('Exam created successfully! Now add questions.', 'success')
+    return redirect(url_for('grading.subject_exams', subject_id=subject_id))
+
+@bp.route('/exam/<int:exam_id>/questions')
+@login_required
+def exam_questions(exam_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT e.*, s.code as subject_code FROM exams e JOIN subjects s ON e.subject_id = s.id WHERE e.id = ?', (exam_id,))
+    exam = cursor.fetchone()
+    cursor.execute('SELECT * FROM exam_questions WHERE exam_id = ? ORDER BY id', (exam_id,))
+    questions = cursor.fetchall()
+    conn.close()
+    return render_template('exam_questions.html', exam=exam, questions=questions)
+
+@bp.route('/exam/<int:exam_id>/add-question', methods=['POST'])
+@login_required
+def add_exam_question(exam_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    question_text = request.form['question_text']
+    question_type = request.form['question_type']
+    options = request.form.get('options', '')
+    correct_answer = request.form['correct_answer']
+    points = request.form.get('points', 1)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO exam_questions (exam_id, question_text, question_type, options, correct_answer, points)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (exam_id, question_text, question_type, options, correct_answer, points))
+    answer_keys.bump_version(cursor, 'exam', exam_id)
+    conn.commit()
+    conn.close()
+    flash('Question added successfully!', 'success')
+    return redirect(url_for('grading.exam_questions', exam_id=exam_id))
+
+@bp.route('/exam/<int:exam_id>/take')
+@login_required
+def take_exam(exam_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get exam and check visibility
+    cursor.execute('SELECT * FROM exams WHERE id = ?', (exam_id,))
+    exam = cursor.fetchone()
+
+    if not exam:
+        conn.close()
+        flash('Exam not found.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    # Check if exam is visible to students
+    if not exam['is_visible']:
+        conn.close()
+        flash('This exam is not yet available.', 'warning')
+        return redirect(url_for('student.student_dashboard'))
+
+    cursor.execute('SELECT * FROM exam_attempts WHERE exam_id = ? AND student_id = ?',
+                   (exam_id, current_user.id))
+    attempt = cursor.fetchone()
+
+    if attempt:
+        conn.close()
+        flash('You have already taken this exam.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    cursor.execute('SELECT id, question_text, question_type, options, points FROM exam_questions WHERE exam_id = ? ORDER BY id', (exam_id,))
+    questions = cursor.fetchall()
+    conn.close()
+
+    return render_template('exam_take.html', exam=exam, questions=questions)
+
+@bp.route('/exam/<int:exam_id>/submit', methods=['POST'])
+@login_required
+def submit_exam(exam_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT subject_id, COALESCE(question_version, 0) AS question_version FROM exams WHERE id = ?',
+                   (exam_id,))
+    exam_row = cursor.fetchone()
+    questions = answer_keys.questions(cursor, 'exam', exam_id, exam_row['question_version'] if exam_row else None)
+
+    answers = {str(q['id']): request.form.get(f'q_{q["id"]}', '') for q in questions}
+    total_score, max_score, _ = item_analysis.grade_answers(questions, answers)
+
+    percentage = (total_score / max_score * 100) if max_score > 0 else 0
+
+    cursor.execute('''
+        INSERT INTO exam_attempts (exam_id, student_id, answers, score)
+        VALUES (?, ?, ?, ?)
+    ''', (exam_id, current_user.id, json.dumps(answers), percentage))
+    item_analysis.record_question_stats(cursor, 'exam', exam_id, questions, answers)
+
+    conn.commit()
+    conn.close()
+    learning_events.record('exam_submitted', current_user.id, subject_id=exam_row['subject_id'] if exam_row else None,
+                           exam_id=exam_id, score=round(percentage, 1))
+
+    flash(f'Exam submitted! Your score: {total_score}/{max_score} ({percentage:.1f}%)', 'success')
+    return redirect(url_for('student.student_dashboard'))
+
+@bp.route('/api/quiz/<int:quiz_id>/item-analysis')
+@login_required
+def quiz_item_analysis(quiz_id):
+    """Difficulty and discrimination per question, served from quiz_question_stats"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, title FROM quizzes WHERE id = ?', (quiz_id,))
+    quiz = cursor.fetchone()
+    if not quiz:
+        conn.close()
+        return jsonify({'error': 'Quiz not found'}), 404
+    items = item_analysis.analyze(cursor, 'quiz', quiz_id)
+    conn.close()
+    return jsonify({'quiz_id': quiz_id, 'title': quiz['title'], 'items': items})
+
+
+@bp.route('/api/exam/<int:exam_id>/item-analysis')
+@login_required
+def exam_item_analysis(exam_id):
+    """Difficulty and discrimination per question, served from exam_question_stats"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, title FROM exams WHERE id = ?', (exam_id,))
+    exam = cursor.fetchone()
+    if not exam:
+        conn.close()
+        return jsonify({'error': 'Exam not found'}), 404
+    items = item_analysis.analyze(cursor, 'exam', exam_id)
+    conn.close()
+    return jsonify({'exam_id': exam_id, 'title': exam['title'], 'items': items})
+
+
+# ==================== GRADES ====================
+
+@bp.route('/grades')
+@login_required
+def grades():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    filter_subject = request.args.get('subject_id', '')
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+    cursor.execute("SELECT * FROM users WHERE role = 'student' ORDER BY full_name")
+    students = cursor.fetchall()
+
+    # Get distinct sections for filter
+    cursor.execute("SELECT DISTINCT section FROM users WHERE role = 'student' AND section IS NOT NULL ORDER BY section")
+    sections = [r['section'] for r in cursor.fetchall()]
+
+    # Build grade summary per student (across all enrolled subjects or filtered subject)
+    student_grades_map = {}
+    for student in students:
+        # Get enrolled subjects
+        cursor.execute('''
+            SELECT s.* FROM subjects s
+            INNER JOIN enrollments e ON s.id = e.subject_id
+            WHERE e.student_id = ?
+            ORDER BY s.code
+        ''', (student['id'],))
+        enrolled_subjects = cursor.fetchall()
+
+        subject_grades = []
+        for subj in enrolled_subjects:
+            weights = get_grade_weights(subj['code'])
+
+            # Activity avg
+            cursor.execute('''
+                SELECT AVG(sub.score) as avg_score
+                FROM submissions sub
+                JOIN activities a ON sub.activity_id = a.id
+                JOIN sessions ses ON a.session_id = ses.id
+                WHERE ses.subject_id = ? AND sub.student_id = ? AND sub.score IS NOT NULL AND sub.score_visible = 1
+            ''', (subj['id'], student['id']))
+            row = cursor.fetchone()
+            activity_avg = row['avg_score'] if row and row['avg_score'] else 0
+
+            # Quiz avg
+            cursor.execute('''
+                SELECT AVG(qa.score) as avg_score
+                FROM quiz_attempts qa
+                JOIN quizzes q ON qa.quiz_id = q.id
+                JOIN sessions ses ON q.session_id = ses.id
+                WHERE ses.subject_id = ? AND qa.student_id = ? AND qa.score IS NOT NULL AND qa.score_visible = 1
+            ''', (subj['id'], student['id']))
+            row = cursor.fetchone()
+            quiz_avg = row['avg_score'] if row and row['avg_score'] else 0
+
+            # Exam scores
+            cursor.execute('''
+                SELECT ea.score, e.exam_type
+                FROM exam_attempts ea
+                JOIN exams e ON ea.exam_id = e.id
+                WHERE e.subject_id = ? AND ea.student_id = ? AND ea.score_visible = 1
+            ''', (subj['id'], student['id']))
+            midterm = None
+            final_exam = None
+            for exam in cursor.fetchall():
+                if exam['exam_type'] == 'midterm':
+                    midterm = exam['score']
+                elif exam['exam_type'] == 'final':
+                    final_exam = exam['score']
+
+            weighted = (
+                (activity_avg * weights['activities']) +
+                (quiz_avg * weights['quizzes']) +
+                ((midterm or 0) * weights['midterm']) +
+                ((final_exam or 0) * weights['final'])
+            )
+            pup_grade = get_pup_grade(weighted)
+
+            subject_grades.append({
+                'subject_id': subj['id'],
+                'code': subj['code'],
+                'section': subj['section'],
+                'activity_avg': round(activity_avg, 1),
+                'quiz_avg': round(quiz_avg, 1),
+                'midterm': round(midterm, 1) if midterm is not None else None,
+                'final': round(final_exam, 1) if final_exam is not None else None,
+                'weighted': round(weighted, 2),
+                'pup_grade': pup_grade,
+                'passed': pup_grade <= 3.00
+            })
+
+        student_grades_map[student['id']] = subject_grades
+
+    conn.close()
+    return render_template('grades.html', subjects=subjects, students=students,
+                           sections=sections, student_grades_map=student_grades_map,
+                           filter_subject=filter_subject)
+
+@bp.route('/grades/download')
+@login_required
+def download_grades_csv():
+    """Download grade book as CSV"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    subject_id = request.args.get('subject_id', type=int)
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM users WHERE role = 'student' ORDER BY full_name")
+    students = cursor.fetchall()
+
+    import io, csv
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    if subject_id:
+        cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+        subj = cursor.fetchone()
+        if not subj:
+            conn.close()
+            flash('Subject not found', 'error')
+            return redirect(url_for('grading.grades'))
+
+        writer.writerow(['Student ID', 'Full Name', 'Section', 'Subject',
+                         'Activity Avg', 'Quiz Avg', 'Midterm', 'Final',
+                         'Weighted Avg', 'PUP Grade', 'Status'])
+
+        weights = get_grade_weights(subj['code'])
+        for student in students:
+            cursor.execute('SELECT 1 FROM enrollments WHERE student_id = ? AND subject_id = ?',
+                           (student['id'], subject_id))
+            if not cursor.fetchone():
+                continue
+
+            cursor.execute('''
+                SELECT AVG(sub.score) as avg FROM submissions sub
+                JOIN activities a ON sub.activity_id = a.id JOIN sessions ses ON a.session_id = ses.id
+                WHERE ses.subject_id = ? AND sub.student_id = ? AND sub.score IS NOT NULL AND sub.score_visible = 1
+            ''', (subject_id, student['id']))
+            act_avg = cursor.fetchone()['avg'] or 0
+
+            cursor.execute('''
+                SELECT AVG(qa.score) as avg FROM quiz_attempts qa
+                JOIN quizzes q ON qa.quiz_id = q.id JOIN sessions ses ON q.session_id = ses.id
+                WHERE ses.subject_id = ? AND qa.student_id = ? AND qa.score IS NOT NULL AND qa.score_visible = 1
+            ''', (subject_id, student['id']))
+            quiz_avg = cursor.fetchone()['avg'] or 0
+
+            cursor.execute('''
+                SELECT ea.score, e.exam_type FROM exam_attempts ea
+                JOIN exams e ON ea.exam_id = e.id
+                WHERE e.subject_id = ? AND ea.student_id = ? AND ea.score_visible = 1
+            ''', (subject_id, student['id']))
+            midterm = final_exam = None
+            for exam in cursor.fetchall():
+                if exam['exam_type'] == 'midterm':
+                    midterm = exam['score']
+                elif exam['exam_type'] == 'final':
+                    final_exam = exam['score']
+
+            weighted = (act_avg * weights['activities'] + quiz_avg * weights['quizzes'] +
+                        (midterm or 0) * weights['midterm'] + (final_exam or 0) * weights['final'])
+            pup = get_pup_grade(weighted)
+
+            writer.writerow([student['student_id'], student['full_name'], student['section'],
+                             f"{subj['code']} {subj['section']}",
+                             f"{act_avg:.1f}", f"{quiz_avg:.1f}",
+                             f"{midterm:.1f}" if midterm is not None else '--',
+                             f"{final_exam:.1f}" if final_exam is not None else '--',
+                             f"{weighted:.2f}%", f"{pup:.2f}",
+                             'PASSED' if pup <= 3.00 else 'FAILED'])
+    else:
+        writer.writerow(['Student ID', 'Full Name', 'Section', 'Subject',
+                         'Activity Avg', 'Quiz Avg', 'Midterm', 'Final',
+                         'Weighted Avg', 'PUP Grade', 'Status'])
+        for student in students:
+            cursor.execute('''
+                SELECT s.* FROM subjects s
+                INNER JOIN enrollments e ON s.id = e.subject_id
+                WHERE e.student_id = ? ORDER BY s.code
+            ''', (student['id'],))
+            for subj in cursor.fetchall():
+                weights = get_grade_weights(subj['code'])
+                cursor.execute('''
+                    SELECT AVG(sub.score) as avg FROM submissions sub
+                    JOIN activities a ON sub.activity_id = a.id JOIN sessions ses ON a.session_id = ses.id
+                    WHERE ses.subject_id = ? AND sub.student_id = ? AND sub.score IS NOT NULL AND sub.score_visible = 1
+                ''', (subj['id'], student['id']))
+                act_avg = cursor.fetchone()['avg'] or 0
+
+                cursor.execute('''
+                    SELECT AVG(qa.score) as avg FROM quiz_attempts qa
+                    JOIN quizzes q ON qa.quiz_id = q.id JOIN sessions ses ON q.session_id = ses.id
+                    WHERE ses.subject_id = ? AND qa.student_id = ? AND qa.score IS NOT NULL AND qa.score_visible = 1
+                ''', (subj['id'], student['id']))
+                quiz_avg = cursor.fetchone()['avg'] or 0
+
+                cursor.execute('''
+                    SELECT ea.score, e.exam_type FROM exam_attempts ea
+                    JOIN exams e ON ea.exam_id = e.id
+                    WHERE e.subject_id = ? AND ea.student_id = ? AND ea.score_visible = 1
+                ''', (subj['id'], student['id']))
+                midterm = final_exam = None
+                for exam in cursor.fetchall():
+                    if exam['exam_type'] == 'midterm':
+                        midterm = exam['score']
+                    elif exam['exam_type'] == 'final':
+                        final_exam = exam['score']
+
+                weighted = (act_avg * weights['activities'] + quiz_avg * weights['quizzes'] +
+                            (midterm or 0) * weights['midterm'] + (final_exam or 0) * weights['final'])
+                pup = get_pup_grade(weighted)
+
+                writer.writerow([student['student_id'], student['full_name'], student['section'],
+                                 f"{subj['code']} {subj['section']}",
+                                 f"{act_avg:.1f}", f"{quiz_avg:.1f}",
+                                 f"{midterm:.1f}" if midterm is not None else '--',
+                                 f"{final_exam:.1f}" if final_exam is not None else '--',
+                                 f"{weighted:.2f}%", f"{pup:.2f}",
+                                 'PASSED' if pup <= 3.00 else 'FAILED'])
+
+    conn.close()
+    from flask import Response
+    return Response(
+        output.getvalue(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=grade_book.csv'}
+    )
+
+
+@bp.route('/grades/student/<int:student_id>')
+@login_required
+def student_grades(student_id):
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM users WHERE id = ?', (student_id,))
+    student = cursor.fetchone()
+
+    # For students viewing their own grades, only show enrolled subjects
+    if current_user.role == 'student':
+        if current_user.id != student_id:
+            flash('You can only view your own grades.', 'error')
+            conn.close()
+            return redirect(url_for('student.student_dashboard'))
+
+    # Always show only enrolled subjects (for both students and instructors)
+    cursor.execute('''
+        SELECT s.* FROM subjects s
+        INNER JOIN enrollments e ON s.id = e.subject_id
+        WHERE e.student_id = ?
+        ORDER BY s.code
+    ''', (student_id,))
+    subjects = cursor.fetchall()
+
+    grades_data = []
+    for subject in subjects:
+        # Get subject-specific grade weights
+        weights = get_grade_weights(subject['code'])
+
+        # Get individual quiz scores (up to 12 quizzes)
+        cursor.execute('''
+            SELECT q.id, s.session_number, qa.score, qa.score_visible
+            FROM quizzes q
+            JOIN sessions s ON q.session_id = s.id
+            LEFT JOIN quiz_attempts qa ON q.id = qa.quiz_id AND qa.student_id = ?
+            WHERE s.subject_id = ?
+            ORDER BY s.session_number
+            LIMIT 12
+        ''', (student_id, subject['id']))
+        quiz_scores = []
+        for row in cursor.fetchall():
+            quiz_scores.append({
+                'session': row['session_number'],
+                'score': row['score'] if row['score'] is not None and row['score_visible'] else None,
+                'pending': row['score'] is not None and not row['score_visible']
+            })
+        # Pad to 12 quizzes if less
+        while len(quiz_scores) < 12:
+            quiz_scores.append({'session': len(quiz_scores) + 1, 'score': None, 'pending': False})
+
+        # Get individual activity scores (up to 12 activities)
+        cursor.execute('''
+            SELECT a.id, a.activity_number, s.session_number, sub.score, sub.score_visible
+            FROM activities a
+            JOIN sessions s ON a.session_id = s.id
+            LEFT JOIN submissions sub ON a.id = sub.activity_id AND sub.student_id = ?
+            WHERE s.subject_id = ?
+            ORDER BY s.session_number, a.activity_number
+            LIMIT 12
+        ''', (student_id, subject['id']))
+        activity_scores = []
+        for row in cursor.fetchall():
+            activity_scores.append({
+                'session': row['session_number'],
+                'activity_num': row['activity_number'],
+                'score': row['score'] if row['score'] is not None and row['score_visible'] else None,
+                'pending': row['score'] is not None and not row['score_visible']
+            })
+        # Pad to 12 activities if less
+        while len(activity_scores) < 12:
+            activity_scores.append({'session': len(activity_scores) + 1, 'activity_num': 1, 'score': None, 'pending': False})
+
+        # Calculate averages for weighted calculation
+        valid_quiz_scores = [q['score'] for q in quiz_scores if q['score'] is not None]
+        quiz_avg = sum(valid_quiz_scores) / len(valid_quiz_scores) if valid_quiz_scores else 0
+
+        valid_activity_scores = [a['score'] for a in activity_scores if a['score'] is not None]
+        activity_avg = sum(valid_activity_scores) / len(valid_activity_scores) if valid_activity_scores else 0
+
+        # Get exam scores
+        cursor.execute('''
+            SELECT ea.score, e.exam_type, ea.score_visible
+            FROM exam_attempts ea
+            JOIN exams e ON ea.exam_id = e.id
+            WHERE e.subject_id = ? AND ea.student_id = ?
+        ''', (subject['id'], student_id))
+        exams = cursor.fetchall()
+
+        midterm = None
+        midterm_pending = False
+        final_exam = None
+        final_pending = False
+        for exam in exams:
+            if exam['exam_type'] == 'midterm':
+                if exam['score_visible']:
+                    midterm = exam['score']
+                else:
+                    midterm_pending = True
+            elif exam['exam_type'] == 'final':
+                if exam['score_visible']:
+                    final_exam = exam['score']
+                else:
+                    final_pending = True
+
+        # Check for project grade if no final exam
+        project_grade = None
+        final_for_calc = final_exam or 0
+        if final_for_calc == 0:
+            proj = compute_project_grade(cursor, subject['id'], student_id)
+            if proj is not None and proj > 0:
+                project_grade = proj
+                final_for_calc = proj
+
+        # Calculate weighted grade based on subject-specific weights
+        # Activities: 50%, Quizzes: 10%, Midterm: 20%, Final: 20%
+        weighted = (
+            (activity_avg * weights['activities']) +
+            (quiz_avg * weights['quizzes']) +
+            ((midterm or 0) * weights['midterm']) +
+            (final_for_calc * weights['final'])
+        )
+
+        # Get PUP grade equivalent
+        pup_grade = get_pup_grade(weighted)
+
+        grades_data.append({
+            'subject': subject,
+            'quiz_scores': quiz_scores,
+            'activity_scores': activity_scores,
+            'quiz_avg': quiz_avg,
+            'activity_avg': activity_avg,
+            'midterm': midterm,
+            'midterm_pending': midterm_pending,
+            'final': final_exam,
+            'final_pending': final_pending,
+            'project_grade': project_grade,
+            'weighted': weighted,
+            'pup_grade': pup_grade,
+            'weights': weights
+        })
+
+    conn.close()
+    return render_template('student_grades.html', student=student, grades=grades_data)
@@ -0,0 +1,1601 @@
+"""Instructor dashboard, monitoring, student management, enrollment approval, project groups,
+attendance, payroll and own-subject CRUD."""
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask_login import login_required, current_user
+from werkzeug.security import generate_password_hash
+from werkzeug.utils import secure_filename
+
+from database import get_db
+import fragment_cache
+import learning_events
+import pagination
+import stats_counters
+import student_import
+
+from lms.common import (
+    build_guidance_message,
+    compute_weighted_grade,
+    get_session_progress,
+    invalidate_journey_tree,
+    invalidate_user_cache,
+    profile_required,
+    student_filters,
+)
+
+bp = Blueprint('instructor', __name__)
+
+
+# ==================== PROJECT GROUP MANAGEMENT ====================
+
+@bp.route('/subject/<int:subject_id>/groups')
+@login_required
+def project_groups(subject_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+    subject = cursor.fetchone()
+    if not subject:
+        conn.close()
+        flash('Subject not found', 'error')
+        return redirect(url_for('instructor.dashboard'))
+
+    # Get groups with members
+    cursor.execute('SELECT * FROM project_groups WHERE subject_id = ? ORDER BY group_number', (subject_id,))
+    groups = [dict(g) for g in cursor.fetchall()]
+    for group in groups:
+        cursor.execute('''
+            SELECT u.id, u.full_name, u.photo, u.student_id as sid, pgm.role
+            FROM project_group_members pgm
+            JOIN users u ON pgm.student_id = u.id
+            WHERE pgm.group_id = ?
+            ORDER BY pgm.role DESC, u.full_name
+        ''', (group['id'],))
+        group['members'] = [dict(m) for m in cursor.fetchall()]
+        cursor.execute('SELECT * FROM project_progress WHERE group_id = ? ORDER BY session_number', (group['id'],))
+        prog_rows = cursor.fetchall()
+        group['progress'] = {r['session_number']: dict(r) for r in prog_rows}
+        total_pct = sum(r['percentage'] for r in prog_rows)
+        group['avg_progress'] = total_pct / 4 if prog_rows else 0
+
+    # Get enrolled students for count
+    cursor.execute('''
+        SELECT COUNT(*) as cnt FROM users u
+        JOIN enrollments e ON u.id = e.student_id
+        WHERE e.subject_id = ? AND u.is_approved = 1
+    ''', (subject_id,))
+    total_enrolled = cursor.fetchone()['cnt']
+
+    conn.close()
+    return render_template('project_groups.html', subject=subject, groups=groups, total_enrolled=total_enrolled)
+
+
+def insert_project_groups(cursor, subject_id, groups):
+    """Create numbered groups (lists of {'id', 'full_name'}, leader first) with their
+    members, finals progress rows (sessions 13-16) and notifications, with one
+    executemany per table. Returns the number of rows written per table."""
+    cursor.executemany('INSERT INTO project_groups (subject_id, group_number, group_name) VALUES (?, ?, ?)',
+                       [(subject_id, gnum, f'Group {gnum}') for gnum in range(1, len(groups) + 1)])
+    cursor.execute('SELECT id, group_number FROM project_groups WHERE subject_id = ?', (subject_id,))
+    group_ids = {row['group_number']: row['id'] for row in cursor.fetchall()}
+
+    members, progress, notifications = [], [], []
+    for gnum, group_students in enumerate(groups, start=1):
+        group_id = group_ids[gnum]
+        member_names = ', '.join(s['full_name'] for s in group_students)
+        for j, student in enumerate(group_students):
+            members.append((group_id, student['id'], 'leader' if j == 0 else 'member'))
+            notifications.append((student['id'],
+                                  f'You have been assigned to Group {gnum} for the finals project! Members: {member_names}'))
+        progress.extend((group_id, sn) for sn in (13, 14, 15, 16))
+
+    cursor.executemany('INSERT INTO project_group_members (group_id, student_id, role) VALUES (?, ?, ?)', members)
+    cursor.executemany('INSERT OR IGNORE INTO project_progress (group_id, session_number, percentage) VALUES (?, ?, 0)',
+                       progress)
+    cursor.executemany('''
+        INSERT INTO notifications (user_id, type, icon, message, link)
+        VALUES (?, 'info', 'users', ?, '/student/dashboard')
+    ''', notifications)
+    return {'groups': len(groups), 'members': len(members), 'progress': len(progress),
+            'notifications': len(notifications)}
+
+
+@bp.route('/api/groups/assign/<int:subject_id>', methods=['POST'])
+@login_required
+def assign_project_groups(subject_id):
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    import random
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Check existing groups
+    cursor.execute('SELECT COUNT(*) as cnt FROM project_groups WHERE subject_id = ?', (subject_id,))
+    if cursor.fetchone()['cnt'] > 0:
+        conn.close()
+        return jsonify({'error': 'Groups already exist. Delete them first to re-randomize.'}), 400
+
+    # Get enrolled students
+    cursor.execute('''
+        SELECT u.id, u.full_name FROM users u
+        JOIN enrollments e ON u.id = e.student_id
+        WHERE e.subject_id = ? AND u.is_approved = 1
+        ORDER BY u.full_name
+    ''', (subject_id,))
+    students = [dict(s) for s in cursor.fetchall()]
+    if len(students) < 2:
+        conn.close()
+        return jsonify({'error': 'Need at least 2 enrolled students'}), 400
+
+    random.shuffle(students)
+
+    # Divide into groups of 3
+    groups = []
+    i = 0
+    while i < len(students):
+        remaining = len(students) - i
+        if remaining == 4:
+            groups.append(students[i:i+4])
+            i += 4
+        elif remaining == 2:
+            groups.append(students[i:i+2])
+            i += 2
+        else:
+            groups.append(students[i:i+3])
+            i += 3
+
+    counts = insert_project_groups(cursor, subject_id, groups)
+
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'groups_created': counts['groups'], 'students_assigned': counts['members'],
+                    'notifications': counts['notifications']})
+
+
+@bp.route('/api/groups/delete/<int:subject_id>', methods=['POST'])
+@login_required
+def delete_project_groups(subject_id):
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM project_groups WHERE subject_id = ?', (subject_id,))
+    group_ids = [r['id'] for r in cursor.fetchall()]
+    if group_ids:
+        ph = ','.join('?' * len(group_ids))
+        cursor.execute(f'DELETE FROM project_progress WHERE group_id IN ({ph})', group_ids)
+        cursor.execute(f'DELETE FROM project_group_members WHERE group_id IN ({ph})', group_ids)
+        cursor.execute('DELETE FROM project_groups WHERE subject_id = ?', (subject_id,))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/groups/progress', methods=['POST'])
+@login_required
+def update_group_progress():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.get_json()
+    group_id = data['group_id']
+    session_number = data['session_number']
+    percentage = min(100, max(0, int(data['percentage'])))
+    notes = data.get('notes', '')
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO project_progress (group_id, session_number, percentage, notes, updated_by, updated_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(group_id, session_number) DO UPDATE SET
+            percentage = ?, notes = ?, updated_by = ?, updated_at = CURRENT_TIMESTAMP
+    ''', (group_id, session_number, percentage, notes, current_user.id,
+          percentage, notes, current_user.id))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+# ==================== INSTRUCTOR MONITORING ====================
+
+@bp.route('/instructor/monitoring')
+@login_required
+def instructor_monitoring():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+    filter_subject = request.args.get('subject_id', type=int)
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+
+    at_risk_students = []
+    missed_deadline_count = 0
+    low_grade_count = 0
+    behind_count = 0
+
+    target_subjects = [s for s in subjects if s['id'] == filter_subject] if filter_subject else subjects
+    for subj in target_subjects:
+        cursor.execute('''
+            SELECT u.* FROM users u
+            JOIN enrollments e ON u.id = e.student_id
+            WHERE e.subject_id = ? AND u.is_approved = 1
+            ORDER BY u.full_name
+        ''', (subj['id'],))
+        students = cursor.fetchall()
+        for student in students:
+            issues = []
+            # 1. Missed deadlines
+            cursor.execute('''
+                SELECT a.title, a.due_date, ses.session_number
+                FROM activities a
+                JOIN sessions ses ON a.session_id = ses.id
+                WHERE ses.subject_id = ? AND a.due_date IS NOT NULL
+                AND a.due_date < date('now') AND a.is_visible = 1
+                AND a.id NOT IN (SELECT activity_id FROM submissions WHERE student_id = ?)
+            ''', (subj['id'], student['id']))
+            missed = cursor.fetchall()
+            for m in missed:
+                issues.append({'type': 'missed_deadline', 'severity': 'critical',
+                               'message': f'Missed {m["title"]} (Session {m["session_number"]}, due {m["due_date"]})',
+                               'icon': 'clock'})
+                missed_deadline_count += 1
+
+            # 2. Low grades
+            weighted = compute_weighted_grade(cursor, subj['id'], student['id'])
+            if weighted > 0 and weighted < 75:
+                issues.append({'type': 'low_grade', 'severity': 'critical',
+                               'message': f'Failing: {weighted:.1f}% (needs 75%)',
+                               'icon': 'exclamation-triangle'})
+                low_grade_count += 1
+            elif weighted > 0 and weighted < 82:
+                issues.append({'type': 'low_grade', 'severity': 'warning',
+                               'message': f'At risk: {weighted:.1f}%',
+                               'icon': 'exclamation-circle'})
+                low_grade_count += 1
+
+            # 3. Behind on sessions
+            cursor.execute('SELECT id FROM sessions WHERE subject_id = ? AND is_visible = 1', (subj['id'],))
+            visible_sessions = cursor.fetchall()
+            completed_count = 0
+            for vs in visible_sessions:
+                prog = get_session_progress(cursor, vs['id'], student['id'])
+                if prog.get('completed'):
+                    completed_count += 1
+            sessions_behind = len(visible_sessions) - completed_count
+            if sessions_behind >= 3:
+                issues.append({'type': 'behind_progress', 'severity': 'critical',
+                               'message': f'{sessions_behind} sessions behind ({completed_count}/{len(visible_sessions)})',
+                               'icon': 'tasks'})
+                behind_count += 1
+            elif sessions_behind >= 2:
+                issues.append({'type': 'behind_progress', 'severity': 'warning',
+                               'message': f'{sessions_behind} sessions behind',
+                               'icon': 'tasks'})
+                behind_count += 1
+
+            if issues:
+                at_risk_students.append({
+                    'student': student, 'subject': subj, 'issues': issues,
+                    'issue_count': len(issues),
+                    'max_severity': 'critical' if any(i['severity'] == 'critical' for i in issues) else 'warning',
+                    'weighted_grade': weighted
+                })
+
+    at_risk_students.sort(key=lambda x: (0 if x['max_severity'] == 'critical' else 1, -x['issue_count']))
+
+    # Count alerts already sent
+    cursor.execute('SELECT COUNT(*) as cnt FROM performance_alerts WHERE notification_sent = 1')
+    alerts_sent = cursor.fetchone()['cnt']
+    conn.close()
+
+    return render_template('instructor_monitoring.html',
+                           subjects=subjects, at_risk_students=at_risk_students,
+                           filter_subject=filter_subject,
+                           missed_deadline_count=missed_deadline_count,
+                           low_grade_count=low_grade_count, behind_count=behind_count,
+                           alerts_sent=alerts_sent)
+
+
+@bp.route('/api/analytics/engagement')
+@login_required
+def engagement_analytics():
+    """Weekly learning events per type and active students, from the event store
+    (learning_events.py) rather than the live tables."""
+    if current_user.role not in ('instructor', 'admin'):
+        return jsonify({'error': 'Unauthorized'}), 403
+    subject_id = request.args.get('subject_id', type=int)
+    weeks = max(1, min(request.args.get('weeks', 8, type=int), 52))
+    return jsonify(learning_events.engagement(subject_id=subject_id, weeks=weeks))
+
+
+@bp.route('/api/monitoring/send-reminders', methods=['POST'])
+@login_required
+def send_performance_reminders():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.get_json()
+    subject_id = data.get('subject_id')
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Compute at-risk students
+    target_subjects = []
+    if subject_id:
+        cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+        s = cursor.fetchone()
+        if s:
+            target_subjects = [s]
+    else:
+        cursor.execute('SELECT * FROM subjects ORDER BY code')
+        target_subjects = cursor.fetchall()
+
+    notifs_sent = 0
+    for subj in target_subjects:
+        cursor.execute('''
+            SELECT u.id, u.full_name FROM users u
+            JOIN enrollments e ON u.id = e.student_id
+            WHERE e.subject_id = ? AND u.is_approved = 1
+        ''', (subj['id'],))
+        students = cursor.fetchall()
+        for student in students:
+            messages = []
+            # Check missed deadlines
+            cursor.execute('''
+                SELECT a.title FROM activities a
+                JOIN sessions ses ON a.session_id = ses.id
+                WHERE ses.subject_id = ? AND a.due_date IS NOT NULL
+                AND a.due_date < date('now') AND a.is_visible = 1
+                AND a.id NOT IN (SELECT activity_id FROM submissions WHERE student_id = ?)
+            ''', (subj['id'], student['id']))
+            missed = cursor.fetchall()
+            if missed:
+                titles = ', '.join(m['title'] for m in missed[:3])
+                messages.append(f"You have {len(missed)} missed deadline(s) in {subj['code']}: {titles}. Submit ASAP.")
+
+            # Check low grade
+            weighted = compute_weighted_grade(cursor, subj['id'], student['id'])
+            if weighted > 0 and weighted < 75:
+                messages.append(f"Academic alert: Your grade in {subj['code']} is {weighted:.1f}%. You need 75% to pass.")
+
+            # Check behind
+            cursor.execute('SELECT id FROM sessions WHERE subject_id = ? AND is_visible = 1', (subj['id'],))
+            vis = cursor.fetchall()
+            done = 0
+            for v in vis:
+                p = get_session_progress(cursor, v['id'], student['id'])
+                if p.get('completed'):
+                    done += 1
+            behind = len(vis) - done
+            if behind >= 3:
+                messages.append(f"You are {behind} sessions behind in {subj['code']}. Complete your lessons.")
+
+            for msg in messages:
+                # Check if we already sent this exact message recently
+                cursor.execute('''
+                    SELECT id FROM performance_alerts
+                    WHERE student_id = ? AND subject_id = ? AND message = ? AND notification_sent = 1
+                    AND created_at > datetime('now', '-7 days')
+                ''', (student['id'], subj['id'], msg))
+                if cursor.fetchone():
+                    continue
+                # Create alert record
+                alert_type = 'missed_deadline' if 'missed' in msg.lower() else ('low_grade' if 'grade' in msg.lower() else 'behind_progress')
+                severity = 'critical' if 'need 75%' in msg or behind >= 3 else 'warning'
+                cursor.execute('''
+                    INSERT INTO performance_alerts (student_id, subject_id, alert_type, severity, message, notification_sent)
+                    VALUES (?, ?, ?, ?, ?, 1)
+                ''', (student['id'], subj['id'], alert_type, severity, msg))
+                # Send notification
+                icon = 'clock' if alert_type == 'missed_deadline' else ('chart-line' if alert_type == 'low_grade' else 'tasks')
+                cursor.execute('''
+                    INSERT INTO notifications (user_id, type, icon, message, link)
+                    VALUES (?, 'warning', ?, ?, '/student/dashboard')
+                ''', (student['id'], icon, msg))
+                notifs_sent += 1
+
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'notifications_sent': notifs_sent})
+
+
+@bp.route('/api/monitoring/send-guidance', methods=['POST'])
+@login_required
+def send_performance_guidance():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.get_json()
+    student_id = data['student_id']
+    subject_id = data['subject_id']
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+    subject = cursor.fetchone()
+    if not subject:
+        conn.close()
+        return jsonify({'error': 'Subject not found'}), 404
+
+    # Compute component averages
+    cursor.execute('''
+        SELECT AVG(COALESCE(sub.final_score, sub.score)) as avg
+        FROM submissions sub JOIN activities a ON sub.activity_id = a.id
+        JOIN sessions ses ON a.session_id = ses.id
+        WHERE ses.subject_id = ? AND sub.student_id = ? AND COALESCE(sub.final_score, sub.score) IS NOT NULL
+    ''', (subject_id, student_id))
+    activity_avg = cursor.fetchone()['avg'] or 0
+
+    cursor.execute('''
+        SELECT AVG(qa.score) as avg FROM quiz_attempts qa
+        JOIN quizzes q ON qa.quiz_id = q.id JOIN sessions ses ON q.session_id = ses.id
+        WHERE ses.subject_id = ? AND qa.student_id = ? AND qa.score IS NOT NULL
+    ''', (subject_id, student_id))
+    quiz_avg = cursor.fetchone()['avg'] or 0
+
+    cursor.execute('SELECT id FROM sessions WHERE subject_id = ? AND is_visible = 1', (subject_id,))
+    vis = cursor.fetchall()
+    done = sum(1 for v in vis if get_session_progress(cursor, v['id'], student_id).get('completed'))
+    sessions_behind = len(vis) - done
+
+    msg = build_guidance_message(activity_avg, quiz_avg, sessions_behind, subject['code'])
+    cursor.execute('''
+        INSERT INTO notifications (user_id, type, icon, message, link)
+        VALUES (?, 'info', 'lightbulb', ?, '/my_grades')
+    ''', (student_id, msg))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'message': msg})
+
+
+@bp.route('/api/bulk-visibility', methods=['POST'])
+@login_required
+def bulk_visibility():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    activity_id = data.get('activity_id')
+    make_visible = data.get('make_visible', True)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE submissions SET score_visible = ? WHERE activity_id = ?',
+                   (1 if make_visible else 0, activity_id))
+    count = cursor.rowcount
+    conn.commit()
+    conn.close()
+
+    return jsonify({'success': True, 'count': count})
+
+@bp.route('/api/bulk-toggle-subject-visibility', methods=['POST'])
+@login_required
+def bulk_toggle_subject_visibility():
+    """Show or hide ALL sessions, activities, quizzes, and exams for a subject at once."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    subject_id = data.get('subject_id')
+    action = data.get('action')  # 'show' or 'hide'
+
+    if not subject_id or action not in ('show', 'hide'):
+        return jsonify({'error': 'Invalid parameters'}), 400
+
+    new_value = 1 if action == 'show' else 0
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Update all sessions
+    cursor.execute('UPDATE sessions SET is_visible = ? WHERE subject_id = ?', (new_value, subject_id))
+    session_count = cursor.rowcount
+    fragment_cache.bump_session_version(cursor, subject_id=subject_id)
+
+    # Update all activities within those sessions
+    cursor.execute('''
+        UPDATE activities SET is_visible = ?
+        WHERE session_id IN (SELECT id FROM sessions WHERE subject_id = ?)
+    ''', (new_value, subject_id))
+
+    # Update all quizzes within those sessions
+    cursor.execute('''
+        UPDATE quizzes SET is_visible = ?
+        WHERE session_id IN (SELECT id FROM sessions WHERE subject_id = ?)
+    ''', (new_value, subject_id))
+    invalidate_journey_tree([subject_id])
+
+    # Update all exams for this subject
+    cursor.execute('''
+        UPDATE exams SET is_visible = ?
+        WHERE subject_id = ?
+    ''', (new_value, subject_id))
+
+    conn.commit()
+    conn.close()
+
+    return jsonify({'success': True, 'action': action, 'sessions': session_count})
+
+@bp.route('/api/bulk-toggle-activities', methods=['POST'])
+@login_required
+def bulk_toggle_activities():
+    """Open or close all activities for a given subject at once."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    subject_id = data.get('subject_id')
+    action = data.get('action')  # 'open' or 'close'
+
+    if not subject_id or action not in ('open', 'close'):
+        return jsonify({'error': 'Invalid parameters'}), 400
+
+    new_value = 1 if action == 'open' else 0
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE activities SET is_active = ?
+        WHERE session_id IN (SELECT id FROM sessions WHERE subject_id = ?)
+    ''', (new_value, subject_id))
+    count = cursor.rowcount
+    conn.commit()
+    conn.close()
+
+    return jsonify({'success': True, 'count': count, 'action': action})
+
+
+# ==================== INSTRUCTOR DASHBOARD ====================
+
+@bp.route('/dashboard')
+@login_required
+@profile_required
+def dashboard():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects')
+    subjects = cursor.fetchall()
+    cursor.execute("SELECT COUNT(*) as count FROM users WHERE role = 'student' AND is_approved = 1")
+    student_count = cursor.fetchone()['count']
+    cursor.execute("SELECT COUNT(*) as count FROM users WHERE role = 'student' AND (is_approved = 0 OR is_approved IS NULL)")
+    pending_count = cursor.fetchone()['count']
+    cursor.execute('SELECT COUNT(*) as count FROM sessions')
+    session_count = cursor.fetchone()['count']
+    cursor.execute('SELECT COUNT(*) as count FROM activities')
+    activity_count = cursor.fetchone()['count']
+    cursor.execute('SELECT COUNT(*) as count FROM quizzes')
+    quiz_count = cursor.fetchone()['count']
+
+    stats = {
+        'students': student_count,
+        'pending': pending_count,
+        'subjects': len(subjects),
+        'sessions': session_count,
+        'activities': activity_count,
+        'quizzes': quiz_count
+    }
+
+    # Monitoring: at-risk summary (lightweight)
+    at_risk_count = 0
+    missed_count = 0
+    low_grade_count = 0
+    at_risk_list = []
+    for subj in subjects[:5]:
+        cursor.execute('''
+            SELECT u.id, u.full_name, u.student_id, u.section FROM users u
+            JOIN enrollments e ON u.id = e.student_id
+            WHERE e.subject_id = ? AND u.is_approved = 1
+        ''', (subj['id'],))
+        for student in cursor.fetchall():
+            issues = []
+            cursor.execute('''
+                SELECT COUNT(*) as cnt FROM activities a
+                JOIN sessions ses ON a.session_id = ses.id
+                WHERE ses.subject_id = ? AND a.due_date IS NOT NULL
+                AND a.due_date < date('now') AND a.is_visible = 1
+                AND a.id NOT IN (SELECT activity_id FROM submissions WHERE student_id = ?)
+            ''', (subj['id'], student['id']))
+            missed = cursor.fetchone()['cnt']
+            if missed > 0:
+                issues.append(f'{missed} missed deadline(s)')
+                missed_count += missed
+
+            weighted = compute_weighted_grade(cursor, subj['id'], student['id'])
+            if weighted > 0 and weighted < 75:
+                issues.append(f'Failing: {weighted:.0f}%')
+                low_grade_count += 1
+
+            if issues:
+                at_risk_count += 1
+                if len(at_risk_list) < 8:
+                    at_risk_list.append({
+                        'name': student['full_name'], 'sid': student['student_id'],
+                        'section': student['section'], 'subject': subj['code'],
+                        'issues': issues, 'grade': weighted
+                    })
+    conn.close()
+
+    return render_template('dashboard.html', subjects=subjects, student_count=student_count, stats=stats,
+        at_risk_count=at_risk_count, missed_count=missed_count, low_grade_count=low_grade_count,
+        at_risk_list=at_risk_list)
+
+
+# ==================== STUDENT MANAGEMENT ====================
+
+STUDENT_ORDER = pagination.Keyset(('u.full_name', 'full_name'), ('u.id', 'id'))
+
+
+@bp.route('/students')
+@login_required
+def students():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    where, params = student_filters(request.args)
+    students_page = STUDENT_ORDER.fetch(cursor, f"""
+        SELECT u.* FROM users u WHERE u.role = 'student'{where} AND {{keyset}}
+    """, params, request.args)
+    cursor.execute('SELECT * FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+
+    # Get distinct sections for filter
+    cursor.execute("SELECT DISTINCT section FROM users WHERE role = 'student' AND section IS NOT NULL ORDER BY section")
+    sections = [r['section'] for r in cursor.fetchall()]
+
+    # Get enrollment counts for the students on this page
+    enrollment_map = {}
+    student_ids = [s['id'] for s in students_page]
+    if student_ids:
+        cursor.execute(f'''
+            SELECT e.student_id, COUNT(*) as subject_count,
+                   GROUP_CONCAT(s.code || ' ' || s.section, ', ') as enrolled_subjects
+            FROM enrollments e
+            JOIN subjects s ON e.subject_id = s.id
+            WHERE e.student_id IN ({', '.join('?' * len(student_ids))})
+            GROUP BY e.student_id
+        ''', student_ids)
+        enrollment_map = {r['student_id']: r for r in cursor.fetchall()}
+
+    # The same users rows the list pages through (one indexed count)
+    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'student'")
+    total_students = cursor.fetchone()[0]
+    conn.close()
+
+    return render_template('students.html', students=students_page, subjects=subjects,
+                           sections=sections, enrollment_map=enrollment_map,
+                           total_students=total_students,
+                           filters={k: request.args.get(k, '') for k in ('section', 'subject', 'q')},
+                           import_job_id=request.args.get('import_job', type=int))
+
+@bp.route('/students/add', methods=['POST'])
+@login_required
+def add_student():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    student_id = request.form['student_id']
+    username = request.form['username']
+    password = request.form['password']
+    full_name = request.form['full_name']
+    section = request.form['section']
+    subject_ids = request.form.getlist('subjects')  # Get selected subjects
+
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO users (username, password_hash, full_name, role, student_id, section)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (username, generate_password_hash(password), full_name, 'student', student_id, section))
+        stats_counters.mark_stale()
+        conn.commit()
+
+        # Get the new student's ID
+        new_student_id = cursor.lastrowid
+
+        # Enroll student in selected subjects
+        for subj_id in subject_ids:
+            try:
+                cursor.execute('''
+                    INSERT INTO enrollments (student_id, subject_id)
+                    VALUES (?, ?)
+                ''', (new_student_id, int(subj_id)))
+            except:
+                pass  # Skip if already enrolled
+        conn.commit()
+
+        flash(f'Student {full_name} added and enrolled in {len(subject_ids)} subject(s)!', 'success')
+    except Exception as e:
+        flash(f'Error adding student: {str(e)}', 'error')
+    conn.close()
+
+    return redirect(url_for('instructor.students'))
+
+@bp.route('/students/<int:student_id>/enrollments', methods=['GET', 'POST'])
+@login_required
+def manage_enrollments(student_id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get student info
+    cursor.execute('SELECT * FROM users WHERE id = ?', (student_id,))
+    student = cursor.fetchone()
+
+    if not student:
+        flash('Student not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.students'))
+
+    if request.method == 'POST':
+        # Get selected subjects
+        subject_ids = request.form.getlist('subjects')
+
+        # Remove all current enrollments
+        cursor.execute('DELETE FROM enrollments WHERE student_id = ?', (student_id,))
+
+        # Add new enrollments
+        for subj_id in subject_ids:
+            cursor.execute('''
+                INSERT INTO enrollments (student_id, subject_id) VALUES (?, ?)
+            ''', (student_id, int(subj_id)))
+
+        conn.commit()
+        flash(f'Enrollments updated for {student["full_name"]}!', 'success')
+        conn.close()
+        return redirect(url_for('instructor.students'))
+
+    # GET: Show enrollment form
+    cursor.execute('SELECT * FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+
+    # Get current enrollments
+    cursor.execute('SELECT subject_id FROM enrollments WHERE student_id = ?', (student_id,))
+    enrolled_ids = [row['subject_id'] for row in cursor.fetchall()]
+
+    conn.close()
+    return render_template('manage_enrollments.html', student=student, subjects=subjects, enrolled_ids=enrolled_ids)
+
+@bp.route('/students/bulk-enroll', methods=['POST'])
+@login_required
+def bulk_enroll_students():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    subject_ids = [int(sid) for sid in request.form.getlist('subjects') if sid.strip().isdigit()]
+    mode = request.form.get('mode', 'all')  # 'all' or 'filtered' (the list's section/subject/q filters)
+
+    if not subject_ids:
+        flash('Please select at least one subject.', 'error')
+        return redirect(url_for('instructor.students'))
+
+    where, params = student_filters(request.form) if mode == 'filtered' else ('', [])
+    if mode == 'filtered' and not where:
+        flash('Set a section, subject or name filter before enrolling filtered students.', 'error')
+        return redirect(url_for('instructor.students'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM users u WHERE u.role = 'student'{where}", params)
+    student_count = cursor.fetchone()[0]
+    # Every matching student x selected subject in one statement; existing pairs are skipped
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO enrollments (student_id, subject_id)
+        SELECT u.id, s.id FROM users u
+        JOIN subjects s ON s.id IN ({', '.join('?' * len(subject_ids))})
+        WHERE u.role = 'student'{where}
+    ''', [*subject_ids, *params])
+    enrolled_count = cursor.rowcount
+    conn.commit()
+    conn.close()
+
+    flash(f'Bulk enrollment complete! {enrolled_count} new enrollment(s) added for {student_count} student(s).', 'success')
+    filters = {k: request.form[k] for k in ('section', 'subject', 'q') if mode == 'filtered' and request.form.get(k)}
+    return redirect(url_for('instructor.students', **filters))
+
+@bp.route('/students/bulk-upload', methods=['POST'])
+@login_required
+def bulk_upload_students():
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    if 'file' not in request.files:
+        flash('No file uploaded', 'error')
+        return redirect(url_for('instructor.students'))
+
+    file = request.files['file']
+    if file.filename == '':
+        flash('No file selected', 'error')
+        return redirect(url_for('instructor.students'))
+
+    filename = secure_filename(file.filename)
+    if not student_import.is_allowed_file(filename):
+        flash('Invalid file format. Use .xlsx, .xls, or .csv', 'error')
+        return redirect(url_for('instructor.students'))
+
+    # Unique name so concurrent uploads of "students.csv" don't overwrite each other
+    filepath = os.path.join(current_app.config['UPLOAD_FOLDER'],
+                            f"import_{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{filename}")
+    file.save(filepath)
+
+    job_id = student_import.start_import_job(filepath, filename, current_user.id,
+                                             enroll_fn=sync_section_enrollments)
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'job_id': job_id,
+                        'status_url': url_for('instructor.bulk_upload_status', job_id=job_id)})
+
+    flash(f'Import of {filename} started. Progress is shown below.', 'info')
+    return redirect(url_for('instructor.students', import_job=job_id))
+
+@bp.route('/students/bulk-upload/<int:job_id>/status')
+@login_required
+def bulk_upload_status(job_id):
+    """Progress of a bulk import job, polled by the students page"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    job = student_import.get_job(job_id)
+    # Jobs carry row errors with student data: only the uploader may read them
+    if not job or job['created_by'] != current_user.id:
+        return jsonify({'error': 'Import job not found'}), 404
+    return jsonify(job)
+
+@bp.route('/students/delete/<int:id>')
+@login_required
+def delete_student(id):
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM users WHERE id = ? AND role = 'student'", (id,))
+    stats_counters.mark_stale()
+    conn.commit()
+    invalidate_user_cache([id])
+    conn.close()
+    flash('Student deleted successfully!', 'success')
+    return redirect(url_for('instructor.students'))
+
+
+# ==================== ENROLLMENT APPROVAL ====================
+
+PENDING_ORDER = pagination.Keyset(('u.created_at', 'created_at'), ('u.id', 'id'), descending=True)
+
+
+def _with_enrolled_subjects(cursor, students):
+    """Student rows as dicts with enrolled_subjects ('CODE - SECTION,...') for just these students."""
+    students = [dict(s) for s in students]
+    if students:
+        ids = [s['id'] for s in students]
+        cursor.execute(f'''
+            SELECT e.student_id, GROUP_CONCAT(s.code || ' - ' || s.section) as enrolled_subjects
+            FROM enrollments e JOIN subjects s ON e.subject_id = s.id
+            WHERE e.student_id IN ({', '.join('?' * len(ids))})
+            GROUP BY e.student_id
+        ''', ids)
+        subjects_by_student = {r['student_id']: r['enrolled_subjects'] for r in cursor.fetchall()}
+        for student in students:
+            student['enrolled_subjects'] = subjects_by_student.get(student['id'])
+    return students
+
+
+@bp.route('/enrollments')
+@login_required
+def enrollments():
+    """Enrollment approval page for instructors"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    where, params = student_filters(request.args)
+
+    # Get pending (unapproved) students, newest first
+    pending_page = PENDING_ORDER.fetch(cursor, f"""
+        SELECT u.* FROM users u
+        WHERE u.role = 'student' AND (u.is_approved = 0 OR u.is_approved IS NULL){where} AND {{keyset}}
+    """, params, request.args, prefix='pending_')
+    pending_students = _with_enrolled_subjects(cursor, pending_page)
+
+    # Get approved students
+    approved_page = STUDENT_ORDER.fetch(cursor, f"""
+        SELECT u.* FROM users u
+        WHERE u.role = 'student' AND u.is_approved = 1{where} AND {{keyset}}
+    """, params, request.args, prefix='approved_')
+    approved_students = _with_enrolled_subjects(cursor, approved_page)
+    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'student' AND is_approved = 1")
+    approved_count = cursor.fetchone()[0]
+
+    # Get sections for filtering
+    cursor.execute("SELECT DISTINCT section FROM users WHERE role = 'student' AND section IS NOT NULL ORDER BY section")
+    sections = [row['section'] for row in cursor.fetchall()]
+
+    # Get subjects for filtering
+    cursor.execute('SELECT id, code, section FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+
+    # Count pending by section
+    cursor.execute('''
+        SELECT section, COUNT(*) as count
+        FROM users
+        WHERE role = 'student' AND (is_approved = 0 OR is_approved IS NULL)
+        GROUP BY section
+    ''')
+    pending_by_section = {row['section']: row['count'] for row in cursor.fetchall()}
+
+    conn.close()
+
+    return render_template('enrollments.html',
+                           pending_students=pending_students,
+                           approved_students=approved_students,
+                           pending_page=pending_page,
+                           approved_page=approved_page,
+                           pending_count=sum(pending_by_section.values()),
+                           approved_count=approved_count,
+                           sections=sections,
+                           subjects=subjects,
+                           pending_by_section=pending_by_section,
+                           filters={k: request.args.get(k, '') for k in ('section', 'q')},
+                           active_tab=request.args.get('tab', 'pending'))
+
+# Student -> subject pairs a section sync should produce. Subjects are matched by
+# section_id first; the text section is only used for students whose section_id
+# matches no subject. {where} filters users (alias u) and appears twice.
+_SECTION_SUBJECT_PAIRS_SQL = '''
+    SELECT u.id AS student_id, s.id AS subject_id
+    FROM users u
+    JOIN subjects s ON s.section_id = u.section_id
+    WHERE u.role = 'student' AND u.section_id IS NOT NULL {where}
+    UNION
+    SELECT u.id, s.id
+    FROM users u
+    JOIN subjects s ON s.section = u.section
+    WHERE u.role = 'student' AND u.section IS NOT NULL AND u.section != '' {where}
+    AND NOT EXISTS (SELECT 1 FROM subjects s2
+                    WHERE u.section_id IS NOT NULL AND s2.section_id = u.section_id)
+'''
+
+def sync_section_enrollments(cursor, where='', params=()):
+    """Enroll students in the subjects matching their section in one set-based pass.
+
+    where is an extra SQL filter on users (alias u), e.g. 'AND u.id = ?'.
+    Returns {student_id: number of new enrollments} for students that gained any.
+    """
+    pairs_sql = _SECTION_SUBJECT_PAIRS_SQL.format(where=where)
+    all_params = tuple(params) * 2
+
+    cursor.execute(f'''
+        SELECT p.student_id, COUNT(*) AS cnt
+        FROM ({pairs_sql}) p
+        WHERE NOT EXISTS (SELECT 1 FROM enrollments e
+                          WHERE e.student_id = p.student_id AND e.subject_id = p.subject_id)
+        GROUP BY p.student_id
+    ''', all_params)
+    counts = {row['student_id']: row['cnt'] for row in cursor.fetchall()}
+
+    if counts:
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO enrollments (student_id, subject_id)
+            SELECT student_id, subject_id FROM ({pairs_sql})
+        ''', all_params)
+    return counts
+
+def auto_enroll_student_in_matching_subjects(cursor, student_id):
+    """Helper function to auto-enroll a student in subjects matching their section"""
+    return sync_section_enrollments(cursor, 'AND u.id = ?', (student_id,)).get(student_id, 0)
+
+def _approval_notification_rows(students, enrolled_counts):
+    """Build notification rows for newly approved students."""
+    rows = []
+    for student in students:
+        notification_msg = 'Your enrollment has been approved! You can now access the system.'
+        enrolled_count = enrolled_counts.get(student['id'], 0)
+        if enrolled_count > 0:
+            notification_msg += f' You have been enrolled in {enrolled_count} subject(s).'
+        rows.append((student['id'], notification_msg))
+    return rows
+
+@bp.route('/enrollments/approve/<int:student_id>', methods=['POST'])
+@login_required
+def approve_student(student_id):
+    """Approve a single student"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get student info including section
+    cursor.execute('SELECT full_name, section FROM users WHERE id = ?', (student_id,))
+    student = cursor.fetchone()
+
+    # Approve the student
+    cursor.execute("UPDATE users SET is_approved = 1 WHERE id = ? AND role = 'student'", (student_id,))
+
+    # Auto-enroll in matching subjects
+    enrolled_count = auto_enroll_student_in_matching_subjects(cursor, student_id)
+
+    # Create notification for the student
+    notification_msg = 'Your enrollment has been approved! You can now access the system.'
+    if enrolled_count > 0:
+        notification_msg += f' You have been enrolled in {enrolled_count} subject(s).'
+
+    cursor.execute('''
+        INSERT INTO notifications (user_id, type, icon, message, link)
+        VALUES (?, 'success', 'check-circle', ?, '/student/dashboard')
+    ''', (student_id, notification_msg))
+    conn.commit()
+    invalidate_user_cache([student_id])
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': f'{student["full_name"]} approved!'})
+
+    flash(f'Student {student["full_name"]} approved!', 'success')
+    return redirect(url_for('instructor.enrollments'))
+
+@bp.route('/enrollments/reject/<int:student_id>', methods=['POST'])
+@login_required
+def reject_student(student_id):
+    """Reject and delete a student enrollment"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get student info before deleting
+    cursor.execute('SELECT full_name FROM users WHERE id = ?', (student_id,))
+    student = cursor.fetchone()
+    student_name = student['full_name'] if student else 'Student'
+
+    # Delete enrollments first
+    cursor.execute('DELETE FROM enrollments WHERE student_id = ?', (student_id,))
+    # Delete the user
+    cursor.execute("DELETE FROM users WHERE id = ? AND role = 'student'", (student_id,))
+    stats_counters.mark_stale()
+    conn.commit()
+    invalidate_user_cache([student_id])
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': f'{student_name} rejected and removed!'})
+
+    flash(f'Student {student_name} rejected and removed!', 'success')
+    return redirect(url_for('instructor.enrollments'))
+
+@bp.route('/enrollments/approve-section/<section>', methods=['POST'])
+@login_required
+def approve_section(section):
+    """Approve all pending students in a section"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get pending students in this section
+    cursor.execute('''
+        SELECT id, full_name, section FROM users
+        WHERE role = 'student' AND section = ? AND (is_approved = 0 OR is_approved IS NULL)
+    ''', (section,))
+    students = cursor.fetchall()
+
+    # Auto-enroll the whole pending section in one pass, before approval clears the filter
+    enrolled_counts = sync_section_enrollments(
+        cursor, 'AND u.section = ? AND (u.is_approved = 0 OR u.is_approved IS NULL)', (section,))
+
+    # Approve all
+    cursor.execute('''
+        UPDATE users SET is_approved = 1
+        WHERE role = 'student' AND section = ? AND (is_approved = 0 OR is_approved IS NULL)
+    ''', (section,))
+    count = cursor.rowcount
+
+    # Create notifications
+    cursor.executemany('''
+        INSERT INTO notifications (user_id, type, icon, message, link)
+        VALUES (?, 'success', 'check-circle', ?, '/student/dashboard')
+    ''', _approval_notification_rows(students, enrolled_counts))
+
+    conn.commit()
+    invalidate_user_cache([s['id'] for s in students])
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': f'{count} students in {section} approved!'})
+
+    flash(f'{count} students in {section} approved!', 'success')
+    return redirect(url_for('instructor.enrollments'))
+
+@bp.route('/enrollments/approve-all', methods=['POST'])
+@login_required
+def approve_all_students():
+    """Approve all pending students"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get all pending students with their sections
+    cursor.execute('''
+        SELECT id, full_name, section FROM users
+        WHERE role = 'student' AND (is_approved = 0 OR is_approved IS NULL)
+    ''')
+    students = cursor.fetchall()
+
+    # Auto-enroll every pending student in one pass, before approval clears the filter
+    enrolled_counts = sync_section_enrollments(cursor, 'AND (u.is_approved = 0 OR u.is_approved IS NULL)')
+
+    # Approve all
+    cursor.execute('''
+        UPDATE users SET is_approved = 1
+        WHERE role = 'student' AND (is_approved = 0 OR is_approved IS NULL)
+    ''')
+    count = cursor.rowcount
+
+    # Create notifications
+    cursor.executemany('''
+        INSERT INTO notifications (user_id, type, icon, message, link)
+        VALUES (?, 'success', 'check-circle', ?, '/student/dashboard')
+    ''', _approval_notification_rows(students, enrolled_counts))
+
+    conn.commit()
+    invalidate_user_cache()
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': f'{count} students approved!'})
+
+    flash(f'{count} students approved!', 'success')
+    return redirect(url_for('instructor.enrollments'))
+
+@bp.route('/enrollments/revoke/<int:student_id>', methods=['POST'])
+@login_required
+def revoke_approval(student_id):
+    """Revoke approval for a student"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET is_approved = 0 WHERE id = ? AND role = 'student'", (student_id,))
+    conn.commit()
+    invalidate_user_cache([student_id])
+
+    cursor.execute('SELECT full_name FROM users WHERE id = ?', (student_id,))
+    student = cursor.fetchone()
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': f'{student["full_name"]} approval revoked!'})
+
+    flash(f'Approval revoked for {student["full_name"]}!', 'success')
+    return redirect(url_for('instructor.enrollments'))
+
+@bp.route('/enrollments/sync-subjects/<int:student_id>', methods=['POST'])
+@login_required
+def sync_student_subjects(student_id):
+    """Sync a student's enrollments with their section's subjects"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get student info
+    cursor.execute('SELECT full_name, section FROM users WHERE id = ?', (student_id,))
+    student = cursor.fetchone()
+
+    if not student:
+        conn.close()
+        return jsonify({'error': 'Student not found'}), 404
+
+    # Auto-enroll in matching subjects
+    enrolled_count = auto_enroll_student_in_matching_subjects(cursor, student_id)
+    conn.commit()
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        if enrolled_count > 0:
+            return jsonify({'success': True, 'message': f'{student["full_name"]} enrolled in {enrolled_count} subject(s)!'})
+        else:
+            return jsonify({'success': True, 'message': f'{student["full_name"]} is already enrolled in all matching subjects.'})
+
+    if enrolled_count > 0:
+        flash(f'{student["full_name"]} enrolled in {enrolled_count} subject(s)!', 'success')
+    else:
+        flash(f'{student["full_name"]} is already enrolled in all matching subjects.', 'info')
+    return redirect(url_for('instructor.enrollments'))
+
+@bp.route('/enrollments/sync-all-subjects', methods=['POST'])
+@login_required
+def sync_all_student_subjects():
+    """Sync all approved students' enrollments with their section's subjects"""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Enroll all approved students in one set-based pass
+    enrolled_counts = sync_section_enrollments(cursor, 'AND u.is_approved = 1')
+    total_enrolled = sum(enrolled_counts.values())
+    students_updated = len(enrolled_counts)
+
+    conn.commit()
+    conn.close()
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'success': True, 'message': f'{students_updated} student(s) enrolled in {total_enrolled} subject(s)!'})
+
+    flash(f'{students_updated} student(s) enrolled in {total_enrolled} subject(s)!', 'success')
+    return redirect(url_for('instructor.enrollments'))
+
+
+# ============== INSTRUCTOR ATTENDANCE ==============
+
+@bp.route('/instructor/attendance')
+@login_required
+def instructor_attendance():
+    if current_user.role not in ('instructor', 'admin'):
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get current month attendance
+    today = datetime.now().strftime('%Y-%m-%d')
+    month_start = datetime.now().strftime('%Y-%m-01')
+
+    cursor.execute('''
+        SELECT * FROM instructor_attendance
+        WHERE instructor_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date DESC
+    ''', (current_user.id, month_start, today))
+    attendance_records = cursor.fetchall()
+
+    # Check if clocked in today
+    cursor.execute('''
+        SELECT * FROM instructor_attendance WHERE instructor_id = ? AND date = ?
+    ''', (current_user.id, today))
+    today_record = cursor.fetchone()
+
+    # Monthly summary
+    cursor.execute('''
+        SELECT COUNT(*) as total_days,
+               SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present,
+               SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END) as absent,
+               SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) as late,
+               SUM(hours_worked) as total_hours
+        FROM instructor_attendance
+        WHERE instructor_id = ? AND date BETWEEN ? AND ?
+    ''', (current_user.id, month_start, today))
+    summary = cursor.fetchone()
+
+    conn.close()
+    return render_template('instructor_attendance.html',
+        attendance=attendance_records, today_record=today_record,
+        summary=summary, today=today)
+
+
+@bp.route('/api/attendance/clock-in', methods=['POST'])
+@login_required
+def clock_in():
+    if current_user.role != 'instructor':
+        return jsonify({'success': False, 'error': 'Instructors only'})
+
+    conn = get_db()
+    cursor = conn.cursor()
+    today = datetime.now().strftime('%Y-%m-%d')
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    cursor.execute('SELECT id FROM instructor_attendance WHERE instructor_id = ? AND date = ?',
+                   (current_user.id, today))
+    if cursor.fetchone():
+        conn.close()
+        return jsonify({'success': False, 'error': 'Already clocked in today'})
+
+    ip_address = request.remote_addr
+    cursor.execute('''
+        INSERT INTO instructor_attendance (instructor_id, date, time_in, status, ip_address)
+        VALUES (?, ?, ?, 'present', ?)
+    ''', (current_user.id, today, now, ip_address))
+    conn.commit()
+
+    # AI log
+    cursor.execute('''
+        INSERT INTO ai_admin_logs (action_type, target_type, target_id, target_name, decision, severity)
+        VALUES ('clock_in', 'instructor', ?, ?, ?, 'info')
+    ''', (current_user.id, current_user.full_name, f'Clocked in at {now}'))
+    conn.commit()
+    conn.close()
+    learning_events.record('clock_in', current_user.id)
+
+    return jsonify({'success': True, 'time_in': now})
+
+
+@bp.route('/api/attendance/clock-out', methods=['POST'])
+@login_required
+def clock_out():
+    if current_user.role != 'instructor':
+        return jsonify({'success': False, 'error': 'Instructors only'})
+
+    conn = get_db()
+    cursor = conn.cursor()
+    today = datetime.now().strftime('%Y-%m-%d')
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    cursor.execute('SELECT * FROM instructor_attendance WHERE instructor_id = ? AND date = ?',
+                   (current_user.id, today))
+    record = cursor.fetchone()
+    if not record:
+        conn.close()
+        return jsonify({'success': False, 'error': 'No clock-in record for today'})
+
+    if record['time_out']:
+        conn.close()
+        return jsonify({'success': False, 'error': 'Already clocked out today'})
+
+    # Calculate hours worked
+    time_in = datetime.strptime(record['time_in'], '%Y-%m-%d %H:%M:%S')
+    time_out = datetime.strptime(now, '%Y-%m-%d %H:%M:%S')
+    hours_worked = round((time_out - time_in).total_seconds() / 3600, 2)
+
+    cursor.execute('''
+        UPDATE instructor_attendance SET time_out = ?, hours_worked = ? WHERE id = ?
+    ''', (now, hours_worked, record['id']))
+    conn.commit()
+    conn.close()
+    learning_events.record('clock_out', current_user.id, hours_worked=hours_worked)
+
+    return jsonify({'success': True, 'time_out': now, 'hours_worked': hours_worked})
+
+
+# ============== INSTRUCTOR PAYROLL VIEW ==============
+
+@bp.route('/instructor/payroll')
+@login_required
+def instructor_payroll_view():
+    if current_user.role not in ('instructor', 'admin'):
+        flash('Access denied.', 'error')
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT * FROM instructor_payroll
+        WHERE instructor_id = ?
+        ORDER BY period_end DESC
+    ''', (current_user.id,))
+    payrolls = cursor.fetchall()
+
+    # Get profile info
+    cursor.execute('SELECT * FROM instructor_profiles WHERE user_id = ?', (current_user.id,))
+    profile = cursor.fetchone()
+
+    # Current month attendance summary
+    month_start = datetime.now().strftime('%Y-%m-01')
+    today = datetime.now().strftime('%Y-%m-%d')
+    cursor.execute('''
+        SELECT COUNT(*) as total_days,
+               SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present,
+               SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) as late,
+               SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END) as absent,
+               SUM(hours_worked) as total_hours
+        FROM instructor_attendance
+        WHERE instructor_id = ? AND date BETWEEN ? AND ?
+    ''', (current_user.id, month_start, today))
+    attendance_summary = cursor.fetchone()
+
+    conn.close()
+    return render_template('instructor_payroll.html',
+        payrolls=payrolls, profile=profile, attendance_summary=attendance_summary)
+
+
+# ============== COMBINED INSTRUCTOR PAGES ==============
+
+@bp.route('/instructor/academics')
+@login_required
+def instructor_academics():
+    """Combined page: Students + Subjects + Peer Reviews + Grades"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Students data
+    cursor.execute("SELECT * FROM users WHERE role = 'student' ORDER BY full_name")
+    students_list = cursor.fetchall()
+    cursor.execute("SELECT DISTINCT section FROM users WHERE role = 'student' AND section IS NOT NULL ORDER BY section")
+    sections = [r['section'] for r in cursor.fetchall()]
+    cursor.execute('''
+        SELECT e.student_id, COUNT(*) as subject_count,
+               GROUP_CONCAT(s.code || ' ' || s.section, ', ') as enrolled_subjects
+        FROM enrollments e JOIN subjects s ON e.subject_id = s.id GROUP BY e.student_id
+    ''')
+    enrollment_map = {r['student_id']: r for r in cursor.fetchall()}
+
+    # Subjects data
+    cursor.execute('SELECT * FROM subjects ORDER BY code, section')
+    subjects = cursor.fetchall()
+
+    # Peer reviews data
+    cursor.execute('''
+        SELECT a.id, a.title, a.enable_peer_review, ses.session_number, s.code, s.section,
+               (SELECT COUNT(*) FROM peer_review_assignments pra
+                JOIN submissions sub ON pra.submission_id = sub.id
+                WHERE sub.activity_id = a.id) as assigned,
+               (SELECT COUNT(*) FROM peer_review_responses prr
+                JOIN peer_review_assignments pra2 ON prr.assignment_id = pra2.id
+                JOIN submissions sub2 ON pra2.submission_id = sub2.id
+                WHERE sub2.activity_id = a.id) as completed
+        FROM activities a
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects s ON ses.subject_id = s.id
+        WHERE a.enable_peer_review = 1
+        ORDER BY s.code, ses.session_number
+    ''')
+    peer_reviews = cursor.fetchall()
+
+    # Grades data
+    cursor.execute('''
+        SELECT s.id, s.code, s.name, s.section,
+               (SELECT COUNT(*) FROM enrollments WHERE subject_id = s.id) as enrolled
+        FROM subjects s ORDER BY s.code, s.section
+    ''')
+    grade_subjects = cursor.fetchall()
+
+    conn.close()
+    return render_template('instructor_academics.html',
+        students=students_list, sections=sections, enrollment_map=enrollment_map,
+        subjects=subjects, peer_reviews=peer_reviews, grade_subjects=grade_subjects)
+
+
+@bp.route('/instructor/work')
+@login_required
+def instructor_work():
+    """Combined page: Attendance + Payroll"""
+    if current_user.role not in ('instructor', 'admin'):
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    today = datetime.now().strftime('%Y-%m-%d')
+    month_start = datetime.now().strftime('%Y-%m-01')
+
+    # Attendance data
+    cursor.execute('''
+        SELECT * FROM instructor_attendance
+        WHERE instructor_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date DESC
+    ''', (current_user.id, month_start, today))
+    attendance_records = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT * FROM instructor_attendance WHERE instructor_id = ? AND date = ?
+    ''', (current_user.id, today))
+    today_record = cursor.fetchone()
+
+    cursor.execute('''
+        SELECT COUNT(*) as total_days,
+               SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present,
+               SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END) as absent,
+               SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) as late,
+               SUM(hours_worked) as total_hours
+        FROM instructor_attendance
+        WHERE instructor_id = ? AND date BETWEEN ? AND ?
+    ''', (current_user.id, month_start, today))
+    summary = cursor.fetchone()
+
+    # Payroll data
+    cursor.execute('''
+        SELECT * FROM instructor_payroll WHERE instructor_id = ? ORDER BY period_end DESC
+    ''', (current_user.id,))
+    payrolls = cursor.fetchall()
+
+    cursor.execute('SELECT * FROM instructor_profiles WHERE user_id = ?', (current_user.id,))
+    profile = cursor.fetchone()
+
+    conn.close()
+    return render_template('instructor_work.html',
+        attendance=attendance_records, today_record=today_record,
+        summary=summary, today=today, payrolls=payrolls, profile=profile)
+
+
+# ============== INSTRUCTOR CRUD (Individual Teacher) ==============
+
+@bp.route('/instructor/my-subjects')
+@login_required
+def instructor_my_subjects():
+    """Instructor manages their own subjects."""
+    if current_user.role != 'instructor':
+        return redirect(url_for('auth.index'))
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, (SELECT COUNT(*) FROM enrollments WHERE subject_id = s.id) as enrolled,
+               (SELECT COUNT(*) FROM sessions WHERE subject_id = s.id) as session_count
+        FROM subjects s WHERE s.instructor_id = ?
+        ORDER BY s.code, s.section
+    ''', (current_user.id,))
+    subjects = [dict(r) for r in cursor.fetchall()]
+    conn.close()
+    return render_template('instructor_my_subjects.html', subjects=subjects)
+
+
+@bp.route('/api/instructor/subjects', methods=['POST'])
+@login_required
+def api_instructor_add_subject():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.json
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO subjects (code, name, description, section, day, time_schedule, instructor_id, room, credits, max_students, institution_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (data['code'], data['name'], data.get('description', ''), data.get('section', ''),
+          data.get('day', ''), data.get('time_schedule', ''), current_user.id,
+          data.get('room', ''), data.get('credits', 3), data.get('max_students', 50), current_user.institution_id))
+    subject_id = cursor.lastrowid
+    for i in range(1, 17):
+        title = f"Session {i}: {'Lesson' if i <= 12 else 'Project'}"
+        cursor.execute('INSERT INTO sessions (subject_id, session_number, title) VALUES (?, ?, ?)', (subject_id, i, title))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'id': subject_id})
+
+
+@bp.route('/api/instructor/subjects/<int:subject_id>', methods=['PUT'])
+@login_required
+def api_instructor_update_subject(subject_id):
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    data = request.json
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE subjects SET code=?, name=?, description=?, section=?, day=?, time_schedule=?, room=?, credits=?, max_students=?
+        WHERE id=? AND instructor_id=?
+    ''', (data['code'], data['name'], data.get('description', ''), data.get('section', ''),
+          data.get('day', ''), data.get('time_schedule', ''), data.get('room', ''),
+          data.get('credits', 3), data.get('max_students', 50), subject_id, current_user.id))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+
+@bp.route('/api/instructor/subjects/<int:subject_id>', methods=['DELETE'])
+@login_required
+def api_instructor_delete_subject(subject_id):
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM subjects WHERE id=? AND instructor_id=?', (subject_id, current_user.id))
+    if not cursor.fetchone():
+        conn.close()
+        return jsonify({'error': 'Not found'}), 404
+    cursor.execute('DELETE FROM enrollments WHERE subject_id=?', (subject_id,))
+    cursor.execute('DELETE FROM sessions WHERE subject_id=?', (subject_id,))
+    invalidate_journey_tree([subject_id])
+    cursor.execute('DELETE FROM subjects WHERE id=?', (subject_id,))
+    stats_counters.mark_stale()
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
@@ -0,0 +1,780 @@
+"""Subjects, session pages (lesson, reading) and the session visibility/progress API."""
+import os
+import re
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask_login import login_required, login_user, current_user
+
+from database import get_db
+import fragment_cache
+import learning_events
+import release_scheduler
+
+from lms.common import (
+    check_and_mark_session_complete,
+    check_previous_session_complete,
+    get_session_progress,
+    invalidate_journey_tree,
+    invalidate_journey_tree_for,
+    load_user,
+    mark_session_complete,
+)
+
+bp = Blueprint('lessons', __name__)
+
+
+# ==================== VISIBILITY API ====================
+
+@bp.route('/api/toggle-visibility', methods=['POST'])
+@login_required
+def toggle_visibility():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    item_type = data.get('type')
+    item_id = data.get('id')
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    if item_type == 'session':
+        cursor.execute('SELECT is_visible FROM sessions WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['is_visible'] else 1
+            cursor.execute('UPDATE sessions SET is_visible = ? WHERE id = ?', (new_value, item_id))
+            invalidate_journey_tree_for(cursor, session_id=item_id)
+            fragment_cache.bump_session_version(cursor, session_id=item_id)
+    elif item_type == 'activity':
+        cursor.execute('SELECT is_visible FROM activities WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['is_visible'] else 1
+            cursor.execute('UPDATE activities SET is_visible = ? WHERE id = ?', (new_value, item_id))
+    elif item_type == 'activity_active':
+        cursor.execute('SELECT is_active FROM activities WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            keys = result.keys()
+            current_value = result['is_active'] if 'is_active' in keys else 1
+            new_value = 0 if current_value else 1
+            cursor.execute('UPDATE activities SET is_active = ? WHERE id = ?', (new_value, item_id))
+    elif item_type == 'quiz':
+        cursor.execute('SELECT is_visible FROM quizzes WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['is_visible'] else 1
+            cursor.execute('UPDATE quizzes SET is_visible = ? WHERE id = ?', (new_value, item_id))
+            invalidate_journey_tree_for(cursor, quiz_id=item_id)
+    elif item_type == 'exam':
+        cursor.execute('SELECT is_visible FROM exams WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['is_visible'] else 1
+            cursor.execute('UPDATE exams SET is_visible = ? WHERE id = ?', (new_value, item_id))
+    elif item_type == 'score':
+        cursor.execute('SELECT score_visible FROM submissions WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['score_visible'] else 1
+            cursor.execute('UPDATE submissions SET score_visible = ? WHERE id = ?', (new_value, item_id))
+            conn.commit()
+            conn.close()
+            return jsonify({'success': True, 'is_visible': bool(new_value)})
+    elif item_type == 'quiz_score':
+        cursor.execute('SELECT score_visible FROM quiz_attempts WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['score_visible'] else 1
+            cursor.execute('UPDATE quiz_attempts SET score_visible = ? WHERE id = ?', (new_value, item_id))
+    elif item_type == 'exam_score':
+        cursor.execute('SELECT score_visible FROM exam_attempts WHERE id = ?', (item_id,))
+        result = cursor.fetchone()
+        if result:
+            new_value = 0 if result['score_visible'] else 1
+            cursor.execute('UPDATE exam_attempts SET score_visible = ? WHERE id = ?', (new_value, item_id))
+    else:
+        conn.close()
+        return jsonify({'error': 'Invalid type'}), 400
+
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'is_visible': bool(new_value)})
+
+@bp.route('/api/schedule-visibility', methods=['POST'])
+@login_required
+def schedule_visibility():
+    """Release (and optionally hide again) a session, activity, quiz, exam or whole
+    subject at set times; empty times clear the schedule. See release_scheduler.py."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json() or {}
+    item_type = data.get('type')
+    try:
+        item_id = int(data.get('id'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid parameters'}), 400
+    if item_type not in release_scheduler.ITEM_TYPES:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    try:
+        visible_from = release_scheduler.parse_time(data.get('visible_from'))
+        visible_until = release_scheduler.parse_time(data.get('visible_until'))
+    except ValueError:
+        return jsonify({'error': 'Invalid date/time'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        release_scheduler.schedule(cursor, item_type, item_id, visible_from, visible_until, current_user.id)
+    except ValueError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'visible_from': visible_from, 'visible_until': visible_until})
+
+
+@bp.route('/api/scheduled-releases/<int:subject_id>')
+@login_required
+def scheduled_releases(subject_id):
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    conn = get_db()
+    releases = [dict(row) for row in release_scheduler.pending(conn.cursor(), subject_id)]
+    conn.close()
+    return jsonify({'releases': releases})
+
+
+def forget_released(cursor, releases):
+    """release_scheduler.on_released: drop this worker's journey trees for released items."""
+    for release in releases:
+        if release['item_type'] == 'session':
+            invalidate_journey_tree_for(cursor, session_id=release['item_id'])
+        elif release['item_type'] == 'quiz':
+            invalidate_journey_tree_for(cursor, quiz_id=release['item_id'])
+        elif release['item_type'] == 'subject':
+            invalidate_journey_tree([release['item_id']])
+
+
+def warm_session_pages(app, session_ids):
+    """release_scheduler.warm_sessions: render the lesson and reading pages of sessions
+    about to open, as their instructor (the fragments do not depend on the viewer),
+    so their {% cache %} fragments are stored before the students arrive."""
+    conn = get_db()
+    cursor = conn.cursor()
+    placeholders = ','.join('?' * len(session_ids))
+    cursor.execute(f'''
+        SELECT s.*, sub.code as subject_code, sub.name as subject_name, sub.id as subject_id,
+               COALESCE(sub.instructor_id,
+                        (SELECT id FROM users WHERE role = 'instructor' ORDER BY id LIMIT 1)) as instructor_id
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id IN ({placeholders})
+    ''', tuple(session_ids))
+    sessions = cursor.fetchall()
+    conn.close()
+
+    for session_data in sessions:
+        user = load_user(session_data['instructor_id']) if session_data['instructor_id'] else None
+        if user is None:
+            continue
+        with app.test_request_context(f"/session/{session_data['id']}/lesson"):
+            login_user(user)
+            try:
+                if not lesson_template_for(session_data['subject_code'], session_data['session_number']):
+                    render_template('lesson.html', session=session_data, video_watched=True,
+                                    progress={}, video_watch_seconds=0)
+                render_template('session_reading.html', session=session_data, progress={})
+            except Exception as e:
+                print(f"[Releases] Could not prewarm session {session_data['id']}: {e}")
+
+
+@bp.route('/api/session/youtube-url', methods=['POST'])
+@login_required
+def save_session_youtube_url():
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+    youtube_url = data.get('youtube_url', '').strip()
+    video_duration = data.get('video_duration', 0)
+
+    # Validate YouTube URL format (allow empty to clear)
+    if youtube_url and not any(domain in youtube_url for domain in ['youtube.com', 'youtu.be']):
+        return jsonify({'error': 'Invalid YouTube URL'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE sessions SET youtube_url = ?, video_duration = ? WHERE id = ?',
+                   (youtube_url or None, video_duration or 0, session_id))
+    fragment_cache.bump_session_version(cursor, session_id=session_id)
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'youtube_url': youtube_url})
+
+@bp.route('/api/session/video-heartbeat', methods=['POST'])
+@login_required
+def video_heartbeat():
+    """Track video watch progress with anti-cheat validation."""
+    if current_user.role != 'student':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+    current_time = data.get('current_time', 0)  # seconds
+    duration = data.get('duration', 0)  # total video duration in seconds
+
+    if not session_id or duration <= 0:
+        return jsonify({'error': 'Invalid data'}), 400
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Verify session has a YouTube URL
+    cursor.execute('SELECT youtube_url, video_duration FROM sessions WHERE id = ?', (session_id,))
+    sess = cursor.fetchone()
+    if not sess or not sess['youtube_url']:
+        conn.close()
+        return jsonify({'error': 'No video for this session'}), 400
+
+    # Update video_duration if not set yet
+    if not sess['video_duration'] and duration > 0:
+        cursor.execute('UPDATE sessions SET video_duration = ? WHERE id = ?', (int(duration), session_id))
+
+    # Get or create watch record
+    cursor.execute('''
+        SELECT * FROM session_video_watches WHERE session_id = ? AND student_id = ?
+    ''', (session_id, current_user.id))
+    watch = cursor.fetchone()
+
+    if watch:
+        last_pos = watch['last_position'] or 0
+        delta = current_time - last_pos
+        # Anti-cheat: max 10 seconds per heartbeat (5s interval + 5s tolerance)
+        # Also handle backward seeks (delta < 0) — that's fine, just don't add time
+        if delta > 10:
+            delta = 5  # Cap to normal heartbeat interval
+        if delta < 0:
+            delta = 0
+        new_watched = (watch['watched_seconds'] or 0) + delta
+        completed = 1 if new_watched >= duration * 0.98 else (watch['completed'] or 0)  # 98% threshold for rounding
+        cursor.execute('''
+            UPDATE session_video_watches
+            SET watched_seconds = ?, last_position = ?, last_heartbeat_at = CURRENT_TIMESTAMP, completed = ?
+            WHERE session_id = ? AND student_id = ?
+        ''', (int(new_watched), int(current_time), completed, session_id, current_user.id))
+    else:
+        new_watched = min(current_time, 5)  # First heartbeat
+        completed = 1 if new_watched >= duration * 0.98 else 0
+        cursor.execute('''
+            INSERT INTO session_video_watches (session_id, student_id, watched_seconds, last_position, last_heartbeat_at, completed)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+        ''', (session_id, current_user.id, int(new_watched), int(current_time), completed))
+
+    # If completed, update session progress
+    if completed:
+        cursor.execute('''
+            INSERT INTO session_progress (session_id, student_id, step_video)
+            VALUES (?, ?, 1)
+            ON CONFLICT(session_id, student_id) DO UPDATE SET step_video = 1
+        ''', (session_id, current_user.id))
+        check_and_mark_session_complete(cursor, session_id, current_user.id)
+
+    conn.commit()
+    conn.close()
+    learning_events.record('video_watched', current_user.id, session_id=session_id,
+                           watched_seconds=int(new_watched), completed=bool(completed))
+    return jsonify({'success': True, 'watched_seconds': int(new_watched), 'completed': bool(completed)})
+
+@bp.route('/api/session/complete-slides', methods=['POST'])
+@login_required
+def complete_slides():
+    """Mark slides as read for a session."""
+    if current_user.role != 'student':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Check video step is complete first
+    progress = get_session_progress(cursor, session_id, current_user.id)
+    if not progress['step_video']:
+        conn.close()
+        return jsonify({'error': 'Watch the video first'}), 400
+
+    cursor.execute('''
+        INSERT INTO session_progress (session_id, student_id, step_slides)
+        VALUES (?, ?, 1)
+        ON CONFLICT(session_id, student_id) DO UPDATE SET step_slides = 1
+    ''', (session_id, current_user.id))
+    check_and_mark_session_complete(cursor, session_id, current_user.id)
+    conn.commit()
+    conn.close()
+    learning_events.record('slides_completed', current_user.id, session_id=session_id)
+    return jsonify({'success': True})
+
+@bp.route('/api/session/complete-reading', methods=['POST'])
+@login_required
+def complete_reading():
+    """Mark reading materials as finished for a session."""
+    if current_user.role != 'student':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Check slides step is complete first
+    progress = get_session_progress(cursor, session_id, current_user.id)
+    if not progress['step_slides']:
+        conn.close()
+        return jsonify({'error': 'Complete the slides first'}), 400
+
+    cursor.execute('''
+        INSERT INTO session_progress (session_id, student_id, step_reading)
+        VALUES (?, ?, 1)
+        ON CONFLICT(session_id, student_id) DO UPDATE SET step_reading = 1
+    ''', (session_id, current_user.id))
+    check_and_mark_session_complete(cursor, session_id, current_user.id)
+    conn.commit()
+    conn.close()
+    learning_events.record('reading_completed', current_user.id, session_id=session_id)
+    return jsonify({'success': True})
+
+@bp.route('/api/session/<int:session_id>/progress')
+@login_required
+def get_progress(session_id):
+    """Get full progress for a student in a session."""
+    conn = get_db()
+    cursor = conn.cursor()
+    progress = get_session_progress(cursor, session_id, current_user.id)
+
+    # Also get video watch seconds
+    cursor.execute('''
+        SELECT watched_seconds, completed FROM session_video_watches
+        WHERE session_id = ? AND student_id = ?
+    ''', (session_id, current_user.id))
+    watch = cursor.fetchone()
+    progress['watched_seconds'] = watch['watched_seconds'] if watch else 0
+    progress['video_completed'] = bool(watch['completed']) if watch else False
+
+    # Get video duration
+    cursor.execute('SELECT video_duration FROM sessions WHERE id = ?', (session_id,))
+    sess = cursor.fetchone()
+    progress['video_duration'] = sess['video_duration'] if sess else 0
+
+    conn.close()
+    return jsonify(progress)
+
+@bp.route('/api/session/reading-materials', methods=['POST'])
+@login_required
+def save_reading_materials():
+    """Save reading materials for a session (instructor only)."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+    content = data.get('content', '').strip()
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE sessions SET reading_materials = ? WHERE id = ?',
+                   (content or None, session_id))
+    fragment_cache.bump_session_version(cursor, session_id=session_id)
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+@bp.route('/api/session/reading-audio', methods=['POST'])
+@login_required
+def upload_reading_audio():
+    """Upload MP3 audio for reading materials (instructor only)."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    session_id = request.form.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'Missing session_id'}), 400
+
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio file provided'}), 400
+
+    audio_file = request.files['audio']
+    if audio_file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    # Validate file extension
+    allowed_extensions = {'.mp3', '.wav', '.ogg', '.m4a'}
+    ext = os.path.splitext(audio_file.filename)[1].lower()
+    if ext not in allowed_extensions:
+        return jsonify({'error': 'Invalid file type. Allowed: MP3, WAV, OGG, M4A'}), 400
+
+    # Save file
+    filename = f"reading_audio_{session_id}{ext}"
+    audio_dir = os.path.join(current_app.root_path, 'static', 'uploads', 'audio')
+    os.makedirs(audio_dir, exist_ok=True)
+    filepath = os.path.join(audio_dir, filename)
+    audio_file.save(filepath)
+
+    # Update database
+    relative_path = f"uploads/audio/{filename}"
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE sessions SET reading_audio = ? WHERE id = ?',
+                   (relative_path, session_id))
+    fragment_cache.bump_session_version(cursor, session_id=session_id)
+    conn.commit()
+    conn.close()
+
+    return jsonify({'success': True, 'audio_path': relative_path})
+
+@bp.route('/api/session/reading-audio/delete', methods=['POST'])
+@login_required
+def delete_reading_audio():
+    """Delete reading audio for a session (instructor only)."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT reading_audio FROM sessions WHERE id = ?', (session_id,))
+    session = cursor.fetchone()
+    if session and session['reading_audio']:
+        # Delete file
+        filepath = os.path.join(current_app.root_path, 'static', session['reading_audio'])
+        if os.path.exists(filepath):
+            os.remove(filepath)
+    cursor.execute('UPDATE sessions SET reading_audio = NULL WHERE id = ?', (session_id,))
+    fragment_cache.bump_session_version(cursor, session_id=session_id)
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+@bp.route('/api/session/unlock', methods=['POST'])
+@login_required
+def unlock_session_for_students():
+    """Instructor manually unlocks a session by marking the PREVIOUS session as complete."""
+    if current_user.role != 'instructor':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json()
+    session_id = data.get('session_id')
+    student_id = data.get('student_id')  # specific student or 'all'
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get session info
+    cursor.execute('SELECT id, subject_id, session_number FROM sessions WHERE id = ?', (session_id,))
+    session = cursor.fetchone()
+    if not session:
+        conn.close()
+        return jsonify({'error': 'Session not found'}), 404
+
+    # Find the previous session to mark as complete
+    cursor.execute('''
+        SELECT id FROM sessions
+        WHERE subject_id = ? AND session_number = ? AND is_visible = 1
+    ''', (session['subject_id'], session['session_number'] - 1))
+    prev_session = cursor.fetchone()
+
+    # Determine which session to mark complete
+    # If session_number == 1, we mark THIS session's progress steps as complete
+    # Otherwise, we mark the PREVIOUS session as complete to unlock THIS one
+    target_session_id = prev_session['id'] if prev_session else session_id
+
+    # Upsert the progress rows of every enrolled student in one statement
+    if student_id == 'all':
+        unlocked = mark_session_complete(cursor, target_session_id, subject_id=session['subject_id'])
+    else:
+        unlocked = mark_session_complete(cursor, target_session_id, student_ids=[int(student_id)])
+
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True, 'unlocked': unlocked})
+
+
+# ==================== SUBJECTS ====================
+
+@bp.route('/subjects')
+@login_required
+def subjects():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects')
+    subjects_list = cursor.fetchall()
+    conn.close()
+    return render_template('subjects.html', subjects=subjects_list)
+
+@bp.route('/subjects/<int:id>')
+@login_required
+def subject_detail(id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (id,))
+    subject = cursor.fetchone()
+    cursor.execute('SELECT * FROM sessions WHERE subject_id = ? ORDER BY session_number', (id,))
+    sessions = cursor.fetchall()
+
+    # Get enrolled students with photos
+    cursor.execute('''
+        SELECT u.id, u.full_name, u.photo FROM users u
+        JOIN enrollments e ON u.id = e.student_id
+        WHERE e.subject_id = ?
+        ORDER BY u.full_name
+    ''', (id,))
+    enrolled_students = cursor.fetchall()
+    total_enrolled = len(enrolled_students)
+
+    # Batch queries for per-session performance stats
+    session_ids = [s['id'] for s in sessions]
+    session_stats = {}
+
+    if session_ids:
+        placeholders = ','.join(['?'] * len(session_ids))
+
+        # Query 1: Activity submission stats per session
+        cursor.execute(f'''
+            SELECT a.session_id,
+                   COUNT(DISTINCT a.id) as activity_count,
+                   COUNT(DISTINCT sub.id) as submission_count,
+                   COUNT(DISTINCT sub.student_id) as students_submitted,
+                   AVG(CASE WHEN sub.final_score IS NOT NULL THEN sub.final_score
+                        WHEN sub.score IS NOT NULL THEN sub.score END) as avg_score,
+                   SUM(CASE WHEN sub.score IS NOT NULL OR sub.final_score IS NOT NULL THEN 1 ELSE 0 END) as graded_count
+            FROM activities a
+            LEFT JOIN submissions sub ON a.id = sub.activity_id
+            WHERE a.session_id IN ({placeholders})
+            GROUP BY a.session_id
+        ''', session_ids)
+        activity_stats = {row['session_id']: dict(row) for row in cursor.fetchall()}
+
+        # Query 2: Quiz stats per session
+        cursor.execute(f'''
+            SELECT q.session_id,
+                   COUNT(DISTINCT q.id) as quiz_count,
+                   COUNT(DISTINCT qa.student_id) as students_attempted,
+                   AVG(qa.score) as avg_score,
+                   MAX(qa.score) as max_score
+            FROM quizzes q
+            LEFT JOIN quiz_attempts qa ON q.id = qa.quiz_id
+            WHERE q.session_id IN ({placeholders})
+            GROUP BY q.session_id
+        ''', session_ids)
+        quiz_stats = {row['session_id']: dict(row) for row in cursor.fetchall()}
+
+        # Query 3: Peer review stats per session
+        cursor.execute(f'''
+            SELECT a.session_id,
+                   COUNT(DISTINCT a.id) as peer_review_activities,
+                   COUNT(DISTINCT pra.id) as total_assignments,
+                   SUM(CASE WHEN pra.is_completed = 1 THEN 1 ELSE 0 END) as completed_assignments
+            FROM activities a
+            JOIN submissions sub ON a.id = sub.activity_id
+            JOIN peer_review_assignments pra ON sub.id = pra.submission_id
+            WHERE a.session_id IN ({placeholders}) AND a.enable_peer_review = 1
+            GROUP BY a.session_id
+        ''', session_ids)
+        peer_stats = {row['session_id']: dict(row) for row in cursor.fetchall()}
+
+        # Query 4: Completed students per session (batched)
+        cursor.execute(f'''
+            SELECT a.session_id, u.id, u.full_name, u.photo
+            FROM submissions sub
+            JOIN activities a ON sub.activity_id = a.id
+            JOIN users u ON sub.student_id = u.id
+            WHERE a.session_id IN ({placeholders})
+            GROUP BY a.session_id, u.id
+            ORDER BY u.full_name
+        ''', session_ids)
+        completed_map = {}
+        for row in cursor.fetchall():
+            sid = row['session_id']
+            if sid not in completed_map:
+                completed_map[sid] = []
+            completed_map[sid].append(dict(row))
+
+        # Assemble enriched session_stats
+        for s in sessions:
+            sid = s['id']
+            act = activity_stats.get(sid, {})
+            quiz = quiz_stats.get(sid, {})
+            pr = peer_stats.get(sid, {})
+
+            session_stats[sid] = {
+                'completed_students': completed_map.get(sid, []),
+                'completed_count': len(completed_map.get(sid, [])),
+                'activity_count': act.get('activity_count', 0),
+                'submission_count': act.get('submission_count', 0),
+                'students_submitted': act.get('students_submitted', 0),
+                'avg_score': round(act.get('avg_score') or 0, 1),
+                'graded_count': act.get('graded_count', 0),
+                'quiz_count': quiz.get('quiz_count', 0),
+                'quiz_students_attempted': quiz.get('students_attempted', 0),
+                'quiz_avg_score': round(quiz.get('avg_score') or 0, 1),
+                'quiz_max_score': round(quiz.get('max_score') or 0, 1),
+                'peer_review_activities': pr.get('peer_review_activities', 0),
+                'peer_review_total': pr.get('total_assignments', 0),
+                'peer_review_completed': pr.get('completed_assignments', 0),
+            }
+
+    conn.close()
+    return render_template('sessions.html', subject=subject, sessions=sessions,
+                           enrolled_students=enrolled_students, total_enrolled=total_enrolled,
+                           session_stats=session_stats)
+
+
+# ==================== LESSONS ====================
+
+# templates/lessons/<code>/session<N>.html overrides lesson.html for that
+# subject code and session; scanned once (every call in debug, so new files
+# show up without a restart)
+_LESSON_TEMPLATE_FILE = re.compile(r'^session(\d+)\.html$')
+_lesson_templates = {}
+
+
+def load_lesson_templates():
+    global _lesson_templates
+    lessons_dir = os.path.join(current_app.root_path, current_app.template_folder, 'lessons')
+    registry = {}
+    if os.path.isdir(lessons_dir):
+        for code_dir in os.listdir(lessons_dir):
+            if not os.path.isdir(os.path.join(lessons_dir, code_dir)):
+                continue
+            for filename in os.listdir(os.path.join(lessons_dir, code_dir)):
+                match = _LESSON_TEMPLATE_FILE.match(filename)
+                if match:
+                    registry[(code_dir.upper(), int(match.group(1)))] = f'lessons/{code_dir}/{filename}'
+    _lesson_templates = registry
+    return registry
+
+
+def lesson_template_for(subject_code, session_number):
+    if current_app.debug:
+        load_lesson_templates()
+    return _lesson_templates.get(((subject_code or '').upper(), session_number))
+
+
+def precompile_templates():
+    """Compile every Jinja template into the environment cache, so the first
+    request for each page (the 1,400-line lesson.html especially) skips parsing."""
+    compiled = 0
+    for name in current_app.jinja_env.list_templates(extensions=['html']):
+        try:
+            current_app.jinja_env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            print(f'[Templates] Could not compile {name}: {e}')
+    return compiled
+
+
+@bp.route('/session/<int:session_id>/lesson')
+@login_required
+def session_lesson(session_id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, sub.code as subject_code, sub.name as subject_name, sub.id as subject_id
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id,))
+    session_data = cursor.fetchone()
+
+    if not session_data:
+        conn.close()
+        flash('Session not found', 'error')
+        return redirect(url_for('instructor.dashboard'))
+
+    # Check visibility for students
+    if current_user.role == 'student' and not session_data['is_visible']:
+        conn.close()
+        flash('This lesson is not yet available.', 'warning')
+        return redirect(url_for('student.student_dashboard'))
+
+    # Check session gating for students (previous session must be complete)
+    progress = {}
+    video_watched = True
+    video_watch_seconds = 0
+    if current_user.role == 'student':
+        if not check_previous_session_complete(cursor, session_id, current_user.id):
+            conn.close()
+            flash('You must complete the previous session first.', 'warning')
+            return redirect(url_for('student.student_subject', subject_id=session_data['subject_id']))
+
+        progress = get_session_progress(cursor, session_id, current_user.id)
+        video_watched = bool(progress['step_video'])
+
+        # Get video watch seconds
+        cursor.execute('SELECT watched_seconds, completed FROM session_video_watches WHERE session_id = ? AND student_id = ?',
+                       (session_id, current_user.id))
+        watch_row = cursor.fetchone()
+        video_watch_seconds = watch_row['watched_seconds'] if watch_row else 0
+
+    conn.close()
+
+    tpl_data = dict(session=session_data, video_watched=video_watched,
+                    progress=progress, video_watch_seconds=video_watch_seconds)
+
+    # Subject-specific lesson template if one exists, else the generic lesson page
+    template_name = lesson_template_for(session_data['subject_code'], session_data['session_number'])
+    if template_name:
+        try:
+            return render_template(template_name, **tpl_data)
+        except Exception as e:
+            print(f'[Lesson] {template_name} failed to render, using lesson.html: {e}')
+    return render_template('lesson.html', **tpl_data)
+
+@bp.route('/session/<int:session_id>/reading')
+@login_required
+def session_reading(session_id):
+    """Student reading materials page."""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, sub.code as subject_code, sub.name as subject_name, sub.id as subject_id
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id,))
+    session_data = cursor.fetchone()
+
+    if not session_data:
+        conn.close()
+        flash('Session not found', 'error')
+        return redirect(url_for('instructor.dashboard'))
+
+    if current_user.role == 'student':
+        if not session_data['is_visible']:
+            conn.close()
+            flash('This session is not available.', 'warning')
+            return redirect(url_for('student.student_dashboard'))
+
+        if not check_previous_session_complete(cursor, session_id, current_user.id):
+            conn.close()
+            flash('You must complete the previous session first.', 'warning')
+            return redirect(url_for('student.student_subject', subject_id=session_data['subject_id']))
+
+        progress = get_session_progress(cursor, session_id, current_user.id)
+        if not progress['step_slides']:
+            conn.close()
+            flash('You must complete the slides first.', 'warning')
+            return redirect(url_for('lessons.session_lesson', session_id=session_id))
+    else:
+        progress = {}
+
+    conn.close()
+    return render_template('session_reading.html', session=session_data, progress=progress)
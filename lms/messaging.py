@@ -0,0 +1,341 @@
+"""Messages and notifications."""
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+
+from database import get_db
+import pagination
+
+from lms.templating import avatar_url
+
+bp = Blueprint('messaging', __name__)
+
+
+# ============== MESSAGING SYSTEM ==============
+
+MESSAGE_ORDER = pagination.Keyset(('m.created_at', 'created_at'), ('m.id', 'id'), descending=True)
+
+def time_ago(dt):
+    """Convert datetime to human-readable time ago string"""
+    if not dt:
+        return ''
+    now = datetime.now()
+    diff = now - dt
+    seconds = diff.total_seconds()
+
+    if seconds < 60:
+        return 'Just now'
+    elif seconds < 3600:
+        mins = int(seconds / 60)
+        return f'{mins}m ago'
+    elif seconds < 86400:
+        hours = int(seconds / 3600)
+        return f'{hours}h ago'
+    elif seconds < 604800:
+        days = int(seconds / 86400)
+        return f'{days}d ago'
+    else:
+        return dt.strftime('%b %d')
+
+@bp.route('/api/messages/unread-count')
+@login_required
+def get_unread_counts():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Count unread messages for current user
+    if current_user.role == 'instructor':
+        # Instructors see replies to their messages
+        cursor.execute('''
+            SELECT COUNT(*) FROM messages
+            WHERE recipient_id = ? AND is_read = 0
+        ''', (current_user.id,))
+    else:
+        # Students see messages sent to them (individual, section, or all)
+        cursor.execute('''
+            SELECT COUNT(*) FROM messages
+            WHERE is_read = 0 AND (
+                recipient_id = ?
+                OR recipient_section = ?
+                OR recipient_all = 1
+            ) AND sender_id != ?
+        ''', (current_user.id, current_user.section, current_user.id))
+
+    msg_count = cursor.fetchone()[0]
+
+    # Count unread notifications
+    cursor.execute('''
+        SELECT COUNT(*) FROM notifications
+        WHERE user_id = ? AND is_read = 0
+    ''', (current_user.id,))
+    notif_count = cursor.fetchone()[0]
+
+    conn.close()
+
+    return jsonify({
+        'messages': msg_count,
+        'notifications': notif_count
+    })
+
+@bp.route('/api/messages/preview')
+@login_required
+def get_messages_preview():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    if current_user.role == 'instructor':
+        # Instructors see their sent messages
+        cursor.execute('''
+            SELECT m.*, u.full_name as sender_name, u.photo as sender_photo
+            FROM messages m
+            JOIN users u ON m.sender_id = u.id
+            WHERE m.sender_id = ?
+            ORDER BY m.created_at DESC
+            LIMIT 5
+        ''', (current_user.id,))
+    else:
+        # Students see messages sent to them
+        cursor.execute('''
+            SELECT m.*, u.full_name as sender_name, u.photo as sender_photo
+            FROM messages m
+            JOIN users u ON m.sender_id = u.id
+            WHERE (
+                m.recipient_id = ?
+                OR m.recipient_section = ?
+                OR m.recipient_all = 1
+            ) AND m.sender_id != ?
+            ORDER BY m.created_at DESC
+            LIMIT 5
+        ''', (current_user.id, current_user.section, current_user.id))
+
+    messages = []
+    for row in cursor.fetchall():
+        msg = dict(row)
+        created = datetime.strptime(msg['created_at'], '%Y-%m-%d %H:%M:%S') if msg['created_at'] else datetime.now()
+        msg['time_ago'] = time_ago(created)
+        msg['sender_photo'] = avatar_url(msg['sender_photo'])
+        messages.append(msg)
+
+    conn.close()
+    return jsonify(messages)
+
+@bp.route('/api/notifications')
+@login_required
+def get_notifications():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT * FROM notifications
+        WHERE user_id = ?
+        ORDER BY created_at DESC
+        LIMIT 10
+    ''', (current_user.id,))
+
+    notifications = []
+    for row in cursor.fetchall():
+        notif = dict(row)
+        created = datetime.strptime(notif['created_at'], '%Y-%m-%d %H:%M:%S') if notif['created_at'] else datetime.now()
+        notif['time_ago'] = time_ago(created)
+        notif['read'] = bool(notif['is_read'])
+        notifications.append(notif)
+
+    conn.close()
+    return jsonify(notifications)
+
+@bp.route('/api/notifications/<int:id>/read', methods=['POST'])
+@login_required
+def mark_notification_read(id):
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE notifications SET is_read = 1 WHERE id = ? AND user_id = ?', (id, current_user.id))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+@bp.route('/api/notifications/mark-all-read', methods=['POST'])
+@login_required
+def mark_all_notifications_read():
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('UPDATE notifications SET is_read = 1 WHERE user_id = ?', (current_user.id,))
+    conn.commit()
+    conn.close()
+    return jsonify({'success': True})
+
+@bp.route('/messages')
+@login_required
+def messages():
+    conn = get_db()
+    cursor = conn.cursor()
+
+    if current_user.role == 'instructor':
+        # Get sent messages, one page at a time
+        sent_page = MESSAGE_ORDER.fetch(cursor, '''
+            SELECT m.*,
+                   CASE
+                       WHEN m.recipient_all = 1 THEN 'All Students'
+                       WHEN m.recipient_section IS NOT NULL THEN m.recipient_section
+                       ELSE (SELECT full_name FROM users WHERE id = m.recipient_id)
+                   END as recipient_name
+            FROM messages m
+            WHERE m.sender_id = ? AND {keyset}
+        ''', (current_user.id,), request.args)
+        sent_messages = [dict(row) for row in sent_page]
+
+        cursor.execute('SELECT COUNT(*) FROM messages WHERE sender_id = ?', (current_user.id,))
+        sent_count = cursor.fetchone()[0]
+
+        # Get list of sections and students for compose
+        cursor.execute('SELECT DISTINCT section FROM users WHERE section IS NOT NULL ORDER BY section')
+        sections = [row['section'] for row in cursor.fetchall()]
+
+        cursor.execute("SELECT id, full_name, section, student_id FROM users WHERE role = 'student' ORDER BY section, full_name")
+        students = [dict(row) for row in cursor.fetchall()]
+
+        conn.close()
+        return render_template('messages_instructor.html',
+                               sent_messages=sent_messages,
+                               sent_page=sent_page,
+                               sent_count=sent_count,
+                               sections=sections,
+                               students=students)
+    else:
+        # Students: Get received messages, one page at a time
+        inbox = '''
+            (
+                m.recipient_id = ?
+                OR m.recipient_section = ?
+                OR m.recipient_all = 1
+            ) AND m.sender_id != ?
+        '''
+        params = (current_user.id, current_user.section, current_user.id)
+        page = MESSAGE_ORDER.fetch(cursor, f'''
+            SELECT m.*, u.full_name as sender_name, u.photo as sender_photo
+            FROM messages m
+            JOIN users u ON m.sender_id = u.id
+            WHERE {inbox} AND {{keyset}}
+        ''', params, request.args)
+        received_messages = [dict(row) for row in page]
+
+        cursor.execute(f'SELECT COUNT(*) FROM messages m WHERE {inbox}', params)
+        message_count = cursor.fetchone()[0]
+
+        conn.close()
+        return render_template('messages_student.html', messages=received_messages,
+                               page=page, message_count=message_count)
+
+@bp.route('/messages/<int:id>')
+@login_required
+def view_message(id):
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT m.*, u.full_name as sender_name, u.photo as sender_photo
+        FROM messages m
+        JOIN users u ON m.sender_id = u.id
+        WHERE m.id = ?
+    ''', (id,))
+    message = cursor.fetchone()
+
+    if not message:
+        flash('Message not found.', 'error')
+        conn.close()
+        return redirect(url_for('messaging.messages'))
+
+    message = dict(message)
+
+    # Mark as read if student viewing
+    if current_user.role == 'student':
+        cursor.execute('UPDATE messages SET is_read = 1 WHERE id = ?', (id,))
+        conn.commit()
+
+    conn.close()
+    return render_template('view_message.html', message=message)
+
+@bp.route('/messages/send', methods=['POST'])
+@login_required
+def send_message():
+    if current_user.role != 'instructor':
+        flash('Only instructors can send messages.', 'error')
+        return redirect(url_for('messaging.messages'))
+
+    recipient_type = request.form.get('recipient_type')
+    subject = request.form.get('subject', '').strip()
+    content = request.form.get('content', '').strip()
+
+    if not subject or not content:
+        flash('Subject and message content are required.', 'error')
+        return redirect(url_for('messaging.messages'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    if recipient_type == 'all':
+        # Send to all students
+        cursor.execute('''
+            INSERT INTO messages (sender_id, recipient_all, subject, content)
+            VALUES (?, 1, ?, ?)
+        ''', (current_user.id, subject, content))
+
+        # Create notifications for all students
+        cursor.execute("SELECT id FROM users WHERE role = 'student'")
+        students = cursor.fetchall()
+        for student in students:
+            cursor.execute('''
+                INSERT INTO notifications (user_id, type, icon, message, link)
+                VALUES (?, 'message', 'envelope', ?, ?)
+            ''', (student['id'], f'New message from {current_user.full_name}: {subject}', f'/messages/{cursor.lastrowid}'))
+
+        flash(f'Message sent to all students!', 'success')
+
+    elif recipient_type == 'section':
+        section = request.form.get('section')
+        if not section:
+            flash('Please select a section.', 'error')
+            conn.close()
+            return redirect(url_for('messaging.messages'))
+
+        cursor.execute('''
+            INSERT INTO messages (sender_id, recipient_section, subject, content)
+            VALUES (?, ?, ?, ?)
+        ''', (current_user.id, section, subject, content))
+        msg_id = cursor.lastrowid
+
+        # Create notifications for section students
+        cursor.execute("SELECT id FROM users WHERE role = 'student' AND section = ?", (section,))
+        students = cursor.fetchall()
+        for student in students:
+            cursor.execute('''
+                INSERT INTO notifications (user_id, type, icon, message, link)
+                VALUES (?, 'message', 'envelope', ?, ?)
+            ''', (student['id'], f'New message from {current_user.full_name}: {subject}', f'/messages/{msg_id}'))
+
+        flash(f'Message sent to {section}!', 'success')
+
+    elif recipient_type == 'individual':
+        recipient_id = request.form.get('recipient_id')
+        if not recipient_id:
+            flash('Please select a student.', 'error')
+            conn.close()
+            return redirect(url_for('messaging.messages'))
+
+        cursor.execute('''
+            INSERT INTO messages (sender_id, recipient_id, subject, content)
+            VALUES (?, ?, ?, ?)
+        ''', (current_user.id, recipient_id, subject, content))
+        msg_id = cursor.lastrowid
+
+        # Create notification for the student
+        cursor.execute('''
+            INSERT INTO notifications (user_id, type, icon, message, link)
+            VALUES (?, 'message', 'envelope', ?, ?)
+        ''', (recipient_id, f'New message from {current_user.full_name}: {subject}', f'/messages/{msg_id}'))
+
+        flash('Message sent!', 'success')
+
+    conn.commit()
+    conn.close()
+    return redirect(url_for('messaging.messages'))
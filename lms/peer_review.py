@@ -0,0 +1,839 @@
+"""Peer review settings, assignment, reviewing and approval."""
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from database import get_db
+
+from lms.common import calculate_participation_score
+
+bp = Blueprint('peer_review', __name__)
+
+
+# ==================== PEER REVIEW SYSTEM ====================
+
+@bp.route('/instructor/peer-reviews')
+@login_required
+def instructor_peer_reviews():
+    """Instructor overview of all peer reviews across activities"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get all activities with peer review enabled
+    cursor.execute('''
+        SELECT a.*, ses.title as session_title, sub.name as subject_name, sub.section,
+               (SELECT COUNT(*) FROM submissions WHERE activity_id = a.id) as submission_count,
+               (SELECT COUNT(*) FROM peer_review_assignments pra
+                JOIN submissions s ON pra.submission_id = s.id
+                WHERE s.activity_id = a.id) as assignment_count,
+               (SELECT COUNT(*) FROM peer_review_assignments pra
+                JOIN submissions s ON pra.submission_id = s.id
+                WHERE s.activity_id = a.id AND pra.is_completed = 1) as completed_count
+        FROM activities a
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects sub ON ses.subject_id = sub.id
+        WHERE a.enable_peer_review = 1
+        ORDER BY a.id DESC
+    ''')
+    activities = cursor.fetchall()
+
+    conn.close()
+    return render_template('instructor_peer_reviews.html', activities=activities)
+
+
+@bp.route('/activity/<int:activity_id>/peer-review/settings', methods=['GET', 'POST'])
+@login_required
+def peer_review_settings(activity_id):
+    """Instructor page to configure peer review settings and criteria"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+
+    if not activity:
+        flash('Activity not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.dashboard'))
+
+    if request.method == 'POST':
+        enable_peer_review = 1 if request.form.get('enable_peer_review') else 0
+        peer_reviewers_count = int(request.form.get('peer_reviewers_count', 1))
+
+        cursor.execute('''
+            UPDATE activities SET enable_peer_review = ?, peer_reviewers_count = ?
+            WHERE id = ?
+        ''', (enable_peer_review, peer_reviewers_count, activity_id))
+        conn.commit()
+        flash('Peer review settings updated!', 'success')
+
+    # Get existing criteria
+    cursor.execute('''
+        SELECT * FROM peer_review_criteria WHERE activity_id = ? ORDER BY order_num
+    ''', (activity_id,))
+    criteria = cursor.fetchall()
+
+    # Get activity with updated settings
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+
+    conn.close()
+    return render_template('peer_review_settings.html', activity=activity, criteria=criteria)
+
+
+@bp.route('/activity/<int:activity_id>/peer-review/criteria', methods=['POST'])
+@login_required
+def add_peer_review_criteria(activity_id):
+    """Add a new peer review criterion"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    criterion = request.form.get('criterion', '').strip()
+    points = int(request.form.get('points', 1))
+
+    if not criterion:
+        flash('Criterion text is required', 'error')
+        return redirect(url_for('peer_review.peer_review_settings', activity_id=activity_id))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get next order number
+    cursor.execute('SELECT MAX(order_num) as max_order FROM peer_review_criteria WHERE activity_id = ?', (activity_id,))
+    result = cursor.fetchone()
+    next_order = (result['max_order'] or 0) + 1
+
+    cursor.execute('''
+        INSERT INTO peer_review_criteria (activity_id, criterion, points, order_num)
+        VALUES (?, ?, ?, ?)
+    ''', (activity_id, criterion, points, next_order))
+    conn.commit()
+    conn.close()
+
+    flash('Criterion added successfully!', 'success')
+    return redirect(url_for('peer_review.peer_review_settings', activity_id=activity_id))
+
+
+@bp.route('/activity/<int:activity_id>/peer-review/criteria/<int:criterion_id>/delete', methods=['POST'])
+@login_required
+def delete_peer_review_criteria(activity_id, criterion_id):
+    """Delete a peer review criterion"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM peer_review_criteria WHERE id = ? AND activity_id = ?', (criterion_id, activity_id))
+    conn.commit()
+    conn.close()
+
+    flash('Criterion deleted', 'success')
+    return redirect(url_for('peer_review.peer_review_settings', activity_id=activity_id))
+
+
+@bp.route('/activity/<int:activity_id>/peer-review/assign', methods=['POST'])
+@login_required
+def assign_peer_reviewers(activity_id):
+    """Randomly assign peer reviewers to submissions - smart assignment that preserves completed reviews"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    import random
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get activity settings
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+
+    if not activity:
+        flash('Activity not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.dashboard'))
+
+    keys = activity.keys()
+    peer_reviewers_count = activity['peer_reviewers_count'] if 'peer_reviewers_count' in keys else 1
+
+    # Auto-generate topic-specific review criteria if none exist
+    cursor.execute('SELECT COUNT(*) FROM peer_review_criteria WHERE activity_id = ?', (activity_id,))
+    if cursor.fetchone()[0] == 0:
+        import re
+        # Get session title for topic context
+        cursor.execute('''
+            SELECT s.title as session_title, a.title as activity_title, a.instructions
+            FROM activities a JOIN sessions s ON a.session_id = s.id WHERE a.id = ?
+        ''', (activity_id,))
+        info = cursor.fetchone()
+        session_topic = info['session_title'] if info else 'the lesson'
+        act_title = info['activity_title'] if info else 'the activity'
+        instructions_html = info['instructions'] if info and info['instructions'] else ''
+
+        # Extract key tasks/objectives from instructions HTML
+        task_items = []
+        # Extract <li> items
+        li_matches = re.findall(r'<li[^>]*>(.*?)</li>', instructions_html, re.DOTALL)
+        for item in li_matches:
+            clean = re.sub(r'<[^>]+>', '', item).strip()
+            if clean and len(clean) > 10 and len(clean) < 150:
+                task_items.append(clean)
+        # Extract <td> descriptions from task tables (skip header and number/points columns)
+        td_matches = re.findall(r'<td[^>]*>(.*?)</td>', instructions_html, re.DOTALL)
+        for item in td_matches:
+            clean = re.sub(r'<[^>]+>', '', item).strip()
+            if clean and len(clean) > 15 and not clean.isdigit():
+                task_items.append(clean)
+
+        # Build specific criteria from extracted content
+        criteria = []
+        order = 1
+        # Add topic-level question
+        criteria.append((f'Did the student demonstrate understanding of "{session_topic}"?', 1, order))
+        order += 1
+
+        # Add task-specific questions (up to 4)
+        seen = set()
+        for task in task_items[:6]:
+            if task.lower() not in seen and len(criteria) < 6:
+                seen.add(task.lower())
+                criteria.append((f'Did the student mention or show: "{task}"?', 1, order))
+                order += 1
+
+        # Fill remaining with general criteria if less than 4 total
+        if len(criteria) < 3:
+            criteria.append((f'Did the student follow the instructions for "{act_title}" correctly?', 1, order))
+            order += 1
+        if len(criteria) < 4:
+            criteria.append(('Is the submission complete with all required deliverables?', 1, order))
+            order += 1
+        if len(criteria) < 5:
+            criteria.append(('Would you consider this submission satisfactory overall?', 1, order))
+            order += 1
+
+        for criterion, points, order_num in criteria:
+            cursor.execute('''
+                INSERT INTO peer_review_criteria (activity_id, criterion, points, order_num)
+                VALUES (?, ?, ?, ?)
+            ''', (activity_id, criterion, points, order_num))
+        conn.commit()
+
+    # Get all submissions for this activity
+    cursor.execute('''
+        SELECT s.id, s.student_id FROM submissions s
+        WHERE s.activity_id = ?
+    ''', (activity_id,))
+    submissions = cursor.fetchall()
+
+    if len(submissions) < 2:
+        flash('Need at least 2 submissions to assign peer reviews', 'error')
+        conn.close()
+        return redirect(url_for('peer_review.peer_review_settings', activity_id=activity_id))
+
+    # Get existing assignments (both completed and pending) to avoid duplicates
+    submission_ids = [s['id'] for s in submissions]
+    placeholders = ','.join(['?' for _ in submission_ids])
+    cursor.execute(f'''
+        SELECT submission_id, reviewer_id, is_completed FROM peer_review_assignments
+        WHERE submission_id IN ({placeholders})
+    ''', submission_ids)
+    existing_assignments = cursor.fetchall()
+
+    # Build a set of existing (submission_id, reviewer_id) pairs
+    existing_pairs = set((a['submission_id'], a['reviewer_id']) for a in existing_assignments)
+
+    # Track completed assignments - these should not be removed
+    completed_pairs = set((a['submission_id'], a['reviewer_id']) for a in existing_assignments if a['is_completed'])
+
+    # Only delete PENDING (not completed) assignments for fresh reassignment
+    for sub_id in submission_ids:
+        cursor.execute('''
+            DELETE FROM peer_review_assignments
+            WHERE submission_id = ? AND is_completed = 0
+        ''', (sub_id,))
+
+    # Track how many reviews each student has already completed for this activity
+    cursor.execute(f'''
+        SELECT reviewer_id, COUNT(*) as review_count
+        FROM peer_review_assignments
+        WHERE submission_id IN ({placeholders}) AND is_completed = 1
+        GROUP BY reviewer_id
+    ''', submission_ids)
+    completed_counts = {row['reviewer_id']: row['review_count'] for row in cursor.fetchall()}
+
+    # Create assignment pool - each student should review X other submissions
+    assignments_made = 0
+
+    for submission in submissions:
+        submitter_id = submission['student_id']
+        submission_id = submission['id']
+
+        # Check how many reviewers this submission already has (completed)
+        existing_reviewers_for_sub = [p[1] for p in completed_pairs if p[0] == submission_id]
+        needed_reviewers = max(0, peer_reviewers_count - len(existing_reviewers_for_sub))
+
+        if needed_reviewers <= 0:
+            continue  # This submission already has enough reviews
+
+        # Get potential reviewers (all students who submitted, except the submitter)
+        # and who haven't already reviewed this submission
+        potential_reviewers = [
+            s['student_id'] for s in submissions
+            if s['student_id'] != submitter_id
+            and (submission_id, s['student_id']) not in completed_pairs
+        ]
+
+        # Sort by least reviews completed (so workload is distributed evenly)
+        potential_reviewers.sort(key=lambda r: completed_counts.get(r, 0))
+
+        # Add some randomness within similar workload groups
+        random.shuffle(potential_reviewers)
+
+        selected_reviewers = potential_reviewers[:min(needed_reviewers, len(potential_reviewers))]
+
+        for reviewer_id in selected_reviewers:
+            # Double check not already assigned
+            if (submission_id, reviewer_id) not in existing_pairs:
+                try:
+                    cursor.execute('''
+                        INSERT INTO peer_review_assignments (submission_id, reviewer_id)
+                        VALUES (?, ?)
+                    ''', (submission_id, reviewer_id))
+                    assignments_made += 1
+                    existing_pairs.add((submission_id, reviewer_id))
+                except:
+                    pass  # Skip duplicates
+
+    conn.commit()
+    conn.close()
+
+    flash(f'Peer review assignments updated! {assignments_made} new reviews assigned. Completed reviews preserved.', 'success')
+    return redirect(url_for('peer_review.peer_review_settings', activity_id=activity_id))
+
+
+@bp.route('/student/peer-reviews')
+@login_required
+def student_peer_reviews():
+    """Student page to see pending and completed peer reviews"""
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get pending peer reviews (assigned to this student but not completed)
+    cursor.execute('''
+        SELECT pra.*, s.content, s.file_path, a.title as activity_title, a.id as activity_id,
+               ses.title as session_title, sub.name as subject_name
+        FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        JOIN activities a ON s.activity_id = a.id
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects sub ON ses.subject_id = sub.id
+        WHERE pra.reviewer_id = ? AND pra.is_completed = 0
+        ORDER BY pra.assigned_at DESC
+    ''', (current_user.id,))
+    pending_reviews = cursor.fetchall()
+
+    # Get completed peer reviews with score given
+    cursor.execute('''
+        SELECT pra.*, s.content, a.title as activity_title, a.id as activity_id,
+               ses.title as session_title, sub.name as subject_name,
+               (SELECT AVG(points_awarded) FROM peer_review_responses WHERE assignment_id = pra.id) as review_score
+        FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        JOIN activities a ON s.activity_id = a.id
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects sub ON ses.subject_id = sub.id
+        WHERE pra.reviewer_id = ? AND pra.is_completed = 1
+        ORDER BY pra.completed_at DESC
+    ''', (current_user.id,))
+    completed_reviews = cursor.fetchall()
+
+    # Get the student's own submissions that have peer review scores
+    cursor.execute('''
+        SELECT s.peer_review_score, a.title as activity_title,
+               ses.title as session_title, sub.name as subject_name,
+               (SELECT COUNT(*) FROM peer_review_assignments WHERE submission_id = s.id AND is_completed = 1) as reviews_received
+        FROM submissions s
+        JOIN activities a ON s.activity_id = a.id
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects sub ON ses.subject_id = sub.id
+        WHERE s.student_id = ? AND a.enable_peer_review = 1 AND s.peer_review_score IS NOT NULL
+        ORDER BY s.submitted_at DESC
+    ''', (current_user.id,))
+    my_scores = cursor.fetchall()
+
+    conn.close()
+    return render_template('student_peer_reviews.html',
+                           pending_reviews=pending_reviews,
+                           completed_reviews=completed_reviews,
+                           my_scores=my_scores)
+
+
+@bp.route('/peer-review/<int:assignment_id>')
+@login_required
+def do_peer_review(assignment_id):
+    """Page for student to complete a peer review"""
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get the assignment and verify it belongs to the current user
+    cursor.execute('''
+        SELECT pra.*, s.content, s.file_path, s.activity_id,
+               a.title as activity_title, a.instructions
+        FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        JOIN activities a ON s.activity_id = a.id
+        WHERE pra.id = ? AND pra.reviewer_id = ?
+    ''', (assignment_id, current_user.id))
+    assignment = cursor.fetchone()
+
+    if not assignment:
+        flash('Peer review assignment not found', 'error')
+        conn.close()
+        return redirect(url_for('peer_review.student_peer_reviews'))
+
+    # Get the submission files
+    cursor.execute('''
+        SELECT * FROM submission_files WHERE submission_id = ?
+    ''', (assignment['submission_id'],))
+    files = cursor.fetchall()
+
+    # Get review criteria for this activity
+    cursor.execute('''
+        SELECT * FROM peer_review_criteria WHERE activity_id = ? ORDER BY order_num
+    ''', (assignment['activity_id'],))
+    criteria = cursor.fetchall()
+
+    conn.close()
+    return render_template('do_peer_review.html',
+                           assignment=assignment,
+                           files=files,
+                           criteria=criteria)
+
+
+@bp.route('/peer-review/<int:assignment_id>/submit', methods=['POST'])
+@login_required
+def submit_peer_review(assignment_id):
+    """Submit peer review responses"""
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Verify assignment belongs to current user
+    cursor.execute('''
+        SELECT pra.*, s.activity_id FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        WHERE pra.id = ? AND pra.reviewer_id = ?
+    ''', (assignment_id, current_user.id))
+    assignment = cursor.fetchone()
+
+    if not assignment:
+        flash('Peer review assignment not found', 'error')
+        conn.close()
+        return redirect(url_for('peer_review.student_peer_reviews'))
+
+    # Get all criteria for this activity
+    cursor.execute('''
+        SELECT * FROM peer_review_criteria WHERE activity_id = ?
+    ''', (assignment['activity_id'],))
+    criteria = cursor.fetchall()
+
+    # New scoring system:
+    # Yes = 100, Somehow = 85, No = 70, No answer = 60
+    SCORE_YES = 100
+    SCORE_SOMEHOW = 85
+    SCORE_NO = 70
+    SCORE_NO_ANSWER = 60
+
+    total_score = 0
+    criteria_count = len(criteria)
+
+    # Process each criterion response
+    for criterion in criteria:
+        criterion_id = criterion['id']
+        response = request.form.get(f'criterion_{criterion_id}', '')
+
+        # Calculate score based on response
+        if response == 'yes':
+            points_awarded = SCORE_YES
+        elif response == 'somehow':
+            points_awarded = SCORE_SOMEHOW
+        elif response == 'no':
+            points_awarded = SCORE_NO
+        else:
+            points_awarded = SCORE_NO_ANSWER
+            response = 'no_answer'
+
+        total_score += points_awarded
+
+        # Save the response
+        cursor.execute('''
+            INSERT INTO peer_review_responses (assignment_id, criterion_id, response, points_awarded)
+            VALUES (?, ?, ?, ?)
+        ''', (assignment_id, criterion_id, response, points_awarded))
+
+    # Calculate average score for this review (percentage out of 100)
+    avg_review_score = total_score / criteria_count if criteria_count > 0 else SCORE_NO_ANSWER
+
+    # Mark assignment as completed
+    cursor.execute('''
+        UPDATE peer_review_assignments SET is_completed = 1, completed_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (assignment_id,))
+
+    # Update the submission's peer review score (average of all reviewers)
+    submission_id = assignment['submission_id']
+
+    # Calculate average peer review score across all completed reviews for this submission
+    cursor.execute('''
+        SELECT AVG(
+            (SELECT AVG(points_awarded) FROM peer_review_responses WHERE assignment_id = pra.id)
+        ) as avg_score
+        FROM peer_review_assignments pra
+        WHERE pra.submission_id = ? AND pra.is_completed = 1
+    ''', (submission_id,))
+    result = cursor.fetchone()
+    avg_peer_score = result['avg_score'] if result and result['avg_score'] else avg_review_score
+
+    cursor.execute('''
+        UPDATE submissions SET peer_review_score = ? WHERE id = ?
+    ''', (avg_peer_score, submission_id))
+
+    conn.commit()
+    conn.close()
+
+    flash(f'Peer review submitted! Average score awarded: {avg_review_score:.1f}/100', 'success')
+    return redirect(url_for('peer_review.student_peer_reviews'))
+
+
+@bp.route('/activity/<int:activity_id>/peer-review/status')
+@login_required
+def peer_review_status(activity_id):
+    """Instructor view of peer review status, approve/reject reviews, and grade submissions"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+
+    if not activity:
+        flash('Activity not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.dashboard'))
+
+    max_points = activity['points'] if activity['points'] else 100
+
+    # Get all submissions with peer review stats
+    cursor.execute('''
+        SELECT s.*, u.full_name, u.student_id as sid, u.photo,
+               (SELECT COUNT(*) FROM peer_review_assignments WHERE submission_id = s.id) as total_reviewers,
+               (SELECT COUNT(*) FROM peer_review_assignments WHERE submission_id = s.id AND is_completed = 1) as completed_reviews,
+               (SELECT COUNT(*) FROM peer_review_assignments WHERE submission_id = s.id AND approval_status = 'approved') as approved_reviews,
+               (SELECT COUNT(*) FROM peer_review_assignments WHERE submission_id = s.id AND approval_status = 'rejected') as rejected_reviews
+        FROM submissions s
+        JOIN users u ON s.student_id = u.id
+        WHERE s.activity_id = ?
+        ORDER BY u.full_name
+    ''', (activity_id,))
+    submissions_raw = cursor.fetchall()
+
+    # Enrich each submission with reviews, files, and reviewer participation info
+    submissions = []
+    for sub in submissions_raw:
+        sub_dict = dict(sub)
+
+        # Get submission files
+        cursor.execute('SELECT * FROM submission_files WHERE submission_id = ?', (sub['id'],))
+        sub_dict['files'] = cursor.fetchall()
+
+        # Get peer reviews for this submission
+        cursor.execute('''
+            SELECT pra.*, u.full_name as reviewer_name, u.student_id as reviewer_sid,
+                   (SELECT AVG(points_awarded) FROM peer_review_responses WHERE assignment_id = pra.id) as review_avg
+            FROM peer_review_assignments pra
+            JOIN users u ON pra.reviewer_id = u.id
+            WHERE pra.submission_id = ?
+            ORDER BY pra.is_completed DESC, pra.assigned_at
+        ''', (sub['id'],))
+        reviews = cursor.fetchall()
+        sub_dict['reviews'] = []
+        for rev in reviews:
+            rev_dict = dict(rev)
+            if rev['is_completed']:
+                cursor.execute('''
+                    SELECT prr.*, COALESCE(prc.criterion, 'Review criterion') as criterion
+                    FROM peer_review_responses prr
+                    LEFT JOIN peer_review_criteria prc ON prr.criterion_id = prc.id
+                    WHERE prr.assignment_id = ?
+                    ORDER BY prr.id
+                ''', (rev['id'],))
+                rev_dict['responses'] = cursor.fetchall()
+            else:
+                rev_dict['responses'] = []
+            sub_dict['reviews'].append(rev_dict)
+
+        submissions.append(sub_dict)
+
+    # Summary stats
+    total_subs = len(submissions)
+    graded_count = sum(1 for s in submissions if s.get('instructor_score') is not None)
+    all_reviewed = sum(1 for s in submissions if s['completed_reviews'] == s['total_reviewers'] and s['total_reviewers'] > 0)
+
+    conn.close()
+    return render_template('peer_review_status.html',
+                           activity=activity, submissions=submissions,
+                           max_points=max_points,
+                           total_subs=total_subs, graded_count=graded_count,
+                           all_reviewed=all_reviewed)
+
+
+@bp.route('/activity/<int:activity_id>/peer-review/reviews')
+@login_required
+def view_peer_reviews(activity_id):
+    """Instructor page to view all peer reviews and rate their quality"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+
+    if not activity:
+        flash('Activity not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.dashboard'))
+
+    # Get all completed peer review assignments with details
+    cursor.execute('''
+        SELECT pra.*,
+               reviewer.full_name as reviewer_name, reviewer.student_id as reviewer_sid,
+               submitter.full_name as submitter_name, submitter.student_id as submitter_sid,
+               s.content as submission_content, s.file_path as submission_file_path,
+               s.id as sub_id
+        FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        JOIN users reviewer ON pra.reviewer_id = reviewer.id
+        JOIN users submitter ON s.student_id = submitter.id
+        WHERE s.activity_id = ? AND pra.is_completed = 1
+        ORDER BY pra.completed_at DESC
+    ''', (activity_id,))
+    reviews = cursor.fetchall()
+
+    # Get criteria for this activity
+    cursor.execute('SELECT * FROM peer_review_criteria WHERE activity_id = ? ORDER BY order_num', (activity_id,))
+    criteria = cursor.fetchall()
+
+    # Get responses and files for each review
+    reviews_with_responses = []
+    for review in reviews:
+        review_dict = dict(review)
+        cursor.execute('''
+            SELECT prr.*, COALESCE(prc.criterion, 'Review criterion') as criterion
+            FROM peer_review_responses prr
+            LEFT JOIN peer_review_criteria prc ON prr.criterion_id = prc.id
+            WHERE prr.assignment_id = ?
+            ORDER BY prr.id
+        ''', (review['id'],))
+        review_dict['responses'] = cursor.fetchall()
+
+        # Get submission files
+        cursor.execute('SELECT * FROM submission_files WHERE submission_id = ?', (review['sub_id'],))
+        review_dict['files'] = cursor.fetchall()
+
+        # Calculate average score for this review from direct query
+        cursor.execute('SELECT AVG(points_awarded) as avg FROM peer_review_responses WHERE assignment_id = ?',
+                       (review['id'],))
+        avg_row = cursor.fetchone()
+        review_dict['avg_score'] = round(avg_row['avg'], 1) if avg_row and avg_row['avg'] else None
+
+        reviews_with_responses.append(review_dict)
+
+    conn.close()
+    return render_template('view_peer_reviews.html',
+                           activity=activity,
+                           reviews=reviews_with_responses,
+                           criteria=criteria)
+
+
+@bp.route('/peer-review/<int:assignment_id>/approve', methods=['POST'])
+@login_required
+def approve_reject_peer_review(assignment_id):
+    """Instructor approves or rejects a peer review - approved = 25% participation grade"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    action = request.form.get('action', '')  # 'approve' or 'reject'
+    instructor_feedback = request.form.get('instructor_feedback', '')
+
+    if action not in ('approve', 'reject'):
+        flash('Invalid action', 'error')
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Get the assignment details including reviewer and activity info
+    cursor.execute('''
+        SELECT pra.*, s.activity_id, s.student_id as submitter_id,
+               a.points as max_points, a.enable_peer_review
+        FROM peer_review_assignments pra
+        JOIN submissions s ON pra.submission_id = s.id
+        JOIN activities a ON s.activity_id = a.id
+        WHERE pra.id = ?
+    ''', (assignment_id,))
+    assignment = cursor.fetchone()
+
+    if not assignment:
+        flash('Review not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.dashboard'))
+
+    activity_id = assignment['activity_id']
+    reviewer_id = assignment['reviewer_id']
+    max_points = assignment['max_points'] or 100
+
+    # Update the assignment with approval status
+    quality_score = 100 if action == 'approve' else 0
+    cursor.execute('''
+        UPDATE peer_review_assignments
+        SET approval_status = ?, review_quality_score = ?, instructor_feedback = ?
+        WHERE id = ?
+    ''', ('approved' if action == 'approve' else 'rejected', quality_score, instructor_feedback, assignment_id))
+
+    # Recalculate reviewer's participation score for this activity
+    participation_score = calculate_participation_score(cursor, reviewer_id, activity_id, max_points)
+
+    # Find and update the reviewer's own submission for this activity
+    cursor.execute('''
+        SELECT s.*, a.points as max_points
+        FROM submissions s
+        JOIN activities a ON s.activity_id = a.id
+        WHERE s.student_id = ? AND s.activity_id = ?
+    ''', (reviewer_id, activity_id))
+    reviewer_submission = cursor.fetchone()
+
+    if reviewer_submission:
+        # Update participation_score
+        cursor.execute('''
+            UPDATE submissions SET participation_score = ? WHERE id = ?
+        ''', (participation_score, reviewer_submission['id']))
+
+        # If instructor has already graded this submission, recalculate final_score
+        if reviewer_submission['instructor_score'] is not None:
+            instructor_score = reviewer_submission['instructor_score']
+            peer_review_score = reviewer_submission['peer_review_score'] or 60
+            sub_max = reviewer_submission['max_points'] or 100
+
+            peer_component = (peer_review_score / 100) * 25
+            participation_component = (participation_score / 100) * 25
+            instructor_component = (instructor_score / sub_max) * 50 if sub_max > 0 else 0
+            final_percentage = peer_component + participation_component + instructor_component
+            final_score = (final_percentage / 100) * sub_max
+
+            late_penalty = reviewer_submission['late_penalty'] if reviewer_submission['late_penalty'] else 0
+            final_score = max(0, final_score - late_penalty)
+
+            cursor.execute('''
+                UPDATE submissions SET final_score = ? WHERE id = ?
+            ''', (final_score, reviewer_submission['id']))
+
+    conn.commit()
+    conn.close()
+
+    status_text = 'approved' if action == 'approve' else 'rejected'
+    flash(f'Peer review {status_text}! Reviewer participation score updated to {participation_score:.0f}%', 'success')
+
+    redirect_to = request.form.get('redirect_to', '')
+    if redirect_to == 'peer_review_status':
+        return redirect(url_for('peer_review.peer_review_status', activity_id=activity_id))
+    return redirect(url_for('peer_review.view_peer_reviews', activity_id=activity_id))
+
+
+@bp.route('/activity/<int:activity_id>/recalculate-scores', methods=['POST'])
+@login_required
+def recalculate_activity_scores(activity_id):
+    """Recalculate all final scores for an activity using the 25-25-50 formula"""
+    if current_user.role != 'instructor':
+        return redirect(url_for('student.student_dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT * FROM activities WHERE id = ?', (activity_id,))
+    activity = cursor.fetchone()
+
+    if not activity:
+        flash('Activity not found', 'error')
+        conn.close()
+        return redirect(url_for('instructor.dashboard'))
+
+    max_points = activity['points']
+    enable_peer_review = activity['enable_peer_review'] if 'enable_peer_review' in activity.keys() else 0
+
+    # Get all submissions for this activity
+    cursor.execute('SELECT * FROM submissions WHERE activity_id = ?', (activity_id,))
+    submissions = cursor.fetchall()
+
+    updated_count = 0
+    for sub in submissions:
+        if sub['instructor_score'] is None and sub['score'] is None:
+            continue  # Skip ungraded submissions
+
+        instructor_score = sub['instructor_score'] if sub['instructor_score'] else sub['score']
+        if instructor_score is None:
+            continue
+
+        student_id = sub['student_id']
+        late_penalty = sub['late_penalty'] if sub['late_penalty'] else 0
+
+        if enable_peer_review:
+            # peer_review_score is now a percentage (60-100)
+            peer_review_score = sub['peer_review_score'] if sub['peer_review_score'] else 60
+            # participation_score is now a percentage (0-100)
+            participation_score = calculate_participation_score(cursor, student_id, activity_id, max_points)
+
+            # Calculate weighted final score
+            # peer_review_score is 60-100 (percentage)
+            # participation_score is 0-100 (percentage)
+            # instructor_score is raw points, needs to be converted
+            peer_component = (peer_review_score / 100) * 25
+            participation_component = (participation_score / 100) * 25
+            instructor_component = (instructor_score / max_points) * 50 if max_points > 0 else 0
+
+            final_percentage = peer_component + participation_component + instructor_component
+            final_score = (final_percentage / 100) * max_points
+            final_score = max(0, final_score - late_penalty)
+
+            cursor.execute('''
+                UPDATE submissions
+                SET instructor_score = ?, participation_score = ?, final_score = ?
+                WHERE id = ?
+            ''', (instructor_score, participation_score, final_score, sub['id']))
+        else:
+            final_score = max(0, instructor_score - late_penalty)
+            cursor.execute('''
+                UPDATE submissions SET instructor_score = ?, final_score = ? WHERE id = ?
+            ''', (instructor_score, final_score, sub['id']))
+
+        updated_count += 1
+
+    conn.commit()
+    conn.close()
+
+    flash(f'Recalculated scores for {updated_count} submissions!', 'success')
+    return redirect(url_for('grading.view_submissions', activity_id=activity_id))
@@ -0,0 +1,96 @@
+"""Site-wide search page and its JSON API (indexes and ranking in search_index.py)."""
+import re
+import sqlite3
+import time
+
+from flask import Blueprint, render_template, request, url_for, jsonify
+from flask_login import login_required, current_user
+from markupsafe import Markup, escape
+
+from database import get_db
+import search_index
+
+bp = Blueprint('search', __name__)
+
+_TAG = re.compile(r'<[^>]*>?')
+
+
+def highlight(snippet):
+    """Escape an FTS5 snippet and turn its match markers into <mark> tags.
+
+    Reading materials, instructions and messages hold HTML; its tags (and a tag
+    cut off at the end of the snippet) are dropped before escaping."""
+    text = _TAG.sub(' ', snippet or '')
+    return Markup(str(escape(text))
+                  .replace(search_index.HIGHLIGHT_START, '<mark>')
+                  .replace(search_index.HIGHLIGHT_END, '</mark>'))
+
+
+def result_url(result, role):
+    """Page a result links to for this role, or None when there is no page to open."""
+    kind, ref = result['kind'], result['ref']
+    if kind == 'user':
+        if role == 'instructor':
+            return url_for('instructor.manage_enrollments', student_id=result['id'])
+        if role == 'admin':
+            return url_for('admin.admin_students' if ref == 'student' else 'admin.admin_teacher_profiles')
+        if role == 'institution' and ref in ('student', 'instructor'):
+            return url_for('institution.inst_students' if ref == 'student' else 'institution.inst_teachers')
+        return None
+    if kind == 'session':
+        return url_for('lessons.session_lesson', session_id=result['id'])
+    if kind == 'activity':
+        if role == 'student':
+            return url_for('student.student_session_activities', session_id=ref)
+        if role == 'instructor':
+            return url_for('grading.view_submissions', activity_id=result['id'])
+        return url_for('grading.session_activities', session_id=ref)
+    if kind == 'quiz_question':
+        return url_for('grading.session_quiz', session_id=ref)
+    if kind == 'exam_question':
+        return url_for('grading.exam_questions', exam_id=ref)
+    return url_for('messaging.view_message', id=result['id'])
+
+
+def _run_search(with_counts):
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type') or None
+    if kind not in search_index.allowed_kinds(current_user.role):
+        kind = None
+    page = max(1, request.args.get('page', 1, type=int))
+
+    started = time.perf_counter()
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        results, has_next = search_index.search(cursor, current_user, query, kind, page)
+        counts = search_index.count_by_kind(cursor, current_user, query) if with_counts else {}
+    except sqlite3.OperationalError as e:  # search indexes missing (FTS5 not compiled in)
+        print(f'[Search] {e}')
+        results, has_next, counts = [], False, {}
+    finally:
+        conn.close()
+    for result in results:
+        result['url'] = result_url(result, current_user.role)
+        result['snippet_html'] = highlight(result.pop('snippet'))
+        result.pop('ref')
+    return {'query': query, 'type': kind, 'page': page, 'has_next': has_next, 'results': results,
+            'counts': counts, 'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+
+@bp.route('/search')
+@login_required
+def search():
+    data = _run_search(with_counts=True)
+    kinds = [(k, search_index.KIND_LABELS[k]) for k in search_index.allowed_kinds(current_user.role)]
+    return render_template('search.html', kinds=kinds, **data)
+
+
+@bp.route('/api/search')
+@login_required
+def api_search():
+    data = _run_search(with_counts=False)
+    for result in data['results']:
+        result['snippet_html'] = str(result['snippet_html'])
+    data.pop('counts')
+    return jsonify(data)
@@ -0,0 +1,299 @@
+"""Student dashboard, subject and session views, and my grades."""
+from datetime import datetime
+
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_required, current_user
+
+from database import get_db
+
+from lms.common import (
+    check_previous_session_complete,
+    compute_weighted_grade,
+    get_pup_grade,
+    get_session_progress,
+    profile_required,
+)
+
+bp = Blueprint('student', __name__)
+
+
+# ==================== STUDENT DASHBOARD ====================
+
+@bp.route('/student/dashboard')
+@login_required
+@profile_required
+def student_dashboard():
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.* FROM subjects s
+        INNER JOIN enrollments e ON s.id = e.subject_id
+        WHERE e.student_id = ?
+        ORDER BY s.code, s.section
+    ''', (current_user.id,))
+    subjects = cursor.fetchall()
+
+    # Compute per-subject performance
+    subject_performance = []
+    total_activities_done = 0
+    total_activities = 0
+    total_quizzes_done = 0
+    total_quizzes = 0
+    total_sessions_completed = 0
+    total_sessions = 0
+    overall_weighted_sum = 0
+    overall_count = 0
+    strength_areas = []
+    weakness_areas = []
+
+    for subj in subjects:
+        # Activity stats
+        cursor.execute('''
+            SELECT COUNT(*) as total FROM activities a
+            JOIN sessions s ON a.session_id = s.id
+            WHERE s.subject_id = ? AND a.is_visible = 1
+        ''', (subj['id'],))
+        act_total = cursor.fetchone()['total']
+
+        cursor.execute('''
+            SELECT COUNT(*) as done, AVG(COALESCE(sub.final_score, sub.score)) as avg
+            FROM submissions sub
+            JOIN activities a ON sub.activity_id = a.id
+            JOIN sessions s ON a.session_id = s.id
+            WHERE s.subject_id = ? AND sub.student_id = ?
+        ''', (subj['id'], current_user.id))
+        act_row = cursor.fetchone()
+        act_done = act_row['done']
+        act_avg = act_row['avg'] or 0
+
+        # Quiz stats
+        cursor.execute('''
+            SELECT COUNT(*) as total FROM quizzes q
+            JOIN sessions s ON q.session_id = s.id
+            WHERE s.subject_id = ? AND q.is_visible = 1
+        ''', (subj['id'],))
+        quiz_total = cursor.fetchone()['total']
+
+        cursor.execute('''
+            SELECT COUNT(*) as done, AVG(qa.score) as avg FROM quiz_attempts qa
+            JOIN quizzes q ON qa.quiz_id = q.id
+            JOIN sessions s ON q.session_id = s.id
+            WHERE s.subject_id = ? AND qa.student_id = ?
+        ''', (subj['id'], current_user.id))
+        quiz_row = cursor.fetchone()
+        quiz_done = quiz_row['done']
+        quiz_avg = quiz_row['avg'] or 0
+
+        # Session progress
+        cursor.execute('SELECT id FROM sessions WHERE subject_id = ? AND is_visible = 1', (subj['id'],))
+        vis_sessions = cursor.fetchall()
+        sess_completed = sum(1 for v in vis_sessions if get_session_progress(cursor, v['id'], current_user.id).get('completed'))
+
+        total_activities += act_total
+        total_activities_done += act_done
+        total_quizzes += quiz_total
+        total_quizzes_done += quiz_done
+        total_sessions += len(vis_sessions)
+        total_sessions_completed += sess_completed
+
+        # Weighted grade
+        weighted = compute_weighted_grade(cursor, subj['id'], current_user.id)
+        pup = get_pup_grade(weighted)
+        if weighted > 0:
+            overall_weighted_sum += weighted
+            overall_count += 1
+
+        # Strengths/weaknesses
+        if act_avg >= 85:
+            strength_areas.append((f"{subj['code']} Activities", act_avg))
+        elif 0 < act_avg < 75:
+            weakness_areas.append((f"{subj['code']} Activities", act_avg))
+        if quiz_avg >= 85:
+            strength_areas.append((f"{subj['code']} Quizzes", quiz_avg))
+        elif 0 < quiz_avg < 75:
+            weakness_areas.append((f"{subj['code']} Quizzes", quiz_avg))
+
+        subject_performance.append({
+            'subject': subj, 'activity_done': act_done, 'activity_total': act_total,
+            'activity_avg': act_avg, 'quiz_done': quiz_done, 'quiz_total': quiz_total,
+            'quiz_avg': quiz_avg, 'sessions_completed': sess_completed,
+            'sessions_total': len(vis_sessions), 'weighted': weighted, 'pup_grade': pup,
+            'passed': pup <= 3.00 if weighted > 0 else None
+        })
+
+    # Upcoming deadlines
+    cursor.execute('''
+        SELECT a.title, a.due_date, a.due_time, ses.session_number, sub.code as subject_code
+        FROM activities a
+        JOIN sessions ses ON a.session_id = ses.id
+        JOIN subjects sub ON ses.subject_id = sub.id
+        JOIN enrollments e ON sub.id = e.subject_id
+        WHERE e.student_id = ? AND a.due_date >= date('now') AND a.is_visible = 1
+        AND a.id NOT IN (SELECT activity_id FROM submissions WHERE student_id = ?)
+        ORDER BY a.due_date, a.due_time
+        LIMIT 5
+    ''', (current_user.id, current_user.id))
+    upcoming_deadlines = cursor.fetchall()
+
+    # Project groups
+    cursor.execute('''
+        SELECT pg.group_name, pg.subject_id, sub.code as subject_code,
+               (SELECT AVG(pp.percentage) FROM project_progress pp WHERE pp.group_id = pg.id) as avg_progress
+        FROM project_groups pg
+        JOIN project_group_members pgm ON pg.id = pgm.group_id
+        JOIN subjects sub ON pg.subject_id = sub.id
+        WHERE pgm.student_id = ?
+    ''', (current_user.id,))
+    my_groups = [dict(r) for r in cursor.fetchall()]
+
+    overall_avg = overall_weighted_sum / overall_count if overall_count > 0 else 0
+    overall_pup = get_pup_grade(overall_avg) if overall_avg > 0 else None
+    strength_areas.sort(key=lambda x: -x[1])
+    weakness_areas.sort(key=lambda x: x[1])
+
+    conn.close()
+    return render_template('student_dashboard.html',
+                           subjects=subjects, subject_performance=subject_performance,
+                           overall_avg=overall_avg, overall_pup=overall_pup,
+                           total_activities_done=total_activities_done, total_activities=total_activities,
+                           total_quizzes_done=total_quizzes_done, total_quizzes=total_quizzes,
+                           total_sessions_completed=total_sessions_completed, total_sessions=total_sessions,
+                           strength_areas=strength_areas[:5], weakness_areas=weakness_areas[:5],
+                           upcoming_deadlines=upcoming_deadlines, my_groups=my_groups)
+
+@bp.route('/student/subject/<int:subject_id>')
+@login_required
+@profile_required
+def student_subject(subject_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Check if student is enrolled in this subject
+    cursor.execute('''
+        SELECT 1 FROM enrollments WHERE student_id = ? AND subject_id = ?
+    ''', (current_user.id, subject_id))
+    if not cursor.fetchone():
+        flash('You are not enrolled in this subject.', 'error')
+        conn.close()
+        return redirect(url_for('student.student_dashboard'))
+
+    cursor.execute('SELECT * FROM subjects WHERE id = ?', (subject_id,))
+    subject = cursor.fetchone()
+
+    # Only show visible sessions to students
+    cursor.execute('''
+        SELECT * FROM sessions
+        WHERE subject_id = ? AND is_visible = 1
+        ORDER BY session_number
+    ''', (subject_id,))
+    sessions = cursor.fetchall()
+
+    # Get progress and gating status for each session
+    session_progress = {}
+    locked_sessions = set()
+    prev_completed = True  # First session is always unlocked
+    for s in sessions:
+        progress = get_session_progress(cursor, s['id'], current_user.id)
+        session_progress[s['id']] = progress
+        if not prev_completed:
+            locked_sessions.add(s['id'])
+        prev_completed = progress['completed'] or bool(progress.get('completed_at'))
+
+    # Get available quizzes (only visible quizzes from visible sessions)
+    cursor.execute('''
+        SELECT q.*, s.session_number, q.session_id
+        FROM quizzes q
+        JOIN sessions s ON q.session_id = s.id
+        WHERE s.subject_id = ? AND s.is_visible = 1 AND q.is_visible = 1
+    ''', (subject_id,))
+    quizzes = cursor.fetchall()
+
+    # Get available exams (only visible exams)
+    cursor.execute('SELECT * FROM exams WHERE subject_id = ? AND is_visible = 1', (subject_id,))
+    exams = cursor.fetchall()
+
+    conn.close()
+    return render_template('student_subject.html', subject=subject, sessions=sessions,
+                           quizzes=quizzes, exams=exams, session_progress=session_progress,
+                           locked_sessions=locked_sessions)
+
+@bp.route('/student/session/<int:session_id>/activities')
+@login_required
+@profile_required
+def student_session_activities(session_id):
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT s.*, sub.code as subject_code, sub.name as subject_name, sub.id as subject_id
+        FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE s.id = ?
+    ''', (session_id,))
+    session_data = cursor.fetchone()
+
+    # Check if session is visible
+    if session_data and not session_data['is_visible']:
+        flash('This session is not available.', 'warning')
+        conn.close()
+        return redirect(url_for('student.student_dashboard'))
+
+    # Check session gating (previous session must be complete)
+    if not check_previous_session_complete(cursor, session_id, current_user.id):
+        conn.close()
+        flash('You must complete the previous session first.', 'warning')
+        return redirect(url_for('student.student_subject', subject_id=session_data['subject_id']))
+
+    # Check step enforcement: video + slides + reading must be complete
+    progress = get_session_progress(cursor, session_id, current_user.id)
+    if not progress['step_video'] or not progress['step_slides'] or not progress['step_reading']:
+        flash('You must complete the video, slides, and reading materials before accessing activities.', 'warning')
+        conn.close()
+        return redirect(url_for('lessons.session_lesson', session_id=session_id))
+
+    # Only show visible activities
+    cursor.execute('''
+        SELECT * FROM activities
+        WHERE session_id = ? AND is_visible = 1
+        ORDER BY activity_number
+    ''', (session_id,))
+    activities = cursor.fetchall()
+
+    # Get student's submissions for these activities
+    activity_ids = [a['id'] for a in activities]
+    submissions = {}
+    if activity_ids:
+        placeholders = ','.join('?' * len(activity_ids))
+        cursor.execute(f'''
+            SELECT * FROM submissions
+            WHERE activity_id IN ({placeholders}) AND student_id = ?
+        ''', (*activity_ids, current_user.id))
+        for sub in cursor.fetchall():
+            submissions[sub['activity_id']] = sub
+
+    conn.close()
+
+    # Current date string for due date comparison
+    now_str = datetime.now().strftime('%Y-%m-%d')
+
+    return render_template('student_activities.html',
+                           session=session_data,
+                           activities=activities,
+                           submissions=submissions,
+                           now_str=now_str,
+                           progress=progress)
+
+@bp.route('/student/my-grades')
+@login_required
+def my_grades():
+    if current_user.role != 'student':
+        return redirect(url_for('instructor.dashboard'))
+    return redirect(url_for('grading.student_grades', student_id=current_user.id))
@@ -0,0 +1,61 @@
+"""Jinja filters and globals registered on the app by init_app()."""
+import json
+import re
+
+from flask import url_for
+
+import image_pipeline
+
+
+# Custom Jinja2 filter for newlines to <br>
+def nl2br_filter(s):
+    if s:
+        return s.replace('\n', '<br>')
+    return s
+
+
+def avatar_url(photo, size=64):
+    """Small WebP avatar for a users.photo value (see image_pipeline.py)."""
+    return url_for('static', filename='uploads/photos/' + image_pipeline.avatar_name(photo, size))
+
+# Custom Jinja filter to parse JSON
+def parse_json_filter(value):
+    if value:
+        try:
+            return json.loads(value)
+        except:
+            return []
+    return []
+
+def from_json_filter(value):
+    if value:
+        try:
+            return json.loads(value)
+        except:
+            return []
+    return []
+
+def youtube_embed_filter(url):
+    """Convert YouTube URL to embed format."""
+    if not url:
+        return ''
+    # Handle youtu.be/VIDEO_ID
+    match = re.match(r'(?:https?://)?(?:www\.)?youtu\.be/([a-zA-Z0-9_-]+)', url)
+    if match:
+        return f'https://www.youtube.com/embed/{match.group(1)}'
+    # Handle youtube.com/watch?v=VIDEO_ID
+    match = re.match(r'(?:https?://)?(?:www\.)?youtube\.com/watch\?v=([a-zA-Z0-9_-]+)', url)
+    if match:
+        return f'https://www.youtube.com/embed/{match.group(1)}'
+    # Already embed format
+    if 'youtube.com/embed/' in url:
+        return url
+    return url
+
+
+def init_app(app):
+    app.add_template_filter(nl2br_filter, 'nl2br')
+    app.add_template_filter(parse_json_filter, 'parse_json')
+    app.add_template_filter(from_json_filter, 'from_json')
+    app.add_template_filter(youtube_embed_filter, 'youtube_embed')
+    app.add_template_global(avatar_url)
@@ -0,0 +1,137 @@
+"""Keyset (seek) pagination for the list pages.
+
+OFFSET pagination makes SQLite walk and throw away every row before the page,
+so page 200 costs as much as rendering the whole table. A keyset cursor
+remembers the sort key and id of the last row shown and asks for the rows
+after it:
+
+    WHERE ... AND (u.full_name, u.id) > (?, ?) ORDER BY u.full_name, u.id LIMIT 51
+
+which an index on the sort columns answers by seeking straight to the page,
+so every page costs the same however large the table grows.
+
+    STUDENT_ORDER = Keyset(('u.full_name', 'full_name'), ('u.id', 'id'))
+
+    page = STUDENT_ORDER.fetch(cursor, '''
+        SELECT u.* FROM users u WHERE u.role = 'student' AND {keyset}
+    ''', params, request.args)
+
+Each column is (SQL expression, key of that value in the fetched row). The
+last column must be unique (the id) and none may be NULL (wrap nullable ones
+in COALESCE and select the result under an alias). {keyset} must come after
+every other `?` of the query; fetch() appends ORDER BY and LIMIT.
+
+The cursor travels in the query string as ?after=<token> (next page) or
+?before=<token> (previous page), with an optional per_page. Two lists on one
+page use a prefix: fetch(..., prefix='pending_') reads pending_after etc.
+Templates render the links with the pager macro in includes/pager.html.
+"""
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, length):
+    """Key values from a cursor token, or None for a missing or malformed one."""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+class Page:
+    """One page of rows plus the cursors of its neighbours (None at either end)."""
+
+    def __init__(self, rows, next_cursor, prev_cursor, size, prefix=''):
+        self.rows = rows
+        self.next = next_cursor
+        self.prev = prev_cursor
+        self.size = size
+        self.prefix = prefix
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def url(self, which, **extra):
+        """URL of the 'next', 'prev' or 'first' page, keeping the other query arguments
+        (plus extra ones, e.g. the tab to reopen)."""
+        from flask import request, url_for
+
+        args = request.args.to_dict()
+        args.update(extra)
+        args.pop(f'{self.prefix}after', None)
+        args.pop(f'{self.prefix}before', None)
+        if which == 'next':
+            args[f'{self.prefix}after'] = self.next
+        elif which == 'prev':
+            args[f'{self.prefix}before'] = self.prev
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+class Keyset:
+    """Sort order of a paginated list: ORDER BY the columns, all ascending or all descending."""
+
+    def __init__(self, *columns, descending=False):
+        self.columns = columns
+        self.descending = descending
+
+    def _key(self, row):
+        return [row[key] for _, key in self.columns]
+
+    def fetch(self, cursor, sql, params=(), args=None, prefix='', size=None):
+        """Run sql for the page the request args point at and return a Page."""
+        args = args or {}
+        size = page_size(args.get(f'{prefix}per_page'), size or DEFAULT_PAGE_SIZE)
+        before = decode_cursor(args.get(f'{prefix}before'), len(self.columns))
+        after = None if before else decode_cursor(args.get(f'{prefix}after'), len(self.columns))
+        boundary = before or after
+
+        backwards = before is not None
+        descending = self.descending != backwards  # walk the other way to reach the previous page
+        expressions = ', '.join(expr for expr, _ in self.columns)
+        if boundary is None:
+            condition, key_params = '1 = 1', []
+        else:
+            placeholders = ', '.join('?' for _ in self.columns)
+            condition, key_params = f'({expressions}) {"<" if descending else ">"} ({placeholders})', boundary
+        order = ', '.join(f'{expr} {"DESC" if descending else "ASC"}' for expr, _ in self.columns)
+
+        cursor.execute(f'{sql.format(keyset=condition)} ORDER BY {order} LIMIT ?',
+                       (*params, *key_params, size + 1))
+        rows = cursor.fetchall()
+        more = len(rows) > size
+        rows = rows[:size]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return Page(rows, None, None, size, prefix)
+        if backwards:
+            prev_cursor = encode_cursor(self._key(rows[0])) if more else None
+            next_cursor = encode_cursor(self._key(rows[-1]))
+        else:
+            prev_cursor = encode_cursor(self._key(rows[0])) if after is not None else None
+            next_cursor = encode_cursor(self._key(rows[-1])) if more else None
+        return Page(rows, next_cursor, prev_cursor, size, prefix)
@@ -0,0 +1,214 @@
+"""Set-based instructor payroll generation.
+
+One statement computes every instructor's attendance for the period (a single
+GROUP BY over instructor_attendance), applies the salary and deduction rules
+to all rows at once, and either returns the rows (preview / dry run) or writes
+them with INSERT ... SELECT ... ON CONFLICT DO NOTHING, so re-running a period
+only fills in instructors that are still missing.
+
+Rules (unchanged from the original per-instructor loop):
+- hourly rate: gross = rate * hours worked; otherwise gross = rate
+- daily rate = gross / WORKING_DAYS_PER_MONTH
+- absent days deduct one daily rate each, late days LATE_DEDUCTION_RATE of it
+- late days count as present; net pay never goes below zero
+"""
+import json
+import sys
+from datetime import datetime
+
+WORKING_DAYS_PER_MONTH = 22
+LATE_DEDUCTION_RATE = 0.1
+
+_PAYROLL_SQL = '''
+    WITH att AS (
+        SELECT instructor_id,
+               SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) AS present,
+               SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END) AS absent,
+               SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) AS late,
+               COALESCE(SUM(hours_worked), 0) AS hours
+        FROM instructor_attendance
+        WHERE date BETWEEN :period_start AND :period_end
+        GROUP BY instructor_id
+    ),
+    base AS (
+        SELECT u.id AS instructor_id, u.full_name,
+               COALESCE(ip.institution_id, u.institution_id) AS institution_id,
+               ip.salary_rate AS base_salary, ip.salary_frequency,
+               COALESCE(att.present, 0) + COALESCE(att.late, 0) AS days_present,
+               COALESCE(att.absent, 0) AS days_absent,
+               COALESCE(att.late, 0) AS days_late,
+               COALESCE(att.hours, 0) AS hours,
+               CASE WHEN ip.salary_frequency = 'hourly' THEN ip.salary_rate * COALESCE(att.hours, 0)
+                    ELSE ip.salary_rate END AS gross
+        FROM users u
+        JOIN instructor_profiles ip ON ip.user_id = u.id
+        LEFT JOIN att ON att.instructor_id = u.id
+        WHERE u.role = 'instructor' AND ip.salary_rate > 0
+          AND (CAST(:institution_id AS INTEGER) IS NULL OR COALESCE(ip.institution_id, u.institution_id) = :institution_id)
+    ),
+    calc AS (
+        SELECT *,
+               gross / :working_days * days_absent AS absent_deduction,
+               gross / :working_days * :late_rate * days_late AS late_deduction
+        FROM base
+    )
+    SELECT instructor_id, full_name, institution_id, base_salary, salary_frequency,
+           days_present, days_absent, days_late,
+           ROUND(hours, 1) AS total_hours,
+           ROUND(absent_deduction + late_deduction, 2) AS deductions,
+           json_object('absent_days', days_absent, 'absent_deduction', ROUND(absent_deduction, 2),
+                       'late_days', days_late, 'late_deduction', ROUND(late_deduction, 2)) AS deduction_details,
+           ROUND(gross, 2) AS gross_pay,
+           ROUND(MAX(0, gross - absent_deduction - late_deduction), 2) AS net_pay
+    FROM calc
+'''
+
+
+def parse_period(period_start, period_end):
+    """Validate YYYY-MM-DD period bounds; raises ValueError with a user-facing message."""
+    if not period_start or not period_end:
+        raise ValueError('Period dates required')
+    try:
+        start = datetime.strptime(period_start, '%Y-%m-%d').date()
+        end = datetime.strptime(period_end, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('Period dates must be YYYY-MM-DD')
+    if start > end:
+        raise ValueError('Period start must be on or before period end')
+    return start.isoformat(), end.isoformat()
+
+
+def _params(period_start, period_end, institution_id):
+    return {'period_start': period_start, 'period_end': period_end, 'institution_id': institution_id,
+            'working_days': float(WORKING_DAYS_PER_MONTH), 'late_rate': LATE_DEDUCTION_RATE}
+
+
+def preview_payroll(cursor, period_start, period_end, institution_id=None):
+    """Dry run: the payroll rows generate_payroll() would write, plus whether each
+    instructor already has a record for the period (those are skipped on write)."""
+    cursor.execute(f'''
+        SELECT p.*, EXISTS (
+                   SELECT 1 FROM instructor_payroll ex
+                   WHERE ex.instructor_id = p.instructor_id
+                     AND ex.period_start = :period_start AND ex.period_end = :period_end
+               ) AS already_generated
+        FROM ({_PAYROLL_SQL}) p
+        ORDER BY p.institution_id, p.full_name
+    ''', _params(period_start, period_end, institution_id))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def generate_payroll(cursor, period_start, period_end, institution_id=None, status='draft'):
+    """Insert payroll for every instructor missing one for the period.
+
+    Runs as a single INSERT ... SELECT; the caller commits. Returns the number
+    of records created.
+    """
+    params = _params(period_start, period_end, institution_id)
+    params['status'] = status
+    cursor.execute(f'''
+        INSERT INTO instructor_payroll (instructor_id, institution_id, period_start, period_end,
+            base_salary, days_present, days_absent, days_late, total_hours,
+            deductions, deduction_details, gross_pay, net_pay, status)
+        SELECT instructor_id, institution_id, :period_start, :period_end,
+               base_salary, days_present, days_absent, days_late, total_hours,
+               deductions, deduction_details, gross_pay, net_pay, :status
+        FROM ({_PAYROLL_SQL}) p
+        WHERE NOT EXISTS (
+            SELECT 1 FROM instructor_payroll ex
+            WHERE ex.instructor_id = p.instructor_id
+              AND ex.period_start = :period_start AND ex.period_end = :period_end
+        )
+        ON CONFLICT DO NOTHING
+    ''', params)
+    return cursor.rowcount
+
+
+def summarize(rows):
+    """Totals for a preview, for the admin confirmation dialog."""
+    new_rows = [r for r in rows if not r['already_generated']]
+    return {
+        'instructors': len(rows),
+        'new_records': len(new_rows),
+        'existing_records': len(rows) - len(new_rows),
+        'gross_total': round(sum(r['gross_pay'] for r in new_rows), 2),
+        'deductions_total': round(sum(r['deductions'] for r in new_rows), 2),
+        'net_total': round(sum(r['net_pay'] for r in new_rows), 2),
+    }
+
+
+# Records generated before the period was unique can repeat an (instructor,
+# period). The one to keep is the most advanced (paid > approved > other), then
+# the oldest; the rest lose.
+_RANKED_SQL = '''
+    SELECT id, instructor_id, period_start, period_end,
+           FIRST_VALUE(id) OVER w AS kept_id,
+           ROW_NUMBER() OVER w AS rn
+    FROM instructor_payroll
+    WINDOW w AS (PARTITION BY instructor_id, period_start, period_end
+                 ORDER BY CASE status WHEN 'paid' THEN 0 WHEN 'approved' THEN 1 ELSE 2 END, id)
+'''
+
+
+def find_duplicates(cursor):
+    """(instructor_id, period_start, period_end, count) of every period with more than one record."""
+    cursor.execute('''
+        SELECT instructor_id, period_start, period_end, COUNT(*) AS records
+        FROM instructor_payroll
+        GROUP BY instructor_id, period_start, period_end
+        HAVING COUNT(*) > 1
+        ORDER BY instructor_id, period_start
+    ''')
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def archive_duplicates(conn):
+    """Move the losing duplicate records into instructor_payroll_archive (the full
+    row as JSON plus the id that was kept) and create the unique period index, in
+    one transaction. Returns the number of records archived."""
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT p.*, r.kept_id FROM instructor_payroll p
+        JOIN ({_RANKED_SQL}) r ON r.id = p.id
+        WHERE r.rn > 1
+        ORDER BY p.id
+    ''')
+    losers = [dict(row) for row in cursor.fetchall()]
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cursor.executemany('''
+        INSERT INTO instructor_payroll_archive (payroll_id, kept_id, instructor_id, period_start, period_end,
+            status, record, archived_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(row['id'], row.pop('kept_id'), row['instructor_id'], row['period_start'], row['period_end'],
+           row['status'], json.dumps(row, default=str), now) for row in losers])
+    cursor.executemany('DELETE FROM instructor_payroll WHERE id = ?', [(row['id'],) for row in losers])
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_instructor_payroll_period
+        ON instructor_payroll (instructor_id, period_start, period_end)
+    ''')
+    conn.commit()
+    return len(losers)
+
+
+if __name__ == '__main__':
+    # One-off clean-up for databases init_db() reported duplicate payroll in:
+    #   python payroll.py duplicates            # list them
+    #   python payroll.py archive-duplicates    # archive the extra records, add the index
+    from database import get_db
+    import tenancy
+
+    command = sys.argv[1:]
+    if command not in (['duplicates'], ['archive-duplicates']):
+        sys.exit('usage: python payroll.py duplicates | archive-duplicates')
+    for institution_id in tenancy.tenants():
+        with tenancy.use_institution(institution_id):
+            conn = get_db()
+        try:
+            label = 'main' if institution_id is None else f'institution {institution_id}'
+            if command == ['duplicates']:
+                for instructor_id, start, end, records in find_duplicates(conn.cursor()):
+                    print(f'{label}: instructor {instructor_id}, {start} to {end}: {records} records')
+            else:
+                print(f'{label}: archived {archive_duplicates(conn)} duplicate payroll record(s)')
+        finally:
+            conn.close()
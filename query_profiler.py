@@ -0,0 +1,302 @@
+"""Request-scoped SQL profiler and slow-query log.
+
+Enabled with LMS_QUERY_PROFILE=1. database.get_db() then hands out
+ProfiledConnection objects whose cursors time every statement (execute plus
+the fetches that step it) and count the rows fetched, charging them to the
+request running on the current thread. init_app() adds the request hooks:
+
+- a Server-Timing header on every response (db time, query count, total time)
+- per-endpoint latency / query-count samples for the admin Query Profile page
+- statements slower than LMS_SLOW_QUERY_MS written to a rotating log
+  (LMS_SLOW_QUERY_LOG, default logs/slow_queries.log)
+
+Bound parameters are never recorded, and literals inlined in the SQL text are
+replaced with '?', so neither the page nor the log carries user data.
+
+When the variable is unset get_db() returns plain sqlite3 connections and no
+hooks are registered, so the only cost is one module-level flag check per
+connection.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from sqlite3 import Connection, Cursor
+
+ENABLED = os.environ.get('LMS_QUERY_PROFILE', '').lower() in ('1', 'true', 'yes', 'on')
+SLOW_QUERY_MS = float(os.environ.get('LMS_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG = os.environ.get('LMS_SLOW_QUERY_LOG', os.path.join('logs', 'slow_queries.log'))
+SLOW_LOG_BYTES = 5 * 1024 * 1024
+SLOW_LOG_BACKUPS = 5
+
+SAMPLES_PER_ROUTE = 500      # latency samples kept per endpoint for percentiles
+SLOWEST_PER_REQUEST = 5      # statements kept per request, for the slow log
+MAX_STATEMENTS = 300         # distinct statements tracked for the admin page
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_route_stats = {}            # endpoint -> RouteStats
+_statement_stats = {}        # redacted sql -> [count, total_ms, max_ms, rows]
+_slow_log = None
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def redact(sql):
+    """SQL text with literals replaced by '?' and whitespace collapsed."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestProfile:
+    __slots__ = ('endpoint', 'started', 'queries', 'sql_ms', 'rows', 'slowest')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.rows = 0
+        self.slowest = []        # [(ms, sql)] longest first, at most SLOWEST_PER_REQUEST
+
+    def add_statement(self, sql, ms):
+        self.queries += 1
+        self.sql_ms += ms
+        if len(self.slowest) < SLOWEST_PER_REQUEST or ms > self.slowest[-1][0]:
+            self.slowest.append((ms, sql))
+            self.slowest.sort(key=lambda item: -item[0])
+            del self.slowest[SLOWEST_PER_REQUEST:]
+
+
+class RouteStats:
+    __slots__ = ('requests', 'latencies', 'query_counts', 'sql_ms', 'rows')
+
+    def __init__(self):
+        self.requests = 0
+        self.latencies = deque(maxlen=SAMPLES_PER_ROUTE)
+        self.query_counts = deque(maxlen=SAMPLES_PER_ROUTE)
+        self.sql_ms = deque(maxlen=SAMPLES_PER_ROUTE)
+        self.rows = deque(maxlen=SAMPLES_PER_ROUTE)
+
+
+def _current():
+    return getattr(_local, 'profile', None)
+
+
+class ProfiledCursor(Cursor):
+    """Cursor that charges statement time and fetched rows to the current request."""
+
+    def _timed(self, method, sql, *args):
+        profile = _current()
+        if profile is None:
+            return method(sql, *args)
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self._profile_sql = sql
+            profile.add_statement(sql, ms)
+            _record_statement(sql, ms, 0)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._timed(super().executescript, sql_script)
+
+    def _fetched(self, method, *args):
+        profile = _current()
+        if profile is None:
+            return method(*args)
+        start = time.perf_counter()
+        result = method(*args)
+        ms = (time.perf_counter() - start) * 1000
+        count = (1 if result is not None else 0) if method.__name__ == 'fetchone' else len(result)
+        profile.sql_ms += ms
+        profile.rows += count
+        sql = getattr(self, '_profile_sql', None)
+        if sql is not None:
+            _record_statement(sql, ms, count, executed=False)
+        return result
+
+    def fetchone(self):
+        return self._fetched(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._fetched(super().fetchall)
+
+    def __next__(self):
+        row = super().__next__()
+        profile = _current()
+        if profile is not None:
+            profile.rows += 1
+        return row
+
+
+class ProfiledConnection(Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # Connection.execute* create their cursor internally; route them through ours
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def record(sql, ms, rows):
+    """Charge a statement timed elsewhere (pg_backend cursors) to the current request."""
+    profile = _current()
+    if profile is None:
+        return
+    profile.add_statement(sql, ms)
+    profile.rows += rows
+    _record_statement(sql, ms, rows)
+
+
+def _record_statement(sql, ms, rows, executed=True):
+    key = redact(sql)
+    with _stats_lock:
+        entry = _statement_stats.get(key)
+        if entry is None:
+            if len(_statement_stats) >= MAX_STATEMENTS:
+                return
+            entry = _statement_stats[key] = [0, 0.0, 0.0, 0]
+        if executed:
+            entry[0] += 1
+        entry[1] += ms
+        entry[2] = max(entry[2], ms)
+        entry[3] += rows
+
+
+def _get_slow_log():
+    global _slow_log
+    with _stats_lock:
+        if _slow_log is not None:
+            return _slow_log
+        directory = os.path.dirname(SLOW_QUERY_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        logger = logging.getLogger('lms.slow_queries')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_LOG_BYTES, backupCount=SLOW_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        logger.addHandler(handler)
+        _slow_log = logger
+        return _slow_log
+
+
+def _finish(profile, response):
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    response.headers['Server-Timing'] = (
+        f'db;dur={profile.sql_ms:.1f};desc="{profile.queries} queries", '
+        f'app;dur={total_ms:.1f}'
+    )
+    with _stats_lock:
+        stats = _route_stats.get(profile.endpoint)
+        if stats is None:
+            stats = _route_stats[profile.endpoint] = RouteStats()
+        stats.requests += 1
+        stats.latencies.append(total_ms)
+        stats.query_counts.append(profile.queries)
+        stats.sql_ms.append(profile.sql_ms)
+        stats.rows.append(profile.rows)
+
+    slow = [(ms, sql) for ms, sql in profile.slowest if ms >= SLOW_QUERY_MS]
+    if slow:
+        log = _get_slow_log()
+        for ms, sql in slow:
+            log.info('%.1fms endpoint=%s request_queries=%d %s', ms, profile.endpoint, profile.queries, redact(sql))
+
+
+def init_app(app):
+    """Register the request hooks; a no-op unless LMS_QUERY_PROFILE is set."""
+    if not ENABLED:
+        return
+    from flask import request
+
+    @app.before_request
+    def _start_query_profile():
+        _local.profile = RequestProfile(request.endpoint or request.path)
+
+    @app.after_request
+    def _finish_query_profile(response):
+        profile = _current()
+        if profile is not None:
+            _finish(profile, response)
+        return response
+
+    @app.teardown_request
+    def _clear_query_profile(exc):
+        _local.profile = None
+
+    print(f'[Profiler] Query profiling enabled (slow query threshold {SLOW_QUERY_MS:g} ms, log {SLOW_QUERY_LOG})')
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def route_report(sort='p95'):
+    """One dict per endpoint seen, sorted by sort ('p95', 'queries', 'requests' or 'sql')."""
+    with _stats_lock:
+        snapshot = [(endpoint, stats.requests, list(stats.latencies), list(stats.query_counts),
+                     list(stats.sql_ms), list(stats.rows)) for endpoint, stats in _route_stats.items()]
+    report = []
+    for endpoint, requests, latencies, query_counts, sql_ms, rows in snapshot:
+        samples = len(latencies)
+        report.append({
+            'endpoint': endpoint,
+            'requests': requests,
+            'p50_ms': round(_percentile(latencies, 50), 1),
+            'p95_ms': round(_percentile(latencies, 95), 1),
+            'max_ms': round(max(latencies), 1),
+            'avg_queries': round(sum(query_counts) / samples, 1),
+            'p95_queries': _percentile(query_counts, 95),
+            'max_queries': max(query_counts),
+            'avg_sql_ms': round(sum(sql_ms) / samples, 1),
+            'avg_rows': round(sum(rows) / samples, 1),
+        })
+    key = {'queries': 'p95_queries', 'requests': 'requests', 'sql': 'avg_sql_ms'}.get(sort, 'p95_ms')
+    report.sort(key=lambda r: r[key], reverse=True)
+    return report
+
+
+def statement_report(limit=25):
+    """The statements with the most total time, literals redacted."""
+    with _stats_lock:
+        rows = [{'sql': sql, 'count': count, 'total_ms': round(total, 1), 'max_ms': round(worst, 1),
+                 'avg_ms': round(total / count, 2) if count else 0.0, 'rows': fetched}
+                for sql, (count, total, worst, fetched) in _statement_stats.items()]
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    with _stats_lock:
+        _route_stats.clear()
+        _statement_stats.clear()
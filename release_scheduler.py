@@ -0,0 +1,223 @@
+"""Scheduled visibility releases: sessions, activities, quizzes and exams (or a
+whole subject) shown and hidden at set times instead of by hand at class start.
+
+schedule() writes the window into the item's visible_from / visible_until
+columns and queues one scheduled_releases row per change (show at
+visible_from, hide at visible_until). The queue is indexed on
+(released_at, release_at), so the pending rows due by now are a range scan
+however many past releases it holds.
+
+Every worker runs the runner thread, polling every POLL_INTERVAL seconds:
+
+- PREWARM_MINUTES before an item opens, the lesson fragments of its sessions
+  (warm_sessions hook, set by lms.create_app) and the answer keys of its
+  quizzes and exams (answer_keys.warm) are loaded into this worker's caches,
+  so the class-start spike finds them warm
+- once a row is due, the first worker to claim it (UPDATE ... WHERE
+  released_at IS NULL) applies it; every worker then passes the rows released
+  since its previous poll to the on_released hook, which drops its own cached
+  journey trees
+
+A release only flips is_visible; it does not bump the sessions'
+content_version, since the cached fragments do not depend on visibility and
+bumping it would throw away what was just warmed. Times are local server time
+('YYYY-MM-DD HH:MM:SS'), like every other timestamp the app writes.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import get_db
+import answer_keys
+import tenancy
+
+POLL_INTERVAL = 30           # seconds between polls of the release queue
+PREWARM_MINUTES = 5          # warm caches this long before an item opens
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+ITEM_TABLES = {'session': 'sessions', 'activity': 'activities', 'quiz': 'quizzes', 'exam': 'exams'}
+ITEM_TYPES = (*ITEM_TABLES, 'subject')
+ITEM_ID_TABLES = {**ITEM_TABLES, 'subject': 'subjects'}
+
+# Set by lms.create_app: warm_sessions(session_ids) renders the session pages'
+# cached fragments; on_released(cursor, releases) drops per-worker caches.
+warm_sessions = None
+on_released = None
+
+_warmed = set()              # (institution id, release id) this worker has already prewarmed
+_last_poll = {}              # institution id -> time of this worker's previous poll
+
+
+def parse_time(value):
+    """Normalize a datetime-local form value ('2026-03-02T08:00') to TIME_FORMAT.
+    Empty values give None; anything else unparseable raises ValueError."""
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).strip()).strftime(TIME_FORMAT)
+
+
+def schedule(cursor, item_type, item_id, visible_from=None, visible_until=None, user_id=None):
+    """Replace the pending releases of an item with a show at visible_from and a
+    hide at visible_until (either may be None; both None clears the schedule)."""
+    if item_type not in ITEM_TYPES:
+        raise ValueError(f'Unknown item type: {item_type}')
+    if visible_from and visible_until and visible_until <= visible_from:
+        raise ValueError('The hide time must be after the release time')
+    cursor.execute(f'SELECT 1 FROM {ITEM_ID_TABLES[item_type]} WHERE id = ?', (item_id,))
+    if cursor.fetchone() is None:
+        raise ValueError(f'Unknown {item_type}: {item_id}')
+
+    cursor.execute('DELETE FROM scheduled_releases WHERE item_type = ? AND item_id = ? AND released_at IS NULL',
+                   (item_type, item_id))
+    if item_type in ITEM_TABLES:
+        cursor.execute(f'UPDATE {ITEM_TABLES[item_type]} SET visible_from = ?, visible_until = ? WHERE id = ?',
+                       (visible_from, visible_until, item_id))
+    for release_at, make_visible in ((visible_from, 1), (visible_until, 0)):
+        if release_at:
+            cursor.execute('''
+                INSERT INTO scheduled_releases (item_type, item_id, make_visible, release_at, created_by)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (item_type, item_id, make_visible, release_at, user_id))
+
+
+def pending(cursor, subject_id):
+    """Pending releases of a subject and everything in it, soonest first."""
+    cursor.execute('''
+        SELECT r.* FROM scheduled_releases r
+        WHERE r.released_at IS NULL AND (
+            (r.item_type = 'subject' AND r.item_id = ?)
+            OR (r.item_type = 'session' AND r.item_id IN (SELECT id FROM sessions WHERE subject_id = ?))
+            OR (r.item_type = 'activity' AND r.item_id IN (
+                SELECT a.id FROM activities a JOIN sessions s ON a.session_id = s.id WHERE s.subject_id = ?))
+            OR (r.item_type = 'quiz' AND r.item_id IN (
+                SELECT q.id FROM quizzes q JOIN sessions s ON q.session_id = s.id WHERE s.subject_id = ?))
+            OR (r.item_type = 'exam' AND r.item_id IN (SELECT id FROM exams WHERE subject_id = ?))
+        )
+        ORDER BY r.release_at, r.id
+    ''', (subject_id,) * 5)
+    return cursor.fetchall()
+
+
+def set_visibility(cursor, item_type, item_id, visible):
+    """Show or hide one item; 'subject' covers its sessions, activities, quizzes and exams."""
+    value = 1 if visible else 0
+    if item_type in ITEM_TABLES:
+        cursor.execute(f'UPDATE {ITEM_TABLES[item_type]} SET is_visible = ? WHERE id = ?', (value, item_id))
+        return
+    cursor.execute('UPDATE sessions SET is_visible = ? WHERE subject_id = ?', (value, item_id))
+    cursor.execute('''
+        UPDATE activities SET is_visible = ?
+        WHERE session_id IN (SELECT id FROM sessions WHERE subject_id = ?)
+    ''', (value, item_id))
+    cursor.execute('''
+        UPDATE quizzes SET is_visible = ?
+        WHERE session_id IN (SELECT id FROM sessions WHERE subject_id = ?)
+    ''', (value, item_id))
+    cursor.execute('UPDATE exams SET is_visible = ? WHERE subject_id = ?', (value, item_id))
+
+
+def release_due(conn, now):
+    """Apply every release due by now that no other worker has claimed; returns them."""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT * FROM scheduled_releases
+        WHERE released_at IS NULL AND release_at <= ?
+        ORDER BY release_at, id
+    ''', (now,))
+    applied = []
+    for release in cursor.fetchall():
+        cursor.execute('UPDATE scheduled_releases SET released_at = ? WHERE id = ? AND released_at IS NULL',
+                       (now, release['id']))
+        if cursor.rowcount:
+            set_visibility(cursor, release['item_type'], release['item_id'], release['make_visible'])
+            applied.append(release)
+        conn.commit()
+    return applied
+
+
+def _targets(cursor, releases):
+    """(session ids, quiz ids, exam ids) whose caches the releases should warm."""
+    session_ids, quiz_ids, exam_ids = set(), set(), set()
+    for release in releases:
+        item_type, item_id = release['item_type'], release['item_id']
+        if item_type == 'session':
+            session_ids.add(item_id)
+        elif item_type == 'quiz':
+            quiz_ids.add(item_id)
+        elif item_type == 'exam':
+            exam_ids.add(item_id)
+        elif item_type == 'subject':
+            cursor.execute('SELECT id FROM sessions WHERE subject_id = ?', (item_id,))
+            session_ids.update(row['id'] for row in cursor.fetchall())
+            cursor.execute('SELECT id FROM exams WHERE subject_id = ?', (item_id,))
+            exam_ids.update(row['id'] for row in cursor.fetchall())
+    if session_ids:
+        placeholders = ','.join('?' * len(session_ids))
+        cursor.execute(f'SELECT id FROM quizzes WHERE session_id IN ({placeholders})', tuple(session_ids))
+        quiz_ids.update(row['id'] for row in cursor.fetchall())
+    return session_ids, quiz_ids, exam_ids
+
+
+def prewarm(conn, now, institution_id=None):
+    """Warm this worker's caches for the items opening within PREWARM_MINUTES."""
+    cursor = conn.cursor()
+    horizon = (datetime.strptime(now, TIME_FORMAT) + timedelta(minutes=PREWARM_MINUTES)).strftime(TIME_FORMAT)
+    cursor.execute('''
+        SELECT * FROM scheduled_releases
+        WHERE released_at IS NULL AND release_at <= ? AND make_visible = 1
+        ORDER BY release_at, id
+    ''', (horizon,))
+    releases = [release for release in cursor.fetchall() if (institution_id, release['id']) not in _warmed]
+    if not releases:
+        return 0
+    session_ids, quiz_ids, exam_ids = _targets(cursor, releases)
+    answer_keys.warm(cursor, 'quiz', quiz_ids)
+    answer_keys.warm(cursor, 'exam', exam_ids)
+    if session_ids and warm_sessions is not None:
+        warm_sessions(sorted(session_ids))
+    _warmed.update((institution_id, release['id']) for release in releases)
+    return len(releases)
+
+
+def poll(conn, institution_id=None, now=None):
+    """One pass over a tenant's queue: prewarm, release what is due, then let
+    this worker drop its caches for everything released since its last poll."""
+    now = now or datetime.now().strftime(TIME_FORMAT)
+    warmed = prewarm(conn, now, institution_id)
+    applied = release_due(conn, now)
+    since = _last_poll.get(institution_id)
+    _last_poll[institution_id] = now
+    cursor = conn.cursor()
+    released = list(applied)
+    if since is not None:
+        cursor.execute('SELECT * FROM scheduled_releases WHERE released_at > ? AND released_at <= ?', (since, now))
+        applied_ids = {release['id'] for release in applied}
+        released += [release for release in cursor.fetchall() if release['id'] not in applied_ids]
+    if released and on_released is not None:
+        on_released(cursor, released)
+    if warmed or applied:
+        print(f'[Releases] {now}: prewarmed {warmed}, released {len(applied)} item(s)')
+    return applied
+
+
+def runner():
+    """Background thread body: poll every tenant's release queue."""
+    while True:
+        # Per tenant, so one institution's failing queue does not hold up the others
+        for institution_id in tenancy.tenants():
+            try:
+                with tenancy.use_institution(institution_id):
+                    conn = get_db()
+                    try:
+                        poll(conn, institution_id)
+                    finally:
+                        conn.close()
+            except Exception as e:
+                print(f'[Releases] Release poll failed for institution {institution_id}: {e}')
+        time.sleep(POLL_INTERVAL)
+
+
+def start_runner():
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,317 @@
+"""Precomputed grade reports (cubes) for the admin and institution Grades pages.
+
+Both pages used to aggregate the OLTP tables on every view: the admin page ran
+correlated AVG subqueries per subject and per student, and the institution
+page called compute_weighted_grade() (five queries) for every enrollment just
+to find the students at 90% or above. build() now computes everything with
+one grouped query per source table and stores the results in the report_*
+tables, which the pages read as-is:
+
+- report_subject_cube: per subject (and so per section) enrollment, the
+  activity/quiz/exam averages, the average weighted grade, the grade
+  distribution (90+, 80-89, 75-79, below 75) and the lesson completion rate
+- report_student_grades: the weighted grade of every enrolled student per
+  subject, the same numbers compute_weighted_grade() gives (top N per
+  institution)
+- report_student_overall: per student graded activity count and average
+  (the admin page's top and at-risk lists)
+- report_builds: one row per build, for the "as of" line
+
+The scheduler thread rebuilds every tenant once a night after REPORT_HOUR;
+a page builds on read if its tenant has no build younger than MAX_AGE (fresh
+install, background jobs off), and ?refresh=1 on the admin page rebuilds on
+demand (admins only: a build scans every institution's rows).
+
+    python report_cubes.py build     # rebuild every tenant now
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import get_db
+from lms.common import get_grade_weights
+import tenancy
+
+REPORT_HOUR = int(os.environ.get('LMS_REPORT_HOUR', '2'))   # nightly build after this local hour
+CHECK_INTERVAL = 600         # seconds between the scheduler's checks
+MAX_AGE = 36 * 3600          # read-time fallback if the nightly build was missed
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+GRADE_BANDS = (('grade_90_up', 90), ('grade_80_89', 80), ('grade_75_79', 75), ('grade_below_75', None))
+PROJECT_SESSIONS = (13, 14, 15, 16)
+
+_build_lock = threading.Lock()
+
+
+def _grouped(cursor, sql):
+    """{(first column, second column): third column} of a grouped query."""
+    cursor.execute(sql)
+    return {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+
+
+def _per_subject(cursor, sql):
+    """{subject id: value} of a query grouped by subject."""
+    cursor.execute(sql)
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def _student_grades(cursor):
+    """[(subject id, student id, full name, activity, quiz, midterm, final, grade)]
+    for every enrollment, computed like compute_weighted_grade()."""
+    weights = get_grade_weights('')
+    activity = _grouped(cursor, '''
+        SELECT ses.subject_id, sub.student_id, AVG(COALESCE(sub.final_score, sub.score))
+        FROM submissions sub
+        JOIN activities a ON sub.activity_id = a.id
+        JOIN sessions ses ON a.session_id = ses.id
+        WHERE COALESCE(sub.final_score, sub.score) IS NOT NULL
+        GROUP BY ses.subject_id, sub.student_id
+    ''')
+    quiz = _grouped(cursor, '''
+        SELECT ses.subject_id, qa.student_id, AVG(qa.score)
+        FROM quiz_attempts qa
+        JOIN quizzes q ON qa.quiz_id = q.id
+        JOIN sessions ses ON q.session_id = ses.id
+        WHERE qa.score IS NOT NULL
+        GROUP BY ses.subject_id, qa.student_id
+    ''')
+    # The last attempt of each exam type counts, as in compute_weighted_grade()
+    exams = {}
+    cursor.execute('''
+        SELECT e.subject_id, ea.student_id, e.exam_type, ea.score
+        FROM exam_attempts ea
+        JOIN exams e ON ea.exam_id = e.id
+        WHERE e.exam_type IN ('midterm', 'final')
+        ORDER BY ea.id
+    ''')
+    for row in cursor.fetchall():
+        exams.setdefault((row['subject_id'], row['student_id']), {})[row['exam_type']] = row['score'] or 0
+
+    groups = _grouped(cursor, '''
+        SELECT pg.subject_id, pgm.student_id, MIN(pg.id)
+        FROM project_groups pg
+        JOIN project_group_members pgm ON pg.id = pgm.group_id
+        GROUP BY pg.subject_id, pgm.student_id
+    ''')
+    progress = {}
+    cursor.execute('SELECT group_id, session_number, percentage FROM project_progress ORDER BY id')
+    for row in cursor.fetchall():
+        progress.setdefault(row['group_id'], {})[row['session_number']] = row['percentage']
+
+    rows = []
+    cursor.execute('''
+        SELECT DISTINCT e.subject_id, e.student_id, u.full_name
+        FROM enrollments e
+        JOIN users u ON e.student_id = u.id
+    ''')
+    for row in cursor.fetchall():
+        key = (row['subject_id'], row['student_id'])
+        activity_avg = activity.get(key) or 0
+        quiz_avg = quiz.get(key) or 0
+        midterm = exams.get(key, {}).get('midterm', 0)
+        final_exam = exams.get(key, {}).get('final', 0)
+        if final_exam == 0 and key in groups:
+            sessions = progress.get(groups[key], {})
+            project = sum(sessions.get(sn) or 0 for sn in PROJECT_SESSIONS) / 4
+            if project > 0:
+                final_exam = project
+        grade = (activity_avg * weights['activities'] + quiz_avg * weights['quizzes'] +
+                 midterm * weights['midterm'] + final_exam * weights['final'])
+        rows.append((*key, row['full_name'], activity_avg, quiz_avg, midterm, final_exam, grade))
+    return rows
+
+
+def _band(grade):
+    for column, floor in GRADE_BANDS:
+        if floor is None or grade >= floor:
+            return column
+
+
+def _subject_cube(cursor, student_grades):
+    """One row per subject: enrollment, component averages, grade distribution, completion."""
+    enrolled = _per_subject(cursor, 'SELECT subject_id, COUNT(*) FROM enrollments GROUP BY subject_id')
+    averages = {}
+    for component, sql in (
+        ('activity', '''
+            SELECT se.subject_id, AVG(sub.score) FROM submissions sub
+            JOIN activities a ON sub.activity_id = a.id
+            JOIN sessions se ON a.session_id = se.id
+            WHERE sub.score IS NOT NULL
+            GROUP BY se.subject_id
+        '''),
+        ('quiz', '''
+            SELECT se.subject_id, AVG(qa.score) FROM quiz_attempts qa
+            JOIN quizzes q ON qa.quiz_id = q.id
+            JOIN sessions se ON q.session_id = se.id
+            WHERE qa.score IS NOT NULL
+            GROUP BY se.subject_id
+        '''),
+        ('exam', '''
+            SELECT e.subject_id, AVG(ea.score) FROM exam_attempts ea
+            JOIN exams e ON ea.exam_id = e.id
+            WHERE ea.score IS NOT NULL
+            GROUP BY e.subject_id
+        '''),
+    ):
+        averages[component] = _per_subject(cursor, sql)
+
+    session_counts = _per_subject(cursor, 'SELECT subject_id, COUNT(*) FROM sessions GROUP BY subject_id')
+    completed = _per_subject(cursor, '''
+        SELECT se.subject_id, COUNT(*)
+        FROM session_progress sp
+        JOIN sessions se ON sp.session_id = se.id
+        JOIN (SELECT DISTINCT subject_id, student_id FROM enrollments) e
+             ON e.subject_id = se.subject_id AND e.student_id = sp.student_id
+        WHERE sp.completed_at IS NOT NULL
+        GROUP BY se.subject_id
+    ''')
+
+    per_subject = {}
+    for subject_id, _, _, _, _, _, _, grade in student_grades:
+        per_subject.setdefault(subject_id, []).append(grade)
+
+    rows = []
+    cursor.execute('''
+        SELECT s.id, s.institution_id, s.code, s.name, s.section, u.full_name AS instructor_name
+        FROM subjects s
+        LEFT JOIN users u ON s.instructor_id = u.id
+    ''')
+    for subject in cursor.fetchall():
+        subject_id = subject['id']
+        grades = per_subject.get(subject_id, [])
+        bands = {column: 0 for column, _ in GRADE_BANDS}
+        for grade in grades:
+            bands[_band(grade)] += 1
+        possible = len(grades) * session_counts.get(subject_id, 0)
+        rows.append((
+            subject_id, subject['institution_id'], subject['code'], subject['name'], subject['section'],
+            subject['instructor_name'], enrolled.get(subject_id, 0),
+            averages['activity'].get(subject_id), averages['quiz'].get(subject_id),
+            averages['exam'].get(subject_id),
+            sum(grades) / len(grades) if grades else None,
+            *(bands[column] for column, _ in GRADE_BANDS),
+            completed.get(subject_id, 0) * 100.0 / possible if possible else None,
+        ))
+    return rows
+
+
+def _student_overall(cursor):
+    cursor.execute('''
+        SELECT u.id, u.full_name, u.section, u.student_id, s.activities_done, s.graded, s.avg_score
+        FROM (SELECT student_id, COUNT(DISTINCT activity_id) AS activities_done,
+                     COUNT(*) AS graded, AVG(score) AS avg_score
+              FROM submissions
+              WHERE score IS NOT NULL
+              GROUP BY student_id) s
+        JOIN users u ON s.student_id = u.id
+        WHERE u.role = 'student'
+    ''')
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def build(conn):
+    """Recompute every cube of this database and replace them in one transaction."""
+    with _build_lock:
+        started = time.monotonic()
+        cursor = conn.cursor()
+        student_grades = _student_grades(cursor)
+        subjects = _subject_cube(cursor, student_grades)
+        students = _student_overall(cursor)
+        now = datetime.now().strftime(TIME_FORMAT)
+
+        cursor.execute('DELETE FROM report_subject_cube')
+        cursor.executemany(f'''
+            INSERT INTO report_subject_cube (subject_id, institution_id, code, name, section, instructor_name,
+                enrolled, avg_activity_score, avg_quiz_score, avg_exam_score, avg_grade,
+                {', '.join(column for column, _ in GRADE_BANDS)}, completion_rate)
+            VALUES ({', '.join('?' * 16)})
+        ''', subjects)
+        cursor.execute('DELETE FROM report_student_grades')
+        cursor.executemany('''
+            INSERT INTO report_student_grades (subject_id, student_id, full_name, activity_avg, quiz_avg,
+                midterm, final_exam, grade)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', student_grades)
+        cursor.execute('DELETE FROM report_student_overall')
+        cursor.executemany('''
+            INSERT INTO report_student_overall (student_id, full_name, section, student_code,
+                activities_done, graded, avg_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', students)
+        duration_ms = int((time.monotonic() - started) * 1000)
+        cursor.execute('''
+            INSERT INTO report_builds (built_at, duration_ms, subject_rows, student_rows)
+            VALUES (?, ?, ?, ?)
+        ''', (now, duration_ms, len(subjects), len(student_grades)))
+        conn.commit()
+    return now
+
+
+def last_built(cursor):
+    """Time of the latest build of this database, None if never built."""
+    cursor.execute('SELECT MAX(built_at) FROM report_builds')
+    return cursor.fetchone()[0]
+
+
+def ensure_built(conn, rebuild=False):
+    """Return when the cubes were built, building them first if asked, missing or older than MAX_AGE."""
+    as_of = last_built(conn.cursor())
+    if rebuild or as_of is None or (
+            datetime.now() - datetime.strptime(as_of, TIME_FORMAT)).total_seconds() >= MAX_AGE:
+        as_of = build(conn)
+    return as_of
+
+
+def build_all():
+    """Rebuild the cubes of every tenant; returns how many were built."""
+    built = 0
+    for institution_id in tenancy.tenants():
+        with tenancy.use_institution(institution_id):
+            conn = get_db()
+        try:
+            build(conn)
+            built += 1
+        finally:
+            conn.close()
+    return built
+
+
+def due(as_of, now):
+    """Whether the nightly build for now is still to be done, given the latest build time."""
+    nightly = now.replace(hour=REPORT_HOUR, minute=0, second=0, microsecond=0)
+    if now < nightly:
+        nightly -= timedelta(days=1)
+    return as_of is None or as_of < nightly.strftime(TIME_FORMAT)
+
+
+def scheduler():
+    """Background thread body: rebuild each tenant's cubes once a night after REPORT_HOUR."""
+    time.sleep(60)  # let startup finish first
+    while True:
+        try:
+            for institution_id in tenancy.tenants():
+                with tenancy.use_institution(institution_id):
+                    conn = get_db()
+                try:
+                    if due(last_built(conn.cursor()), datetime.now()):
+                        as_of = build(conn)
+                        print(f'[Reports] Built grade cubes for {institution_id or "main"} at {as_of}')
+                finally:
+                    conn.close()
+        except Exception as e:
+            print(f'[Reports] Cube build failed: {e}')
+        time.sleep(CHECK_INTERVAL)
+
+
+def start_scheduler():
+    thread = threading.Thread(target=scheduler, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['build']:
+        sys.exit('usage: python report_cubes.py build')
+    print(f'Built grade cubes for {build_all()} tenant(s)')
@@ -0,0 +1,289 @@
+"""Full-text search over people, sessions, activities, quiz/exam questions and messages.
+
+Each searchable table gets an FTS5 index stored as external content (the
+index keeps only the tokens; the text stays in the source table), created by
+create_schema() from init_db. AFTER INSERT / DELETE / UPDATE OF <columns>
+triggers keep every index in step with its table, so no route has to know
+about search and unrelated updates (a new photo, a visibility toggle) do not
+touch the index.
+
+search() turns free text into prefix terms ("net adm" matches "Network
+Administration"), ranks with bm25 (column weights favour names and titles
+over bodies) and applies role filters in the same query:
+
+- admin: everything, but only messages they sent or received
+- instructor: the same, with students as the only people
+- institution: people, sessions and activities of their institution
+- student: visible sessions and activities of enrolled subjects and the
+  messages addressed to them; never people or questions (answer keys)
+
+    python search_index.py rebuild     # re-index every table from scratch
+    python search_index.py optimize    # merge index segments after bulk imports
+
+On PostgreSQL (pg_backend.py) the indexes are GIN indexes on weighted
+tsvector expressions of the same columns, ranked with ts_rank and
+highlighted with ts_headline.
+"""
+import re
+import sqlite3
+import sys
+
+import pg_backend
+
+# kind -> (index table, source table, indexed columns, bm25 column weights)
+SOURCES = {
+    'user': ('users_fts', 'users', ('full_name', 'student_id', 'section'), (10.0, 5.0, 2.0)),
+    'session': ('sessions_fts', 'sessions', ('title', 'reading_materials'), (5.0, 1.0)),
+    'activity': ('activities_fts', 'activities', ('title', 'instructions'), (5.0, 1.0)),
+    'quiz_question': ('quiz_questions_fts', 'quiz_questions', ('question_text', 'options'), (3.0, 1.0)),
+    'exam_question': ('exam_questions_fts', 'exam_questions', ('question_text', 'options'), (3.0, 1.0)),
+    'message': ('messages_fts', 'messages', ('subject', 'content'), (3.0, 1.0)),
+}
+
+ROLE_KINDS = {
+    'admin': ('user', 'session', 'activity', 'quiz_question', 'exam_question', 'message'),
+    'instructor': ('user', 'session', 'activity', 'quiz_question', 'exam_question', 'message'),
+    'institution': ('user', 'session', 'activity', 'message'),
+    'student': ('session', 'activity', 'message'),
+}
+
+KIND_LABELS = {
+    'user': 'People', 'session': 'Sessions', 'activity': 'Activities',
+    'quiz_question': 'Quiz questions', 'exam_question': 'Exam questions', 'message': 'Messages',
+}
+
+PER_PAGE = 20
+MAX_TERMS = 8
+SNIPPET_TOKENS = 16
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'  # replaced by <mark> after escaping
+
+_TERM = re.compile(r'\w+')
+# ts_headline options matching the FTS5 snippet() call (PostgreSQL)
+_HEADLINE = (f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords={SNIPPET_TOKENS}, '
+             f'MinWords={SNIPPET_TOKENS // 2}, MaxFragments=1, FragmentDelimiter=" … "')
+
+# kind -> (select list, table and alias, joins). Every select list yields:
+# kind, id, title, context, snippet, ref (as text), score. {snippet} and {rank} are
+# filled per backend; :q, :uid, :inst and :section are bound at query time.
+_BRANCHES = {
+    'user': (
+        """'user', u.id, u.full_name,
+            TRIM(COALESCE(u.student_id, '') || ' ' || COALESCE(u.section, '') || ' · ' || u.role),
+            {snippet}, u.role, {rank}""",
+        'users u', '',
+    ),
+    'session': (
+        """'session', s.id, s.title, sub.code || ' ' || COALESCE(sub.section, ''),
+            {snippet}, CAST(s.subject_id AS TEXT), {rank}""",
+        'sessions s', 'JOIN subjects sub ON sub.id = s.subject_id',
+    ),
+    'activity': (
+        """'activity', a.id, a.title, sub.code || ' ' || COALESCE(sub.section, '') || ' · ' || s.title,
+            {snippet}, CAST(a.session_id AS TEXT), {rank}""",
+        'activities a', """JOIN sessions s ON s.id = a.session_id
+           JOIN subjects sub ON sub.id = s.subject_id""",
+    ),
+    'quiz_question': (
+        """'quiz_question', qq.id, q.title, sub.code || ' ' || COALESCE(sub.section, '') || ' · ' || s.title,
+            {snippet}, CAST(q.session_id AS TEXT), {rank}""",
+        'quiz_questions qq', """JOIN quizzes q ON q.id = qq.quiz_id
+           JOIN sessions s ON s.id = q.session_id
+           JOIN subjects sub ON sub.id = s.subject_id""",
+    ),
+    'exam_question': (
+        """'exam_question', eq.id, e.title, sub.code || ' ' || COALESCE(sub.section, ''),
+            {snippet}, CAST(e.id AS TEXT), {rank}""",
+        'exam_questions eq', """JOIN exams e ON e.id = eq.exam_id
+           JOIN subjects sub ON sub.id = e.subject_id""",
+    ),
+    'message': (
+        """'message', m.id, m.subject, sender.full_name || ' · ' || m.created_at,
+            {snippet}, CAST(NULL AS TEXT), {rank}""",
+        'messages m', 'JOIN users sender ON sender.id = m.sender_id',
+    ),
+}
+
+_ENROLLED = 'sub.id IN (SELECT subject_id FROM enrollments WHERE student_id = :uid)'
+_OWN_MESSAGES = 'm.sender_id = :uid OR m.recipient_id = :uid'
+
+# (kind, role) -> WHERE condition; no entry means no extra filter
+_FILTERS = {
+    ('user', 'instructor'): "u.role = 'student'",
+    ('user', 'institution'): 'u.institution_id = :inst',
+    ('session', 'institution'): 'sub.institution_id = :inst',
+    ('activity', 'institution'): 'sub.institution_id = :inst',
+    ('session', 'student'): f's.is_visible = 1 AND {_ENROLLED}',
+    ('activity', 'student'): f'a.is_visible = 1 AND s.is_visible = 1 AND {_ENROLLED}',
+    ('message', 'admin'): _OWN_MESSAGES,
+    ('message', 'instructor'): _OWN_MESSAGES,
+    ('message', 'institution'): _OWN_MESSAGES,
+    ('message', 'student'): (f'({_OWN_MESSAGES} OR m.recipient_all = 1 OR m.recipient_section = :section)'
+                             ' AND m.sender_id != :uid'),
+}
+
+
+def create_schema(cursor):
+    """Create the FTS5 indexes and their triggers; index existing rows the first time."""
+    if pg_backend.ENABLED:
+        _create_pg_indexes(cursor)
+        return
+    for fts, table, columns, _ in SOURCES.values():
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        exists = cursor.fetchone() is not None
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {', '.join(columns)}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        ''')
+        new_values = ', '.join(f'new.{c}' for c in columns)
+        old_values = ', '.join(f'old.{c}' for c in columns)
+        column_list = ', '.join(columns)
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+        if not exists:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            print(f'[Search] Indexed {table}')
+
+
+def _document(kind, alias=None):
+    """PostgreSQL tsvector of a kind's columns, weighted A, B, C in SOURCES order."""
+    columns = SOURCES[kind][2]
+    prefix = f'{alias}.' if alias else ''
+    return ' || '.join(f"setweight(to_tsvector('simple', COALESCE({prefix}{column}, '')), '{weight}')"
+                       for column, weight in zip(columns, 'ABC'))
+
+
+def _create_pg_indexes(cursor):
+    """PostgreSQL: a GIN index on each table's tsvector expression (kept current by
+    PostgreSQL itself, so no triggers), named like the FTS5 table it replaces."""
+    for kind, (fts, table, _, _) in SOURCES.items():
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (fts,))
+        if cursor.fetchone() is None:
+            cursor.execute(f'CREATE INDEX {fts} ON {table} USING gin (({_document(kind)}))')
+            print(f'[Search] Indexed {table}')
+
+
+def rebuild(cursor, command='rebuild'):
+    """Run an FTS5 maintenance command ('rebuild' or 'optimize') on every index.
+
+    On PostgreSQL 'rebuild' is REINDEX and 'optimize' flushes the GIN pending lists."""
+    for fts, _, _, _ in SOURCES.values():
+        if not pg_backend.ENABLED:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES (?)", (command,))
+        elif command == 'rebuild':
+            cursor.execute(f'REINDEX INDEX {fts}')
+        else:
+            cursor.execute('SELECT gin_clean_pending_list(CAST(? AS regclass))', (fts,))
+
+
+def match_expression(query):
+    """FTS5 query (tsquery text on PostgreSQL) for free text: every word must match
+    as a prefix. None if no words."""
+    terms = _TERM.findall(query or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    if pg_backend.ENABLED:
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def users_matching():
+    """Subquery of the ids of users matching a match_expression() bound to its one ?."""
+    if pg_backend.ENABLED:
+        return f"SELECT id FROM users WHERE {_document('user')} @@ to_tsquery('simple', ?)"
+    return 'SELECT rowid FROM users_fts WHERE users_fts MATCH ?'
+
+
+def allowed_kinds(role):
+    return ROLE_KINDS.get(role, ())
+
+
+def _branch(kind, role, select=None):
+    """SELECT for one kind with the role's filter applied; select overrides the column list."""
+    fts, table, columns, weights = SOURCES[kind]
+    select_list, source, joins = _BRANCHES[kind]
+    alias = source.split()[1]
+    if pg_backend.ENABLED:
+        document = _document(kind, alias)
+        query = "to_tsquery('simple', :q)"
+        text = ', '.join(f'{alias}.{column}' for column in columns)
+        pieces = {'snippet': f"ts_headline('simple', concat_ws(' ', {text}), {query}, :headline)",
+                  'rank': f'-ts_rank({document}, {query})'}
+        source, match = f'{source} {joins}', f'{document} @@ {query}'
+    else:
+        pieces = {'snippet': f"snippet({fts}, -1, :hl_start, :hl_end, '…', :tokens)",
+                  'rank': f"bm25({fts}, {', '.join(str(w) for w in weights)})"}
+        source, match = f'{fts} JOIN {source} ON {alias}.id = {fts}.rowid {joins}', f'{fts} MATCH :q'
+    row_filter = _FILTERS.get((kind, role), '1 = 1')
+    return f'SELECT {select or select_list.format(**pieces)} FROM {source} WHERE {match} AND ({row_filter})'
+
+
+def _params(user, match):
+    return {'q': match, 'uid': user.id, 'inst': getattr(user, 'institution_id', None),
+            'section': getattr(user, 'section', None), 'hl_start': HIGHLIGHT_START,
+            'hl_end': HIGHLIGHT_END, 'tokens': SNIPPET_TOKENS, 'headline': _HEADLINE}
+
+
+def search(cursor, user, query, kind=None, page=1, per_page=PER_PAGE):
+    """One page of results for user, best match first.
+
+    Returns (results, has_next); each result is a dict with kind, id, title,
+    context, snippet (highlighted with HIGHLIGHT_START/END) and ref: the role
+    for people, the subject for sessions, the session for activities and quiz
+    questions, the exam for exam questions.
+    bm25 scores of different indexes are close enough to interleave them.
+    """
+    match = match_expression(query)
+    kinds = [k for k in allowed_kinds(user.role) if kind in (None, k)]
+    if match is None or not kinds:
+        return [], False
+    union = ' UNION ALL '.join(_branch(k, user.role) for k in kinds)
+    cursor.execute(f'{union} ORDER BY 7 LIMIT :limit OFFSET :offset',
+                   {**_params(user, match), 'limit': per_page + 1, 'offset': (max(page, 1) - 1) * per_page})
+    rows = cursor.fetchall()
+    results = [{'kind': r[0], 'id': r[1], 'title': r[2], 'context': r[3], 'snippet': r[4], 'ref': r[5]}
+               for r in rows[:per_page]]
+    return results, len(rows) > per_page
+
+
+def count_by_kind(cursor, user, query):
+    """{kind: number of matches} for every kind the user may search (no snippets, no ranking)."""
+    match = match_expression(query)
+    kinds = allowed_kinds(user.role)
+    if match is None or not kinds:
+        return {}
+    union = ' UNION ALL '.join(_branch(k, user.role, select=f"'{k}', COUNT(*)") for k in kinds)
+    cursor.execute(union, _params(user, match))
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] not in (['rebuild'], ['optimize']):
+        print('usage: python search_index.py rebuild|optimize')
+        sys.exit(2)
+    from database import get_db
+    conn = get_db()
+    try:
+        rebuild(conn.cursor(), sys.argv[1])
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f'[Search] {e}')
+        sys.exit(1)
+    finally:
+        conn.close()
+    print(f'[Search] {sys.argv[1]} done')
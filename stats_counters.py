@@ -0,0 +1,188 @@
+"""Cached dashboard counters for the platform admin and institution dashboards.
+
+refresh() recomputes every counter with a handful of grouped queries (one per
+source table, grouped by institution) and stores them in stats_counters under
+a scope: 'platform' or 'institution:<id>'. Dashboards call get_counters(),
+which reads the small table and reports when the numbers were computed.
+
+Counters are refreshed by the background refresher every REFRESH_INTERVAL
+seconds, and on read only when missing or older than MAX_AGE (e.g. the
+refresher is not running). Create/delete paths call mark_stale(), which only
+wakes this worker's refresher: it waits STALE_DELAY seconds so a burst of
+writes (and their commits) becomes one refresh of the tenant written to, and
+reads never pay for it.
+"""
+import threading
+import time
+from datetime import datetime
+
+from database import get_db
+import tenancy
+
+REFRESH_INTERVAL = 300       # background refresh period (seconds)
+MAX_AGE = 600                # read-time fallback if the refresher fell behind
+STALE_DELAY = 10             # seconds the refresher waits after mark_stale() to batch writes
+
+PLATFORM = 'platform'
+
+_refresh_lock = threading.Lock()
+_stale = set()               # tenants written to since the refresher last ran
+_stale_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def institution_scope(institution_id):
+    return f'institution:{institution_id}'
+
+
+def _compute(cursor):
+    """{scope: {name: value}} for the platform and every institution."""
+    counters = {PLATFORM: {}}
+
+    def inst(institution_id):
+        return counters.setdefault(institution_scope(institution_id), {})
+
+    platform = counters[PLATFORM]
+
+    cursor.execute('SELECT COUNT(*) FROM institutions WHERE is_active = 1')
+    platform['total_institutions'] = cursor.fetchone()[0]
+    cursor.execute('SELECT id FROM institutions')
+    for row in cursor.fetchall():
+        inst(row['id']).update(teacher_count=0, student_count=0, subject_count=0, session_count=0,
+                               activity_count=0, total_revenue=0, total_pending=0)
+
+    platform['total_instructors'] = platform['total_students'] = 0
+    cursor.execute('''
+        SELECT institution_id, role, COUNT(*) AS c FROM users
+        WHERE role IN ('instructor', 'student')
+        GROUP BY institution_id, role
+    ''')
+    for row in cursor.fetchall():
+        key = 'instructors' if row['role'] == 'instructor' else 'students'
+        platform[f'total_{key}'] += row['c']
+        if row['institution_id'] is not None:
+            inst(row['institution_id'])['teacher_count' if key == 'instructors' else 'student_count'] = row['c']
+
+    platform['total_subjects'] = 0
+    cursor.execute('SELECT institution_id, COUNT(*) AS c FROM subjects GROUP BY institution_id')
+    for row in cursor.fetchall():
+        platform['total_subjects'] += row['c']
+        if row['institution_id'] is not None:
+            inst(row['institution_id'])['subject_count'] = row['c']
+
+    cursor.execute('''
+        SELECT sub.institution_id, COUNT(*) AS c FROM sessions s
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE sub.institution_id IS NOT NULL
+        GROUP BY sub.institution_id
+    ''')
+    for row in cursor.fetchall():
+        inst(row['institution_id'])['session_count'] = row['c']
+
+    cursor.execute('''
+        SELECT sub.institution_id, COUNT(*) AS c FROM activities a
+        JOIN sessions s ON a.session_id = s.id
+        JOIN subjects sub ON s.subject_id = sub.id
+        WHERE sub.institution_id IS NOT NULL
+        GROUP BY sub.institution_id
+    ''')
+    for row in cursor.fetchall():
+        inst(row['institution_id'])['activity_count'] = row['c']
+
+    cursor.execute('''
+        SELECT institution_id,
+               COALESCE(SUM(CASE WHEN status = 'paid' THEN amount_paid END), 0) AS revenue,
+               COALESCE(SUM(CASE WHEN status != 'paid' THEN balance END), 0) AS pending
+        FROM student_payments
+        WHERE institution_id IS NOT NULL
+        GROUP BY institution_id
+    ''')
+    for row in cursor.fetchall():
+        inst(row['institution_id']).update(total_revenue=row['revenue'], total_pending=row['pending'])
+
+    cursor.execute('SELECT COUNT(*) FROM submissions')
+    platform['total_submissions'] = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM ai_admin_logs')
+    platform['total_ai_actions'] = cursor.fetchone()[0]
+    cursor.execute('SELECT COUNT(*) FROM ai_admin_rules WHERE is_active = 1')
+    platform['active_rules'] = cursor.fetchone()[0]
+    cursor.execute('''
+        SELECT COALESCE(SUM(CASE WHEN status = 'draft' THEN 1 ELSE 0 END), 0) AS pending,
+               COALESCE(SUM(CASE WHEN status = 'paid' THEN net_pay END), 0) AS paid
+        FROM instructor_payroll
+    ''')
+    row = cursor.fetchone()
+    platform['pending_payroll'] = row['pending']
+    platform['total_paid'] = row['paid']
+    return counters
+
+
+def refresh(conn):
+    """Recompute all counters and replace the stored values in one transaction."""
+    with _refresh_lock:
+        cursor = conn.cursor()
+        counters = _compute(cursor)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        rows = [(scope, name, value, now) for scope, values in counters.items() for name, value in values.items()]
+        cursor.execute('DELETE FROM stats_counters')
+        cursor.executemany('INSERT INTO stats_counters (scope, name, value, updated_at) VALUES (?, ?, ?, ?)', rows)
+        conn.commit()
+    return counters
+
+
+def mark_stale():
+    """Ask the refresher to recompute the current tenant's counters shortly."""
+    with _stale_lock:
+        _stale.add(tenancy.current_institution() if tenancy.ENABLED else None)
+    _wake.set()
+
+
+def get_counters(conn, scope):
+    """Return ({name: value}, as_of) for scope, refreshing first if stale or missing."""
+    cursor = conn.cursor()
+    cursor.execute('SELECT name, value, updated_at FROM stats_counters WHERE scope = ?', (scope,))
+    rows = cursor.fetchall()
+    as_of = min((r['updated_at'] for r in rows), key=lambda v: v or '') if rows else None
+    fresh = as_of is not None and (
+        datetime.now() - datetime.strptime(as_of, '%Y-%m-%d %H:%M:%S')).total_seconds() < MAX_AGE
+    if not fresh:
+        counters = refresh(conn)
+        cursor.execute('SELECT MAX(updated_at) FROM stats_counters')
+        return counters.get(scope, {}), cursor.fetchone()[0]
+    return {r['name']: r['value'] for r in rows}, as_of
+
+
+def _refresh_tenant(institution_id):
+    with tenancy.use_institution(institution_id):
+        conn = get_db()
+    try:
+        refresh(conn)
+    finally:
+        conn.close()
+
+
+def refresher():
+    """Background thread body: refresh every tenant each REFRESH_INTERVAL, and the
+    tenants passed to mark_stale() STALE_DELAY seconds after the first write."""
+    last_full = time.monotonic() - REFRESH_INTERVAL     # full refresh at startup
+    while True:
+        if _wake.wait(max(0, REFRESH_INTERVAL - (time.monotonic() - last_full))):
+            time.sleep(STALE_DELAY)
+        _wake.clear()
+        with _stale_lock:
+            stale = set(_stale)
+            _stale.clear()
+        if time.monotonic() - last_full >= REFRESH_INTERVAL:
+            last_full = time.monotonic()
+            stale = tenancy.tenants()
+        try:
+            for institution_id in stale:
+                _refresh_tenant(institution_id)
+        except Exception as e:
+            print(f'[Stats] Counter refresh failed: {e}')
+
+
+def start_refresher():
+    thread = threading.Thread(target=refresher, daemon=True)
+    thread.start()
+    return thread
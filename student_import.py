@@ -0,0 +1,257 @@
+"""Background bulk student import for /students/bulk-upload.
+
+The upload route saves the file and calls start_import_job(), which records a
+row in student_import_jobs and processes the file on a daemon thread:
+
+- the file is parsed in chunks of CHUNK_SIZE rows and every row is validated
+- passwords are hashed in parallel in a process pool (the hash is deliberately slow)
+- each chunk is written with a single executemany() INSERT
+- new students are auto-enrolled in the subjects matching their section
+
+Progress and per-row errors are stored on the job row so the students page can
+poll /students/bulk-upload/<job_id>/status from any worker.
+"""
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
+from database import get_db
+import tenancy
+
+REQUIRED_COLUMNS = ('student_id', 'username', 'password', 'full_name')
+ALLOWED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+CHUNK_SIZE = 400             # rows per parse/insert chunk; the section sync repeats its IN (...)
+                             # filter, so 2 x 400 stays under SQLite's 999-variable limit
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+POOL_MIN_ROWS = 8            # below this, hashing inline is cheaper than a pool round trip
+MAX_STORED_ERRORS = 200      # per-row errors kept on the job row; error_count has the full total
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _hash_password(password):
+    return generate_password_hash(password)
+
+
+def _get_hash_pool():
+    """Create the shared password hashing pool on first use."""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+        return _hash_pool
+
+
+def hash_passwords(passwords):
+    """Hash a list of plain-text passwords, in parallel when the batch is large enough."""
+    if len(passwords) < POOL_MIN_ROWS or HASH_WORKERS < 2:
+        return [_hash_password(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return list(_get_hash_pool().map(_hash_password, passwords, chunksize=chunksize))
+
+
+def is_allowed_file(filename):
+    return filename.lower().endswith(ALLOWED_EXTENSIONS)
+
+
+def iter_chunks(filepath, chunk_size=CHUNK_SIZE):
+    """Yield DataFrame chunks of the upload with every cell as a stripped string."""
+    import pandas as pd
+
+    if filepath.lower().endswith('.csv'):
+        reader = pd.read_csv(filepath, dtype=str, keep_default_na=False, chunksize=chunk_size)
+        for chunk in reader:
+            chunk.columns = [str(c).strip() for c in chunk.columns]
+            yield chunk
+    else:
+        # Excel has no streaming reader in pandas; read once and slice.
+        df = pd.read_excel(filepath, dtype=str).fillna('')
+        df.columns = [str(c).strip() for c in df.columns]
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def count_rows(filepath):
+    """Count data rows so the progress bar has a denominator."""
+    import pandas as pd
+
+    if filepath.lower().endswith('.csv'):
+        return sum(len(c) for c in pd.read_csv(filepath, dtype=str, usecols=[0], chunksize=5000))
+    return len(pd.read_excel(filepath, usecols=[0]))
+
+
+def validate_chunk(df, seen_usernames):
+    """Split a chunk into valid rows and per-row errors.
+
+    Row numbers match the spreadsheet (header is row 1). seen_usernames carries
+    usernames across chunks so duplicates inside the file are reported too.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f'Missing required column(s): {", ".join(missing)}')
+
+    has_section = 'section' in df.columns
+    rows, errors = [], []
+    for index, record in zip(df.index, df.to_dict('records')):
+        row_number = int(index) + 2
+        values = {c: str(record.get(c, '') or '').strip() for c in REQUIRED_COLUMNS}
+        values['section'] = str(record.get('section', '') or '').strip() if has_section else ''
+        empty = [c for c in REQUIRED_COLUMNS if not values[c]]
+        if empty:
+            errors.append({'row': row_number, 'username': values['username'],
+                           'error': f'Missing {", ".join(empty)}'})
+            continue
+        if values['username'] in seen_usernames:
+            errors.append({'row': row_number, 'username': values['username'],
+                           'error': 'Duplicate username in file'})
+            continue
+        seen_usernames.add(values['username'])
+        values['row'] = row_number
+        rows.append(values)
+    return rows, errors
+
+
+def insert_chunk(conn, rows, enroll_fn=None):
+    """Insert one validated chunk and auto-enroll the new students.
+
+    enroll_fn(cursor, where, params) enrolls the users matched by the SQL filter
+    and returns {student_id: new enrollments} (app.sync_section_enrollments).
+    Returns (added, enrolled, errors).
+    """
+    cursor = conn.cursor()
+    errors = []
+
+    # Drop usernames that already exist so one collision doesn't fail the whole executemany
+    placeholders = ','.join('?' * len(rows))
+    cursor.execute(f'SELECT username FROM users WHERE username IN ({placeholders})',
+                   [r['username'] for r in rows])
+    existing = {r['username'] for r in cursor.fetchall()}
+    if existing:
+        errors.extend({'row': r['row'], 'username': r['username'], 'error': 'Username already exists'}
+                      for r in rows if r['username'] in existing)
+        rows = [r for r in rows if r['username'] not in existing]
+    if not rows:
+        return 0, 0, errors
+
+    hashes = hash_passwords([r['password'] for r in rows])
+    params = [(r['username'], h, r['full_name'], 'student', r['student_id'], r['section'])
+              for r, h in zip(rows, hashes)]
+    insert_sql = '''
+        INSERT INTO users (username, password_hash, full_name, role, student_id, section)
+        VALUES (?, ?, ?, ?, ?, ?)
+    '''
+    try:
+        cursor.executemany(insert_sql, params)
+        inserted = rows
+    except sqlite3.Error:
+        # Something raced us or a row is otherwise bad: retry row by row to pinpoint it
+        conn.rollback()
+        inserted = []
+        for r, p in zip(rows, params):
+            try:
+                cursor.execute(insert_sql, p)
+                inserted.append(r)
+            except sqlite3.Error as e:
+                errors.append({'row': r['row'], 'username': r['username'], 'error': str(e)})
+
+    enrolled = 0
+    if inserted and enroll_fn:
+        placeholders = ','.join('?' * len(inserted))
+        enrolled_counts = enroll_fn(cursor, f'AND u.username IN ({placeholders})',
+                                    [r['username'] for r in inserted])
+        enrolled = sum(enrolled_counts.values())
+
+    conn.commit()
+    return len(inserted), enrolled, errors
+
+
+# ==================== JOB TRACKING ====================
+
+def _update_job(job_id, **fields):
+    conn = get_db()
+    assignments = ', '.join(f'{k} = ?' for k in fields)
+    conn.execute(f'UPDATE student_import_jobs SET {assignments} WHERE id = ?',
+                 list(fields.values()) + [job_id])
+    conn.commit()
+    conn.close()
+
+
+def get_job(job_id):
+    """Return a job as a JSON-ready dict, or None."""
+    conn = get_db()
+    row = conn.execute('SELECT * FROM student_import_jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    if not row:
+        return None
+    job = dict(row)
+    job['errors'] = json.loads(job['errors']) if job['errors'] else []
+    job['percent'] = round(100 * job['processed_rows'] / job['total_rows']) if job['total_rows'] else 0
+    job['done'] = job['status'] in ('completed', 'failed')
+    return job
+
+
+def run_import_job(job_id, filepath, enroll_fn=None, institution_id=None):
+    """Process an uploaded file chunk by chunk, recording progress on the job row
+    (in the shard of institution_id, the uploader's; see tenancy.py)."""
+    with tenancy.use_institution(institution_id):
+        _run_import_job(job_id, filepath, enroll_fn)
+
+
+def _run_import_job(job_id, filepath, enroll_fn):
+    conn = None
+    added = enrolled = processed = 0
+    errors = []
+    error_count = 0
+    try:
+        total = count_rows(filepath)
+        _update_job(job_id, status='running', total_rows=total)
+
+        conn = get_db()
+        seen_usernames = set()
+        for chunk in iter_chunks(filepath):
+            rows, chunk_errors = validate_chunk(chunk, seen_usernames)
+            if rows:
+                chunk_added, chunk_enrolled, insert_errors = insert_chunk(conn, rows, enroll_fn)
+                added += chunk_added
+                enrolled += chunk_enrolled
+                chunk_errors.extend(insert_errors)
+            processed += len(chunk)
+            error_count += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_STORED_ERRORS - len(errors)])
+            _update_job(job_id, processed_rows=processed, added=added, enrolled=enrolled,
+                        error_count=error_count, errors=json.dumps(errors))
+
+        _update_job(job_id, status='completed', finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    message=f'Successfully added {added} students!')
+        print(f'[Bulk-Import] Job {job_id}: {added} added, {error_count} error(s)')
+    except Exception as e:
+        print(f'[Bulk-Import] Job {job_id} failed: {e}')
+        _update_job(job_id, status='failed', finished_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    message=f'Error processing file: {str(e)}')
+    finally:
+        if conn:
+            conn.close()
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
+def start_import_job(filepath, filename, created_by, enroll_fn=None):
+    """Create a job row and process the file on a background thread. Returns the job id."""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO student_import_jobs (filename, created_by, status)
+        VALUES (?, ?, 'queued')
+    ''', (filename, created_by))
+    job_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+
+    thread = threading.Thread(target=run_import_job, daemon=True,
+                              args=(job_id, filepath, enroll_fn, tenancy.current_institution()))
+    thread.start()
+    return job_id
@@ -0,0 +1,338 @@
+"""Per-institution database shards for multi-tenant deployments.
+
+By default the whole platform lives in classroom_lms.db. Setting
+LMS_SHARD_DIR switches to one SQLite file per institution, so one school's
+exam burst only holds its own writer lock:
+
+    <dir>/catalog.db            users, institutions, subscription plans, platform
+                                settings, AI admin rules and logs, game scores, plus
+                                the data of accounts without an institution
+    <dir>/institution_<id>.db   everything else that belongs to one institution
+
+get_db() opens the shard of the signed-in user's institution and ATTACHes the
+catalog as `catalog`. Shards keep no copy of the catalog tables, so an
+unqualified `users` resolves to catalog.users and the existing queries, joins
+included, run unchanged; only writes to catalog tables (registrations,
+profile edits) take the catalog's lock. Code outside a request, or working
+for another institution, picks the shard explicitly:
+
+    with tenancy.use_institution(institution_id):
+        conn = get_db()
+
+init_db() migrates the catalog, then every shard whose schema is behind (each
+shard's PRAGMA user_version holds a fingerprint of the catalog schema it was
+migrated to). A shard for a new institution is created on first use.
+
+An existing single-file database is split with:
+
+    python tenancy.py split classroom_lms.db shards/
+    LMS_SHARD_DIR=shards python app.py
+
+Each row goes to the institution it belongs to: its own institution_id, else
+that of the row it references (session -> subject, submission -> activity ->
+session -> subject, ...), else that of the user it references. Rows that
+belong to no institution stay in the catalog. Ids are unique per file.
+"""
+import contextlib
+import contextvars
+import os
+import re
+import sys
+import threading
+import zlib
+
+from flask import g, has_request_context
+from flask_login import current_user
+
+import pg_backend
+import search_index
+
+SHARD_DIR = os.environ.get('LMS_SHARD_DIR') or None
+# Shards are SQLite files; a PostgreSQL database (DATABASE_URL) is not split
+ENABLED = SHARD_DIR is not None and not pg_backend.ENABLED
+
+CATALOG_NAME = 'catalog.db'
+# The game tables feed the platform-wide leaderboard, which tails game_scores by id
+CATALOG_TABLES = ('users', 'institutions', 'subscription_plans', 'platform_settings',
+                  'ai_admin_rules', 'ai_admin_logs', 'game_scores', 'game_user_stats', 'game_score_daily')
+
+# References the schema does not declare as foreign keys:
+# table -> [(column, referenced table, condition on the row)]
+IMPLICIT_REFERENCES = {
+    'question_option_counts': [('question_id', 'quiz_questions', "kind = 'quiz'"),
+                               ('question_id', 'exam_questions', "kind = 'exam'")],
+}
+
+_SHARD_FILE = re.compile(r'^institution_(\d+)\.db$')
+_UNSET = object()
+_institution = contextvars.ContextVar('lms_institution', default=_UNSET)
+_create_lock = threading.Lock()
+
+
+def catalog_path(directory=None):
+    return os.path.join(directory or SHARD_DIR, CATALOG_NAME)
+
+
+def shard_path(institution_id, directory=None):
+    """File holding an institution's data; the catalog for no institution."""
+    if institution_id is None:
+        return catalog_path(directory)
+    return os.path.join(directory or SHARD_DIR, f'institution_{int(institution_id)}.db')
+
+
+def shard_ids(directory=None):
+    """Institution ids that have a shard file, in ascending order."""
+    directory = directory or SHARD_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted(int(m.group(1)) for m in map(_SHARD_FILE.match, os.listdir(directory)) if m)
+
+
+def tenants():
+    """Every tenant to visit for platform-wide work: None (the catalog), then each shard."""
+    return [None, *shard_ids()] if ENABLED else [None]
+
+
+@contextlib.contextmanager
+def use_institution(institution_id):
+    """Make get_db() open this institution's shard (None: the catalog) inside the block."""
+    token = _institution.set(institution_id)
+    try:
+        yield
+    finally:
+        _institution.reset(token)
+
+
+def current_institution():
+    """Institution whose shard get_db() opens: the use_institution() block's, else the
+    signed-in user's (None for anonymous requests and users without an institution)."""
+    institution_id = _institution.get()
+    if institution_id is not _UNSET:
+        return institution_id
+    if not has_request_context():
+        return None
+    if '_login_user' not in g:
+        if g.get('_tenant_loading_user'):
+            return None  # the user loader's own query; users live in the catalog
+        g._tenant_loading_user = True
+        try:
+            current_user._get_current_object()
+        finally:
+            g._tenant_loading_user = False
+    return getattr(g.get('_login_user'), 'institution_id', None)
+
+
+def connect(open_db, create_schema):
+    """Connection to the current institution's shard with the catalog attached."""
+    institution_id = current_institution()
+    if institution_id is None:
+        return open_db(catalog_path())
+    path = shard_path(institution_id)
+    if not os.path.exists(path):
+        catalog = open_db(catalog_path())
+        known = catalog.execute('SELECT 1 FROM institutions WHERE id = ?', (institution_id,)).fetchone()
+        if not known:
+            return catalog  # e.g. a made-up id from the public registration API: nothing to read
+        catalog.close()
+        create_shard(open_db, create_schema, institution_id)
+    conn = open_db(path)
+    conn.execute('ATTACH DATABASE ? AS catalog', (catalog_path(),))
+    return conn
+
+
+def schema_fingerprint(conn):
+    """Checksum of a database's schema, stored in each shard's user_version once migrated."""
+    rows = conn.execute("SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name")
+    return zlib.crc32(repr([tuple(r) for r in rows]).encode()) & 0x7fffffff
+
+
+def _catalog_fingerprint(open_db, directory=None):
+    conn = open_db(catalog_path(directory))
+    try:
+        return schema_fingerprint(conn)
+    finally:
+        conn.close()
+
+
+def _migrate_shard(open_db, create_schema, path, fingerprint):
+    """Bring one shard to the catalog's schema. Returns True when it had to change."""
+    conn = open_db(path)
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] == fingerprint:
+            return False
+        create_schema(conn)
+        # create_schema() also makes the catalog tables; shards read those through the attached catalog
+        for fts, table, _, _ in search_index.SOURCES.values():
+            if table in CATALOG_TABLES:
+                conn.execute(f'DROP TABLE IF EXISTS {fts}')
+        for table in CATALOG_TABLES:
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.execute(f'PRAGMA user_version = {fingerprint}')
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def create_shard(open_db, create_schema, institution_id, directory=None):
+    """Create an empty shard for an institution (built aside, then moved into place)."""
+    path = shard_path(institution_id, directory)
+    with _create_lock:
+        if os.path.exists(path):
+            return path
+        tmp = f'{path}.{os.getpid()}.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        _migrate_shard(open_db, create_schema, tmp, _catalog_fingerprint(open_db, directory))
+        os.replace(tmp, path)
+    print(f'[Shards] Created shard for institution {institution_id}')
+    return path
+
+
+def migrate(open_db, create_schema, seed_catalog=None):
+    """init_db() in sharded mode: migrate the catalog, then every shard that is behind.
+
+    Without a catalog yet, a fresh single-file database is built (seeded by
+    seed_catalog) and split, so a new deployment starts with the same demo data."""
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    if not os.path.exists(catalog_path()):
+        fresh = os.path.join(SHARD_DIR, 'initial.db')
+        conn = open_db(fresh)
+        create_schema(conn)
+        if seed_catalog:
+            seed_catalog(conn)
+        conn.close()
+        split(open_db, create_schema, fresh, SHARD_DIR)
+        os.remove(fresh)
+
+    conn = open_db(catalog_path())
+    try:
+        create_schema(conn)
+        conn.commit()
+        fingerprint = schema_fingerprint(conn)
+    finally:
+        conn.close()
+    ids = shard_ids()
+    migrated = sum(_migrate_shard(open_db, create_schema, shard_path(i), fingerprint) for i in ids)
+    print(f'[Shards] Catalog and {len(ids)} shard(s) ready ({migrated} migrated)')
+
+
+# ============== SPLITTING A SINGLE FILE ==============
+
+def _tables(conn, schema='main'):
+    """Ordinary tables of a schema (no sqlite_* tables, full-text indexes or their shadow tables)."""
+    rows = conn.execute(f"SELECT name, sql FROM {schema}.sqlite_master WHERE type = 'table'").fetchall()
+    virtual = [r[0] for r in rows if (r[1] or '').upper().startswith('CREATE VIRTUAL')]
+    return [r[0] for r in rows if not r[0].startswith('sqlite_') and r[0] not in virtual
+            and not any(r[0].startswith(f'{v}_') for v in virtual)]
+
+
+def _columns(conn, table, schema='main'):
+    return [r[1] for r in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+def owner_sql(conn, table, depth=0, seen=()):
+    """SQL for the institution a row of table (aliased t<depth>) belongs to, or None."""
+    alias = f't{depth}'
+    terms, user_terms = [], []
+    if 'institution_id' in _columns(conn, table):
+        terms.append(f'{alias}.institution_id')
+    references = [(fk[3], fk[2], fk[4] or 'id', None)
+                  for fk in conn.execute(f'PRAGMA foreign_key_list({table})').fetchall()]
+    references += [(column, parent, 'id', condition)
+                   for column, parent, condition in IMPLICIT_REFERENCES.get(table, ())]
+    for column, parent, parent_key, condition in references:
+        if parent == 'users':
+            user_terms.append(f'(SELECT institution_id FROM users WHERE id = {alias}.{column})')
+            continue
+        if parent in CATALOG_TABLES or parent in seen or parent == table:
+            continue
+        parent_owner = owner_sql(conn, parent, depth + 1, (*seen, table))
+        if parent_owner is None:
+            continue
+        term = (f'(SELECT {parent_owner} FROM {parent} t{depth + 1} '
+                f'WHERE t{depth + 1}.{parent_key} = {alias}.{column})')
+        if condition:
+            term = f'CASE WHEN {alias}.{condition} THEN {term} END'
+        terms.append(term)
+    terms += user_terms
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else f'COALESCE({", ".join(terms)})'
+
+
+def split(open_db, create_schema, source, directory):
+    """Split a single-file database into a catalog and one shard per institution."""
+    catalog = catalog_path(directory)
+    if os.path.exists(catalog):
+        raise FileExistsError(f'{catalog} already exists')
+    os.makedirs(directory, exist_ok=True)
+
+    src = open_db(source)
+    conn = open_db(catalog)
+    src.backup(conn)
+    src.close()
+    conn.isolation_level = None  # transactions are explicit below
+
+    # Owner of every row, computed once from the full copy
+    owned = []
+    for table in _tables(conn):
+        if table in CATALOG_TABLES:
+            continue
+        owner = owner_sql(conn, table)
+        if owner is None:
+            continue
+        conn.execute(f'CREATE TEMP TABLE "owner_{table}" AS SELECT t0.rowid AS rid, {owner} AS institution_id FROM {table} t0')
+        conn.execute(f'CREATE INDEX temp."idx_owner_{table}" ON "owner_{table}" (institution_id)')
+        owned.append(table)
+
+    institution_ids = {r[0] for r in conn.execute('SELECT id FROM institutions')}
+    for table in owned:
+        institution_ids.update(r[0] for r in conn.execute(
+            f'SELECT DISTINCT institution_id FROM "owner_{table}" WHERE institution_id IS NOT NULL'))
+
+    fingerprint = schema_fingerprint(conn)
+    for institution_id in sorted(institution_ids):
+        path = shard_path(institution_id, directory)
+        _migrate_shard(open_db, create_schema, path, fingerprint)
+        conn.execute('ATTACH DATABASE ? AS shard', (path,))
+        conn.execute('BEGIN')
+        moved = 0
+        for table in owned:
+            shard_columns = set(_columns(conn, table, 'shard'))
+            columns = ', '.join(c for c in _columns(conn, table) if c in shard_columns)
+            moved += conn.execute(f'''
+                INSERT INTO shard.{table} ({columns})
+                SELECT {columns} FROM main.{table}
+                WHERE rowid IN (SELECT rid FROM "owner_{table}" WHERE institution_id = ?)
+            ''', (institution_id,)).rowcount
+        conn.execute('COMMIT')
+        conn.execute('DETACH DATABASE shard')
+        print(f'[Shards] institution {institution_id}: {moved} rows -> {os.path.basename(path)}')
+
+    conn.execute('BEGIN')
+    for table in owned:
+        conn.execute(f'''
+            DELETE FROM main.{table}
+            WHERE rowid IN (SELECT rid FROM "owner_{table}" WHERE institution_id IS NOT NULL)
+        ''')
+    conn.execute('COMMIT')
+    conn.execute('VACUUM')
+    conn.close()
+    print(f'[Shards] Catalog: {catalog}')
+
+
+if __name__ == '__main__':
+    from database import open_db, create_schema
+    if len(sys.argv) == 4 and sys.argv[1] == 'split':
+        split(open_db, create_schema, sys.argv[2], sys.argv[3])
+    elif sys.argv[1:] == ['migrate'] and ENABLED:
+        migrate(open_db, create_schema)
+    elif sys.argv[1:] == ['list'] and ENABLED:
+        for institution_id in tenants():
+            path = shard_path(institution_id)
+            print(f'{institution_id or "catalog":>10}  {os.path.getsize(path) / 1024:10.0f} KB  {path}')
+    else:
+        print('usage: python tenancy.py split SOURCE.db DIRECTORY\n'
+              '       LMS_SHARD_DIR=DIRECTORY python tenancy.py migrate|list')
+        sys.exit(2)